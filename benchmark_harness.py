@@ -0,0 +1,392 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import interoperability_report as ir
+import test_suite_functions as tsf
+from rtps_test_capture import SubscriberCapture, can_capture, capture_ring, \
+    verify_capture
+from rtps_test_console import ConsoleCapture
+from rtps_test_emulator import get_emulated_sample
+from rtps_test_ring import SampleRing, get_ring_readers
+from rtps_test_samples import Sample, SampleReader, get_sample
+from rtps_test_utilities import basic_check
+
+# Subscriber shape_main application used by the benchmarks
+EMULATOR = f'{sys.executable} ' \
+    f'{os.path.join(os.path.dirname(os.path.abspath(__file__)), "rtps_test_emulator.py")}'
+
+# Check functions measured and the size of the samples the emulator prints
+# for each of them (0 increases the size for every sample), so they read
+# as many samples as they do in their Test Cases.
+BENCHMARKS = {
+    'basic_check': (basic_check, 0),
+    'test_ownership_receivers': (tsf.test_ownership_receivers, 20),
+    'test_ownership_receivers_by_samples_sent':
+        (tsf.test_ownership_receivers_by_samples_sent, 20),
+    'test_color_receivers': (tsf.test_color_receivers, 20),
+    'test_size_less_than_20': (tsf.test_size_less_than_20, 20),
+    'test_reliability_order': (tsf.test_reliability_order, 0),
+    'test_reliability_no_losses': (tsf.test_reliability_no_losses, 0),
+    'test_durability_volatile': (tsf.test_durability_volatile, 0),
+    'test_durability_transient_local':
+        (tsf.test_durability_transient_local, 0),
+}
+
+# Size of the samples of Publisher 2, which the Subscriber does not receive.
+SECOND_PUBLISHER_SIZE = 30
+
+# Time to wait for the rest of the samples once the check function finishes.
+DRAIN_TIMEOUT = 1
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Measure how many samples per second the harness '
+                '(run_subscriber_shape_main() and each check function) '
+                'processes, with a Subscriber emulator that prints the '
+                'samples at a configurable rate (rtps_test_emulator.py), '
+                'so the results do not depend on any DDS implementation.',
+            add_help=True)
+
+        gen_opts = parser.add_argument_group(title='general options')
+        gen_opts.add_argument('-c', '--check-functions',
+            nargs='+',
+            default=list(BENCHMARKS),
+            required=False,
+            type=str,
+            choices=list(BENCHMARKS),
+            metavar='check_function',
+            help='Check functions measured. Default: all.')
+        gen_opts.add_argument('-n', '--samples',
+            default=2000,
+            required=False,
+            type=int,
+            metavar='number_of_samples',
+            help='Number of samples the emulator prints. It must be greater '
+                'than the samples a check function reads '
+                f'({tsf.MAX_SAMPLES_READ}). Default: 2000.')
+        gen_opts.add_argument('-p', '--write-period',
+            default=0,
+            required=False,
+            type=float,
+            metavar='ms',
+            help='Period between samples in ms. With 0 the emulator prints '
+                'them as fast as possible and the lag is not calculated. '
+                'Default: 0.')
+        gen_opts.add_argument('-f', '--output-formats',
+            nargs='+',
+            default=['text'],
+            required=False,
+            type=str,
+            choices=ir.OUTPUT_FORMATS,
+            help='Output formats of the emulator. Default: text.')
+        gen_opts.add_argument('-b', '--io-backends',
+            nargs='+',
+            default=['pty'],
+            required=False,
+            type=str,
+            choices=ir.IO_BACKENDS,
+            help='I/O backends. Default: pty.')
+        gen_opts.add_argument('-r', '--repeat',
+            default=3,
+            required=False,
+            type=int,
+            metavar='number_of_runs',
+            help='Number of runs of each benchmark; the fastest one is '
+                'reported. Default: 3.')
+        gen_opts.add_argument('-t', '--timeout',
+            default=5,
+            required=False,
+            type=float,
+            metavar='seconds',
+            help='Timeout of the check functions. Default: 5.')
+        gen_opts.add_argument('-o', '--output',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file where the results are saved. Default: None.')
+        gen_opts.add_argument('--baseline',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file with the results of a previous run (see '
+                '--output). The benchmarks whose samples per second are '
+                'lower than the baseline by more than --tolerance are '
+                'reported and the script exits with an error. '
+                'Default: None.')
+        gen_opts.add_argument('--tolerance',
+            default=20,
+            required=False,
+            type=float,
+            metavar='percent',
+            help='Maximum decrease of the samples per second with respect '
+                'to --baseline. Default: 20.')
+        gen_opts.add_argument('--capture-then-verify',
+            action='store_true',
+            default=False,
+            required=False,
+            help='Measure the check functions built from conditions in the '
+                'capture-then-verify mode (see interoperability_report.py '
+                '--capture-then-verify): the time is the time to capture the '
+                'samples, and the time to verify them is reported apart. '
+                'Default: disabled.')
+        return parser
+
+def get_benchmark_name(
+        check_function_name: str,
+        output_format: str,
+        io_backend: str,
+        capture: bool = False) -> str:
+    """ Return the name of the results of a benchmark. """
+    return f'{check_function_name}/{output_format}/{io_backend}' \
+        + ('/capture' if capture else '')
+
+def count_samples(output, timeout: float) -> int:
+    """ Return the number of samples the output (a pexpect child or a
+        ShapeMainEvents) prints after the last one read, waiting up to
+        timeout seconds for each of them.
+    """
+    # SampleReader starts with the last sample matched, already read
+    skip = 1 if get_sample(output) is not None else 0
+    with SampleReader(output, timeout) as samples:
+        return max(0, sum(1 for _ in samples) - skip)
+
+def run_benchmark(
+        check_function_name: str,
+        samples: int,
+        write_period: float,
+        output_format: str,
+        io_backend: str,
+        timeout: float,
+        capture: bool = False) -> dict:
+    """ Run run_subscriber_shape_main() with the emulator and a check
+        function, and return its measurements:
+            * return_code: ReturnCode of the Subscriber.
+            * samples: samples read by the check function.
+            * time: time (in seconds) the check function took.
+            * cpu_time: CPU time (in seconds) the harness used meanwhile.
+            * samples_per_second: samples / time.
+            * lag_samples: samples already printed and not read yet when the
+              check function finished.
+            * lag: lag_samples * write_period (in seconds), or None if the
+              samples are printed as fast as possible.
+            * verify_time: time (in seconds) to verify the samples captured,
+              or None if they are checked while they are read.
+
+        check_function_name <<in>>: name of the check function (see
+                BENCHMARKS).
+        samples <<in>>: number of samples the emulator prints.
+        write_period <<in>>: period between samples in ms.
+        output_format <<in>>: output format of the emulator (see
+                OUTPUT_FORMATS).
+        io_backend <<in>>: I/O backend (see IO_BACKENDS).
+        timeout <<in>>: timeout of the check function.
+        capture <<in>>: if the check function is built from conditions, the
+                samples are captured and verified afterwards.
+    """
+    check_function, size = BENCHMARKS[check_function_name]
+    parameters = f'-S -t Square -z {size} --write-period {write_period} ' \
+                 f'--num-iterations {samples}'
+
+    # Samples the Publishers would have sent: the Subscriber receives the
+    # samples of Publisher 1 and Publisher 2 sends the same number of
+    # samples with another size, as in the Test Cases of Ownership.
+    condition = threading.Condition()
+    sample_rings = [SampleRing(samples, condition) for i in range(2)]
+    for i, publisher_size in enumerate([size, SECOND_PUBLISHER_SIZE]):
+        for number in range(1, samples + 1):
+            event = get_emulated_sample('Square', 'BLUE', publisher_size,
+                                        number)
+            sample_rings[i].put(Sample(event['topic'], event['color'],
+                                       event['x'], event['y'], event['size']))
+        sample_rings[i].finish()
+    samples_sent, last_sample_saved = get_ring_readers(sample_rings)
+
+    subscriber_capture = None
+    subscriber_check_function = check_function
+    if capture and can_capture(check_function):
+        subscriber_capture = SubscriberCapture(
+            tempfile.TemporaryFile(mode='w+b'), check_function.max_samples)
+        subscriber_check_function = subscriber_capture.check_function
+
+    measurements = {}
+    def measured_check_function(child_sub, samples_sent, last_sample_saved,
+                                timeout):
+        start_time = time.monotonic()
+        start_cpu_time = time.process_time()
+        return_code = subscriber_check_function(child_sub, samples_sent,
+                                                last_sample_saved, timeout)
+        measurements['time'] = time.monotonic() - start_time
+        measurements['cpu_time'] = time.process_time() - start_cpu_time
+        measurements['lag_samples'] = count_samples(child_sub, 0)
+        measurements['unread_samples'] = measurements['lag_samples'] \
+            + count_samples(child_sub, DRAIN_TIMEOUT)
+        return return_code
+
+    result_slots = ir.ResultSlots(group_size=1)
+    result_group = result_slots.acquire(1)
+    subscriber_finished = threading.Event()
+    console_capture = ConsoleCapture(tempfile.TemporaryFile(mode='w+t'))
+    # The Subscriber runs in a thread and, as in run_test(), the emulator
+    # is stopped once the Subscriber has finished. The check functions
+    # print the number of samples read.
+    subscriber = threading.Thread(
+        target=ir.run_subscriber_shape_main,
+        kwargs={
+            'name_executable': EMULATOR,
+            'parameters': parameters,
+            'produced_code': result_group.return_codes,
+            'produced_code_index': 0,
+            'subscriber_index': 1,
+            'samples_sent': samples_sent,
+            'last_sample_saved': last_sample_saved,
+            'verbosity': False,
+            'timeout': timeout,
+            'file': console_capture,
+            'subscriber_finished': subscriber_finished,
+            'check_function': measured_check_function,
+            'subscriber_ready': threading.Event(),
+            'child_pids': result_group.child_pids,
+            'stage_timeouts': ir.get_stage_timeouts(
+                None, EMULATOR, EMULATOR, check_function_name,
+                [parameters], timeout),
+            'stage_timestamps': result_group.stage_timestamps,
+            'output_format': output_format,
+            'io_backend': io_backend})
+    with contextlib.redirect_stdout(io.StringIO()):
+        subscriber.start()
+        while subscriber.is_alive() and not subscriber_finished.wait(1):
+            continue
+        if result_group.child_pids[0] != 0:
+            ir.stop_processes([ir.RemoteProcess(result_group.child_pids[0])],
+                              [ir.MAX_TEARDOWN_TIMEOUT])
+        subscriber.join()
+    console_capture.close()
+    console_capture.read_output()
+    return_code = result_group.return_codes[0]
+    result_slots.release(result_group)
+
+    verify_time = None
+    if subscriber_capture is not None:
+        start_time = time.monotonic()
+        captured_samples = subscriber_capture.read_capture()
+        if captured_samples is not None:
+            return_code = verify_capture(
+                check_function, captured_samples,
+                [capture_ring(element) for element in sample_rings])
+        verify_time = time.monotonic() - start_time
+
+    if 'time' not in measurements:
+        raise RuntimeError(f'The emulator did not print any sample '
+            f'({check_function_name}: {return_code.name}).')
+    read_samples = samples - measurements['unread_samples']
+    return {
+        'return_code': return_code.name,
+        'samples': read_samples,
+        'time': measurements['time'],
+        'cpu_time': measurements['cpu_time'],
+        'samples_per_second': read_samples / measurements['time']
+            if measurements['time'] > 0 else 0,
+        'lag_samples': measurements['lag_samples'],
+        'lag': measurements['lag_samples'] * write_period / 1000
+            if write_period > 0 else None,
+        'verify_time': verify_time,
+    }
+
+def get_regressions(
+        results: dict,
+        baseline: dict,
+        tolerance: float) -> "list[str]":
+    """ Return a message for each benchmark of results whose samples per
+        second are lower than in baseline by more than tolerance (percent).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['samples_per_second']
+        if result['samples_per_second'] < expected * (1 - tolerance / 100):
+            regressions.append(
+                f'{name}: {result["samples_per_second"]:.0f} samples/s '
+                f'(baseline: {expected:.0f} samples/s)')
+    return regressions
+
+def main():
+    args = Arguments.parser().parse_args()
+    if args.samples <= tsf.MAX_SAMPLES_READ:
+        raise RuntimeError('The number of samples must be greater than '
+                           f'{tsf.MAX_SAMPLES_READ}.')
+
+    print(f'{"benchmark":63} {"code":20} {"samples":>7} {"time (s)":>8} '
+          f'{"samples/s":>10} {"cpu (s)":>8} {"lag":>6} {"lag (s)":>8} '
+          f'{"verify (s)":>10}')
+    results = {}
+    for check_function_name in args.check_functions:
+        for output_format in args.output_formats:
+            for io_backend in args.io_backends:
+                name = get_benchmark_name(check_function_name, output_format,
+                                          io_backend, args.capture_then_verify)
+                best = None
+                for _ in range(args.repeat):
+                    result = run_benchmark(
+                        check_function_name, args.samples, args.write_period,
+                        output_format, io_backend, args.timeout,
+                        args.capture_then_verify)
+                    if best is None \
+                            or result['samples_per_second'] \
+                            > best['samples_per_second']:
+                        best = result
+                results[name] = best
+                lag = f'{"-":>8}' if best['lag'] is None \
+                    else f'{best["lag"]:8.3f}'
+                verify_time = f'{"-":>10}' if best['verify_time'] is None \
+                    else f'{best["verify_time"]:10.3f}'
+                print(f'{name:63} {best["return_code"]:20} '
+                      f'{best["samples"]:7} {best["time"]:8.3f} '
+                      f'{best["samples_per_second"]:10.0f} '
+                      f'{best["cpu_time"]:8.3f} {best["lag_samples"]:6} {lag} '
+                      f'{verify_time}')
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'samples': args.samples,
+                'write_period': args.write_period,
+                'results': results,
+            }, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = get_regressions(results, baseline, args.tolerance)
+        for element in regressions:
+            print(f'Regression: {element}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import argparse
+import re
+import sys
+import time
+
+import pexpect
+
+from rtps_test_io import IO_BACKENDS, spawn
+from rtps_test_samples import SampleReader
+
+# Application used by default: it prints the samples as a shape_main
+# Publisher with -w and --write-period 0 would do, and then the time it
+# took to print them (WRITER_TIME).
+DEFAULT_WRITER = (
+    f'{sys.executable} -c "import sys, time\n'
+    'start = time.monotonic()\n'
+    'for i in range(1, int(sys.argv[1]) + 1):\n'
+    '    print(\'Square     BLUE       %03d %03d [%d]\' % (i % 250, i % 230, i))\n'
+    'sys.stdout.flush()\n'
+    'print(\'Written in %f seconds\' % (time.monotonic() - start))" {samples}')
+WRITER_TIME = re.compile(r'Written in ([0-9.]+) seconds')
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Measure how fast the harness reads the samples '
+                'printed by an application with each I/O backend '
+                '(interoperability_report.py --io-backend). The samples are '
+                'read with the same SampleReader as the check functions.',
+            add_help=True)
+
+        gen_opts = parser.add_argument_group(title='general options')
+        gen_opts.add_argument('-c', '--command',
+            default=None,
+            required=False,
+            type=str,
+            metavar='command',
+            help='Application that prints the samples, for example '
+                '"shape_main -P -t Square -w --write-period 1". '
+                '{samples} is replaced by the number of samples. '
+                'Default: a Python application that prints the samples as '
+                'fast as possible and the time it took.')
+        gen_opts.add_argument('-n', '--samples',
+            default=100000,
+            required=False,
+            type=int,
+            metavar='number_of_samples',
+            help='Number of samples read. Default: 100000.')
+        gen_opts.add_argument('-b', '--backends',
+            nargs='+',
+            default=IO_BACKENDS,
+            required=False,
+            type=str,
+            choices=IO_BACKENDS,
+            help='I/O backends measured. Default: all.')
+        gen_opts.add_argument('-w', '--work',
+            default=0,
+            required=False,
+            type=float,
+            metavar='microseconds',
+            help='Time the harness spends with each sample, to simulate the '
+                'work of the check functions. With a small buffer, the '
+                'application blocks while the harness is busy. Default: 0.')
+        gen_opts.add_argument('-r', '--repeat',
+            default=3,
+            required=False,
+            type=int,
+            metavar='number_of_runs',
+            help='Number of runs of each I/O backend; the best one is '
+                'reported. Default: 3.')
+        gen_opts.add_argument('-t', '--timeout',
+            default=10,
+            required=False,
+            type=float,
+            metavar='seconds',
+            help='Time to wait for each sample. Default: 10.')
+        return parser
+
+def run_benchmark(
+        command: str,
+        io_backend: str,
+        samples: int,
+        work: float,
+        timeout: float) -> "tuple[int, float, float]":
+    """ Run the command with the I/O backend and read its samples.
+
+        command <<in>>: application that prints the samples.
+        io_backend <<in>>: I/O backend (see IO_BACKENDS).
+        samples <<in>>: maximum number of samples read.
+        work <<in>>: time (in seconds) spent with each sample.
+        timeout <<in>>: time to wait for each sample.
+
+        It returns the number of samples read, the time (in seconds) the
+        harness took to read them and the time the application took to
+        print them (None if the application does not print it).
+    """
+    child = spawn(command, io_backend)
+    try:
+        start = time.monotonic()
+        if child.expect([r'\[[0-9]+\]', pexpect.TIMEOUT, pexpect.EOF],
+                        timeout) != 0:
+            return 0, 0.0, None
+        samples_read = 0
+        with SampleReader(child, timeout) as sample_reader:
+            for _ in sample_reader:
+                samples_read += 1
+                if work:
+                    end = time.perf_counter() + work
+                    while time.perf_counter() < end:
+                        pass
+                if samples_read == samples:
+                    break
+        read_time = time.monotonic() - start
+        writer_time = None
+        if child.expect([WRITER_TIME, pexpect.TIMEOUT, pexpect.EOF],
+                        timeout) == 0:
+            writer_time = float(child.match.group(1))
+        return samples_read, read_time, writer_time
+    finally:
+        if child.isalive():
+            child.sendintr()
+        child.close(force=True)
+
+def main():
+    args = Arguments.parser().parse_args()
+    command = args.command if args.command is not None else DEFAULT_WRITER
+    command = command.replace('{samples}', str(args.samples))
+
+    print(f'{"I/O backend":12} {"samples":>8} {"read (s)":>9} '
+          f'{"samples/s":>10} {"writer (s)":>10}')
+    for io_backend in args.backends:
+        best = None
+        for _ in range(args.repeat):
+            result = run_benchmark(command, io_backend, args.samples,
+                                   args.work / 1e6, args.timeout)
+            if best is None or result[1] < best[1]:
+                best = result
+        samples_read, read_time, writer_time = best
+        rate = samples_read / read_time if read_time else 0
+        writer = f'{writer_time:10.3f}' if writer_time is not None \
+            else f'{"-":>10}'
+        print(f'{io_backend:12} {samples_read:8} {read_time:9.3f} '
+              f'{rate:10.0f} {writer}')
+
+if __name__ == '__main__':
+    main()
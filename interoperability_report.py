@@ -20,65 +20,755 @@ import tempfile
 from os.path import exists
 import inspect
 import platform
+import queue
+import threading
+import concurrent.futures
+import os
+import select
+import signal
+import asyncio
+import pexpect.expect
 
 if __name__ == "__main__" and platform.system() == "Darwin":
     multiprocessing.set_start_method('fork')
 
 from rtps_test_utilities import ReturnCode, log_message, basic_check, remove_ansi_colors
+from rtps_test_history import TimingHistory, adaptive_timeout, MIN_HISTORY_VALUES
+from rtps_test_capabilities import Capabilities
+from rtps_test_events import OUTPUT_FORMATS, JSONL_OPTION, ShapeMainEvents, \
+    supports_jsonl
+from rtps_test_samples import get_sample
+from rtps_test_alignment import RELIABILITY_METRICS
+from rtps_test_checks import get_metric_names
+from rtps_test_io import IO_BACKENDS, spawn
+from rtps_test_console import ConsoleCapture, DEFAULT_CONSOLE_LINES
+from rtps_test_capture import SampleCapture, SubscriberCapture, can_capture, \
+    capture_ring, save_captures, verify_capture
+from rtps_test_ring import SampleRing, SampleRingReader, LastSampleSaved, \
+    get_ring_readers
+from rtps_test_cache import ResultCache, is_cacheable, \
+    get_default_cache_directory, DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_SIZE_MB
+from rtps_test_journal import Journal, get_completed_test_cases
+from rtps_test_server import ServerPool
+from rtps_test_scheduling import Durations, order_longest_first, \
+    parse_shard, split_in_shards
 
 # This parameter is used to save the samples the Publisher sends.
 # MAX_SAMPLES_SAVED is the maximum number of samples saved.
 MAX_SAMPLES_SAVED = 500
 
-def stop_process(child_process, timeout=30, poll_interval=0.2):
+# Time pexpect waits until it matches a pattern.
+DEFAULT_TIMEOUT = 15
+
+# Maximum and minimum time (in seconds) a shape_main application has to exit
+# after SIGINT before it is forcefully terminated. The actual value depends
+# on the time the product took to exit in previous runs (see
+# get_teardown_timeout()).
+MAX_TEARDOWN_TIMEOUT = 30
+MIN_TEARDOWN_TIMEOUT = 2
+# Value saved in the timing history when a shape_main application did not
+# exit after SIGINT and had to be killed.
+FORCED_TEARDOWN = -1
+# Minimum timeout (in seconds) of a stage of the shape_main applications,
+# and margin added to the durations of previous runs. See get_stage_timeouts().
+MIN_STAGE_TIMEOUT = 3
+STAGE_TIMEOUT_MARGIN = 2
+
+# ReturnCodes that a shape_main application only obtains after waiting for
+# a timeout. Test Cases that expect them are long.
+TIMEOUT_RETURN_CODES = [
+    ReturnCode.READER_NOT_MATCHED,
+    ReturnCode.DATA_NOT_RECEIVED,
+    ReturnCode.DATA_NOT_SENT,
+]
+
+# Highest Domain ID that can be used. The RTPS well-known port mapping with
+# the default parameters does not allow Domain IDs greater than 232.
+MAX_DOMAIN_ID = 232
+
+# Lock to serialize the creation of the junitparser attributes that contain
+# the shape_main application parameters (see run_test()). These attributes
+# are created at class level, so test cases running at the same time may
+# overwrite them.
+junit_attribute_lock = threading.Lock()
+
+class DomainIdPool:
+    """ Pool of Domain IDs used to isolate the test cases that run at the
+        same time.
+
+        Each test case takes a block of 'block_size' consecutive Domain IDs
+        and the Domain IDs configured in the test case are used as offsets
+        within that block. This way, test cases that use several Domain IDs
+        (such as Test_Domain_1) keep their relative Domain IDs, and test
+        cases running at the same time cannot see each other's traffic.
     """
-    Stops a pexpect child process using SIGINT (Ctrl+C),
-    and forcefully terminates it if it doesn't exit within the timeout.
+    def __init__(self, block_size: int, num_blocks: int):
+        # Use as many blocks as possible if there are not enough Domain IDs.
+        # In that case, the Test Cases wait for a free block.
+        num_blocks = min(num_blocks, (MAX_DOMAIN_ID + 1) // block_size)
+        self.block_size = block_size
+        self.__free_blocks = queue.Queue()
+        for i in range(num_blocks):
+            self.__free_blocks.put(i * block_size)
+
+    def acquire(self) -> int:
+        """ Wait for a free block and return its first Domain ID. """
+        return self.__free_blocks.get()
+
+    def release(self, base_domain_id: int):
+        """ Return a block of Domain IDs to the pool. """
+        self.__free_blocks.put(base_domain_id)
+
+# Regular expression that matches the Domain ID parameter of the shape_main
+# application. group(1) contains the Domain ID.
+DOMAIN_ID_PARAMETER = re.compile(r'(?<!\S)-d\s+([0-9]+)')
+
+# Regular expression that matches the write period parameter of the
+# shape_main application. group(1) contains the write period in ms.
+WRITE_PERIOD_PARAMETER = re.compile(r'--write-period\s+([0-9]+)')
+
+def get_domain_ids(parameters: "list[str]") -> "list[int]":
+    """ Return the Domain ID used by each shape_main application. If the
+        Domain ID is not set, the shape_main application uses Domain ID 0.
+    """
+    domain_ids = []
+    for element in parameters:
+        domain_id = DOMAIN_ID_PARAMETER.search(element)
+        domain_ids.append(int(domain_id.group(1)) if domain_id else 0)
+    return domain_ids
+
+def get_domain_block_size(test_cases: "list[tuple]") -> int:
+    """ Return the number of consecutive Domain IDs needed to run any of the
+        (test_suite_name, test_case_name, test_case_parameters) Test Cases.
+    """
+    return 1 + max(
+        [max(get_domain_ids(element[2]['apps'])) for element in test_cases],
+        default=0)
+
+def rewrite_domain_ids(parameters: "list[str]", base_domain_id: int) -> "list[str]":
+    """ Return a copy of the shape_main application parameters with the
+        Domain IDs moved to the block that starts at base_domain_id. The
+        original Domain ID is used as an offset within the block.
+    """
+    new_parameters = []
+    for element, domain_id in zip(parameters, get_domain_ids(parameters)):
+        domain_parameter = f'-d {base_domain_id + domain_id}'
+        if DOMAIN_ID_PARAMETER.search(element):
+            element = DOMAIN_ID_PARAMETER.sub(domain_parameter, element)
+        else:
+            element += f' {domain_parameter}'
+        new_parameters.append(element)
+    return new_parameters
+
+def wait_any_process_exit(
+        child_processes: "list[pexpect.spawn]",
+        timeout: float) -> "list[pexpect.spawn]":
+    """
+    Waits until at least one of the child processes exits or the timeout
+    expires, whatever happens first. It reacts as soon as a child exits
+    (using pidfd on Linux or kqueue on macOS/BSD, polling on other
+    platforms). Meanwhile, it reads the output of the children, so they
+    cannot block writing to a full terminal. The output of a RemoteProcess
+    is read by the process that spawned it.
 
     Parameters:
-        child_process (pexpect.spawn): The process to stop.
-        timeout (int): Max time (in seconds) to wait for graceful exit.
-        poll_interval (float): Time between checks in seconds.
+        child_processes (list of pexpect.spawn or RemoteProcess): The
+            processes to wait for.
+        timeout (float): Max time (in seconds) to wait.
 
     Returns:
-        bool: True if process exited gracefully, False if it was killed.
+        list of pexpect.spawn or RemoteProcess: The processes that have
+            exited.
     """
-    if child_process.isalive():
+    deadline = time.monotonic() + timeout
+    exited = [child for child in child_processes if not child.isalive()]
+    if exited:
+        return exited
+
+    if hasattr(os, 'pidfd_open'):
+        poller = select.poll()
+        pidfds = {}
+        child_fds = {}
         try:
-            child_process.sendintr()
-        except Exception as e:
-            return True  # Process already exited
+            for child in child_processes:
+                try:
+                    pidfd = os.pidfd_open(child.pid)
+                except ProcessLookupError:
+                    exited.append(child)  # Exited and already reaped
+                    continue
+                pidfds[pidfd] = child
+                poller.register(pidfd, select.POLLIN)
+                if child.child_fd is not None:
+                    child_fds[child.child_fd] = child
+                    poller.register(child.child_fd, select.POLLIN)
+            while not exited and time.monotonic() < deadline:
+                remaining_ms = max(0, (deadline - time.monotonic()) * 1000)
+                for fd, _ in poller.poll(remaining_ms):
+                    if fd in pidfds:
+                        exited.append(pidfds[fd])
+                    elif fd in child_fds:
+                        try:
+                            child_fds[fd].read_nonblocking(65536, timeout=0)
+                        except (pexpect.TIMEOUT, pexpect.EOF):
+                            poller.unregister(fd)
+        finally:
+            for pidfd in pidfds:
+                os.close(pidfd)
+    elif hasattr(select, 'kqueue'):
+        kq = select.kqueue()
+        children_by_pid = {child.pid: child for child in child_processes}
+        try:
+            kq.control([select.kevent(pid,
+                                      filter=select.KQ_FILTER_PROC,
+                                      flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                                      fflags=select.KQ_NOTE_EXIT)
+                        for pid in children_by_pid], 0, 0)
+            events = kq.control(None, len(children_by_pid),
+                                max(0, deadline - time.monotonic()))
+            exited = [children_by_pid[event.ident] for event in events]
+        except ProcessLookupError:
+            pass  # A process exited before registering it, checked below
+        finally:
+            kq.close()
     else:
-        return True  # Process already exited
+        while not exited and time.monotonic() < deadline:
+            time.sleep(0.05)
+            exited = [child for child in child_processes if not child.isalive()]
+
+    # Also report the processes that exited while registering the others
+    return exited or [child for child in child_processes if not child.isalive()]
+
+class RemoteProcess:
+    """
+    shape_main application spawned by another process, such as the ones
+    that run_test() starts for each entity. It has the interface of
+    pexpect.spawn that stop_processes() uses, so the shape_main applications
+    of all the entities are stopped at the same time by a single process.
+    The signals are sent to the process group of the application, the same
+    way Ctrl+C in its terminal does. The process that spawned the
+    application reads its output until it exits.
+    """
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.child_fd = None
+
+    def isalive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
 
-    return_value = True
+    def sendintr(self):
+        os.killpg(self.pid, signal.SIGINT)
 
-    start_time = time.time()
-    while child_process.isalive() and (time.time() - start_time < timeout):
-        time.sleep(poll_interval)
+    def terminate(self, force: bool = False):
+        try:
+            os.killpg(self.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass  # Process already exited
+
+def stop_processes(
+        child_processes: "list[pexpect.spawn | RemoteProcess]",
+        timeouts: "list[float]") -> "list[tuple]":
+    """
+    Stops several pexpect child processes at the same time using SIGINT
+    (Ctrl+C), and forcefully terminates the ones that do not exit within
+    their timeout.
 
-    if child_process.isalive():
-        child_process.terminate(force=True)
-        return_value = False  # Process was forcefully terminated
+    Parameters:
+        child_processes (list of pexpect.spawn or RemoteProcess): The
+            processes to stop.
+        timeouts (list of float): Max time (in seconds) to wait for the
+            graceful exit of each process.
+
+    Returns:
+        list of (bool, float): For each process, True if it exited
+            gracefully, False if it was killed; and the time (in seconds)
+            it took to stop.
+    """
+    result = [(True, 0.0)] * len(child_processes)
+    alive = []
+    for i, child in enumerate(child_processes):
+        if child.isalive():
+            try:
+                child.sendintr()
+                alive.append(i)
+            except Exception as e:
+                pass  # Process already exited
+
+    start_time = time.monotonic()
+    while alive:
+        elapsed = time.monotonic() - start_time
+        for i in [i for i in alive if elapsed >= timeouts[i]]:
+            child_processes[i].terminate(force=True)
+            result[i] = (False, elapsed)  # Process was forcefully terminated
+            alive.remove(i)
+        if not alive:
+            break
+        exited = wait_any_process_exit(
+            [child_processes[i] for i in alive],
+            min(timeouts[i] for i in alive) - elapsed)
+        for i in [i for i in alive if child_processes[i] in exited]:
+            result[i] = (True, time.monotonic() - start_time)
+            alive.remove(i)
+
+    for child in child_processes:
+        if isinstance(child, RemoteProcess):
+            continue  # Its output is read by the process that spawned it
+        try:
+            child.expect(pexpect.EOF, timeout=5)
+        except pexpect.TIMEOUT:
+            pass
+
+    return result
+
+def stop_process(child_process, timeout=MAX_TEARDOWN_TIMEOUT):
+    """
+    Stops a pexpect child process using SIGINT (Ctrl+C),
+    and forcefully terminates it if it doesn't exit within the timeout.
 
-    child_process.expect(pexpect.EOF, timeout=5)
+    Parameters:
+        child_process (pexpect.spawn): The process to stop.
+        timeout (float): Max time (in seconds) to wait for graceful exit.
 
-    return return_value
+    Returns:
+        (bool, float): True if process exited gracefully, False if it was
+            killed; and the time (in seconds) it took to stop.
+    """
+    return stop_processes([child_process], [timeout])[0]
+
+def get_teardown_timeout(
+        timing_history: TimingHistory,
+        name_executable: str) -> float:
+    """ Return the time a shape_main application has to exit after SIGINT,
+        based on the time it took to exit in previous runs. If there is no
+        history, it returns MAX_TEARDOWN_TIMEOUT.
+    """
+    if timing_history is None:
+        return MAX_TEARDOWN_TIMEOUT
+    values = timing_history.get(
+        f'teardown/{get_product_name(name_executable)}')
+    graceful_values = [value for value in values if value != FORCED_TEARDOWN]
+    if values and not graceful_values:
+        # The application never exits after SIGINT, there is no need
+        # to wait for it.
+        return MIN_TEARDOWN_TIMEOUT
+    return adaptive_timeout(graceful_values,
+                            minimum=MIN_TEARDOWN_TIMEOUT,
+                            maximum=MAX_TEARDOWN_TIMEOUT,
+                            margin=1)
+
+# Stages of the shape_main applications whose duration is saved in the
+# timing history and whose timeout is calculated from it.
+# Each stage finishes when the shape_main application prints:
+#   *_topic: 'Create topic:'
+#   pub_writer / sub_reader: 'Create writer/reader for topic'
+#   pub_matched: 'on_publication_matched()'
+#   pub_data / sub_data: the first sample
+PUBLISHER_STAGES = ['pub_topic', 'pub_writer', 'pub_matched', 'pub_data']
+SUBSCRIBER_STAGES = ['sub_topic', 'sub_reader', 'sub_data']
+
+def get_write_period(parameters: "list[str]") -> int:
+    """ Return the longest write period (in ms) set in the shape_main
+        application parameters, or None if none of them sets it.
+    """
+    write_periods = [int(element) for element in
+                     WRITE_PERIOD_PARAMETER.findall(' '.join(parameters))]
+    return max(write_periods, default=None)
+
+def get_stage_history_keys(
+        name_executable_pub: str,
+        name_executable_sub: str,
+        test_case_name: str,
+        parameters: "list[str]") -> "list[str]":
+    """ Return the prefixes of the keys of the timing history that keep the
+        stage durations of a Test Case for the publisher/subscriber pair:
+        the first one is only used by this Test Case, the second one is
+        shared by the Test Cases whose Publishers use the same write period
+        (see get_stage_timeouts()).
+    """
+    pair = f'{get_product_name(name_executable_pub)}---' \
+           f'{get_product_name(name_executable_sub)}'
+    write_period = get_write_period(parameters)
+    return [f'stage/{pair}/{test_case_name}',
+            f'stage/{pair}/write_period_'
+            + ('default' if write_period is None else str(write_period))]
+
+def get_stage_timeouts(
+        timing_history: TimingHistory,
+        name_executable_pub: str,
+        name_executable_sub: str,
+        test_case_name: str,
+        parameters: "list[str]",
+        timeout: float) -> "dict[str, float]":
+    """ Return the timeout of each stage of the shape_main applications of a
+        Test Case for the publisher/subscriber pair. It is calculated from
+        the durations of the stage in previous runs of the same Test Case
+        (see adaptive_timeout()) and it is never greater than timeout. The
+        durations depend on the Test Case, for example the first sample
+        takes longer with a long write period. If the stage has not
+        succeeded enough times in the Test Case (for example, because the
+        Test Case expects it to fail), the durations of the Test Cases with
+        the same write period are used. If there is no history, all stages
+        use timeout.
+    """
+    stage_timeouts = {}
+    for stage in PUBLISHER_STAGES + SUBSCRIBER_STAGES:
+        if timing_history is None:
+            stage_timeouts[stage] = timeout
+            continue
+        for key in get_stage_history_keys(name_executable_pub,
+                                          name_executable_sub,
+                                          test_case_name, parameters):
+            values = timing_history.get(f'{key}/{stage}')
+            if len(values) >= MIN_HISTORY_VALUES:
+                break
+        stage_timeouts[stage] = adaptive_timeout(
+            values,
+            minimum=MIN_STAGE_TIMEOUT,
+            maximum=timeout,
+            margin=STAGE_TIMEOUT_MARGIN)
+    return stage_timeouts
+
+# Timestamps saved for each shape_main application: when it is started and
+# when each stage finishes. The duration of a stage is the time since the
+# previous timestamp.
+SLOT_TIMESTAMPS = ['start'] + PUBLISHER_STAGES + SUBSCRIBER_STAGES
+# Metrics that the check functions may measure on the samples of each
+# shape_main application (see get_metric_names()).
+SLOT_METRICS = RELIABILITY_METRICS
+# Value of a ReturnCode, a timestamp or a metric that has not been saved.
+NOT_SAVED = -1
+
+class SharedReturnCodes:
+    """ List-like access to the ReturnCodes of a group of result slots.
+        An element is None until the shape_main application saves its
+        ReturnCode.
+    """
+    def __init__(self, array: "multiprocessing.Array", base: int, size: int):
+        self.__array = array
+        self.__base = base
+        self.__size = size
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __getitem__(self, index: int) -> ReturnCode:
+        if not 0 <= index < self.__size:
+            raise IndexError('result slot index out of range')
+        value = self.__array[self.__base + index]
+        return None if value == NOT_SAVED else ReturnCode(value)
+
+    def __setitem__(self, index: int, code: ReturnCode):
+        self.__array[self.__base + index] = code.value
+
+    def clear(self):
+        for i in range(self.__size):
+            self.__array[self.__base + i] = NOT_SAVED
+
+class SharedTeardownResults:
+    """ List-like access to the results of stop_processes() (exited gracefully,
+        time to stop) of a group of result slots.
+    """
+    def __init__(
+            self,
+            graceful: "multiprocessing.Array",
+            seconds: "multiprocessing.Array",
+            base: int,
+            size: int):
+        self.__graceful = graceful
+        self.__seconds = seconds
+        self.__base = base
+        self.__size = size
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __getitem__(self, index: int) -> "tuple[bool, float]":
+        if not 0 <= index < self.__size:
+            raise IndexError('result slot index out of range')
+        return (bool(self.__graceful[self.__base + index]),
+                self.__seconds[self.__base + index])
+
+    def __setitem__(self, index: int, result: "tuple[bool, float]"):
+        self.__graceful[self.__base + index] = result[0]
+        self.__seconds[self.__base + index] = result[1]
+
+    def clear(self):
+        for i in range(self.__size):
+            self[i] = (True, 0.0)
+
+class SharedChildPids:
+    """ List-like access to the PIDs of the shape_main applications of a
+        group of result slots. An element is 0 until the shape_main
+        application is spawned.
+    """
+    def __init__(self, array: "multiprocessing.Array", base: int, size: int):
+        self.__array = array
+        self.__base = base
+        self.__size = size
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.__size:
+            raise IndexError('result slot index out of range')
+        return self.__array[self.__base + index]
+
+    def __setitem__(self, index: int, pid: int):
+        self.__array[self.__base + index] = pid
+
+    def clear(self):
+        for i in range(self.__size):
+            self.__array[self.__base + i] = 0
+
+class SharedStageTimestamps:
+    """ Access to the timestamps (time.monotonic()) of a group of result
+        slots. The key is (index of the shape_main application, name), where
+        name is one of SLOT_TIMESTAMPS.
+    """
+    def __init__(self, array: "multiprocessing.Array", base: int, size: int):
+        self.__array = array
+        self.__base = base
+        self.__size = size
+
+    def __position(self, key: "tuple[int, str]") -> int:
+        index, name = key
+        return (self.__base + index) * len(SLOT_TIMESTAMPS) \
+            + SLOT_TIMESTAMPS.index(name)
+
+    def __getitem__(self, key: "tuple[int, str]") -> float:
+        """ Return the timestamp, or None if it has not been saved. """
+        value = self.__array[self.__position(key)]
+        return None if value == NOT_SAVED else value
+
+    def __setitem__(self, key: "tuple[int, str]", timestamp: float):
+        self.__array[self.__position(key)] = timestamp
+
+    def get_durations(self, index: int, stages: "list[str]") -> "dict[str, float]":
+        """ Return the duration of the stages that shape_main application
+            'index' finished. stages must be in the order they happen.
+        """
+        durations = {}
+        previous = self[(index, 'start')]
+        for stage in stages:
+            timestamp = self[(index, stage)]
+            if previous is None or timestamp is None:
+                break
+            durations[stage] = timestamp - previous
+            previous = timestamp
+        return durations
+
+    def clear(self):
+        for index in range(self.__size):
+            for name in SLOT_TIMESTAMPS:
+                self[(index, name)] = NOT_SAVED
+
+class SharedMetrics:
+    """ Access to the metrics that the check functions measure on the
+        samples (see get_metric_names()) of a group of result slots. The key
+        is (index of the shape_main application, name), where name is one
+        of SLOT_METRICS.
+    """
+    def __init__(self, array: "multiprocessing.Array", base: int, size: int):
+        self.__array = array
+        self.__base = base
+        self.__size = size
+
+    def __position(self, key: "tuple[int, str]") -> int:
+        index, name = key
+        return (self.__base + index) * len(SLOT_METRICS) \
+            + SLOT_METRICS.index(name)
+
+    def __getitem__(self, key: "tuple[int, str]") -> int:
+        """ Return the metric, or None if it has not been saved. """
+        value = self.__array[self.__position(key)]
+        return None if value == NOT_SAVED else value
+
+    def __setitem__(self, key: "tuple[int, str]", value: int):
+        self.__array[self.__position(key)] = value
+
+    def update(self, index: int, metrics: "dict[str, int]"):
+        """ Save the metrics of shape_main application 'index'. """
+        for name, value in metrics.items():
+            self[(index, name)] = value
+
+    def get_metrics(self, index: int) -> "dict[str, int]":
+        """ Return the metrics saved by shape_main application 'index'. """
+        return {name: self[(index, name)] for name in SLOT_METRICS
+                if self[(index, name)] is not None}
+
+    def clear(self):
+        for index in range(self.__size):
+            for name in SLOT_METRICS:
+                self[(index, name)] = NOT_SAVED
+
+class ResultGroup:
+    """ Result slots used by one Test Case, one for each shape_main
+        application. Only the process of a shape_main application writes
+        its slot, except the result of stop_processes(), which is written
+        by the process that stops all of them.
+    """
+    def __init__(self, slots: "ResultSlots", base: int, size: int):
+        self.base = base
+        self.return_codes = SharedReturnCodes(slots.return_codes, base, size)
+        self.child_pids = SharedChildPids(slots.child_pids, base, size)
+        self.teardown_result = SharedTeardownResults(
+            slots.teardown_graceful, slots.teardown_seconds, base, size)
+        self.stage_timestamps = SharedStageTimestamps(
+            slots.timestamps, base, size)
+        self.metrics = SharedMetrics(slots.metrics, base, size)
+
+class ResultSlots:
+    """ Shared memory where the processes of the shape_main applications save
+        their results: the ReturnCode, the PID of the shape_main application,
+        the result of stop_processes(), the timestamps of the stages and the
+        metrics of the samples.
+
+        The slots are created once and reused by all the Test Cases. They are
+        divided in 'num_groups' groups of 'group_size' slots. Each Test Case
+        takes a group while it runs, so there must be as many groups as
+        Test Cases running at the same time.
+    """
+    def __init__(self, group_size: int, num_groups: int = 1):
+        num_slots = group_size * num_groups
+        self.group_size = group_size
+        # Each slot is written by one process only, so no lock is needed.
+        self.return_codes = multiprocessing.RawArray('i', num_slots)
+        self.child_pids = multiprocessing.RawArray('i', num_slots)
+        self.teardown_graceful = multiprocessing.RawArray('b', num_slots)
+        self.teardown_seconds = multiprocessing.RawArray('d', num_slots)
+        self.timestamps = multiprocessing.RawArray(
+            'd', num_slots * len(SLOT_TIMESTAMPS))
+        self.metrics = multiprocessing.RawArray(
+            'q', num_slots * len(SLOT_METRICS))
+        self.__free_groups = queue.Queue()
+        for i in range(num_groups):
+            self.__free_groups.put(i * group_size)
+
+    def acquire(self, size: int) -> ResultGroup:
+        """ Wait for a free group and return its first 'size' slots, cleared. """
+        if size > self.group_size:
+            raise RuntimeError(f'Cannot save the results of {size} shape_main '
+                f'applications, the maximum is {self.group_size}.')
+        group = ResultGroup(self, self.__free_groups.get(), size)
+        group.return_codes.clear()
+        group.child_pids.clear()
+        group.teardown_result.clear()
+        group.stage_timestamps.clear()
+        group.metrics.clear()
+        return group
+
+    def release(self, group: ResultGroup):
+        """ Return a group of result slots to the pool. """
+        self.__free_groups.put(group.base)
+
+def get_result_group_size(test_cases: "list[tuple]") -> int:
+    """ Return the number of result slots needed to run any of the
+        (test_suite_name, test_case_name, test_case_parameters) Test Cases.
+    """
+    return max([len(element[2]['apps']) for element in test_cases], default=1)
+
+def expect_stage(
+        child: pexpect.spawn,
+        patterns: list,
+        stage: str,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps,
+        produced_code_index: int) -> int:
+    """ Run child.expect() with the timeout of the stage. If the first
+        pattern (the one expected when the stage succeeds) matches, the
+        time is saved in stage_timestamps[(produced_code_index, stage)].
+        It returns the index of the pattern matched.
+    """
+    index = child.expect(patterns, stage_timeouts[stage])
+    if index == 0:
+        stage_timestamps[(produced_code_index, stage)] = time.monotonic()
+    return index
+
+def run_check_function(
+        check_function: "function",
+        child_sub: "pexpect.spawn | ShapeMainEvents",
+        samples_sent: "list[SampleRingReader]",
+        last_sample_saved: "list[LastSampleSaved]",
+        timeout: int,
+        sample_metrics: SharedMetrics,
+        produced_code_index: int) -> ReturnCode:
+    """ Run the check function of a Subscriber and return its ReturnCode.
+        If it measures metrics on the samples (see get_metric_names()), they
+        are saved in sample_metrics with the index produced_code_index.
+    """
+    if sample_metrics is None or not get_metric_names(check_function):
+        return check_function(child_sub, samples_sent, last_sample_saved,
+                              timeout)
+    metrics = {}
+    return_code = check_function(child_sub, samples_sent, last_sample_saved,
+                                 timeout, metrics=metrics)
+    sample_metrics.update(produced_code_index, metrics)
+    return return_code
+
+def spawn_shape_main(
+        name_executable: str,
+        parameters: str,
+        file: ConsoleCapture,
+        working_directory: str,
+        output_format: str,
+        verbosity: bool,
+        io_backend: str = 'pty') -> "tuple[pexpect.spawn, object]":
+    """ Run the shape_main application with the parameters and return its
+        pexpect child (with the I/O backend io_backend, see IO_BACKENDS) and
+        the object that reads its output: the child itself or, if
+        output_format is 'jsonl' and the application supports it (see
+        supports_jsonl()), a ShapeMainEvents.
+    """
+    jsonl = output_format == 'jsonl' and supports_jsonl(
+        name_executable, working_directory, verbosity)
+    child = spawn(
+        f'{name_executable} {parameters}' + (f' {JSONL_OPTION}' if jsonl else ''),
+        io_backend, cwd=working_directory)
+    child.logfile = file
+    return child, ShapeMainEvents(child) if jsonl else child
+
+def create_sample_rings(
+        parameters: "list[str]",
+        condition_type: type) -> "list[SampleRing]":
+    """ Return the SampleRings used to save the samples the Publishers send,
+        one for each Publisher: element 1 of the list is for Publisher 1,
+        etc. All the Subscribers read the same SampleRings (see
+        get_ring_readers()). condition_type is the type of the Condition
+        used to wait for new samples (see SampleRing). All the SampleRings
+        share the same Condition, so a Subscriber can wait for a sample of
+        any Publisher (see SampleAttribution.wait()).
+    """
+    num_publishers = sum(1 for element in parameters
+                         if '-P ' in element or element.endswith('-P'))
+    condition = condition_type()
+    return [SampleRing(MAX_SAMPLES_SAVED, condition)
+            for i in range(num_publishers)]
 
 def run_subscriber_shape_main(
         name_executable: str,
         parameters: str,
-        produced_code: "list[int]",
+        produced_code: SharedReturnCodes,
         produced_code_index: int,
         subscriber_index: int,
-        samples_sent: "list[multiprocessing.Queue]",
-        last_sample_saved: "list[multiprocessing.Queue]",
+        samples_sent: "list[SampleRingReader]",
+        last_sample_saved: "list[LastSampleSaved]",
         verbosity: bool,
         timeout: int,
-        file: tempfile.TemporaryFile,
+        file: ConsoleCapture,
         subscriber_finished: multiprocessing.Event,
-        publishers_finished: "list[multiprocessing.Event]",
-        check_function: "function"):
+        check_function: "function",
+        subscriber_ready: multiprocessing.Event,
+        child_pids: SharedChildPids,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps,
+        working_directory: str = None,
+        output_format: str = 'text',
+        io_backend: str = 'pty',
+        sample_metrics: SharedMetrics = None):
 
     """ This function runs the subscriber shape_main application with
         the specified parameters. Then it saves the
@@ -93,10 +783,10 @@ def run_subscriber_shape_main(
                 where the ReturnCode is saved.
         subscriber_index <<in>>: index of the subscriber. For the first
                 subscriber it is 1, for the second 2, etc.
-        samples_sent <<in>>: list of multiprocessing Queues with the samples
+        samples_sent <<in>>: list of SampleRingReaders with the samples
                 the Publishers send. Element 1 of the list is for
                 Publisher 1, etc.
-        last_sample_saved <<in>>: list of multiprocessing Queues with the last
+        last_sample_saved <<in>>: list of LastSampleSaved with the last
                 sample saved on samples_sent for each Publisher. Element 1 of
                 the list is for Publisher 1, etc.
         verbosity <<in>>: print debug information.
@@ -104,11 +794,27 @@ def run_subscriber_shape_main(
         file <<inout>>: temporal file to save shape_main application output.
         subscriber_finished <<inout>>: object event from multiprocessing
                 that is set when the subscriber is finished.
-        publishers_finished <<inout>>: list of events from multiprocessing
-                that are set when the publishers are finished.
-                Element 1 of the list is for Publisher 1, etc.
         check_function <<in>>: function to check how the samples are received
                 by the Subscriber. By default it does not check anything.
+        subscriber_ready <<inout>>: object event from multiprocessing
+                that is set when the subscriber has created the Data Reader
+                (or has failed before creating it).
+        child_pids <<out>>: element produced_code_index will be overwritten
+                with the PID of the shape_main application, which run_test()
+                stops.
+        stage_timeouts <<in>>: timeout of each stage (see SUBSCRIBER_STAGES).
+        stage_timestamps <<out>>: the time the shape_main application starts
+                and the time each stage succeeds are saved with the key
+                (produced_code_index, 'start' or stage).
+        working_directory <<in>>: directory where the shape_main application
+                runs. By default, the current directory.
+        output_format <<in>>: output format of the shape_main application
+                (see OUTPUT_FORMATS).
+        io_backend <<in>>: I/O backend that runs the shape_main application
+                (see IO_BACKENDS).
+        sample_metrics <<out>>: the metrics that check_function measures on
+                the samples (see get_metric_names()) are saved with the key
+                (produced_code_index, name). By default, they are not saved.
 
         The function runs the shape_main application as a Subscriber
         with the parameters defined.
@@ -132,21 +838,26 @@ def run_subscriber_shape_main(
     # Step 1: run the executable
     log_message(f'Running shape_main application Subscriber {subscriber_index}',
             verbosity)
-    child_sub = pexpect.spawnu(f'{name_executable} {parameters}')
-    child_sub.logfile = file
+    stage_timestamps[(produced_code_index, 'start')] = time.monotonic()
+    child_sub, output_sub = spawn_shape_main(name_executable, parameters,
+                                             file, working_directory,
+                                             output_format, verbosity,
+                                             io_backend)
+    child_pids[produced_code_index] = child_sub.pid
 
     # Step 2: Check if the topic is created
     log_message(f'Subscriber {subscriber_index}: Waiting for topic creation',
             verbosity)
-    index = child_sub.expect(
+    index = expect_stage(
+        output_sub,
         [
             'Create topic:', # index = 0
             re.compile('not supported', re.IGNORECASE), # index = 1
             pexpect.TIMEOUT, # index = 2
             pexpect.EOF # index = 3
         ],
-        timeout
-    )
+        'sub_topic', stage_timeouts, stage_timestamps,
+        produced_code_index)
 
     if index == 2 or index == 3:
         produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
@@ -156,7 +867,8 @@ def run_subscriber_shape_main(
         # Step 3: Check if the reader is created
         log_message(f'Subscriber {subscriber_index}: Waiting for DataReader '
                 'creation', verbosity)
-        index = child_sub.expect(
+        index = expect_stage(
+            output_sub,
             [
                 'Create reader for topic:', # index = 0
                 'failed to create content filtered topic', # index = 1
@@ -165,8 +877,10 @@ def run_subscriber_shape_main(
                 pexpect.EOF # index = 4
 
             ],
-            timeout
-        )
+            'sub_reader', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        # The next entity may be started
+        subscriber_ready.set()
 
         if index == 3 or index == 4:
             produced_code[produced_code_index] = ReturnCode.READER_NOT_CREATED
@@ -177,7 +891,8 @@ def run_subscriber_shape_main(
         elif index == 0:
             # Step 4: Read data or incompatible qos or deadline missed
             log_message(f'Subscriber {subscriber_index}: Waiting for data', verbosity)
-            index = child_sub.expect(
+            index = expect_stage(
+                output_sub,
                 [
                     r'\[[0-9]+\]', # index = 0
                     'on_requested_incompatible_qos()', # index = 1
@@ -187,8 +902,8 @@ def run_subscriber_shape_main(
                     pexpect.EOF # index = 5
 
                 ],
-                timeout
-            )
+                'sub_data', stage_timeouts, stage_timestamps,
+                produced_code_index)
 
             if index == 1:
                 produced_code[produced_code_index] = ReturnCode.INCOMPATIBLE_QOS
@@ -206,19 +921,20 @@ def run_subscriber_shape_main(
                 # this is used to check how the samples are arriving
                 # to the Subscriber. By default it does not check
                 # anything and returns ReturnCode.OK.
-                produced_code[produced_code_index] = check_function(
-                    child_sub, samples_sent, last_sample_saved, timeout)
+                produced_code[produced_code_index] = run_check_function(
+                    check_function, output_sub, samples_sent,
+                    last_sample_saved, timeout, sample_metrics,
+                    produced_code_index)
 
+    subscriber_ready.set()  # in case the subscriber failed before
     subscriber_finished.set()   # set subscriber as finished
-    log_message(f'Subscriber {subscriber_index}: Waiting for Publishers to '
-            'finish', verbosity)
-    for element in publishers_finished:
-        element.wait() # wait for all publishers to finish
-    # Stop process
-    if not stop_process(child_sub):
-        log_message(f'Subscriber {subscriber_index} process did not exit '
-                    'gracefully; it was forcefully terminated.',
-                    verbosity)
+    # run_test() stops the shape_main applications of all the entities at
+    # the same time once all of them have finished. Meanwhile, the output
+    # is read until the application exits.
+    log_message(f'Subscriber {subscriber_index}: Waiting for the other '
+            'entities to finish', verbosity)
+    child_sub.expect(pexpect.EOF, timeout=None)
+    child_sub.wait()
 
     return
 
@@ -226,16 +942,21 @@ def run_subscriber_shape_main(
 def run_publisher_shape_main(
         name_executable: str,
         parameters: str,
-        produced_code: "list[int]",
+        produced_code: SharedReturnCodes,
         produced_code_index: int,
         publisher_index: int,
-        samples_sent: multiprocessing.Queue,
-        last_sample_saved: multiprocessing.Queue,
+        sample_ring: SampleRing,
         verbosity: bool,
         timeout: int,
-        file: tempfile.TemporaryFile,
-        subscribers_finished: "list[multiprocessing.Event]",
-        publisher_finished: multiprocessing.Event):
+        file: ConsoleCapture,
+        publisher_finished: multiprocessing.Event,
+        publisher_ready: multiprocessing.Event,
+        child_pids: SharedChildPids,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps,
+        working_directory: str = None,
+        output_format: str = 'text',
+        io_backend: str = 'pty'):
 
     """ This function runs the publisher shape_main application with
         the specified parameters. Then it saves the
@@ -250,18 +971,29 @@ def run_publisher_shape_main(
                 where the ReturnCode is saved.
         publisher_index <<in>>: index of the publisher. For the first
                 publisher it is 1, for the second 2, etc.
-        samples_sent <<out>>: this variable contains the samples
-                the Publisher sends.
-        last_sample_saved <<out>>: this variable contains the last sample
-                saved on samples_sent.
+        sample_ring <<out>>: SampleRing where the samples the Publisher
+                sends are saved, it is read by all the Subscribers.
         verbosity <<in>>: print debug information.
         timeout <<in>>: time pexpect waits until it matches a pattern.
         file <<inout>>: temporal file to save shape_main application output.
-        subscribers_finished <<inout>>: list of events from multiprocessing
-                that are set when the subscribers are finished.
-                Element 1 of the list is for Subscriber 1, etc.
         publisher_finished <<inout>>: object event from multiprocessing
                 that is set when the publisher is finished.
+        publisher_ready <<inout>>: object event from multiprocessing
+                that is set when the publisher has created the Data Writer
+                (or has failed before creating it).
+        child_pids <<out>>: element produced_code_index will be overwritten
+                with the PID of the shape_main application, which run_test()
+                stops.
+        stage_timeouts <<in>>: timeout of each stage (see PUBLISHER_STAGES).
+        stage_timestamps <<out>>: the time the shape_main application starts
+                and the time each stage succeeds are saved with the key
+                (produced_code_index, 'start' or stage).
+        working_directory <<in>>: directory where the shape_main application
+                runs. By default, the current directory.
+        output_format <<in>>: output format of the shape_main application
+                (see OUTPUT_FORMATS).
+        io_backend <<in>>: I/O backend that runs the shape_main application
+                (see IO_BACKENDS).
 
         The function runs the shape_main application as a Publisher
         with the parameters defined.
@@ -284,21 +1016,26 @@ def run_publisher_shape_main(
     # Step 1: run the executable
     log_message(f'Running shape_main application Publisher {publisher_index}',
             verbosity)
-    child_pub = pexpect.spawnu(f'{name_executable} {parameters}')
-    child_pub.logfile = file
+    stage_timestamps[(produced_code_index, 'start')] = time.monotonic()
+    child_pub, output_pub = spawn_shape_main(name_executable, parameters,
+                                             file, working_directory,
+                                             output_format, verbosity,
+                                             io_backend)
+    child_pids[produced_code_index] = child_pub.pid
 
     # Step 2: Check if the topic is created
     log_message(f'Publisher {publisher_index}: Waiting for topic creation',
             verbosity)
-    index = child_pub.expect(
+    index = expect_stage(
+        output_pub,
         [
             'Create topic:', # index == 0
             re.compile('not supported', re.IGNORECASE), # index = 1
             pexpect.TIMEOUT, # index == 2
             pexpect.EOF # index == 3
         ],
-        timeout
-    )
+        'pub_topic', stage_timeouts, stage_timestamps,
+        produced_code_index)
 
     if index == 2 or index == 3:
         produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
@@ -308,15 +1045,18 @@ def run_publisher_shape_main(
         # Step 3: Check if the writer is created
         log_message(f'Publisher {publisher_index}: Waiting for DataWriter '
                 'creation', verbosity)
-        index = child_pub.expect(
+        index = expect_stage(
+            output_pub,
             [
                 'Create writer for topic', # index = 0
                 re.compile('not supported', re.IGNORECASE), # index = 1
                 pexpect.TIMEOUT, # index = 2
                 pexpect.EOF # index == 3
             ],
-            timeout
-        )
+            'pub_writer', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        # The next entity may be started
+        publisher_ready.set()
         if index == 2 or index == 3:
             produced_code[produced_code_index] = ReturnCode.WRITER_NOT_CREATED
         elif index == 1:
@@ -325,7 +1065,8 @@ def run_publisher_shape_main(
             # Step 4: Check if the writer matches the reader
             log_message(f'Publisher {publisher_index}: Waiting for matching '
                     'DataReader', verbosity)
-            index = child_pub.expect(
+            index = expect_stage(
+                output_pub,
                 [
                     'on_publication_matched()', # index = 0
                     'on_offered_incompatible_qos', # index = 1
@@ -333,8 +1074,8 @@ def run_publisher_shape_main(
                     pexpect.TIMEOUT, # index = 3
                     pexpect.EOF # index == 4
                 ],
-                timeout
-            )
+                'pub_matched', stage_timeouts, stage_timestamps,
+                produced_code_index)
             if index == 3 or index == 4:
                 produced_code[produced_code_index] = ReturnCode.READER_NOT_MATCHED
             elif index == 1:
@@ -350,14 +1091,15 @@ def run_publisher_shape_main(
                 # will only save the ReturnCode OK.
                 if '-w ' in parameters or parameters.endswith('-w'):
                     # Step 5: Check whether the writer sends the samples
-                    index = child_pub.expect([
+                    index = expect_stage(output_pub, [
                             r'\[[0-9]+\]', # index = 0
                             'on_offered_deadline_missed()', # index = 1
                             re.compile('not supported', re.IGNORECASE), # index = 2
                             pexpect.TIMEOUT, # index = 3
                             pexpect.EOF # index == 4
                         ],
-                        timeout)
+                        'pub_data', stage_timeouts, stage_timestamps,
+                        produced_code_index)
                     if index == 1:
                         produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
                     elif index == 3 or index == 4:
@@ -368,19 +1110,16 @@ def run_publisher_shape_main(
                         produced_code[produced_code_index] = ReturnCode.OK
                         log_message(f'Publisher {publisher_index}: Sending '
                                 'samples', verbosity)
-                        last_sample = ''
                         for x in range(0, MAX_SAMPLES_SAVED, 1):
                             # At this point, at least one sample has been printed
-                            # Therefore, that sample is added to samples_sent.
-                            pub_string = re.search(r'[0-9]+ [0-9]+ \[[0-9]+\]',
-                                    child_pub.before + child_pub.after)
-                            last_sample = pub_string.group(0)
-                            samples_sent.put(last_sample)
-                            index = child_pub.expect([
+                            # Therefore, that sample is added to sample_ring.
+                            sample_ring.put(get_sample(output_pub))
+                            index = output_pub.expect([
                                     r'\[[0-9]+\]', # index = 0
                                     'on_offered_deadline_missed()', # index = 1
                                     re.compile('not supported', re.IGNORECASE), # index = 2
-                                    pexpect.TIMEOUT # index = 3
+                                    pexpect.TIMEOUT, # index = 3
+                                    pexpect.EOF # index = 4
                                 ],
                                 timeout)
                             if index == 1:
@@ -392,120 +1131,558 @@ def run_publisher_shape_main(
                             elif index == 3:
                                 produced_code[produced_code_index] = ReturnCode.DATA_NOT_SENT
                                 break
-                        last_sample_saved.put(last_sample)
+                            elif index == 4:
+                                # The application exited after sending its
+                                # samples (e.g. with --num-iterations)
+                                break
+                        sample_ring.finish()
                 else:
                     produced_code[produced_code_index] = ReturnCode.OK
 
-    log_message(f'Publisher {publisher_index}: Waiting for Subscribers to finish',
-            verbosity)
-    for element in subscribers_finished:
-        element.wait() # wait for all subscribers to finish
+    publisher_ready.set()  # in case the publisher failed before
     publisher_finished.set()   # set publisher as finished
-    # Stop process
-    if not stop_process(child_pub):
-        log_message(f'Publisher {publisher_index} process did not exit '
-                    'gracefully; it was forcefully terminated.',
-                    verbosity)
+    # run_test() stops the shape_main applications of all the entities at
+    # the same time once all of them have finished. Meanwhile, the output
+    # is read until the application exits.
+    log_message(f'Publisher {publisher_index}: Waiting for the other '
+            'entities to finish', verbosity)
+    child_pub.expect(pexpect.EOF, timeout=None)
+    child_pub.wait()
 
     return
 
 
-def run_test(
-    name_executable_pub:str,
-    name_executable_sub:str,
-    test_case: junitparser.TestCase,
-    parameters: "list[str]",
-    expected_codes: "list[str]",
-    verbosity: bool,
-    timeout: int,
-    check_function: "function"):
-
-    """ Run the Publisher and the Subscriber applications and check
-        the actual and the expected ReturnCode.
+class AsyncioEngine:
+    """ Event loop that drives the shape_main applications when the option
+        '--engine asyncio' is used. The event loop runs in its own thread,
+        so it is shared by all the Test Cases running at the same time.
+    """
+    def __init__(self):
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever,
+                                         daemon=True)
+        self.__thread.start()
+
+    def run(self, coroutine) -> object:
+        """ Run the coroutine in the event loop and wait for its result. """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop).result()
+
+    def close(self):
+        """ Stop the event loop and its thread. """
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+async def expect_async(
+        child: "pexpect.spawn | ShapeMainEvents",
+        patterns: list,
+        timeout: float) -> int:
+    """ Same as child.expect(patterns, timeout), but the output of the
+        shape_main application is read when the event loop reports it is
+        available instead of blocking, so several shape_main applications
+        can be driven by the same event loop.
+        It returns the index of the pattern matched.
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(child, ShapeMainEvents):
+        expecter = child.expecter(patterns)
+    else:
+        expecter = pexpect.expect.Expecter(child, pexpect.expect.searcher_re(
+            child.compile_pattern_list(patterns)))
+    index = expecter.existing_data()
+    if index is not None:
+        return index
+
+    readable = asyncio.Event()
+    deadline = loop.time() + timeout
+    loop.add_reader(child.child_fd, readable.set)
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(readable.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return expecter.timeout()
+            readable.clear()
+            try:
+                data = child.read_nonblocking(child.maxread, timeout=0)
+            except pexpect.TIMEOUT:
+                continue
+            except pexpect.EOF as e:
+                return expecter.eof(e)
+            index = expecter.new_data(data)
+            if index is not None:
+                return index
+    finally:
+        loop.remove_reader(child.child_fd)
+
+async def expect_stage_async(
+        child: "pexpect.spawn | ShapeMainEvents",
+        patterns: list,
+        stage: str,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps,
+        produced_code_index: int) -> int:
+    """ Coroutine version of expect_stage(). """
+    index = await expect_async(child, patterns, stage_timeouts[stage])
+    if index == 0:
+        stage_timestamps[(produced_code_index, stage)] = time.monotonic()
+    return index
+
+async def run_subscriber_async(
+        child_sub: "pexpect.spawn | ShapeMainEvents",
+        produced_code: SharedReturnCodes,
+        produced_code_index: int,
+        subscriber_index: int,
+        samples_sent: "list[SampleRingReader]",
+        last_sample_saved: "list[LastSampleSaved]",
+        verbosity: bool,
+        timeout: int,
+        check_function: "function",
+        subscriber_ready: asyncio.Event,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps,
+        sample_metrics: SharedMetrics):
+    """ Coroutine version of run_subscriber_shape_main(): it follows the same
+        steps with the output (pexpect child or ShapeMainEvents) of the
+        shape_main application child_sub, which is already running. The
+        check_function runs in a thread of the event loop
+        executor, so it does not block the other shape_main applications.
+        The shape_main application is not stopped.
+    """
+    try:
+        log_message(f'Subscriber {subscriber_index}: Waiting for topic '
+                'creation', verbosity)
+        index = await expect_stage_async(
+            child_sub,
+            [
+                'Create topic:', # index = 0
+                re.compile('not supported', re.IGNORECASE), # index = 1
+                pexpect.TIMEOUT, # index = 2
+                pexpect.EOF # index = 3
+            ],
+            'sub_topic', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        if index == 2 or index == 3:
+            produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
+            return
+        elif index == 1:
+            produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+            return
 
-        name_executable_pub <<in>>: name of the shape_main application to run
-                as a Publisher.
-        name_executable_sub <<in>>: name of the shape_main application to run
-                as a Subscriber.
-        test_case <<inout>>: testCase object to test.
-        parameters <<in>>: list of shape_main application parameters.
-        expected_codes <<in>>: list of ReturnCodes the Publishers and
-                the Subscribers would obtain in a non error situation.
-        verbosity <<in>>: print debug information.
-        timeout <<in>>: time pexpect waits until it matches a pattern.
-        check_function <<in>>: function to check how the samples are received
-                by the Subscriber. By default it does not check anything.
+        log_message(f'Subscriber {subscriber_index}: Waiting for DataReader '
+                'creation', verbosity)
+        index = await expect_stage_async(
+            child_sub,
+            [
+                'Create reader for topic:', # index = 0
+                'failed to create content filtered topic', # index = 1
+                re.compile('not supported', re.IGNORECASE), # index = 2
+                pexpect.TIMEOUT, # index = 3
+                pexpect.EOF # index = 4
+            ],
+            'sub_reader', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        # The next entity may be started
+        subscriber_ready.set()
+        if index == 3 or index == 4:
+            produced_code[produced_code_index] = ReturnCode.READER_NOT_CREATED
+            return
+        elif index == 1:
+            produced_code[produced_code_index] = ReturnCode.FILTER_NOT_CREATED
+            return
+        elif index == 2:
+            produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+            return
 
-        The function runs several different processes: one for each Publisher
-        and one for each Subscriber shape_main application.
-        The number of processes depends on how many elements are in
-        the list of parameters.
-        Then it checks that the codes obtained are the expected ones.
+        log_message(f'Subscriber {subscriber_index}: Waiting for data', verbosity)
+        index = await expect_stage_async(
+            child_sub,
+            [
+                r'\[[0-9]+\]', # index = 0
+                'on_requested_incompatible_qos()', # index = 1
+                'on_requested_deadline_missed()', # index = 2
+                re.compile('not supported', re.IGNORECASE), # index = 3
+                pexpect.TIMEOUT, # index = 4
+                pexpect.EOF # index = 5
+            ],
+            'sub_data', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        if index == 1:
+            produced_code[produced_code_index] = ReturnCode.INCOMPATIBLE_QOS
+        elif index == 2:
+            produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+        elif index == 4 or index == 5:
+            produced_code[produced_code_index] = ReturnCode.DATA_NOT_RECEIVED
+        elif index == 3:
+            produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+        elif index == 0:
+            log_message(f'Subscriber {subscriber_index}: Receiving samples',
+                    verbosity)
+            produced_code[produced_code_index] = \
+                await asyncio.get_running_loop().run_in_executor(
+                    None, run_check_function, check_function,
+                    child_sub, samples_sent, last_sample_saved, timeout,
+                    sample_metrics, produced_code_index)
+    finally:
+        subscriber_ready.set()  # in case the subscriber failed before
+
+async def run_publisher_async(
+        child_pub: "pexpect.spawn | ShapeMainEvents",
+        parameters: str,
+        produced_code: SharedReturnCodes,
+        produced_code_index: int,
+        publisher_index: int,
+        sample_ring: SampleRing,
+        verbosity: bool,
+        timeout: int,
+        publisher_ready: asyncio.Event,
+        stage_timeouts: "dict[str, float]",
+        stage_timestamps: SharedStageTimestamps):
+    """ Coroutine version of run_publisher_shape_main(): it follows the same
+        steps with the output (pexpect child or ShapeMainEvents) of the
+        shape_main application child_pub, which is already running. The
+        shape_main application is not stopped.
     """
+    try:
+        log_message(f'Publisher {publisher_index}: Waiting for topic creation',
+                verbosity)
+        index = await expect_stage_async(
+            child_pub,
+            [
+                'Create topic:', # index == 0
+                re.compile('not supported', re.IGNORECASE), # index = 1
+                pexpect.TIMEOUT, # index == 2
+                pexpect.EOF # index == 3
+            ],
+            'pub_topic', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        if index == 2 or index == 3:
+            produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
+            return
+        elif index == 1:
+            produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+            return
 
-    log_message(f'run_test parameters:\n'
-            f'    name_executable_pub: {name_executable_pub}\n'
-            f'    name_executable_sub: {name_executable_sub}\n'
-            f'    test_case: {test_case.name}\n'
-            f'    parameters: {parameters}\n'
-            f'    expected_codes: {expected_codes}\n'
-            f'    verbosity: {verbosity}\n'
-            f'    timeout: {timeout}\n'
-            f'    check_function: {check_function.__name__}',
-            verbosity)
+        log_message(f'Publisher {publisher_index}: Waiting for DataWriter '
+                'creation', verbosity)
+        index = await expect_stage_async(
+            child_pub,
+            [
+                'Create writer for topic', # index = 0
+                re.compile('not supported', re.IGNORECASE), # index = 1
+                pexpect.TIMEOUT, # index = 2
+                pexpect.EOF # index == 3
+            ],
+            'pub_writer', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        # The next entity may be started
+        publisher_ready.set()
+        if index == 2 or index == 3:
+            produced_code[produced_code_index] = ReturnCode.WRITER_NOT_CREATED
+            return
+        elif index == 1:
+            produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+            return
 
-    # numbers of publishers/subscriber we will have. It depends on how
-    # many strings of parameters we have.
+        log_message(f'Publisher {publisher_index}: Waiting for matching '
+                'DataReader', verbosity)
+        index = await expect_stage_async(
+            child_pub,
+            [
+                'on_publication_matched()', # index = 0
+                'on_offered_incompatible_qos', # index = 1
+                re.compile('not supported', re.IGNORECASE), # index = 2
+                pexpect.TIMEOUT, # index = 3
+                pexpect.EOF # index == 4
+            ],
+            'pub_matched', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        if index == 3 or index == 4:
+            produced_code[produced_code_index] = ReturnCode.READER_NOT_MATCHED
+            return
+        elif index == 1:
+            produced_code[produced_code_index] = ReturnCode.INCOMPATIBLE_QOS
+            return
+        elif index == 2:
+            produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+            return
+
+        # The samples are only saved with the option -w (see
+        # run_publisher_shape_main()).
+        if not ('-w ' in parameters or parameters.endswith('-w')):
+            produced_code[produced_code_index] = ReturnCode.OK
+            return
+
+        index = await expect_stage_async(child_pub, [
+                r'\[[0-9]+\]', # index = 0
+                'on_offered_deadline_missed()', # index = 1
+                re.compile('not supported', re.IGNORECASE), # index = 2
+                pexpect.TIMEOUT, # index = 3
+                pexpect.EOF # index == 4
+            ],
+            'pub_data', stage_timeouts, stage_timestamps,
+            produced_code_index)
+        if index == 1:
+            produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+        elif index == 3 or index == 4:
+            produced_code[produced_code_index] = ReturnCode.DATA_NOT_SENT
+        elif index == 2:
+            produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+        elif index == 0:
+            produced_code[produced_code_index] = ReturnCode.OK
+            log_message(f'Publisher {publisher_index}: Sending samples',
+                    verbosity)
+            for x in range(0, MAX_SAMPLES_SAVED, 1):
+                sample_ring.put(get_sample(child_pub))
+                index = await expect_async(child_pub, [
+                        r'\[[0-9]+\]', # index = 0
+                        'on_offered_deadline_missed()', # index = 1
+                        re.compile('not supported', re.IGNORECASE), # index = 2
+                        pexpect.TIMEOUT, # index = 3
+                        pexpect.EOF # index = 4
+                    ],
+                    timeout)
+                if index == 1:
+                    produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+                    break
+                elif index == 2:
+                    produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+                    break
+                elif index == 3:
+                    produced_code[produced_code_index] = ReturnCode.DATA_NOT_SENT
+                    break
+                elif index == 4:
+                    break  # See run_publisher_shape_main()
+            sample_ring.finish()
+    finally:
+        publisher_ready.set()  # in case the publisher failed before
+
+async def run_entities_asyncio(
+        name_executables: "list[str]",
+        parameters: "list[str]",
+        verbosity: bool,
+        timeout: int,
+        check_function: "function",
+        startup_delay: float,
+        working_directory: str,
+        timing_history: TimingHistory,
+        stage_timeouts: "dict[str, float]",
+        console_capture: "list[ConsoleCapture]",
+        result_group: ResultGroup,
+        output_format: str = 'text',
+        io_backend: str = 'pty',
+        sample_capture: "list[SubscriberCapture]" = None,
+        server_pool: ServerPool = None) -> "list[SampleRing]":
+    """ Run the shape_main applications of a test, all of them driven by
+        coroutines of the running event loop, and wait until all of them
+        finish. The parameters and the value returned are the same as in
+        run_entities_multiprocessing(), plus:
+
+        server_pool <<inout>>: if it is set, the shape_main applications
+                run in the servers of the pool (warm processes) instead of
+                starting a new process for each one.
+
+        The samples sent by the Publishers are saved in SampleRings that use
+        a threading.Condition, as all the readers are in this process. Once
+        all the
+        shape_main applications have finished their steps, they are stopped
+        at the same time.
+    """
     num_entities = len(parameters)
+    sample_rings = create_sample_rings(parameters, threading.Condition)
 
-    # Manager is a shared memory section where all processes can access.
-    # 'return_codes' is a list of elements where the different processes
-    # (publishers and subscribers shape_main applications) copy their ReturnCode.
-    # These ReturnCodes are identified by the index within the list,
-    # every index identifies one shape_main application. Therefore, only one
-    # shape_main application must modify one element of the list.
-    # Once all processes are finished, the list 'return_codes' contains
-    # the ReturnCode in the corresponding index. This index is set manually
-    # and we need it in order to use it later.
-    # Example: (1 Publisher and 1 Subscriber)
-    #   Processes:
-    #     - Publisher Process (index = 0)
-    #     - Subscriber Process (index = 1)
-    #   Code contains:
-    #     - return_codes[0] contains Publisher shape_main application ReturnCode
-    #     - return_codes[1] contains Subscriber shape_main application ReturnCode
-    manager = multiprocessing.Manager()
-    return_codes = manager.list(range(num_entities))
-    samples_sent = [] # used for storing the samples the Publishers send.
-                      # It is a list with one Queue for each Publisher.
-    last_sample_saved = [] # used for storing the last value sent by each Publisher.
-
-    # list of multiprocessing Events used as semaphores to control the end of
-    # the processes, one for each entity.
-    subscribers_finished = []
-    publishers_finished = []
+    children = []
+    servers = []
+    teardown_timeouts = []
+    tasks = []
+    publisher_number = 0
+    subscriber_number = 0
+    try:
+        for i in range(0, num_entities):
+            is_publisher = '-P ' in parameters[i] or parameters[i].endswith('-P')
+            name_executable = name_executables[i]
+            if is_publisher:
+                log_message('Running shape_main application Publisher '
+                        f'{publisher_number + 1}', verbosity)
+            else:
+                # Wait before running the subscriber to avoid conflicts
+                # between the programs on startup
+                if startup_delay is not None:
+                    await asyncio.sleep(startup_delay)
+                log_message('Running shape_main application Subscriber '
+                        f'{subscriber_number + 1}', verbosity)
+
+            result_group.stage_timestamps[(i, 'start')] = time.monotonic()
+            if server_pool is None:
+                child, output = spawn_shape_main(
+                    name_executable, parameters[i], console_capture[i],
+                    working_directory, output_format, verbosity, io_backend)
+            else:
+                server = server_pool.acquire(name_executable, parameters[i])
+                server.run(parameters[i], console_capture[i],
+                           output_format == 'jsonl' and supports_jsonl(
+                               name_executable, working_directory, verbosity))
+                servers.append(server)
+                child = server.child
+                output = server.output
+            children.append(child)
+            teardown_timeouts.append(
+                get_teardown_timeout(timing_history, name_executable))
+
+            entity_ready = asyncio.Event()
+            if is_publisher:
+                tasks.append(asyncio.ensure_future(run_publisher_async(
+                    child_pub=output,
+                    parameters=parameters[i],
+                    produced_code=result_group.return_codes,
+                    produced_code_index=i,
+                    publisher_index=publisher_number + 1,
+                    sample_ring=sample_rings[publisher_number],
+                    verbosity=verbosity,
+                    timeout=timeout,
+                    publisher_ready=entity_ready,
+                    stage_timeouts=stage_timeouts,
+                    stage_timestamps=result_group.stage_timestamps)))
+                publisher_number += 1
+                if startup_delay is not None:
+                    await asyncio.sleep(startup_delay)
+            else:
+                # Each Subscriber reads the samples with its own cursors
+                samples_sent, last_sample_saved = get_ring_readers(
+                    sample_rings)
+                tasks.append(asyncio.ensure_future(run_subscriber_async(
+                    child_sub=output,
+                    produced_code=result_group.return_codes,
+                    produced_code_index=i,
+                    subscriber_index=subscriber_number + 1,
+                    samples_sent=samples_sent,
+                    last_sample_saved=last_sample_saved,
+                    verbosity=verbosity,
+                    timeout=timeout,
+                    check_function=get_subscriber_check_function(
+                        check_function, sample_capture, i),
+                    subscriber_ready=entity_ready,
+                    stage_timeouts=stage_timeouts,
+                    stage_timestamps=result_group.stage_timestamps,
+                    sample_metrics=result_group.metrics)))
+                subscriber_number += 1
+
+            if startup_delay is None and i < num_entities - 1:
+                # Start the next entity once this one has created its Data
+                # Writer or Data Reader (see run_entities_multiprocessing()).
+                try:
+                    await asyncio.wait_for(entity_ready.wait(), 2 * timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+        await asyncio.gather(*tasks)
+    finally:
+        if server_pool is None:
+            teardown_result = await asyncio.get_running_loop().run_in_executor(
+                None, stop_processes, children, teardown_timeouts)
+        else:
+            teardown_result = await asyncio.get_running_loop().run_in_executor(
+                None, server_pool.stop, servers, teardown_timeouts)
+        for i, result in enumerate(teardown_result):
+            result_group.teardown_result[i] = result
+            if not result[0]:
+                log_message(f'shape_main application {i} process did not '
+                            'exit gracefully; it was forcefully terminated.',
+                            verbosity)
+        for element in console_capture:
+            element.close()
+    return sample_rings
+
+def get_subscriber_check_function(
+        check_function: "function",
+        sample_capture: "list[SubscriberCapture]",
+        index: int) -> "function":
+    """ Return the check function of the shape_main application index: the
+        one of its SubscriberCapture in the capture-then-verify mode, or
+        check_function otherwise.
+    """
+    if sample_capture is None or sample_capture[index] is None:
+        return check_function
+    return sample_capture[index].check_function
+
+def run_entity_process(target: "function", **kwargs):
+    """ Run target (run_publisher_shape_main() or run_subscriber_shape_main())
+        with kwargs in the process of the entity and then close its
+        ConsoleCapture (kwargs['file']), so its output is saved in the file
+        that run_shape_main_applications() reads.
+    """
+    try:
+        target(**kwargs)
+    finally:
+        kwargs['file'].close()
+
+def run_entities_multiprocessing(
+        name_executables: "list[str]",
+        parameters: "list[str]",
+        verbosity: bool,
+        timeout: int,
+        check_function: "function",
+        startup_delay: float,
+        working_directory: str,
+        timing_history: TimingHistory,
+        stage_timeouts: "dict[str, float]",
+        console_capture: "list[ConsoleCapture]",
+        result_group: ResultGroup,
+        output_format: str = 'text',
+        io_backend: str = 'pty',
+        sample_capture: "list[SubscriberCapture]" = None) -> "list[SampleRing]":
+    """ Run the shape_main applications of a test, each one driven by its own
+        process (see run_publisher_shape_main() and
+        run_subscriber_shape_main()), and wait until all of them finish.
+        Then all the shape_main applications are stopped at the same time.
+        Return the SampleRings with the samples sent by each Publisher.
+        The parameters are the same as in run_test(), plus:
+
+        name_executables <<in>>: name of the shape_main application that
+                runs each element of parameters.
+        stage_timeouts <<in>>: timeout of each stage (see get_stage_timeouts()).
+        console_capture <<inout>>: ConsoleCapture objects that save the
+                output of the shape_main applications, one for each of them.
+        result_group <<out>>: result slots where the shape_main applications
+                save their results, one for each of them.
+        output_format <<in>>: output format of the shape_main applications
+                (see OUTPUT_FORMATS).
+        io_backend <<in>>: I/O backend that runs the shape_main applications
+                (see IO_BACKENDS).
+        sample_capture <<inout>>: in the capture-then-verify mode, the
+                SubscriberCapture that saves the samples of each Subscriber
+                instead of running check_function (None for the Publishers).
+    """
+    num_entities = len(parameters)
+
+    # used for storing the samples the Publishers send and the last value
+    # sent by each Publisher (see create_sample_rings()).
+    sample_rings = create_sample_rings(parameters, multiprocessing.Condition)
+
+    # list of multiprocessing Events that are set when the entity has
+    # finished, one for each entity. Then its shape_main application may
+    # be stopped.
+    entity_finished = []
+    # time each shape_main application has to exit after SIGINT
+    teardown_timeouts = []
     publisher_number = 0
     subscriber_number = 0
-    # entity_type defines the name of the entity: Publisher/Subscriber_<number>.
-    entity_type = []
-    # list of files to save the shape_main output, one for each entity.
-    temporary_file = []
-    # list of shape_main application outputs, one for each entity.
-    shape_main_application_output = []
     # list of processes, one for each entity
     entity_process = []
-    # list of shape_main application outputs, edited to use in the html code.
-    shape_main_application_output_edited = []
+    # list of multiprocessing Events that are set when the entity has created
+    # its Data Writer or Data Reader, one for each entity.
+    entity_ready = []
     # Create these elements earlier because they are needed
     # to define the processes.
-    for element in parameters:
-        temporary_file.append(tempfile.TemporaryFile(mode='w+t'))
+    for i, element in enumerate(parameters):
+        entity_ready.append(multiprocessing.Event())
+        entity_finished.append(multiprocessing.Event())
         if ('-P ' in element or element.endswith('-P')):
-            publishers_finished.append(multiprocessing.Event())
-            samples_sent.append(multiprocessing.Queue())
-            last_sample_saved.append(multiprocessing.Queue())
+            teardown_timeouts.append(get_teardown_timeout(
+                timing_history, name_executables[i]))
         elif ('-S ' in element or element.endswith('-S')):
-            subscribers_finished.append(multiprocessing.Event())
+            teardown_timeouts.append(get_teardown_timeout(
+                timing_history, name_executables[i]))
         else:
             raise RuntimeError('Error in the definition of shape_main '
                 'application parameters. Neither Publisher or Subscriber '
@@ -515,47 +1692,64 @@ def run_test(
     for i in range(0, num_entities):
         if ('-P ' in parameters[i] or parameters[i].endswith('-P')):
             entity_process.append(multiprocessing.Process(
-                    target=run_publisher_shape_main,
+                    target=run_entity_process,
+                    args=(run_publisher_shape_main,),
                     kwargs={
-                        'name_executable':name_executable_pub,
+                        'name_executable':name_executables[i],
                         'parameters':parameters[i],
-                        'produced_code':return_codes,
+                        'produced_code':result_group.return_codes,
                         'produced_code_index':i,
                         'publisher_index':publisher_number+1,
-                        'samples_sent':samples_sent[publisher_number],
-                        'last_sample_saved':last_sample_saved[publisher_number],
+                        'sample_ring':sample_rings[publisher_number],
                         'verbosity':verbosity,
                         'timeout':timeout,
-                        'file':temporary_file[i],
-                        'subscribers_finished':subscribers_finished,
-                        'publisher_finished':publishers_finished[publisher_number]}))
+                        'file':console_capture[i],
+                        'publisher_finished':entity_finished[i],
+                        'publisher_ready':entity_ready[i],
+                        'child_pids':result_group.child_pids,
+                        'stage_timeouts':stage_timeouts,
+                        'stage_timestamps':result_group.stage_timestamps,
+                        'working_directory':working_directory,
+                        'output_format':output_format,
+                        'io_backend':io_backend}))
             publisher_number += 1
-            entity_type.append(f'Publisher_{publisher_number}')
-            time.sleep(1)
+            if startup_delay is not None:
+                time.sleep(startup_delay)
 
         elif('-S ' in parameters[i] or parameters[i].endswith('-S')):
-            # Wait 1 second before running the subscriber to avoid conflicts between
+            # Wait before running the subscriber to avoid conflicts between
             # the programs on startup
-            time.sleep(1)
+            if startup_delay is not None:
+                time.sleep(startup_delay)
 
+            # Each Subscriber reads the samples with its own cursors
+            samples_sent, last_sample_saved = get_ring_readers(sample_rings)
             entity_process.append(multiprocessing.Process(
-                    target=run_subscriber_shape_main,
+                    target=run_entity_process,
+                    args=(run_subscriber_shape_main,),
                     kwargs={
-                        'name_executable':name_executable_sub,
+                        'name_executable':name_executables[i],
                         'parameters':parameters[i],
-                        'produced_code':return_codes,
+                        'produced_code':result_group.return_codes,
                         'produced_code_index':i,
                         'subscriber_index':subscriber_number+1,
                         'samples_sent':samples_sent,
                         'last_sample_saved':last_sample_saved,
                         'verbosity':verbosity,
                         'timeout':timeout,
-                        'file':temporary_file[i],
-                        'subscriber_finished':subscribers_finished[subscriber_number],
-                        'publishers_finished':publishers_finished,
-                        'check_function':check_function}))
+                        'file':console_capture[i],
+                        'subscriber_finished':entity_finished[i],
+                        'check_function':get_subscriber_check_function(
+                            check_function, sample_capture, i),
+                        'subscriber_ready':entity_ready[i],
+                        'child_pids':result_group.child_pids,
+                        'stage_timeouts':stage_timeouts,
+                        'stage_timestamps':result_group.stage_timestamps,
+                        'working_directory':working_directory,
+                        'output_format':output_format,
+                        'io_backend':io_backend,
+                        'sample_metrics':result_group.metrics}))
             subscriber_number += 1
-            entity_type.append(f'Subscriber_{subscriber_number}')
         else:
             raise RuntimeError('Error in the definition of shape_main '
                 'application parameters. Neither Publisher or Subscriber '
@@ -563,20 +1757,521 @@ def run_test(
 
         entity_process[i].start()
 
+        if startup_delay is None and i < num_entities - 1:
+            # Start the next entity once this one has created its Data Writer
+            # or Data Reader. That takes at most two pexpect stages
+            # (topic creation and Data Writer/Reader creation).
+            entity_ready[i].wait(2 * timeout)
+
+    # Wait until all the entities finish (or their processes fail) and stop
+    # all the shape_main applications at the same time. This takes as long
+    # as the slowest application, instead of one application after another.
+    for i in range(0, num_entities):
+        while entity_process[i].is_alive() and not entity_finished[i].wait(1):
+            continue
+    child_pids = result_group.child_pids
+    spawned = [i for i in range(0, num_entities) if child_pids[i] != 0]
+    for i, result in zip(spawned, stop_processes(
+            [RemoteProcess(child_pids[i]) for i in spawned],
+            [teardown_timeouts[i] for i in spawned])):
+        result_group.teardown_result[i] = result
+
     for element in entity_process:
         element.join()     # Wait until the processes finish
+    return sample_rings
+
+def get_entity_types(parameters: "list[str]") -> "list[str]":
+    """ Return the name of the entity of each shape_main application:
+        Publisher_<number> or Subscriber_<number>.
+    """
+    entity_type = []
+    publisher_number = 0
+    subscriber_number = 0
+    for element in parameters:
+        if ('-P ' in element or element.endswith('-P')):
+            publisher_number += 1
+            entity_type.append(f'Publisher_{publisher_number}')
+        elif ('-S ' in element or element.endswith('-S')):
+            subscriber_number += 1
+            entity_type.append(f'Subscriber_{subscriber_number}')
+        else:
+            raise RuntimeError('Error in the definition of shape_main '
+                'application parameters. Neither Publisher or Subscriber '
+                'defined.')
+    return entity_type
+
+def run_test(
+    name_executable_pub:str,
+    name_executable_sub:str,
+    test_case: junitparser.TestCase,
+    parameters: "list[str]",
+    expected_codes: "list[str]",
+    verbosity: bool,
+    timeout: int,
+    check_function: "function",
+    startup_delay: float = None,
+    working_directory: str = None,
+    timing_history: TimingHistory = None,
+    result_slots: ResultSlots = None,
+    asyncio_engine: AsyncioEngine = None,
+    server_pool: ServerPool = None,
+    output_format: str = 'text',
+    io_backend: str = 'pty',
+    console_lines: int = DEFAULT_CONSOLE_LINES,
+    console_log_dir: str = None,
+    capture: bool = False,
+    capture_dir: str = None):
+
+    """ Run the Publisher and the Subscriber applications and check
+        the actual and the expected ReturnCode.
+
+        name_executable_pub <<in>>: name of the shape_main application to run
+                as a Publisher.
+        name_executable_sub <<in>>: name of the shape_main application to run
+                as a Subscriber.
+        test_case <<inout>>: testCase object to test.
+        parameters <<in>>: list of shape_main application parameters.
+        expected_codes <<in>>: list of ReturnCodes the Publishers and
+                the Subscribers would obtain in a non error situation.
+        verbosity <<in>>: print debug information.
+        timeout <<in>>: time pexpect waits until it matches a pattern.
+        check_function <<in>>: function to check how the samples are received
+                by the Subscriber. By default it does not check anything.
+        startup_delay <<in>>: if it is None, each shape_main application
+                is started as soon as the previous one has created its
+                Data Writer or Data Reader. Otherwise, time (in seconds)
+                waited after starting a Publisher and before starting
+                a Subscriber.
+        working_directory <<in>>: directory where the shape_main applications
+                run. By default, the current directory.
+        timing_history <<inout>>: durations measured in previous runs. It is
+                used to calculate the time each shape_main application has
+                to exit, and it is updated with the times of this test.
+        result_slots <<inout>>: shared memory where the shape_main
+                applications save their results. The test takes a group of
+                slots while it runs. If it is not set, new slots are created.
+        asyncio_engine <<in>>: if it is set, the shape_main applications are
+                driven by its event loop (see run_entities_asyncio()).
+                Otherwise, each one is driven by its own process (see
+                run_entities_multiprocessing()).
+        server_pool <<inout>>: if it is set, the shape_main applications
+                run in the servers of the pool (warm processes). It needs
+                asyncio_engine.
+        output_format <<in>>: output format of the shape_main applications
+                (see OUTPUT_FORMATS). With 'jsonl', the applications that
+                support it print their events as JSON objects, which are
+                read by a ShapeMainEvents.
+        io_backend <<in>>: I/O backend that runs the shape_main applications
+                (see IO_BACKENDS): a pseudo-terminal ('pty') or pipes
+                ('pipe').
+        console_lines <<in>>: number of lines kept at the beginning and at
+                the end of the console output of each shape_main
+                application (see ConsoleCapture). 0 keeps all of them.
+        console_log_dir <<in>>: if it is set, the whole console output of
+                the shape_main applications whose output is elided is saved
+                compressed in this directory.
+        capture <<in>>: capture-then-verify mode: the Subscribers capture
+                their samples, which are checked once the shape_main
+                applications stop (see run_shape_main_applications()).
+        capture_dir <<in>>: if it is set (capture-then-verify mode), the
+                samples captured are saved in this directory, so they can
+                be verified again with rtps_test_capture.py.
+
+        The function runs one Publisher or Subscriber shape_main application
+        for each element in the list of parameters.
+        Then it checks that the codes obtained are the expected ones.
+    """
+
+    # timeout of each stage of the shape_main applications
+    stage_timeouts = get_stage_timeouts(timing_history, name_executable_pub,
+                                        name_executable_sub, test_case.name,
+                                        parameters, timeout)
+
+    log_message(f'run_test parameters:\n'
+            f'    name_executable_pub: {name_executable_pub}\n'
+            f'    name_executable_sub: {name_executable_sub}\n'
+            f'    test_case: {test_case.name}\n'
+            f'    parameters: {parameters}\n'
+            f'    expected_codes: {expected_codes}\n'
+            f'    verbosity: {verbosity}\n'
+            f'    timeout: {timeout}\n'
+            f'    stage_timeouts: {stage_timeouts}\n'
+            f'    check_function: {check_function.__name__}\n'
+            f'    startup_delay: {startup_delay}\n'
+            f'    output_format: {output_format}\n'
+            f'    io_backend: {io_backend}\n'
+            f'    console_lines: {console_lines}\n'
+            f'    console_log_dir: {console_log_dir}\n'
+            f'    capture: {capture}\n'
+            f'    capture_dir: {capture_dir}',
+            verbosity)
+
+    # entity_type defines the name of the entity: Publisher/Subscriber_<number>.
+    entity_type = get_entity_types(parameters)
+    name_executables = [
+        name_executable_pub if element.startswith('Publisher')
+        else name_executable_sub
+        for element in entity_type]
+
+    results = run_shape_main_applications(
+        name_executables=name_executables,
+        parameters=parameters,
+        verbosity=verbosity,
+        timeout=timeout,
+        check_function=check_function,
+        startup_delay=startup_delay,
+        working_directory=working_directory,
+        timing_history=timing_history,
+        stage_timeouts=stage_timeouts,
+        result_slots=result_slots,
+        asyncio_engine=asyncio_engine,
+        server_pool=server_pool,
+        output_format=output_format,
+        io_backend=io_backend,
+        console_lines=console_lines,
+        console_log_prefix=get_console_log_prefix(
+            console_log_dir, test_case.name, name_executable_pub,
+            name_executable_sub),
+        capture=capture)
+
+    save_capture_file(capture_dir, test_case.name, name_executable_pub,
+                      name_executable_sub, entity_type, parameters,
+                      results['captures'])
+
+    # The times of the warm processes are not saved, as they do not create
+    # their participant, they would shorten the timeouts of the rest.
+    if timing_history is not None and server_pool is None:
+        save_teardown_times(timing_history, name_executables,
+                            results['teardown_result'])
+        save_stage_durations(timing_history, name_executable_pub,
+                             name_executable_sub, test_case.name, parameters,
+                             results['stage_durations'])
+
+    set_test_result(test_case, parameters, expected_codes, results, verbosity)
+
+def run_shape_main_applications(
+        name_executables: "list[str]",
+        parameters: "list[str]",
+        verbosity: bool,
+        timeout: int,
+        check_function: "function",
+        startup_delay: float,
+        working_directory: str,
+        timing_history: TimingHistory,
+        stage_timeouts: "dict[str, float]",
+        result_slots: ResultSlots = None,
+        asyncio_engine: AsyncioEngine = None,
+        server_pool: ServerPool = None,
+        output_format: str = 'text',
+        io_backend: str = 'pty',
+        console_lines: int = DEFAULT_CONSOLE_LINES,
+        console_log_prefix: str = None,
+        capture: bool = False) -> dict:
+    """ Run one shape_main application for each element in the list of
+        parameters and return their results as a dictionary with a list
+        for each key, with one element for each shape_main application:
+            * return_codes: ReturnCode obtained.
+            * teardown_result: (exited gracefully, time to stop).
+            * stage_durations: dictionary with the duration of each stage
+              (see PUBLISHER_STAGES and SUBSCRIBER_STAGES).
+            * output: console output (see ConsoleCapture).
+            * console_log: file with the whole console output, or None if
+              it was not saved or no line was elided.
+            * captures: in the capture-then-verify mode, SampleCapture with
+              the samples received by each Subscriber (None if it did not
+              receive samples) or sent by each Publisher. Otherwise, None.
+
+        name_executables <<in>>: name of the shape_main application that
+                runs each element of parameters.
+        stage_timeouts <<in>>: timeout of each stage (see get_stage_timeouts()).
+        console_log_prefix <<in>>: if it is set, the whole console output
+                of each shape_main application is saved compressed in
+                <console_log_prefix>_<entity>.log.gz.
+        capture <<in>>: if it is True and the check function is built from
+                conditions (see check_samples()), the Subscribers only
+                capture their samples, which are verified once the
+                shape_main applications stop (see verify_captures()).
+        The rest of the parameters are the same as in run_test().
+    """
+    # numbers of publishers/subscriber we will have. It depends on how
+    # many strings of parameters we have.
+    num_entities = len(parameters)
+
+    # entity_type defines the name of the entity: Publisher/Subscriber_<number>.
+    entity_type = get_entity_types(parameters)
+    # list of objects to save the shape_main output, one for each entity.
+    console_capture = []
+    # list of shape_main application outputs, one for each entity.
+    shape_main_application_output = []
+    for i in range(0, num_entities):
+        console_capture.append(ConsoleCapture(
+            tempfile.TemporaryFile(mode='w+t'),
+            console_lines,
+            f'{console_log_prefix}_{entity_type[i]}.log.gz'
+            if console_log_prefix is not None else None))
+
+    # In the capture-then-verify mode, the samples of each Subscriber are
+    # saved in a file instead of being checked while it runs.
+    sample_capture = None
+    if capture and can_capture(check_function):
+        sample_capture = [
+            SubscriberCapture(tempfile.TemporaryFile(mode='w+b'),
+                              check_function.max_samples)
+            if element.startswith('Subscriber') else None
+            for element in entity_type]
+
+    # The shape_main applications save their results in
+    # a group of result slots (shared memory), one slot for each shape_main
+    # application. The slots are identified by an index, every index
+    # identifies one shape_main application. Therefore, only one shape_main
+    # application must modify one slot. Once all of them are finished,
+    # 'return_codes' contains the ReturnCode in the corresponding index.
+    # This index is set manually and we need it in order to use it later.
+    # Example: (1 Publisher and 1 Subscriber)
+    #   Processes:
+    #     - Publisher Process (index = 0)
+    #     - Subscriber Process (index = 1)
+    #   Code contains:
+    #     - return_codes[0] contains Publisher shape_main application ReturnCode
+    #     - return_codes[1] contains Subscriber shape_main application ReturnCode
+    # 'child_pids' contains the PID of each shape_main application,
+    # 'teardown_result' (exited gracefully, time to stop), 'stage_timestamps'
+    # the time each stage finished and 'metrics' the metrics that the check
+    # function measures on the samples of each Subscriber. The results are
+    # copied once they finish, so the group of result slots can be reused.
+    if result_slots is None:
+        result_slots = ResultSlots(group_size=num_entities)
+    result_group = result_slots.acquire(num_entities)
+    # The group is released even if running the shape_main applications
+    # fails, otherwise the Test Cases waiting for a group would block forever
+    try:
+        # The shape_main applications are driven by one process each
+        # (multiprocessing engine) or by the event loop of asyncio_engine.
+        entities_parameters = {
+            'name_executables': name_executables,
+            'parameters': parameters,
+            'verbosity': verbosity,
+            'timeout': timeout,
+            'check_function': check_function,
+            'startup_delay': startup_delay,
+            'working_directory': working_directory,
+            'timing_history': timing_history,
+            'stage_timeouts': stage_timeouts,
+            'console_capture': console_capture,
+            'result_group': result_group,
+            'output_format': output_format,
+            'io_backend': io_backend,
+            'sample_capture': sample_capture,
+        }
+        if asyncio_engine is None:
+            sample_rings = run_entities_multiprocessing(**entities_parameters)
+        else:
+            sample_rings = asyncio_engine.run(run_entities_asyncio(
+                **entities_parameters, server_pool=server_pool))
+
+        return_codes = list(result_group.return_codes)
+        teardown_result = list(result_group.teardown_result)
+        stage_durations = [
+            result_group.stage_timestamps.get_durations(
+                i,
+                PUBLISHER_STAGES if entity_type[i].startswith('Publisher')
+                else SUBSCRIBER_STAGES)
+            for i in range(0, num_entities)]
+        metrics = [result_group.metrics.get_metrics(i)
+                   for i in range(0, num_entities)]
+    finally:
+        result_slots.release(result_group)
 
     log_message('Reading shape_main application console output from '
                 'temporary files',
                 verbosity)
-    for element in temporary_file:
-        element.seek(0)
-        shape_main_application_output.append(element.read())
+    for element in console_capture:
+        shape_main_application_output.append(element.read_output())
+
+    captures = None
+    if sample_capture is not None:
+        captures = verify_captures(check_function, entity_type, sample_capture,
+                                   sample_rings, return_codes, metrics,
+                                   verbosity)
 
-    # create an attribute for each entity that will contain their parameters
     for i in range(0, num_entities):
-        junitparser.TestCase.i = junitparser.Attr(entity_type[i])
-        test_case.i = parameters[i]
+        log_message(f'{entity_type[i]} stopped in {teardown_result[i][1]:.3f} s'
+                    + ('' if teardown_result[i][0] else ' (killed)'), verbosity)
+        if metrics[i]:
+            log_message(f'{entity_type[i]} metrics: '
+                        + ', '.join(f'{name}={value}'
+                                    for name, value in metrics[i].items()),
+                        verbosity)
+
+    return {
+        'return_codes': return_codes,
+        'teardown_result': teardown_result,
+        'stage_durations': stage_durations,
+        'output': shape_main_application_output,
+        'console_log': [element.get_full_log_filename()
+                        for element in console_capture],
+        'captures': captures if captures is not None
+                    else [None] * num_entities,
+        'metrics': metrics,
+    }
+
+def verify_captures(
+        check_function: "function",
+        entity_type: "list[str]",
+        sample_capture: "list[SubscriberCapture]",
+        sample_rings: "list[SampleRing]",
+        return_codes: "list[ReturnCode]",
+        metrics: "list[dict]",
+        verbosity: bool) -> "list[SampleCapture]":
+    """ Verify the samples captured from the Subscribers in the
+        capture-then-verify mode, once the shape_main applications have
+        stopped, and return the capture of each shape_main application.
+
+        check_function <<in>>: check function built from conditions (see
+                check_samples()).
+        entity_type <<in>>: name of the entity of each shape_main
+                application (see get_entity_types()).
+        sample_capture <<in>>: SubscriberCapture of each shape_main
+                application (None for the Publishers).
+        sample_rings <<in>>: SampleRings with the samples sent by each
+                Publisher.
+        return_codes <<inout>>: the ReturnCode of the Subscribers that
+                received samples is replaced by the verdict of the checks.
+        metrics <<inout>>: the metrics that the checks measure on the
+                samples of those Subscribers are added to their element.
+        verbosity <<in>>: print debug information.
+    """
+    publishers = [capture_ring(element) for element in sample_rings]
+    captures = []
+    publisher_number = 0
+    for i, element in enumerate(sample_capture):
+        if element is None:
+            captures.append(publishers[publisher_number])
+            publisher_number += 1
+            continue
+        captures.append(element.read_capture())
+        if captures[i] is not None:
+            return_codes[i] = verify_capture(check_function, captures[i],
+                                             publishers, metrics[i])
+            log_message(f'{entity_type[i]}: {len(captures[i])} samples '
+                        f'verified: {return_codes[i].name}', verbosity)
+    return captures
+
+def get_console_log_prefix(
+        console_log_dir: str,
+        test_case_name: str,
+        name_executable_pub: str,
+        name_executable_sub: str) -> str:
+    """ Return the prefix of the files with the whole console output of the
+        shape_main applications of a Test Case (see
+        run_shape_main_applications()), or None if console_log_dir is None.
+    """
+    if console_log_dir is None:
+        return None
+    return os.path.join(
+        console_log_dir,
+        f'{test_case_name}-{get_product_name(name_executable_pub)}---'
+        f'{get_product_name(name_executable_sub)}')
+
+def save_capture_file(
+        capture_dir: str,
+        test_case_name: str,
+        name_executable_pub: str,
+        name_executable_sub: str,
+        entity_type: "list[str]",
+        parameters: "list[str]",
+        captures: "list[SampleCapture]"):
+    """ Save the samples captured from the shape_main applications of a
+        Test Case in <capture_dir>/<test_case>-<publisher>---<subscriber>.capture
+        (see save_captures()). Nothing is saved if capture_dir is None or
+        the samples were not captured.
+    """
+    if capture_dir is None or not any(captures):
+        return
+    save_captures(
+        get_console_log_prefix(capture_dir, test_case_name,
+                               name_executable_pub, name_executable_sub)
+        + '.capture',
+        test_case_name, entity_type, parameters, captures)
+
+def select_entities(results: dict, indexes: "list[int]") -> dict:
+    """ Return the results of run_shape_main_applications() of the
+        shape_main applications in the list of indexes.
+    """
+    return {key: [value[i] for i in indexes] for key, value in results.items()}
+
+def save_teardown_times(
+        timing_history: TimingHistory,
+        name_executables: "list[str]",
+        teardown_result: "list[tuple]"):
+    """ Save in the timing history the time each shape_main application
+        took to exit (see run_shape_main_applications()).
+    """
+    for name_executable, result in zip(name_executables, teardown_result):
+        timing_history.add(
+            f'teardown/{get_product_name(name_executable)}',
+            result[1] if result[0] else FORCED_TEARDOWN)
+
+def save_stage_durations(
+        timing_history: TimingHistory,
+        name_executable_pub: str,
+        name_executable_sub: str,
+        test_case_name: str,
+        parameters: "list[str]",
+        stage_durations: "list[dict]"):
+    """ Save in the timing history the duration of the stages of the
+        shape_main applications of a publisher/subscriber pair in a Test Case
+        (see run_shape_main_applications() and get_stage_history_keys()).
+    """
+    stage_history_keys = get_stage_history_keys(
+        name_executable_pub, name_executable_sub, test_case_name, parameters)
+    for durations in stage_durations:
+        for stage, duration in durations.items():
+            for key in stage_history_keys:
+                timing_history.add(f'{key}/{stage}', duration)
+
+def set_test_result(
+        test_case: junitparser.TestCase,
+        parameters: "list[str]",
+        expected_codes: "list[ReturnCode]",
+        results: dict,
+        verbosity: bool):
+    """ Check the actual and the expected ReturnCode of each shape_main
+        application and save the result in test_case.
+
+        test_case <<inout>>: testCase object to update.
+        parameters <<in>>: list of shape_main application parameters.
+        expected_codes <<in>>: list of ReturnCodes the Publishers and
+                the Subscribers would obtain in a non error situation.
+        results <<in>>: results of the shape_main applications (see
+                run_shape_main_applications()).
+        verbosity <<in>>: print debug information.
+    """
+    num_entities = len(parameters)
+    entity_type = get_entity_types(parameters)
+    return_codes = results['return_codes']
+    teardown_result = results['teardown_result']
+    shape_main_application_output = results['output']
+    # list of shape_main application outputs, edited to use in the html code.
+    shape_main_application_output_edited = []
+
+    console_log = results.get('console_log', [None] * num_entities)
+    metrics = results.get('metrics', [{}] * num_entities)
+    # create an attribute for each entity that will contain their parameters,
+    # another one with the time it took to stop and, if its console output
+    # was elided, another one with the file that contains all of it
+    with junit_attribute_lock:
+        for i in range(0, num_entities):
+            junitparser.TestCase.i = junitparser.Attr(entity_type[i])
+            test_case.i = parameters[i]
+            junitparser.TestCase.i = junitparser.Attr(
+                f'{entity_type[i]}_teardown_time')
+            test_case.i = f'{teardown_result[i][1]:.3f}' \
+                + ('' if teardown_result[i][0] else ' (killed)')
+            if console_log[i] is not None:
+                junitparser.TestCase.i = junitparser.Attr(
+                    f'{entity_type[i]}_console_log')
+                test_case.i = console_log[i]
 
     # code[i] contains publisher/subscriber i shape_main application ReturnCode,
     # If we have 1 Publisher (index 0) and 1 Subscriber (index 1):
@@ -630,8 +2325,99 @@ def run_test(
         message = remove_ansi_colors(message)
         test_case.result = [junitparser.Failure(message)]
 
-    for element in temporary_file:
-        element.close()
+    # the metrics are added once the result is set
+    set_metric_properties(test_case, entity_type, metrics)
+
+def set_metric_properties(
+        test_case: junitparser.TestCase,
+        entity_type: "list[str]",
+        metrics: "list[dict]"):
+    """ Save the metrics measured on the samples of each entity (for
+        example, the samples lost) as properties of the Test Case, named
+        <entity>_<metric>, so they can be compared between runs. The
+        <properties> element is added after the result of the Test Case.
+
+        test_case <<inout>>: testCase object to update.
+        entity_type <<in>>: name of the entity of each shape_main
+                application (see get_entity_types()).
+        metrics <<in>>: metrics of each shape_main application (see
+                run_shape_main_applications()).
+    """
+    if not any(metrics):
+        return
+    properties = junitparser.Properties()
+    for entity, element in zip(entity_type, metrics):
+        for name, value in element.items():
+            properties.add_property(junitparser.Property(
+                f'{entity}_{name}', str(value)))
+    test_case.append(properties)
+
+def set_unsupported_result(
+        test_case: junitparser.TestCase,
+        parameters: "list[str]",
+        expected_codes: "list[ReturnCode]",
+        unsupported_options: "list[list[str]]"):
+    """ Set the result of a Test Case that is not run because some of the
+        shape_main applications do not support the options they need
+        (see Capabilities).
+
+        test_case <<inout>>: testCase object to update.
+        parameters <<in>>: list of shape_main application parameters.
+        expected_codes <<in>>: list of ReturnCodes the Publishers and
+                the Subscribers would obtain in a non error situation.
+        unsupported_options <<in>>: for each shape_main application, the
+                options it does not support.
+
+        The shape_main applications that do not support an option produce
+        PUB_UNSUPPORTED_FEATURE or SUB_UNSUPPORTED_FEATURE, as they would
+        if the Test Case was run. The rest of them are reported as not run.
+    """
+    entity_type = get_entity_types(parameters)
+    num_entities = len(parameters)
+
+    with junit_attribute_lock:
+        for i in range(0, num_entities):
+            junitparser.TestCase.i = junitparser.Attr(entity_type[i])
+            test_case.i = parameters[i]
+
+    codes_produced = []
+    information = []
+    for i in range(0, num_entities):
+        if not unsupported_options[i]:
+            codes_produced.append('NOT_RUN')
+            information.append('Not run.')
+        else:
+            if entity_type[i].startswith('Publisher'):
+                codes_produced.append(ReturnCode.PUB_UNSUPPORTED_FEATURE.name)
+            else:
+                codes_produced.append(ReturnCode.SUB_UNSUPPORTED_FEATURE.name)
+            information.append('Not run. The shape_main application does not '
+                'support: ' + ', '.join(unsupported_options[i]))
+
+    print(f'{test_case.name} : ERROR')
+    for i in range(0, num_entities):
+        print(f'{entity_type[i]} expected code: {expected_codes[i].name}; '
+            f'Code found: {codes_produced[i]}')
+
+    message = \
+        '<table> ' \
+            '<tr> ' \
+                '<th/> ' \
+                '<th> Expected Code </th> ' \
+                '<th> Code Produced </th> ' \
+            '</tr> '
+    for i in range(num_entities):
+        message += \
+            '<tr> ' \
+                f'<th> {entity_type[i]} </th> ' \
+                f'<th> {expected_codes[i].name} </th> ' \
+                f'<th> {codes_produced[i]} </th> ' \
+            '</tr>'
+    message += '</table>'
+    for i in range(0, num_entities):
+        message += f'<strong> Information {entity_type[i]} </strong>' \
+                f'<br> {information[i]} <br>'
+    test_case.result = [junitparser.Failure(message)]
 
 class Arguments:
     def parser():
@@ -691,6 +2477,214 @@ class Arguments:
             help='Indicates the periodic participant announcement period in ms. '
                 'Default: 0 (off).')
 
+        optional.add_argument('--startup-delay',
+            default=None,
+            required=False,
+            type=float,
+            metavar='seconds',
+            help='Use a fixed delay (in seconds) after starting a Publisher '
+                'and before starting a Subscriber in all Test Cases. '
+                'Default: each shape_main application is started as soon as the '
+                'previous one has created its DataWriter or DataReader, unless the '
+                'Test Case sets \'startup_delay\'.')
+
+        optional.add_argument('--timing-history',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file with the durations measured in previous runs. '
+                'It is used to calculate the timeout of each stage of the '
+                'shape_main applications (topic and DataWriter/DataReader '
+                'creation, matching and first sample) of each Test Case and '
+                'publisher/subscriber pair and how long each product needs '
+                'to exit. It is updated '
+                'with the durations of this run. '
+                'Default: None (the history is not used).')
+
+        optional.add_argument('--capabilities',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file with the options supported by the shape_main '
+                'applications. Before running a Test Case, each option it uses '
+                'is probed by running the shape_main application with that '
+                'option until it creates its DataWriter or DataReader. If an '
+                'application reports that an option is not supported, the Test '
+                'Case is reported as unsupported without running it. The '
+                'results are saved by the SHA-256 of the application, so each '
+                'build is only probed once. '
+                'Default: None (the options are not probed).')
+
+        optional.add_argument('--cache',
+            nargs='?',
+            const=get_default_cache_directory(),
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Use a result cache in the directory (by default, '
+                f'{get_default_cache_directory()}): the Test Cases whose '
+                'shape_main applications (their content), parameters and '
+                'harness have not changed since they passed are not run '
+                'again, their previous result is reported. '
+                'Default: None (all the Test Cases run).')
+
+        optional.add_argument('--cache-max-age',
+            default=DEFAULT_MAX_AGE_DAYS,
+            required=False,
+            type=float,
+            metavar='days',
+            help='Results older than this number of days are removed from the '
+                f'result cache. Default: {DEFAULT_MAX_AGE_DAYS}.')
+
+        optional.add_argument('--cache-max-size',
+            default=DEFAULT_MAX_SIZE_MB,
+            required=False,
+            type=float,
+            metavar='megabytes',
+            help='Maximum size of the result cache, the oldest results are '
+                f'removed when it is bigger. Default: {DEFAULT_MAX_SIZE_MB}.')
+
+        optional.add_argument('-j', '--jobs',
+            default=1,
+            required=False,
+            type=int,
+            metavar='number_of_jobs',
+            help='Number of Test Cases that run at the same time. If the value '
+                'is greater than 1, each Test Case runs with its own set of '
+                'Domain IDs, so the shape_main applications of different Test '
+                'Cases do not communicate with each other. '
+                'Default: 1.')
+
+        optional.add_argument('--engine',
+            default='multiprocessing',
+            required=False,
+            type=str,
+            choices=['multiprocessing', 'asyncio'],
+            help='How the shape_main applications are driven. '
+                'multiprocessing: one process for each shape_main application. '
+                'asyncio: one event loop for all the shape_main applications '
+                'of all the Test Cases. '
+                'Default: multiprocessing.')
+
+        optional.add_argument('--warm-processes',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Run the shape_main applications in server mode (--server) '
+                'and reuse them in the next Test Cases, instead of starting '
+                'a new process for each Test Case. They only create their '
+                'participant again if the Domain ID or a participant option '
+                'changes. The shape_main applications must support the '
+                'server mode. It needs --engine asyncio. '
+                'Default: False (one process for each shape_main application '
+                'and Test Case).')
+
+        optional.add_argument('--output-format',
+            default='text',
+            required=False,
+            type=str,
+            choices=OUTPUT_FORMATS,
+            help='Output format of the shape_main applications. '
+                'text: the output is matched as text. '
+                'jsonl: the shape_main applications print one JSON object '
+                'per event (--output-format jsonl), which is parsed one line '
+                'at a time. The shape_main applications that do not support '
+                'it use the text output format. '
+                'Default: text.')
+        optional.add_argument('--io-backend',
+            default='pty',
+            required=False,
+            type=str,
+            choices=IO_BACKENDS,
+            help='How the output of the shape_main applications is read. '
+                'pty: each one runs in a pseudo-terminal. '
+                'pipe: each one writes to a pipe with a bigger buffer, '
+                'line-buffered, so it does not block writing its output at '
+                'high sample rates. '
+                'Default: pty.')
+
+        optional.add_argument('--console-lines',
+            default=DEFAULT_CONSOLE_LINES,
+            required=False,
+            type=int,
+            metavar='number_of_lines',
+            help='Number of lines kept at the beginning and at the end of '
+                'the console output of each shape_main application; the '
+                'lines in between are counted but not saved in the report. '
+                '0 keeps all the lines. '
+                f'Default: {DEFAULT_CONSOLE_LINES}.')
+
+        optional.add_argument('--console-log-dir',
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Directory where the whole console output of the '
+                'shape_main applications whose output is elided (see '
+                '--console-lines) is saved, compressed with gzip. The file '
+                'is referenced from the report as the attribute '
+                '<entity>_console_log of the Test Case. '
+                'Default: not saved.')
+
+        optional.add_argument('--capture-then-verify',
+            action='store_true',
+            default=False,
+            required=False,
+            help='The Subscribers only capture the samples they receive '
+                '(position, size, color and the time they are read), and the '
+                'check functions built from conditions (see '
+                'rtps_test_checks.py) verify them once the shape_main '
+                'applications stop, so the checks do not slow down reading '
+                'their output. The rest of the check functions run while the '
+                'Subscribers receive the samples. Default: disabled.')
+
+        optional.add_argument('--capture-dir',
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Directory where the samples captured are saved (it implies '
+                '--capture-then-verify), one file for each Test Case, so '
+                'they can be verified again with rtps_test_capture.py without '
+                'running the shape_main applications. Default: not saved.')
+
+        optional.add_argument('--shard',
+            default=None,
+            required=False,
+            type=str,
+            metavar='i/N',
+            help='Split the Test Cases in N shards and run only the shard i '
+                '(from 1 to N). The shards are balanced using the durations '
+                'of the Test Cases in the reports passed with --durations. '
+                'Default: None (run all the Test Cases).')
+
+        optional.add_argument('--durations',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JUnit reports of previous runs. The time of their Test '
+                'Cases is used as the expected duration to balance the '
+                'shards (see --shard). If a Test Case is not found, all '
+                'of them are expected to take the same time. '
+                'Default: None.')
+
+        optional.add_argument('--order',
+            default='duration',
+            required=False,
+            type=str,
+            choices=['duration', 'dictionary'],
+            help='Order in which the Test Cases run. duration: longest first, '
+                'according to the reports passed with --durations (Test '
+                'Cases that expect a timeout go first if the durations are '
+                'the same). dictionary: as defined in the Test Suite. The '
+                'report always keeps the order of the Test Suite. '
+                'Default: duration.')
+
         tests = parser.add_argument_group(title='Test Case and Test Suite')
         tests.add_argument('-s', '--suite',
             default='test_suite',
@@ -737,6 +2731,15 @@ class Arguments:
                 'the new results to it. In other case it will create '
                 'a new file. '
                 'Default: <publisher_name>-<subscriber_name>-date.xml')
+        out_opts.add_argument('--resume',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Run only the Test Cases that are not in the report (and in '
+                'its journal) or that did not pass. The result of each Test '
+                'Case is saved in the journal <output_name>.journal as soon '
+                'as it finishes, so an interrupted run can be resumed. '
+                'Default: False (run all the Test Cases).')
 
         return parser
 
@@ -751,10 +2754,378 @@ def are_tests_in_test_suite(test_suite, suite_name, test_cases):
                 all_test_cases_exist = False
     return all_test_cases_exist
 
-def main():
-    parser = Arguments.parser()
-    args = parser.parse_args()
+def get_test_case_settings(
+        options: dict,
+        test_case_name: str,
+        test_case_parameters: dict) -> dict:
+    """ Return the settings used to run a Test Case with the options of
+        the script, as a dictionary with the keys: parameters (shape_main
+        application parameters), expected_codes, check_function and
+        startup_delay.
+    """
+    # Copy the parameters, the Test Suite dictionary may be shared with other
+    # Test Suites running at the same time.
+    parameters = list(test_case_parameters['apps'])
+    expected_codes = test_case_parameters['expected_codes']
+    if ('check_function' in test_case_parameters):
+        if callable(test_case_parameters['check_function']):
+            check_function = test_case_parameters['check_function']
+        else:
+            raise RuntimeError('Cannot process function of '
+                f'test case: {test_case_name}')
+    else:
+        check_function = basic_check
 
+    # The startup delay from the command line applies to all Test Cases.
+    if options['startup_delay'] is not None:
+        startup_delay = options['startup_delay']
+    else:
+        startup_delay = test_case_parameters.get('startup_delay')
+
+    assert(len(parameters) == len(expected_codes))
+
+    for i,element in enumerate(parameters):
+        if not '-x ' in element:
+            element += f' -x {options["data_representation"]}'
+        # Add periodic announcement argument if needed
+        if options['periodic_announcement_ms'] > 0 \
+                and not '--periodic-announcement ' in element \
+                and 'connext' in options['publisher'].lower() \
+                and '-P' in element:
+            element += f' --periodic-announcement {options["periodic_announcement_ms"]}'
+        parameters[i] = element
+
+    return {
+        'parameters': parameters,
+        'expected_codes': expected_codes,
+        'check_function': check_function,
+        'startup_delay': startup_delay,
+    }
+
+def get_cached_test_case(
+        options: dict,
+        test_case_name: str,
+        settings: dict) -> "tuple[junitparser.TestCase, str]":
+    """ Return the TestCase saved in the result cache for a Test Case (or
+        None if there is none) and its key in the cache (or None if the
+        cache is not used).
+
+        The TestCase keeps the time it took when it was run, and the
+        attribute 'cached' contains when it was run.
+    """
+    if options['result_cache'] is None:
+        return None, None
+    cache_key = options['result_cache'].get_key(
+        options['publisher'], options['subscriber'], settings['parameters'],
+        settings['expected_codes'], settings['check_function'],
+        settings['startup_delay'])
+    if cache_key is None:
+        return None, None
+    cached_case, cached_time = options['result_cache'].get(cache_key)
+    if cached_case is not None:
+        cached_case.name = test_case_name
+        with junit_attribute_lock:
+            junitparser.TestCase.i = junitparser.Attr('cached')
+            cached_case.i = datetime.fromtimestamp(cached_time) \
+                .isoformat(timespec='seconds')
+        print(f'{test_case_name} : '
+              f'{"OK" if cached_case.is_passed else "ERROR"} (cached)')
+        if options['journal'] is not None:
+            options['journal'].add(get_suite_name(options), cached_case)
+    return cached_case, cache_key
+
+def get_unsupported_options(
+        options: dict,
+        timeout: int,
+        parameters: "list[str]") -> "list[list[str]]":
+    """ Return the options that each shape_main application does not
+        support (according to the capability probes, see Capabilities).
+    """
+    unsupported_options = []
+    if options['capabilities'] is not None:
+        for element in parameters:
+            unsupported_options.append(
+                options['capabilities'].get_unsupported_options(
+                    options['publisher'] if '-P' in element.split()
+                        else options['subscriber'],
+                    element,
+                    timeout,
+                    options['working_directory'],
+                    options['verbosity']))
+    return unsupported_options
+
+def finish_test_case(
+        options: dict,
+        case: junitparser.TestCase,
+        cache_key: str,
+        start_time: datetime):
+    """ Set the time of a Test Case that has finished and save its result
+        in the result cache and in the journal.
+    """
+    case.time = (datetime.now() - start_time).total_seconds()
+    if cache_key is not None and is_cacheable(case):
+        options['result_cache'].add(cache_key, case)
+    if options['journal'] is not None:
+        options['journal'].add(get_suite_name(options), case)
+
+def run_test_case(
+        options: dict,
+        timeout: int,
+        test_suite_name: str,
+        test_case_name: str,
+        test_case_parameters: dict,
+        domain_pool: DomainIdPool = None,
+        result_slots: ResultSlots = None,
+        asyncio_engine: AsyncioEngine = None,
+        server_pool: ServerPool = None) -> junitparser.TestCase:
+    """ Run one Test Case from a Test Suite and return the junitparser
+        TestCase with its result.
+
+        options <<in>>: dictionary with the options of the script.
+        timeout <<in>>: time pexpect waits until it matches a pattern.
+        test_suite_name <<in>>: name of the Test Suite dictionary.
+        test_case_name <<in>>: name of the Test Case.
+        test_case_parameters <<in>>: dictionary that defines the Test Case.
+        domain_pool <<inout>>: pool of Domain IDs. If it is set, the Test Case
+                takes a block of Domain IDs from it while it runs.
+        result_slots <<inout>>: shared memory where the shape_main
+                applications save their results (see run_test()).
+        asyncio_engine <<in>>: event loop that drives the shape_main
+                applications (see run_test()).
+        server_pool <<inout>>: servers where the shape_main applications
+                run (see run_test()).
+    """
+    settings = get_test_case_settings(options, test_case_name,
+                                      test_case_parameters)
+    parameters = settings['parameters']
+
+    # TestCase is a class from junitparser whose attributes
+    # are: name and result (OK, Failure, Error or Skipped).
+    case = junitparser.TestCase(
+        get_test_case_name(test_suite_name, test_case_name))
+
+    # If the result of the Test Case is in the cache, it is not run again.
+    cached_case, cache_key = get_cached_test_case(options, case.name, settings)
+    if cached_case is not None:
+        return cached_case
+
+    now_test_case = datetime.now()
+    log_message(f'Running test: {test_case_name}', options['verbosity'])
+
+    # If any shape_main application does not support the options it needs,
+    # the Test Case is not run.
+    unsupported_options = get_unsupported_options(options, timeout, parameters)
+    if any(unsupported_options):
+        set_unsupported_result(case, parameters, settings['expected_codes'],
+                               unsupported_options)
+    else:
+        base_domain_id = None
+        if domain_pool is not None:
+            base_domain_id = domain_pool.acquire()
+            parameters = rewrite_domain_ids(parameters, base_domain_id)
+            log_message(f'{test_case_name}: using Domain IDs from '
+                        f'{base_domain_id}', options['verbosity'])
+        try:
+            run_test(name_executable_pub=options['publisher'],
+                    name_executable_sub=options['subscriber'],
+                    test_case=case,
+                    parameters=parameters,
+                    expected_codes=settings['expected_codes'],
+                    verbosity=options['verbosity'],
+                    timeout=timeout,
+                    check_function=settings['check_function'],
+                    startup_delay=settings['startup_delay'],
+                    working_directory=options['working_directory'],
+                    timing_history=options['timing_history'],
+                    result_slots=result_slots,
+                    asyncio_engine=asyncio_engine,
+                    server_pool=server_pool,
+                    output_format=options['output_format'],
+                    io_backend=options['io_backend'],
+                    console_lines=options['console_lines'],
+                    console_log_dir=options['console_log_dir'],
+                    capture=options['capture'],
+                    capture_dir=options['capture_dir'])
+        finally:
+            if base_domain_id is not None:
+                domain_pool.release(base_domain_id)
+    finish_test_case(options, case, cache_key, now_test_case)
+    return case
+
+def is_fan_out_test_case(test_case_parameters: dict) -> bool:
+    """ Return whether a Test Case can run in fan-out mode (see
+        run_fan_out_test_case()): it sets 'fan_out', it has one Publisher
+        followed by one Subscriber, the Publisher is expected to return
+        ReturnCode.OK and it does not wait for the acknowledgments of the
+        Subscribers (-w), so its ReturnCode cannot depend on the set of
+        Subscribers.
+    """
+    apps = test_case_parameters['apps']
+    return test_case_parameters.get('fan_out', False) \
+        and len(apps) == 2 \
+        and get_entity_types(apps) == ['Publisher_1', 'Subscriber_1'] \
+        and test_case_parameters['expected_codes'][0] == ReturnCode.OK \
+        and '-w' not in apps[0].split()
+
+def run_fan_out_test_case(
+        pair_options: "list[dict]",
+        timeout: int,
+        test_suite_name: str,
+        test_case_name: str,
+        test_case_parameters: dict,
+        working_directory: str = None,
+        domain_pool: DomainIdPool = None,
+        result_slots: ResultSlots = None,
+        asyncio_engine: AsyncioEngine = None,
+        server_pool: ServerPool = None) -> "list[junitparser.TestCase]":
+    """ Run one Test Case for several publisher/subscriber pairs that have
+        the same publisher shape_main application, and return the
+        junitparser TestCase of each pair.
+
+        pair_options <<in>>: options of each pair, as in run_test_case().
+                The shared objects (such as the timing history) are taken
+                from the first one.
+        working_directory <<in>>: directory where the shape_main
+                applications run. By default, the current directory.
+        The rest of the parameters are the same as in run_test_case().
+
+        Instead of running the Publisher once for each pair, a single
+        Publisher runs with the Subscribers of all the pairs in the same
+        Domain. Each Subscriber obtains its own ReturnCode and the result
+        of each pair contains the ReturnCode of the Publisher and its
+        Subscriber, as if the pair was tested alone. The Publisher
+        ReturnCode is shared by all the pairs, so this is only valid for
+        Test Cases in which it cannot depend on the Subscribers (see
+        is_fan_out_test_case() and 'fan_out' in test_suite.py): an
+        incompatible Subscriber would not make the Publisher fail while
+        another one matches, and a slow Subscriber would throttle a
+        Publisher that waits for acknowledgments.
+    """
+    if not is_fan_out_test_case(test_case_parameters):
+        raise RuntimeError(f'Test Case <{test_case_name}> cannot run in '
+            'fan-out mode.')
+    name = get_test_case_name(test_suite_name, test_case_name)
+    options = pair_options[0]
+    cases = [None] * len(pair_options)
+
+    # Pairs that need to run, grouped by the parameters of the Publisher
+    # (they may be different, for example, the periodic announcement).
+    groups = {}
+    for k, element in enumerate(pair_options):
+        settings = get_test_case_settings(element, test_case_name,
+                                          test_case_parameters)
+        cases[k], cache_key = get_cached_test_case(element, name, settings)
+        if cases[k] is not None:
+            continue
+        case = junitparser.TestCase(name)
+        unsupported_options = get_unsupported_options(
+            element, timeout, settings['parameters'])
+        if any(unsupported_options):
+            set_unsupported_result(case, settings['parameters'],
+                                   settings['expected_codes'],
+                                   unsupported_options)
+            finish_test_case(element, case, cache_key, datetime.now())
+            cases[k] = case
+            continue
+        groups.setdefault(settings['parameters'][0], []).append(
+            (k, case, cache_key, settings))
+
+    for group_number, (publisher_parameters, group) in enumerate(
+            groups.items(), start=1):
+        now_test_case = datetime.now()
+        log_message(f'Running test: {test_case_name} (fan-out with '
+                    f'{len(group)} Subscribers)', options['verbosity'])
+        settings = group[0][3]
+        name_executable_pub = pair_options[group[0][0]]['publisher']
+        name_executables = [name_executable_pub] + [
+            pair_options[element[0]]['subscriber'] for element in group]
+        parameters = [publisher_parameters] + [
+            element[3]['parameters'][1] for element in group]
+
+        # Each stage may take as long as it takes for the slowest pair
+        stage_timeouts = {}
+        for k, _, _, element in group:
+            for stage, value in get_stage_timeouts(
+                    options['timing_history'], name_executable_pub,
+                    pair_options[k]['subscriber'], name,
+                    element['parameters'], timeout).items():
+                stage_timeouts[stage] = max(stage_timeouts.get(stage, 0), value)
+
+        base_domain_id = None
+        if domain_pool is not None:
+            base_domain_id = domain_pool.acquire()
+            parameters = rewrite_domain_ids(parameters, base_domain_id)
+        try:
+            results = run_shape_main_applications(
+                name_executables=name_executables,
+                parameters=parameters,
+                verbosity=options['verbosity'],
+                timeout=timeout,
+                check_function=settings['check_function'],
+                startup_delay=settings['startup_delay'],
+                working_directory=working_directory,
+                timing_history=options['timing_history'],
+                stage_timeouts=stage_timeouts,
+                result_slots=result_slots,
+                asyncio_engine=asyncio_engine,
+                server_pool=server_pool,
+                output_format=options['output_format'],
+                io_backend=options['io_backend'],
+                console_lines=options['console_lines'],
+                console_log_prefix=get_console_log_prefix(
+                    options['console_log_dir'], name, name_executable_pub,
+                    f'fan-out_{group_number}'),
+                capture=options['capture'])
+        finally:
+            if base_domain_id is not None:
+                domain_pool.release(base_domain_id)
+
+        if options['timing_history'] is not None and server_pool is None:
+            save_teardown_times(options['timing_history'], name_executables,
+                                results['teardown_result'])
+        for j, (k, case, cache_key, settings) in enumerate(group, start=1):
+            pair_results = select_entities(results, [0, j])
+            if options['timing_history'] is not None and server_pool is None:
+                save_stage_durations(options['timing_history'],
+                                     name_executable_pub, name_executables[j],
+                                     name, settings['parameters'],
+                                     pair_results['stage_durations'])
+            save_capture_file(options['capture_dir'], name,
+                              name_executable_pub, name_executables[j],
+                              ['Publisher_1', 'Subscriber_1'],
+                              [parameters[0], parameters[j]],
+                              pair_results['captures'])
+            set_test_result(case, [parameters[0], parameters[j]],
+                            settings['expected_codes'], pair_results,
+                            options['verbosity'])
+            finish_test_case(pair_options[k], case, cache_key, now_test_case)
+            cases[k] = case
+
+    return cases
+
+def skip_test_case(
+        options: dict,
+        test_suite_name: str,
+        test_case_name: str,
+        failed_dependencies: "list[str]") -> junitparser.TestCase:
+    """ Return the junitparser TestCase of a Test Case that is not run
+        because some of the Test Cases it depends on (see 'depends_on')
+        did not pass.
+    """
+    case = junitparser.TestCase(
+        get_test_case_name(test_suite_name, test_case_name))
+    case.result = [junitparser.Skipped(
+        f'Not run because {", ".join(failed_dependencies)} did not pass.')]
+    case.time = 0
+    print(f'{case.name} : SKIPPED')
+    if options['journal'] is not None:
+        options['journal'].add(get_suite_name(options), case)
+    return case
+
+def get_options(args: argparse.Namespace) -> dict:
+    """ Return the dictionary of options used by the script from the
+        arguments parsed with Arguments.parser().
+    """
     options = {
         'publisher': args.publisher,
         'subscriber': args.subscriber,
@@ -764,40 +3135,92 @@ def main():
         'test_cases_disabled': args.disable_test,
         'data_representation': args.data_representation,
         'periodic_announcement_ms': args.periodic_announcement,
+        'jobs': args.jobs,
+        'engine': args.engine,
+        'warm_processes': args.warm_processes,
+        'output_format': args.output_format,
+        'io_backend': args.io_backend,
+        'console_lines': args.console_lines,
+        'console_log_dir': None,
+        'capture': args.capture_then_verify or args.capture_dir is not None,
+        'capture_dir': None,
+        'startup_delay': args.startup_delay,
+        'working_directory': None,
+        'timing_history': None,
+        'capabilities': None,
+        'result_cache': None,
+        'resume': args.resume,
+        'journal': None,
+        'completed_test_cases': {},
+        'shard': None,
+        'durations': Durations(args.durations),
+        'shard_test_cases': None,
+        'order': args.order,
     }
 
-    # The executables's names are supposed to follow the pattern: name_shape_main
-    # We will keep only the part of the name that is useful, deleting the path
-    # and the substring '_shape_main'.
-    # Example: if the shape_main application's name (including the path) is:
-    #  ./srcCxx/objs/x64Linux4gcc7.3.0/rti_connext_dds-6.1.1_shape_main_linux
-    # we will take the substring rti_connext_dds-6.1.1.
-    # That will be the name that will appear in the report.
-    name_publisher = options['publisher'].split('_shape')[0].split('-shape')[0].split('/')[-1]
-    name_subscriber = options['subscriber'].split('_shape')[0].split('-shape')[0].split('/')[-1]
+    if args.shard is not None:
+        options['shard'] = parse_shard(args.shard)
 
-    if args.output_name is None:
-        now = datetime.now()
-        date_time = now.strftime('%Y%m%d-%H_%M_%S')
-        options['filename_report'] = \
-            f'{name_publisher}-{name_subscriber}-{date_time}.xml'
-        xml = junitparser.JUnitXml()
+    if args.timing_history is not None:
+        options['timing_history'] = TimingHistory(args.timing_history)
 
-    else:
-        options['filename_report'] = args.output_name
-        file_exists = exists(options['filename_report'])
-        if file_exists:
-            xml = junitparser.JUnitXml.fromfile(options['filename_report'])
-        else:
-            xml = junitparser.JUnitXml()
+    if args.capabilities is not None:
+        options['capabilities'] = Capabilities(args.capabilities)
 
-    # TestSuite is a class from junitparser that will contain the
-    # results of running different TestCases between two shape_main
-    # applications. A TestSuite contains a collection of TestCases.
-    suite = junitparser.TestSuite(f"{name_publisher}---{name_subscriber}")
+    if args.console_log_dir is not None:
+        options['console_log_dir'] = os.path.abspath(args.console_log_dir)
+        os.makedirs(options['console_log_dir'], exist_ok=True)
 
-    timeout = 15
-    now = datetime.now()
+    if args.capture_dir is not None:
+        options['capture_dir'] = os.path.abspath(args.capture_dir)
+        os.makedirs(options['capture_dir'], exist_ok=True)
+
+    if options['console_lines'] < 0:
+        raise RuntimeError('The number of console lines must not be '
+                           'negative.')
+
+    if options['jobs'] < 1:
+        raise RuntimeError('The number of jobs must be greater than 0.')
+
+    if options['warm_processes'] and options['engine'] != 'asyncio':
+        raise RuntimeError('The option --warm-processes needs '
+                           '--engine asyncio.')
+
+    return options
+
+def get_product_name(name_executable: str) -> str:
+    """ Return the name of the product from the shape_main application name.
+
+        The executables's names are supposed to follow the pattern: name_shape_main
+        We will keep only the part of the name that is useful, deleting the path
+        and the substring '_shape_main'.
+        Example: if the shape_main application's name (including the path) is:
+         ./srcCxx/objs/x64Linux4gcc7.3.0/rti_connext_dds-6.1.1_shape_main_linux
+        we will take the substring rti_connext_dds-6.1.1.
+        That will be the name that will appear in the report.
+    """
+    return name_executable.split('_shape')[0].split('-shape')[0].split('/')[-1]
+
+def get_suite_name(options: dict) -> str:
+    """ Return the name of the junitparser TestSuite with the results of the
+        publisher and the subscriber in the options: <publisher>---<subscriber>.
+    """
+    return f'{get_product_name(options["publisher"])}---' \
+           f'{get_product_name(options["subscriber"])}'
+
+def get_test_case_name(test_suite_name: str, test_case_name: str) -> str:
+    """ Return the name of the junitparser TestCase with the result of
+        a Test Case from a Test Suite.
+    """
+    return f'{test_suite_name}_{test_case_name}'
+
+def get_test_cases_to_run(options: dict) -> "list[tuple]":
+    """ Return the list of (test_suite_name, test_case_name,
+        test_case_parameters) from the Test Suite file that are enabled
+        in the options. If options['shard_test_cases'] is set, only the
+        TestCases with those names are returned.
+    """
+    test_cases_to_run = []
 
     t_suite_module = importlib.import_module(options['test_suite'])
     for test_suite_name, t_suite_dict in inspect.getmembers(t_suite_module):
@@ -820,9 +3243,11 @@ def main():
                 raise RuntimeError('Disabled test cases not found.')
 
             for test_case_name, test_case_parameters in t_suite_dict.items():
-                # TestCase is a class from junitparser whose attributes
-                # are: name and result (OK, Failure, Error or Skipped).
-
+                for dependency in test_case_parameters.get('depends_on', []):
+                    if dependency not in t_suite_dict:
+                        raise RuntimeError(f'Test Case <{test_case_name}> '
+                            f'depends on <{dependency}>, which is not in '
+                            f'Test Suite <{test_suite_name}>.')
                 if options['test_cases_disabled'] is not None \
                         and test_case_name in options['test_cases_disabled']:
                     # if there are test cases disabled and the script is
@@ -837,48 +3262,251 @@ def main():
                     continue
                 else:
                     # if the test case is processed
-                    parameters = test_case_parameters['apps']
-                    expected_codes = test_case_parameters['expected_codes']
-                    if ('check_function' in test_case_parameters):
-                        if callable(test_case_parameters['check_function']):
-                            check_function = test_case_parameters['check_function']
-                        else:
-                            raise RuntimeError('Cannot process function of '
-                                f'test case: {test_case_name}')
-                    else:
-                        check_function = basic_check
-
-                    assert(len(parameters) == len(expected_codes))
-
-                    for i,element in enumerate(parameters):
-                        if not '-x ' in element:
-                            element += f' -x {options["data_representation"]}'
-                        # Add periodic announcement argument if needed
-                        if options['periodic_announcement_ms'] > 0 \
-                                and not '--periodic-announcement ' in element \
-                                and 'connext' in options['publisher'].lower() \
-                                and '-P' in element:
-                            element += f' --periodic-announcement {options["periodic_announcement_ms"]}'
-                        parameters[i] = element  # Update the list in place
-
-                    case = junitparser.TestCase(f'{test_suite_name}_{test_case_name}')
-                    now_test_case = datetime.now()
-                    log_message(f'Running test: {test_case_name}', options['verbosity'])
-                    run_test(name_executable_pub=options['publisher'],
-                            name_executable_sub=options['subscriber'],
-                            test_case=case,
-                            parameters=parameters,
-                            expected_codes=expected_codes,
-                            verbosity=options['verbosity'],
-                            timeout=timeout,
-                            check_function=check_function)
-                    case.time = (datetime.now() - now_test_case).total_seconds()
-                    suite.add_testcase(case)
+                    test_cases_to_run.append(
+                        (test_suite_name, test_case_name, test_case_parameters))
+
+    if options['shard_test_cases'] is not None:
+        test_cases_to_run = [
+            element for element in test_cases_to_run
+            if get_test_case_name(element[0], element[1])
+                in options['shard_test_cases']]
+
+    return test_cases_to_run
+
+def is_expected_to_time_out(test_case_parameters: dict) -> bool:
+    """ Return whether a shape_main application of the Test Case is expected
+        to wait for a timeout (see TIMEOUT_RETURN_CODES).
+    """
+    return any(code in TIMEOUT_RETURN_CODES
+               for code in test_case_parameters['expected_codes'])
+
+def order_test_cases(options: dict, test_cases: "list[tuple]") -> "list[tuple]":
+    """ Return the (test_suite_name, test_case_name, test_case_parameters)
+        Test Cases sorted by their expected duration (see --durations),
+        longest first, so the Test Cases running at the same time finish
+        at about the same time.
+    """
+    suite_name = get_suite_name(options)
+    return order_longest_first(
+        test_cases,
+        [options['durations'].get(suite_name,
+                                  get_test_case_name(element[0], element[1]))
+         for element in test_cases],
+        [is_expected_to_time_out(element[2]) for element in test_cases])
+
+def get_shard_test_cases(options: dict) -> "set[str]":
+    """ Return the names of the TestCases that belong to the shard selected
+        in the options. The Test Cases are split so that the expected
+        durations of all the shards are balanced (see split_in_shards()).
+    """
+    suite_name = get_suite_name(options)
+    names = [get_test_case_name(element[0], element[1])
+             for element in get_test_cases_to_run(options)]
+    shards = split_in_shards(
+        names,
+        [options['durations'].get(suite_name, name) for name in names],
+        options['shard'][1])
+    return set(shards[options['shard'][0] - 1])
+
+def run_test_suite(
+        options: dict,
+        timeout: int,
+        domain_pool: DomainIdPool = None,
+        result_slots: ResultSlots = None,
+        asyncio_engine: AsyncioEngine = None) -> junitparser.TestSuite:
+    """ Run all the Test Cases enabled in the options between the publisher
+        and the subscriber shape_main applications and return a junitparser
+        TestSuite with the results.
+
+        options <<in>>: dictionary with the options of the script.
+        timeout <<in>>: time pexpect waits until it matches a pattern.
+        domain_pool <<inout>>: pool of Domain IDs shared with other Test
+                Suites that run at the same time. If it is not set and
+                several jobs are used, a pool is created for this Test Suite.
+        result_slots <<inout>>: shared memory where the shape_main
+                applications save their results, shared with other Test
+                Suites that run at the same time. If it is not set, it is
+                created for this Test Suite.
+        asyncio_engine <<in>>: event loop shared with other Test Suites that
+                run at the same time. If it is not set and the asyncio engine
+                is selected in the options, it is created for this Test Suite.
+    """
+    # TestSuite is a class from junitparser that will contain the
+    # results of running different TestCases between two shape_main
+    # applications. A TestSuite contains a collection of TestCases.
+    suite = junitparser.TestSuite(get_suite_name(options))
+
+    now = datetime.now()
+
+    # list of (test_suite_name, test_case_name, test_case_parameters) that
+    # will be run.
+    test_cases_to_run = get_test_cases_to_run(options)
+
+    if domain_pool is None and options['jobs'] > 1:
+        # Each Test Case running at the same time needs a block of Domain IDs
+        # big enough to keep the Domain IDs it uses.
+        domain_pool = DomainIdPool(
+            block_size=get_domain_block_size(test_cases_to_run),
+            num_blocks=options['jobs'])
+
+    if result_slots is None:
+        # Created once, each Test Case running at the same time uses
+        # a group of slots.
+        result_slots = ResultSlots(
+            group_size=get_result_group_size(test_cases_to_run),
+            num_groups=options['jobs'])
+
+    close_asyncio_engine = False
+    if asyncio_engine is None and options['engine'] == 'asyncio':
+        asyncio_engine = AsyncioEngine()
+        close_asyncio_engine = True
+
+    # The servers run in the working directory of this Test Suite, so they
+    # are not shared with other Test Suites.
+    server_pool = None
+    if options['warm_processes']:
+        server_pool = ServerPool(options['working_directory'],
+                                 options['verbosity'],
+                                 options['io_backend'])
+
+    # The Test Cases that already ran (see --resume) are not run again
+    test_cases_pending = [
+        element for element in test_cases_to_run
+        if get_test_case_name(element[0], element[1])
+            not in options['completed_test_cases']]
+    for element in test_cases_to_run:
+        if element not in test_cases_pending:
+            print(f'Test Case {element[1]} already run.')
+    if options['order'] == 'duration':
+        test_cases_pending = order_test_cases(options, test_cases_pending)
+
+    # TestCases with the result of each Test Case, the ones that already
+    # ran are needed to check the dependencies.
+    results = dict(options['completed_test_cases'])
+    names_to_run = [get_test_case_name(element[0], element[1])
+                    for element in test_cases_to_run]
+    # Test Cases running, the key is the Future that returns their TestCase
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=options['jobs']) as executor:
+        while test_cases_pending or running:
+            # Start the Test Cases whose dependencies have finished (or skip
+            # them if any dependency did not pass), in order, while there
+            # are free jobs.
+            progress = False
+            for element in list(test_cases_pending):
+                if len(running) >= options['jobs']:
+                    break
+                dependencies = [
+                    get_test_case_name(element[0], dependency)
+                    for dependency in element[2].get('depends_on', [])
+                    if get_test_case_name(element[0], dependency)
+                        in names_to_run]
+                if any(name not in results for name in dependencies):
+                    continue
+                test_cases_pending.remove(element)
+                progress = True
+                failed = [name for name in dependencies
+                          if not results[name].is_passed]
+                if failed:
+                    case = skip_test_case(options, element[0], element[1],
+                                          failed)
+                    results[case.name] = case
+                else:
+                    future = executor.submit(
+                        run_test_case, options, timeout, *element,
+                        domain_pool=domain_pool,
+                        result_slots=result_slots,
+                        asyncio_engine=asyncio_engine,
+                        server_pool=server_pool)
+                    running[future] = element
+            if not running:
+                if not progress:
+                    raise RuntimeError('Circular dependencies between the '
+                        'Test Cases: '
+                        f'{", ".join(element[1] for element in test_cases_pending)}')
+                # The Test Cases skipped may allow to start others
+                continue
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                results[future.result().name] = future.result()
+
+    # Add the Test Cases in the same order as they are defined in the
+    # Test Suite.
+    for element in test_cases_to_run:
+        suite.add_testcase(
+            results[get_test_case_name(element[0], element[1])])
+
+    if server_pool is not None:
+        server_pool.close()
+    if close_asyncio_engine:
+        asyncio_engine.close()
 
     suite.time = (datetime.now() - now).total_seconds()
+    return suite
+
+def remove_test_suites(xml: junitparser.JUnitXml, suite_name: str):
+    """ Remove the TestSuites called suite_name from the report. """
+    for suite in [suite for suite in xml if suite.name == suite_name]:
+        xml.remove(suite)
+
+def main():
+    parser = Arguments.parser()
+    args = parser.parse_args()
+
+    options = get_options(args)
+
+    name_publisher = get_product_name(options['publisher'])
+    name_subscriber = get_product_name(options['subscriber'])
+
+    if args.output_name is None:
+        now = datetime.now()
+        date_time = now.strftime('%Y%m%d-%H_%M_%S')
+        options['filename_report'] = \
+            f'{name_publisher}-{name_subscriber}-{date_time}.xml'
+        xml = junitparser.JUnitXml()
+
+    else:
+        options['filename_report'] = args.output_name
+        file_exists = exists(options['filename_report'])
+        if file_exists:
+            xml = junitparser.JUnitXml.fromfile(options['filename_report'])
+        else:
+            xml = junitparser.JUnitXml()
+
+    if options['resume'] and args.output_name is None:
+        raise RuntimeError('The option --resume needs --output-name.')
+
+    if options['shard'] is not None:
+        options['shard_test_cases'] = get_shard_test_cases(options)
+
+    # The result of each Test Case is saved in the journal as soon as it
+    # finishes. The journal is deleted once the report is written.
+    journal_filename = f'{options["filename_report"]}.journal'
+    if options['resume']:
+        options['completed_test_cases'] = get_completed_test_cases(
+            xml, journal_filename).get(get_suite_name(options), {})
+    options['journal'] = Journal(journal_filename, keep=options['resume'])
+
+    if args.cache is not None:
+        options['result_cache'] = ResultCache(args.cache)
+        options['result_cache'].evict(args.cache_max_age, args.cache_max_size)
+
+    suite = run_test_suite(options, DEFAULT_TIMEOUT)
+    if options['resume']:
+        # The new TestSuite contains the Test Cases of the previous one
+        remove_test_suites(xml, suite.name)
     xml.add_testsuite(suite)
 
+    if options['timing_history'] is not None:
+        options['timing_history'].save()
+    if options['capabilities'] is not None:
+        options['capabilities'].save()
+
     xml.write(options['filename_report'])
+    options['journal'].remove()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,134 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Names of the reliability metrics of a SequenceAlignment (see get_metrics())
+RELIABILITY_METRICS = ['samples_received', 'samples_lost',
+                       'samples_duplicated', 'samples_reordered',
+                       'samples_not_sent', 'max_reorder_distance',
+                       'longest_gap']
+
+class SequenceAlignment:
+    """
+    Streaming alignment of the samples that a Subscriber receives with the
+    samples that a Publisher sends. The samples sent are numbered in the
+    order the Publisher saves them (see add_sent()), and each sample
+    received is aligned with one of them by its text (see Sample.text and
+    align()), so the samples are compared once, as they arrive, instead of
+    stopping at the first one that differs.
+
+    A sample received is aligned with the first sample sent with the same
+    text that has not been received yet, starting with the sample that
+    matches the first sample received (the ones sent before are not lost,
+    the Subscriber did not exist or had not matched yet). If all the
+    samples sent with its text have been received, it is a duplicate. If
+    its sequence number is lower than the highest one received, it is
+    reordered, and the difference is its reorder distance. If the Publisher
+    has not sent any sample with its text, it is not sent. Once the samples
+    finish, the samples lost are the ones sent between the first and the
+    highest sequence numbers received that were not received.
+    """
+    def __init__(self):
+        # Sequence numbers of the samples sent with each text
+        self.__sequences = {}
+        self.sent = 0
+        self.first = None
+        self.highest = None
+        self.aligned = set()
+        self.received = 0
+        self.duplicated = 0
+        self.reordered = 0
+        self.not_sent = 0
+        self.max_reorder_distance = 0
+
+    def add_sent(self, text: str):
+        """ Add the next sample that the Publisher sends. """
+        self.__sequences.setdefault(text, []).append(self.sent)
+        self.sent += 1
+
+    def is_sent(self, text: str) -> bool:
+        """ Return whether the Publisher has sent a sample with the text. """
+        return text in self.__sequences
+
+    def is_pending(self, text: str) -> bool:
+        """ Return whether a sample sent with the text may still be
+            aligned: it has not been received and it is not before the
+            first sample received.
+        """
+        return self.__find_pending(text) is not None
+
+    def is_exhausted(self) -> bool:
+        """ Return whether no sample has been sent after the highest
+            sample received (or no sample has been received yet).
+        """
+        return self.first is None or self.highest == self.sent - 1
+
+    def __find_pending(self, text: str) -> int:
+        start = 0 if self.first is None else self.first
+        for sequence in self.__sequences.get(text, ()):
+            if sequence >= start and sequence not in self.aligned:
+                return sequence
+        return None
+
+    def align(self, text: str) -> int:
+        """ Align the next sample received and return the sequence number
+            of the sample sent it is aligned with, or None if it is a
+            duplicate or it is not sent.
+        """
+        self.received += 1
+        if not self.is_sent(text):
+            self.not_sent += 1
+            return None
+        sequence = self.__find_pending(text)
+        if sequence is None:
+            self.duplicated += 1
+            return None
+        if self.first is None:
+            self.first = sequence
+            self.highest = sequence
+        elif sequence > self.highest:
+            self.highest = sequence
+        else:
+            self.reordered += 1
+            self.max_reorder_distance = max(self.max_reorder_distance,
+                                            self.highest - sequence)
+        self.aligned.add(sequence)
+        return sequence
+
+    def get_lost(self) -> int:
+        """ Return the number of samples sent between the first and the
+            highest sequence numbers received that were not received.
+        """
+        if self.first is None:
+            return 0
+        return self.highest - self.first + 1 - len(self.aligned)
+
+    def get_longest_gap(self) -> int:
+        """ Return the highest number of consecutive samples lost. """
+        sequences = sorted(self.aligned)
+        return max((following - previous - 1 for previous, following
+                    in zip(sequences, sequences[1:])), default=0)
+
+    def is_complete(self) -> bool:
+        """ Return whether the samples received so far are the samples
+            sent, in the same order and with no gaps or duplicates.
+        """
+        return self.duplicated == 0 and self.reordered == 0 \
+            and self.not_sent == 0 and self.get_lost() == 0
+
+    def get_metrics(self) -> "dict[str, int]":
+        """ Return the value of each one of RELIABILITY_METRICS. """
+        return {
+            'samples_received': self.received,
+            'samples_lost': self.get_lost(),
+            'samples_duplicated': self.duplicated,
+            'samples_reordered': self.reordered,
+            'samples_not_sent': self.not_sent,
+            'max_reorder_distance': self.max_reorder_distance,
+            'longest_gap': self.get_longest_gap(),
+        }
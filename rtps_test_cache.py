@@ -0,0 +1,203 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import junitparser
+
+from rtps_test_utilities import get_file_hash
+
+# Files whose content identifies the version of the harness. The file that
+# defines the check function of each Test Case is added to them.
+HARNESS_FILES = ['interoperability_report.py', 'rtps_test_utilities.py',
+                 'rtps_test_events.py', 'rtps_test_samples.py',
+                 'rtps_test_io.py', 'rtps_test_console.py',
+                 'rtps_test_ring.py', 'rtps_test_checks.py',
+                 'rtps_test_capture.py', 'rtps_test_alignment.py']
+
+# Results older than this number of days are removed from the cache.
+DEFAULT_MAX_AGE_DAYS = 7
+
+# Maximum size (in megabytes) of the cache. The oldest results are removed
+# when the cache is bigger.
+DEFAULT_MAX_SIZE_MB = 100
+
+def get_default_cache_directory() -> str:
+    """ Return the directory where the results are cached by default:
+        dds-rtps in the user's cache directory.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'dds-rtps')
+
+def get_file_identity(filename: str) -> "tuple[str, int, int]":
+    """ Return the real path, the modification time (in nanoseconds) and
+        the size of a file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return os.path.realpath(filename), stat.st_mtime_ns, stat.st_size
+
+def is_cacheable(test_case: junitparser.TestCase) -> bool:
+    """ Return whether the result of a Test Case can be reused: it passed
+        or it needs a feature that a shape_main application does not
+        support. Other failures may be transient, so they run again.
+    """
+    if test_case.is_passed:
+        return True
+    return any(isinstance(result, junitparser.Failure)
+               and 'UNSUPPORTED_FEATURE' in (result.message or '')
+               for result in test_case.result)
+
+class ResultCache:
+    """
+    Results of the Test Cases saved in previous runs, so the Test Cases
+    whose shape_main applications and parameters have not changed do not
+    run again.
+
+    Each result is saved in the directory as the JUnit XML of the TestCase,
+    in a file whose name is the key of the result (see get_key()). The key
+    depends on the content of the shape_main applications and the harness,
+    not on their names, so a new build of one product only invalidates the
+    results of the pairs in which it is used.
+    A ResultCache may be shared by Test Cases running at the same time.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        # SHA-256 of each shape_main application and harness file, by its
+        # path, modification time and size (see get_file_identity())
+        self.__hashes = {}
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __get_hash(self, filename: str, executable: bool = False) -> str:
+        """ Return the SHA-256 of a file, or None if it cannot be read. A
+            file rebuilt at the same path (another modification time or
+            size) is hashed again.
+        """
+        if executable:
+            filename = shutil.which(filename) or filename
+        identity = get_file_identity(filename)
+        if identity is None:
+            return None
+        with self.__lock:
+            if identity not in self.__hashes:
+                self.__hashes[identity] = get_file_hash(filename)
+            return self.__hashes[identity]
+
+    def get_harness_version(self, check_function: "function") -> str:
+        """ Return the SHA-256 of the harness files and the file that
+            defines the check function.
+        """
+        directory = os.path.dirname(os.path.abspath(__file__))
+        filenames = [os.path.join(directory, name) for name in HARNESS_FILES]
+        # The check functions built with check_samples() are defined in
+        # the module that calls it
+        filenames.append(sys.modules[check_function.__module__].__file__)
+        return hashlib.sha256(''.join(
+            str(self.__get_hash(filename)) for filename in filenames)
+            .encode()).hexdigest()
+
+    def get_key(
+            self,
+            name_executable_pub: str,
+            name_executable_sub: str,
+            parameters: "list[str]",
+            expected_codes: list,
+            check_function: "function",
+            startup_delay: float) -> str:
+        """ Return the key of the result of a Test Case, or None if the
+            shape_main applications cannot be read.
+
+            The key is the SHA-256 of: the SHA-256 of the publisher and the
+            subscriber shape_main applications, the shape_main application
+            parameters (with normalized whitespace), the expected codes, the
+            name of the check function, the startup delay and the version
+            of the harness.
+        """
+        publisher_hash = self.__get_hash(name_executable_pub, executable=True)
+        subscriber_hash = self.__get_hash(name_executable_sub, executable=True)
+        if publisher_hash is None or subscriber_hash is None:
+            return None
+        content = json.dumps({
+            'publisher': publisher_hash,
+            'subscriber': subscriber_hash,
+            'apps': [' '.join(element.split()) for element in parameters],
+            'expected_codes': [code.name for code in expected_codes],
+            'check_function': check_function.__name__,
+            'startup_delay': startup_delay,
+            'harness': self.get_harness_version(check_function),
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def __get_filename(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.xml')
+
+    def get(self, key: str) -> "tuple[junitparser.TestCase, float]":
+        """ Return the TestCase saved with the key and the time when it was
+            saved (seconds since the epoch), or (None, None) if there is none.
+        """
+        filename = self.__get_filename(key)
+        try:
+            with open(filename, 'r') as file:
+                test_case = junitparser.TestCase.fromstring(file.read())
+            return test_case, os.path.getmtime(filename)
+        except (OSError, SyntaxError):
+            # The result does not exist, or it was removed or not
+            # completely written
+            return None, None
+
+    def add(self, key: str, test_case: junitparser.TestCase):
+        """ Save the result of a Test Case. The file is written atomically,
+            so other runs never read an incomplete result.
+        """
+        file_descriptor, temporary_filename = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(test_case.tostring().decode())
+        os.replace(temporary_filename, self.__get_filename(key))
+
+    def evict(self, max_age_days: float, max_size_mb: float):
+        """ Remove the results older than max_age_days and, if the cache is
+            bigger than max_size_mb, the oldest results until it is not.
+        """
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.xml'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > max_age_days * 24 * 3600:
+                self.__remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, path in sorted(entries):
+            if size <= max_size_mb * 1024 * 1024:
+                break
+            self.__remove(path)
+            size -= entry_size
+
+    def __remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass # Removed by another run
@@ -0,0 +1,204 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import json
+import os
+import re
+import threading
+
+import pexpect
+
+from rtps_test_utilities import log_message, get_executable_hash
+
+# Options of the shape_main application that take an argument.
+OPTIONS_WITH_ARGUMENT = [
+    '-c', '-d', '-D', '-f', '-k', '-p', '-s', '-x', '-t', '-v', '-z',
+    '--write-period', '--read-period', '--final-instance-state',
+    '--access-scope', '--coherent-sample-count', '--additional-payload-size',
+    '--num-topics', '--lifespan', '--num-instances', '--num-iterations',
+    '--time-filter', '--periodic-announcement', '--datafrag-size', '--cft',
+    '--size-modulo',
+]
+
+# Options that are not probed: the role, and the topic and Domain ID, which
+# are set by the probe itself.
+NOT_PROBED_OPTIONS = ['-P', '-S', '-t', '-d', '-v']
+
+# Regular expression that matches each argument of the shape_main
+# application parameters. Quoted arguments keep their quotes, as they are
+# passed to pexpect.
+ARGUMENT = re.compile(r'(?:"[^"]*"|\'[^\']*\'|\S)+')
+
+# Topic used by the probes. No Test Case uses it, so the probes do not
+# communicate with the shape_main applications of running Test Cases.
+PROBE_TOPIC = 'CapabilityProbe'
+
+def get_role(parameters: str) -> str:
+    """ Return the role ('-P' or '-S') of the shape_main application
+        parameters.
+    """
+    return '-P' if '-P' in ARGUMENT.findall(parameters) else '-S'
+
+def get_probed_options(parameters: str) -> "list[str]":
+    """ Return the options of the shape_main application parameters that
+        are probed, each one with its argument (if any). For example,
+        '-P -t Square -r -D t' returns ['-r', '-D t'].
+    """
+    options = []
+    tokens = ARGUMENT.findall(parameters)
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        option = name
+        if name in OPTIONS_WITH_ARGUMENT and i + 1 < len(tokens):
+            i += 1
+            option += ' ' + tokens[i]
+        if name not in NOT_PROBED_OPTIONS:
+            options.append(option)
+        i += 1
+    return options
+
+def probe_option(
+        name_executable: str,
+        role: str,
+        option: str,
+        timeout: float,
+        working_directory: str = None,
+        verbosity: bool = False) -> bool:
+    """ Run the shape_main application with one option until it creates its
+        DataWriter or DataReader. Return True if the option is supported,
+        False if the application reports that it is not supported and None
+        if it is not known (for example, the application exits or does not
+        create the DataWriter/DataReader within the timeout).
+    """
+    entity = 'writer' if role == '-P' else 'reader'
+    child = pexpect.spawnu(
+        f'{name_executable} {role} -t {PROBE_TOPIC} {option}',
+        cwd=working_directory)
+    try:
+        index = child.expect(
+            [
+                re.compile('not supported', re.IGNORECASE), # index = 0
+                f'Create {entity} for topic', # index = 1
+                pexpect.EOF, # index = 2
+            ],
+            timeout)
+    except pexpect.TIMEOUT:
+        index = None
+    finally:
+        if child.isalive():
+            child.sendintr()
+            try:
+                child.expect(pexpect.EOF, timeout=5)
+            except pexpect.TIMEOUT:
+                child.terminate(force=True)
+        child.close()
+    if index == 0:
+        supported = False
+        result = 'not supported'
+    elif index == 1:
+        supported = True
+        result = 'supported'
+    else:
+        supported = None
+        result = 'unknown'
+    log_message(f'Probe {name_executable} {role} {option}: {result}',
+                verbosity)
+    return supported
+
+class Capabilities:
+    """
+    Options supported by the shape_main applications, obtained by running
+    each application once per option (see probe_option()).
+
+    The results are saved in a JSON file as a dictionary in which the key is
+    the SHA-256 of the shape_main application and the value is a dictionary
+    with the role and option probed (for example '-P -D t') as key and True
+    if it is supported. Using the content of the application as key, the
+    results of a new build are never mixed with the ones of a previous build.
+    Results that are not known are not saved.
+    A Capabilities object may be shared by Test Cases running at the same time.
+    """
+    def __init__(self, filename: str = None):
+        self.filename = filename
+        self.__values = {}
+        # SHA-256 of each shape_main application
+        self.__hashes = {}
+        # Options whose result is not known, they are not probed again
+        self.__unknown = set()
+        # Lock of each (hash, key) being probed
+        self.__probe_locks = {}
+        self.__lock = threading.Lock()
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as file:
+                self.__values = json.load(file)
+
+    def __get_hash(self, name_executable: str) -> str:
+        with self.__lock:
+            if name_executable not in self.__hashes:
+                self.__hashes[name_executable] = \
+                    get_executable_hash(name_executable)
+            return self.__hashes[name_executable]
+
+    def is_supported(
+            self,
+            name_executable: str,
+            role: str,
+            option: str,
+            timeout: float,
+            working_directory: str = None,
+            verbosity: bool = False) -> bool:
+        """ Return whether the shape_main application supports the option
+            (True, False or None if it is not known). The option is probed
+            the first time.
+        """
+        executable_hash = self.__get_hash(name_executable)
+        if executable_hash is None:
+            return None
+        key = f'{role} {option}'
+        with self.__lock:
+            probe_lock = self.__probe_locks.setdefault(
+                (executable_hash, key), threading.Lock())
+        # Test Cases that need the same option wait for a single probe
+        with probe_lock:
+            with self.__lock:
+                if key in self.__values.get(executable_hash, {}):
+                    return self.__values[executable_hash][key]
+                if (executable_hash, key) in self.__unknown:
+                    return None
+            supported = probe_option(name_executable, role, option, timeout,
+                                     working_directory, verbosity)
+            with self.__lock:
+                if supported is None:
+                    self.__unknown.add((executable_hash, key))
+                else:
+                    self.__values.setdefault(executable_hash, {})[key] = supported
+            return supported
+
+    def get_unsupported_options(
+            self,
+            name_executable: str,
+            parameters: str,
+            timeout: float,
+            working_directory: str = None,
+            verbosity: bool = False) -> "list[str]":
+        """ Return the options of the shape_main application parameters that
+            the application does not support.
+        """
+        role = get_role(parameters)
+        return [option for option in get_probed_options(parameters)
+                if self.is_supported(name_executable, role, option, timeout,
+                                     working_directory, verbosity) is False]
+
+    def save(self):
+        """ Write the capabilities to their file (if any). """
+        if self.filename is None:
+            return
+        with self.__lock:
+            with open(self.filename, 'w') as file:
+                json.dump(self.__values, file, indent=1, sort_keys=True)
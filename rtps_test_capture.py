@@ -0,0 +1,280 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import argparse
+import array
+import copy
+import importlib
+import itertools
+import json
+import sys
+import time
+
+from rtps_test_checks import verify_checks
+from rtps_test_ring import SampleRing
+from rtps_test_samples import Sample, SampleReader
+from rtps_test_utilities import ReturnCode
+
+# Columns of a SampleCapture and the type code of their arrays
+COLUMNS = [('x', 'i'), ('y', 'i'), ('size', 'i'), ('color', 'H'),
+           ('timestamp', 'd')]
+
+class SampleCapture:
+    """
+    Samples of a shape_main application saved in columns (arrays of the
+    array module): position (x and y), size, color (index in colors) and the
+    time (monotonic clock) the harness read each one. For a Publisher, last
+    is the index of the last sample saved once it finished (None otherwise).
+
+    The captures are written to and read from binary files (see write() and
+    read()), with the arrays in the byte order of the machine.
+    """
+    def __init__(self):
+        for name, type_code in COLUMNS:
+            setattr(self, name, array.array(type_code))
+        self.colors = []
+        self.__color_index = {}
+        self.last = None
+        self.__texts = None
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def append(self, x: int, y: int, size: int, color: str, timestamp: float):
+        """ Add a sample at the end of the capture. """
+        if color not in self.__color_index:
+            self.__color_index[color] = len(self.colors)
+            self.colors.append(color)
+        self.x.append(x)
+        self.y.append(y)
+        self.size.append(size)
+        self.color.append(self.__color_index[color])
+        self.timestamp.append(timestamp)
+        self.__texts = None
+
+    def get_texts(self) -> "list[str]":
+        """ Return the text of each sample ('x y [size]', see Sample.text). """
+        if self.__texts is None:
+            self.__texts = [f'{x:03d} {y:03d} [{size}]'
+                            for x, y, size in zip(self.x, self.y, self.size)]
+        return self.__texts
+
+    def get_samples(self) -> "Iterator[Sample]":
+        """ Return an iterator over the Samples of the capture (without the
+            topic).
+        """
+        return (Sample('', self.colors[color], x, y, size)
+                for x, y, size, color in zip(self.x, self.y, self.size,
+                                             self.color))
+
+    def write(self, file):
+        """ Write the capture to a binary file: a JSON line with the number
+            of samples, the colors and last, followed by the columns.
+        """
+        file.write((json.dumps({'samples': len(self), 'colors': self.colors,
+                                'last': self.last}) + '\n').encode())
+        for name, _ in COLUMNS:
+            getattr(self, name).tofile(file)
+
+    @classmethod
+    def read(cls, file) -> "SampleCapture":
+        """ Return the capture written by write() at the current position of
+            the binary file, or None if the file finishes.
+        """
+        header = file.readline()
+        if not header:
+            return None
+        header = json.loads(header)
+        capture = cls()
+        for name, _ in COLUMNS:
+            getattr(capture, name).fromfile(file, header['samples'])
+        capture.colors = header['colors']
+        capture.last = header['last']
+        return capture
+
+def capture_ring(ring: SampleRing) -> SampleCapture:
+    """ Return the capture of the samples saved in a SampleRing by a
+        Publisher (the ones that have not been overwritten). The color is
+        not saved in the ring, so it is empty.
+    """
+    capture = SampleCapture()
+    with ring.condition:
+        written, last = ring.get_cursors()
+        first = max(0, written - ring.capacity)
+        for sequence in range(first, written):
+            record = ring.read(sequence)
+            capture.append(record.x, record.y, record.size, '',
+                           record.timestamp)
+    if last >= 0:
+        capture.last = last - first
+    return capture
+
+class SubscriberCapture:
+    """
+    Capture of the samples that a Subscriber shape_main application
+    receives, used instead of its check function in the capture-then-verify
+    mode: check_function() only reads up to max_samples samples and saves
+    them in file, so reading the output of the Subscriber does not wait for
+    the checks. Once the shape_main applications stop, the capture is read
+    with read_capture() and verified (see verify_checks()).
+
+    The Subscriber may run in another process (multiprocessing engine), so
+    the capture is written to file in the process that runs it, as the
+    output of a ConsoleCapture.
+    """
+    def __init__(self, file, max_samples: int):
+        self.file = file
+        self.max_samples = max_samples
+
+    def check_function(self, child_sub, samples_sent, last_sample_saved,
+                       timeout) -> ReturnCode:
+        """ Save the samples that the Subscriber receives. The ReturnCode
+            is replaced by the verdict of the checks on the capture.
+        """
+        capture = SampleCapture()
+        with SampleReader(child_sub, timeout) as samples:
+            for sample in itertools.islice(samples, self.max_samples):
+                capture.append(sample.x, sample.y, sample.size, sample.color,
+                               time.monotonic())
+        print(f'Samples read: {len(capture)}')
+        capture.write(self.file)
+        self.file.flush()
+        return ReturnCode.OK
+
+    def read_capture(self) -> SampleCapture:
+        """ Return the capture written by check_function() and close file,
+            or None if the Subscriber did not receive samples.
+        """
+        self.file.seek(0)
+        capture = SampleCapture.read(self.file)
+        self.file.close()
+        return capture
+
+def can_capture(check_function: "function") -> bool:
+    """ Return whether the samples of a check function can be captured and
+        verified offline: it is built from conditions (see check_samples()).
+    """
+    return hasattr(check_function, 'checks')
+
+def verify_capture(
+        check_function: "function",
+        samples: SampleCapture,
+        publishers: "list[SampleCapture]",
+        metrics: dict = None) -> ReturnCode:
+    """ Return the verdict of the check function on the samples captured
+        from a Subscriber and the captures of the Publishers. If metrics is
+        not None, the metrics of the check function are added to it.
+    """
+    return verify_checks(copy.deepcopy(list(check_function.checks)), samples,
+                         publishers, metrics)
+
+def save_captures(
+        filename: str,
+        test_case_name: str,
+        entities: "list[str]",
+        parameters: "list[str]",
+        captures: "list[SampleCapture]"):
+    """ Save the captures of the shape_main applications of a Test Case in
+        a file, so they can be verified again (see main()): a JSON line
+        with the name of the Test Case (junitparser TestCase) and the
+        entities, followed by the capture of each entity. The captures that
+        are None (the Subscriber did not receive samples) are saved empty.
+    """
+    with open(filename, 'wb') as file:
+        file.write((json.dumps({'test_case': test_case_name,
+                                'entities': entities,
+                                'parameters': parameters,
+                                'captured': [element is not None
+                                             for element in captures]})
+                    + '\n').encode())
+        for element in captures:
+            (element if element is not None else SampleCapture()).write(file)
+
+def read_captures(filename: str) -> "tuple[dict, list[SampleCapture]]":
+    """ Return the header and the captures saved by save_captures(). """
+    with open(filename, 'rb') as file:
+        header = json.loads(file.readline())
+        captures = [SampleCapture.read(file) for _ in header['entities']]
+    return header, [element if captured else None
+                    for element, captured in zip(captures, header['captured'])]
+
+def find_test_case(suite_module, test_case_name: str) -> dict:
+    """ Return the dictionary that defines the Test Case whose junitparser
+        TestCase is test_case_name (<test_suite_name>_<test_case_name>), or
+        None if it is not in the module.
+    """
+    for suite_name, suite in vars(suite_module).items():
+        if not isinstance(suite, dict):
+            continue
+        for name, parameters in suite.items():
+            if f'{suite_name}_{name}' == test_case_name \
+                    and isinstance(parameters, dict):
+                return parameters
+    return None
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Verify again the samples captured by '
+                'interoperability_report.py --capture-dir, without running '
+                'the shape_main applications. The check function of each Test '
+                'Case is taken from the Test Suite.',
+            add_help=True)
+
+        parser.add_argument('captures',
+            nargs='+',
+            type=str,
+            metavar='capture_file',
+            help='Files with the samples captured (<test_case>.capture).')
+        parser.add_argument('-s', '--suite',
+            default='test_suite',
+            type=str,
+            metavar='test_suite_dictionary_file',
+            help='Test Suite that defines the Test Cases, without the .py '
+                'extension. Default: test_suite.')
+        return parser
+
+def main():
+    args = Arguments.parser().parse_args()
+    suite_module = importlib.import_module(args.suite)
+    all_correct = True
+    for filename in args.captures:
+        header, captures = read_captures(filename)
+        test_case = find_test_case(suite_module, header['test_case'])
+        if test_case is None or not can_capture(
+                test_case.get('check_function')):
+            print(f'{header["test_case"]} : the Test Case is not in '
+                  f'{args.suite} or it cannot be verified offline')
+            all_correct = False
+            continue
+        publishers = [element for entity, element
+                      in zip(header['entities'], captures)
+                      if entity.startswith('Publisher')]
+        codes = []
+        for entity, element, expected_code in zip(
+                header['entities'], captures, test_case['expected_codes']):
+            if entity.startswith('Subscriber') and element is not None:
+                metrics = {}
+                codes.append((entity, expected_code, verify_capture(
+                    test_case['check_function'], element, publishers,
+                    metrics), metrics))
+        correct = all(expected == code for _, expected, code, _ in codes)
+        all_correct = all_correct and correct
+        print(f'{header["test_case"]} : {"OK" if correct else "ERROR"}')
+        for entity, expected_code, code, metrics in codes:
+            print(f'    {entity} expected code: {expected_code.name}; '
+                  f'Code found: {code.name}')
+            if metrics:
+                print('    ' + ', '.join(f'{entity}_{name}={value}'
+                                         for name, value in metrics.items()))
+    sys.exit(0 if all_correct else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,646 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import collections
+import copy
+import itertools
+import operator
+import queue
+import sys
+
+from rtps_test_alignment import RELIABILITY_METRICS, SequenceAlignment
+from rtps_test_samples import Sample, SampleAttribution, SampleReader
+from rtps_test_utilities import ReturnCode
+
+# This constant is used to limit the maximum number of samples that tests that
+# check the behavior needs to read. For example, checking that the data
+# is received in order, or that OWNERSHIP works properly, etc...
+MAX_SAMPLES_READ = 500
+
+# Maximum time (in seconds) to wait for the publishers to save a sample that
+# the subscriber has received (see SampleAttribution).
+MAX_ATTRIBUTION_WAIT = 50
+
+# Sources of the samples for ReceivesFromBothAfterSwitch: the size of the
+# samples (each Publisher publishes a different size) or the Publisher that
+# saved them in samples_sent (see SampleAttribution).
+SOURCE_SIZE = 'size'
+SOURCE_PUBLISHER = 'publisher'
+
+# Arguments of the check function that the checks may use
+CheckContext = collections.namedtuple(
+    'CheckContext', ['samples_sent', 'last_sample_saved', 'timeout'])
+
+class StreamCheck:
+    """
+    Condition on the samples that a Subscriber receives. The conditions of a
+    check function are evaluated together by run_checks(), in a single pass
+    over the samples, so each sample is read and parsed once whatever the
+    number of conditions.
+
+    For each sample, check() returns None while the verdict of the condition
+    is not certain, or its ReturnCode as soon as it is: ReturnCode.OK if the
+    condition holds whatever samples follow, or the code that the check
+    function returns otherwise. If the samples finish before, the verdict is
+    the one returned by finish().
+
+    The conditions may also be verified offline, on the samples captured
+    once the shape_main applications stop (see verify() and
+    verify_checks()).
+
+    Besides the verdict, a condition may measure the samples: the names of
+    its metrics are in METRICS and their values are returned by
+    get_metrics() once the samples finish.
+    """
+    METRICS = []
+
+    def start(self, context: CheckContext):
+        """ Prepare the condition for the samples of a Subscriber. """
+        pass
+
+    def check(self, sample: Sample) -> ReturnCode:
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        return ReturnCode.OK
+
+    def get_metrics(self) -> "dict[str, int]":
+        """ Return the value of each one of METRICS. """
+        return {}
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        """ Return the index of the first sample of the capture for which
+            check() returns a verdict and the verdict, or None if there is
+            none. publishers are the captures of the samples sent by each
+            Publisher. By default, the samples are replayed through check();
+            the conditions override it with operations on the columns of
+            the captures.
+        """
+        self.start(get_replay_context(publishers))
+        for index, sample in enumerate(samples.get_samples()):
+            verdict = self.check(sample)
+            if verdict is not None:
+                return index, verdict
+        return None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}()'
+
+class SizeStrictlyIncreasing(StreamCheck):
+    """ The size of each sample is greater than the size of the previous
+        one. Otherwise, the verdict is DATA_NOT_CORRECT.
+    """
+    def start(self, context: CheckContext):
+        self.last_size = 0
+
+    def check(self, sample: Sample) -> ReturnCode:
+        if sample.size <= self.last_size:
+            return ReturnCode.DATA_NOT_CORRECT
+        self.last_size = sample.size
+        return None
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        # Difference with the previous size (0 for the first sample)
+        increasing = list(map(operator.lt,
+                              itertools.chain((0,), samples.size),
+                              samples.size))
+        if all(increasing):
+            return None
+        return increasing.index(False), ReturnCode.DATA_NOT_CORRECT
+
+class SizesWithin(StreamCheck):
+    """ The size of all the samples is between min_size and max_size
+        (inclusive). Otherwise, the verdict is DATA_NOT_CORRECT.
+    """
+    def __init__(self, min_size: int, max_size: int):
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def check(self, sample: Sample) -> ReturnCode:
+        if sample.size < self.min_size or sample.size > self.max_size:
+            return ReturnCode.DATA_NOT_CORRECT
+        return None
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        size = samples.size
+        if not size or (min(size) >= self.min_size
+                        and max(size) <= self.max_size):
+            return None
+        inside = [self.min_size <= element <= self.max_size
+                  for element in size]
+        return inside.index(False), ReturnCode.DATA_NOT_CORRECT
+
+    def __repr__(self) -> str:
+        return f'SizesWithin({self.min_size}, {self.max_size})'
+
+class AllColorsEqual(StreamCheck):
+    """ All the samples have the color of the first one: the verdict is
+        RECEIVING_FROM_ONE, or RECEIVING_FROM_BOTH as soon as a sample has a
+        different color.
+    """
+    def start(self, context: CheckContext):
+        self.first_color = None
+
+    def check(self, sample: Sample) -> ReturnCode:
+        if self.first_color is None:
+            self.first_color = sample.color
+        elif sample.color != self.first_color:
+            return ReturnCode.RECEIVING_FROM_BOTH
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        return ReturnCode.RECEIVING_FROM_ONE
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        # The colors are numbered in the order they are received, so the
+        # first sample with a different color is the first one with color 1
+        if len(samples.colors) < 2:
+            return None
+        return samples.color.index(1), ReturnCode.RECEIVING_FROM_BOTH
+
+class ReceivesSamples(StreamCheck):
+    """ At least count samples are received. Otherwise, the verdict is
+        DATA_NOT_RECEIVED.
+    """
+    def __init__(self, count: int):
+        self.count = count
+
+    def start(self, context: CheckContext):
+        self.samples_read = 0
+
+    def check(self, sample: Sample) -> ReturnCode:
+        self.samples_read += 1
+        if self.samples_read >= self.count:
+            return ReturnCode.OK
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        return ReturnCode.DATA_NOT_RECEIVED if samples_read < self.count \
+            else ReturnCode.OK
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        if len(samples) < self.count:
+            return None
+        return self.count - 1, ReturnCode.OK
+
+    def __repr__(self) -> str:
+        return f'ReceivesSamples({self.count})'
+
+class MatchesPublisherStream(StreamCheck):
+    """
+    The samples received are the samples sent by a Publisher (its
+    samples_sent), starting with the first sample received, in the same
+    order and with no gaps or duplicates. Otherwise, the verdict is
+    DATA_NOT_CORRECT, or DATA_NOT_RECEIVED if no sample is received. The
+    verdict is OK once all the samples that the Publisher saved are received.
+    """
+    def __init__(self, publisher: int = 0):
+        self.publisher = publisher
+
+    def start(self, context: CheckContext):
+        self.samples_sent = context.samples_sent[self.publisher]
+        self.last_sample_saved = context.last_sample_saved[self.publisher]
+        self.timeout = context.timeout
+        self.processed_samples = 0
+
+    def check(self, sample: Sample) -> ReturnCode:
+        try:
+            if self.processed_samples == 0:
+                # Get the sample sent by the DataWriter that matches the
+                # first sample received
+                pub_sample = self.samples_sent.get(block=True,
+                                                   timeout=self.timeout)
+                while pub_sample != sample.text:
+                    pub_sample = self.samples_sent.get(block=True,
+                                                       timeout=self.timeout)
+            elif self.last_sample_saved.empty():
+                # The subscriber may read the samples before the publisher
+                # saves them, wait for them until the publisher finishes
+                # saving samples
+                pub_sample = self.samples_sent.get(block=True,
+                                                   timeout=self.timeout)
+            else:
+                pub_sample = self.samples_sent.get(block=False)
+        except queue.Empty:
+            # at least 2 samples should be received. If the first sample
+            # does not match any sample published, it is not correct.
+            if self.processed_samples <= 1:
+                return ReturnCode.DATA_NOT_CORRECT
+            return ReturnCode.OK
+
+        if pub_sample != sample.text:
+            return ReturnCode.DATA_NOT_CORRECT
+        self.processed_samples += 1
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        return ReturnCode.DATA_NOT_RECEIVED if samples_read == 0 \
+            else ReturnCode.OK
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        if len(samples) == 0:
+            return None
+        publisher = publishers[self.publisher]
+        try:
+            # Sample sent by the DataWriter that matches the first sample
+            # received
+            first = publisher.get_texts().index(samples.get_texts()[0])
+        except ValueError:
+            return 0, ReturnCode.DATA_NOT_CORRECT
+
+        # The rest of the samples received are compared with the samples
+        # sent after the first one, column by column
+        compared = min(len(samples), len(publisher) - first) - 1
+        received = slice(1, 1 + compared)
+        sent = slice(first + 1, first + 1 + compared)
+        if any(getattr(samples, name)[received]
+                != getattr(publisher, name)[sent]
+               for name in ('x', 'y', 'size')):
+            for index, (x, y, size, pub_x, pub_y, pub_size) in enumerate(
+                    zip(samples.x[received], samples.y[received],
+                        samples.size[received], publisher.x[sent],
+                        publisher.y[sent], publisher.size[sent]), start=1):
+                if (x, y, size) != (pub_x, pub_y, pub_size):
+                    return index, ReturnCode.DATA_NOT_CORRECT
+
+        if compared < len(samples) - 1:
+            # The samples sent finish before the samples received: at least
+            # 2 samples should be received
+            processed_samples = compared + 1
+            return processed_samples, ReturnCode.DATA_NOT_CORRECT \
+                if processed_samples <= 1 else ReturnCode.OK
+        return None
+
+    def __repr__(self) -> str:
+        return f'MatchesPublisherStream({self.publisher})'
+
+class AlignsWithPublisherStream(StreamCheck):
+    """
+    Same condition as MatchesPublisherStream, but the samples received are
+    aligned with the samples sent by the Publisher (see SequenceAlignment)
+    until they finish, instead of stopping at the first one that differs, so
+    it also measures how many samples are lost, duplicated or reordered (see
+    RELIABILITY_METRICS). The verdict is OK if the samples received are the
+    samples sent, in the same order and with no gaps or duplicates,
+    DATA_NOT_CORRECT otherwise, or DATA_NOT_RECEIVED if no sample is
+    received.
+
+    The subscriber may read the samples before the publisher saves them, so
+    it waits for them until the publisher finishes saving samples. If a
+    sample received cannot be aligned with the samples saved and no sample
+    has been saved after the ones received, the rest of the samples cannot
+    be aligned either and the verdict is certain (as with
+    MatchesPublisherStream, at least 2 samples should be received).
+    """
+    METRICS = RELIABILITY_METRICS
+
+    def __init__(self, publisher: int = 0):
+        self.publisher = publisher
+
+    def start(self, context: CheckContext):
+        self.samples_sent = context.samples_sent[self.publisher]
+        self.last_sample_saved = context.last_sample_saved[self.publisher]
+        self.timeout = context.timeout
+        self.alignment = SequenceAlignment()
+
+    def __add_sent(self, block: bool) -> bool:
+        """ Add the next sample saved by the publisher to the alignment.
+            Return False if there is none.
+        """
+        try:
+            self.alignment.add_sent(self.samples_sent.get(
+                block=block, timeout=self.timeout if block else None))
+        except queue.Empty:
+            return False
+        return True
+
+    def get_verdict(self) -> ReturnCode:
+        """ Return the verdict on the samples aligned so far. """
+        if len(self.alignment.aligned) <= 1 \
+                or not self.alignment.is_complete():
+            return ReturnCode.DATA_NOT_CORRECT
+        return ReturnCode.OK
+
+    def check(self, sample: Sample) -> ReturnCode:
+        text = sample.text
+        # Wait for the sample only if the publisher has never saved its
+        # text; otherwise, it may be a duplicate, so only the samples
+        # already saved are added
+        while not self.alignment.is_pending(text):
+            block = self.last_sample_saved.empty() \
+                and not self.alignment.is_sent(text)
+            if not self.__add_sent(block):
+                break
+        if not self.alignment.is_pending(text) \
+                and self.alignment.is_exhausted():
+            return self.get_verdict()
+        self.alignment.align(text)
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        if samples_read == 0:
+            return ReturnCode.DATA_NOT_RECEIVED
+        return ReturnCode.OK if self.alignment.is_complete() \
+            else ReturnCode.DATA_NOT_CORRECT
+
+    def get_metrics(self) -> "dict[str, int]":
+        return self.alignment.get_metrics()
+
+    def __repr__(self) -> str:
+        return f'AlignsWithPublisherStream({self.publisher})'
+
+class ReceivesFromBothAfterSwitch(StreamCheck):
+    """
+    The samples come from two sources (see SOURCE_SIZE and SOURCE_PUBLISHER)
+    interleaved: the verdict is RECEIVING_FROM_BOTH as soon as, after the
+    first change of source, a sample of each source is received, or
+    RECEIVING_FROM_ONE otherwise (DATA_NOT_RECEIVED if no sample is received).
+
+    A potential case is that the reader gets data from one writer and then
+    starts receiving from a different writer with a higher ownership, so
+    the samples received before the first change of source are ignored.
+
+    With SOURCE_PUBLISHER, the Subscriber may read a sample before its
+    Publisher saves it, so it waits up to MAX_ATTRIBUTION_WAIT seconds for
+    the Publishers (DATA_NOT_CORRECT if they do not save it), unless the
+    last sample of any Publisher has already been processed
+    (RECEIVING_FROM_ONE).
+    """
+    def __init__(self, source: str = SOURCE_SIZE):
+        if source not in (SOURCE_SIZE, SOURCE_PUBLISHER):
+            raise RuntimeError(f'Unknown source of the samples: {source}')
+        self.source = source
+
+    def start(self, context: CheckContext):
+        self.first_source = None
+        self.sources = set()
+        self.attribution = None
+        if self.source == SOURCE_PUBLISHER:
+            self.attribution = SampleAttribution(context.samples_sent,
+                                                 context.last_sample_saved)
+
+    def check(self, sample: Sample) -> ReturnCode:
+        if self.attribution is None:
+            source = sample.size
+        else:
+            source = self.attribution.attribute(sample.text,
+                                                MAX_ATTRIBUTION_WAIT)
+            if source is None:
+                if self.attribution.publisher_finished():
+                    return ReturnCode.RECEIVING_FROM_ONE
+                print(f'Last samples: {self.attribution.last_samples}')
+                print('Max wait time exceeded')
+                return ReturnCode.DATA_NOT_CORRECT
+            # Keep all samples processed, so we can check whether the last
+            # sample published by any publisher has already been processed
+            self.attribution.add_processed(sample.text)
+
+        if not self.sources:
+            if self.first_source is None:
+                self.first_source = source
+            if source == self.first_source:
+                return None
+        self.sources.add(source)
+        if len(self.sources) > 1:
+            return ReturnCode.RECEIVING_FROM_BOTH
+        return None
+
+    def finish(self, samples_read: int) -> ReturnCode:
+        return ReturnCode.RECEIVING_FROM_ONE if samples_read > 0 \
+            else ReturnCode.DATA_NOT_RECEIVED
+
+    def verify(
+            self,
+            samples: "SampleCapture",
+            publishers: "list[SampleCapture]") -> "tuple[int, ReturnCode]":
+        if self.source == SOURCE_SIZE:
+            sources = samples.size
+        else:
+            # Join the samples received with the samples sent: if several
+            # Publishers sent a sample, the last one is its source (the same
+            # as SampleAttribution)
+            publisher_of = {}
+            for index, publisher in enumerate(publishers):
+                publisher_of.update(dict.fromkeys(publisher.get_texts(), index))
+            texts = samples.get_texts()
+            sources = [publisher_of.get(text) for text in texts]
+        # Only the samples before the first one not sent by any Publisher
+        # are attributed
+        attributed = sources.index(None) if None in sources else len(sources)
+
+        if attributed > 0:
+            switch = find_different(sources, sources[0], 1, attributed)
+            if switch is not None:
+                both = find_different(sources, sources[switch], switch + 1,
+                                      attributed)
+                if both is not None:
+                    return both, ReturnCode.RECEIVING_FROM_BOTH
+
+        if attributed < len(sources):
+            # The sample is not sent by any Publisher. It is not an error if
+            # the last sample of any Publisher has already been received.
+            last_samples = {publisher.get_texts()[publisher.last]
+                            for publisher in publishers
+                            if publisher.last is not None}
+            if not last_samples.isdisjoint(texts[:attributed]):
+                return attributed, ReturnCode.RECEIVING_FROM_ONE
+            return attributed, ReturnCode.DATA_NOT_CORRECT
+        return None
+
+    def __repr__(self) -> str:
+        return f"ReceivesFromBothAfterSwitch('{self.source}')"
+
+def find_different(
+        column: list,
+        value,
+        start: int,
+        stop: int) -> int:
+    """ Return the index of the first element of column[start:stop] that is
+        different from value, or None if there is none.
+    """
+    return next((index for index in range(start, stop)
+                 if column[index] != value), None)
+
+def get_replay_context(publishers: "list[SampleCapture]") -> CheckContext:
+    """ Return the context of the checks that replay a capture (see
+        StreamCheck.verify()): samples_sent and last_sample_saved are queues
+        with the samples captured from each Publisher.
+    """
+    samples_sent = []
+    last_sample_saved = []
+    for publisher in publishers:
+        texts = publisher.get_texts()
+        samples_sent.append(queue.Queue())
+        last_sample_saved.append(queue.Queue())
+        for text in texts:
+            samples_sent[-1].put(text)
+        if publisher.last is not None:
+            last_sample_saved[-1].put(texts[publisher.last])
+    return CheckContext(samples_sent, last_sample_saved, 0)
+
+def add_metrics(checks: "list[StreamCheck]", metrics: dict):
+    """ Add the metrics of the checks to metrics, unless it is None. """
+    if metrics is None:
+        return
+    for check in checks:
+        metrics.update(check.get_metrics())
+
+def run_checks(
+        child_sub,
+        samples_sent: "list[SampleRingReader]",
+        last_sample_saved: "list[LastSampleSaved]",
+        timeout: float,
+        checks: "list[StreamCheck]",
+        max_samples: int = MAX_SAMPLES_READ,
+        metrics: dict = None) -> ReturnCode:
+    """ Evaluate the checks on the samples that the Subscriber receives, in
+        a single pass of up to max_samples samples (see StreamCheck). Return
+        the first verdict of a check that is not OK (in the order of checks
+        if the samples finish before), or OK.
+
+        child_sub <<in>>: child program generated with pexpect
+        samples_sent <<in>>: samples sent by each Publisher
+        last_sample_saved <<in>>: last sample saved by each Publisher
+        timeout <<in>>: time waited for each sample
+        checks <<inout>>: conditions to evaluate, they are started here
+        max_samples <<in>>: maximum number of samples read
+        metrics <<out>>: if it is not None, the metrics of the checks are
+                added to it once the pass finishes (see get_metrics()).
+    """
+    context = CheckContext(samples_sent, last_sample_saved, timeout)
+    for check in checks:
+        check.start(context)
+    verdicts = [None] * len(checks)
+    # Checks whose verdict is not certain yet
+    pending = list(enumerate(checks))
+    return_code = None
+    samples_read = 0
+
+    # Read the samples the subscriber is receiving, starting with the one
+    # already printed
+    with SampleReader(child_sub, timeout) as samples:
+        for sample in itertools.islice(samples, max_samples):
+            samples_read += 1
+            decided = False
+            for index, check in pending:
+                verdict = check.check(sample)
+                if verdict is None:
+                    continue
+                if verdict != ReturnCode.OK:
+                    return_code = verdict
+                    break
+                verdicts[index] = verdict
+                decided = True
+            if return_code is not None:
+                break
+            if decided:
+                pending = [(index, check) for index, check in pending
+                           if verdicts[index] is None]
+                if not pending:
+                    break
+
+    print(f'Samples read: {samples_read}')
+    add_metrics(checks, metrics)
+    if return_code is not None:
+        return return_code
+    for index, check in enumerate(checks):
+        verdict = verdicts[index] if verdicts[index] is not None \
+            else check.finish(samples_read)
+        if verdict != ReturnCode.OK:
+            return verdict
+    return ReturnCode.OK
+
+def verify_checks(
+        checks: "list[StreamCheck]",
+        samples: "SampleCapture",
+        publishers: "list[SampleCapture]",
+        metrics: dict = None) -> ReturnCode:
+    """ Offline version of run_checks(): return the verdict of the checks on
+        the samples captured from a Subscriber, once the shape_main
+        applications have stopped (see StreamCheck.verify()). The verdict is
+        the one run_checks() returns for the same samples, if the Publishers
+        save their samples before the Subscriber receives them.
+
+        checks <<inout>>: conditions to verify
+        samples <<in>>: capture of the samples the Subscriber received
+        publishers <<in>>: captures of the samples each Publisher sent
+        metrics <<out>>: if it is not None, the metrics of the checks are
+                added to it.
+    """
+    decisions = [check.verify(samples, publishers) for check in checks]
+    add_metrics(checks, metrics)
+    # The first sample with a verdict that is not OK finishes the pass
+    failures = [(decision[0], order, decision[1])
+                for order, decision in enumerate(decisions)
+                if decision is not None and decision[1] != ReturnCode.OK]
+    if failures:
+        return min(failures, key=lambda element: element[:2])[2]
+    for check, decision in zip(checks, decisions):
+        verdict = decision[1] if decision is not None \
+            else check.finish(len(samples))
+        if verdict != ReturnCode.OK:
+            return verdict
+    return ReturnCode.OK
+
+def check_samples(
+        name: str,
+        *checks: StreamCheck,
+        max_samples: int = MAX_SAMPLES_READ,
+        doc: str = None) -> "function":
+    """ Return a check function (the 'check_function' of a Test Case) called
+        name, with the documentation doc, that evaluates the checks with
+        run_checks(). Each call evaluates copies of the checks, so the check
+        function may be used by Test Cases that run at the same time.
+
+        The check function belongs to the module that calls check_samples(),
+        so the result cache hashes the file that defines its checks (see
+        ResultCache.get_harness_version()).
+    """
+    def check_function(child_sub, samples_sent, last_sample_saved, timeout,
+                       metrics=None):
+        return run_checks(child_sub, samples_sent, last_sample_saved, timeout,
+                          copy.deepcopy(list(checks)), max_samples, metrics)
+
+    check_function.__name__ = name
+    check_function.__qualname__ = name
+    check_function.__doc__ = doc
+    check_function.__module__ = sys._getframe(1).f_globals['__name__']
+    # The checks are also verified offline (see verify_checks())
+    check_function.checks = checks
+    check_function.max_samples = max_samples
+    # Names of the metrics that the check function adds to its metrics
+    # argument (see get_metric_names())
+    check_function.metrics = [metric for check in checks
+                              for metric in check.METRICS]
+    return check_function
+
+def get_metric_names(check_function: "function") -> "list[str]":
+    """ Return the names of the metrics that a check function measures on
+        the samples (see StreamCheck.get_metrics()). The check functions
+        with metrics accept the keyword argument metrics, a dictionary where
+        their values are added.
+    """
+    return getattr(check_function, 'metrics', [])
@@ -0,0 +1,113 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import collections
+import gzip
+import os
+
+# Number of lines kept at the beginning and at the end of the console
+# output of each shape_main application (--console-lines).
+DEFAULT_CONSOLE_LINES = 100
+
+class ConsoleCapture:
+    """
+    Console output of a shape_main application, used as the logfile of its
+    pexpect child. Only the first and the last max_lines lines are kept in
+    memory; the lines in between are counted (elided_lines). If
+    full_log_filename is set, the whole output is also written to that file
+    compressed with gzip, which is removed if no line was elided.
+
+    The shape_main application may run in another process (multiprocessing
+    engine), so the output kept is written to file by close(), in the
+    process that runs it, and read back with read_output().
+    """
+    def __init__(
+            self,
+            file,
+            max_lines: int = DEFAULT_CONSOLE_LINES,
+            full_log_filename: str = None):
+        self.file = file
+        # None or 0 keeps all the lines
+        self.max_lines = max_lines or None
+        self.full_log_filename = full_log_filename
+        if full_log_filename is not None and os.path.exists(full_log_filename):
+            os.remove(full_log_filename)  # from a previous run
+        self.elided_lines = 0
+        self.__head = []
+        self.__tail = collections.deque(maxlen=self.max_lines)
+        # Output received after the last complete line
+        self.__partial_line = ''
+        # Opened by the first write(), in the process that runs the
+        # shape_main application
+        self.__full_log = None
+        self.closed = False
+
+    def write(self, data: str):
+        if self.full_log_filename is not None:
+            if self.__full_log is None:
+                self.__full_log = gzip.open(self.full_log_filename, 'wt',
+                                            encoding='utf-8')
+            self.__full_log.write(data)
+        lines = (self.__partial_line + data).split('\n')
+        self.__partial_line = lines.pop()
+        for line in lines:
+            if self.max_lines is None or len(self.__head) < self.max_lines:
+                self.__head.append(line)
+            else:
+                if len(self.__tail) == self.max_lines:
+                    self.elided_lines += 1
+                self.__tail.append(line)
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        """ Return the output kept. If some lines were elided, a line with
+            their number (and the file with the whole output, if any)
+            replaces them.
+        """
+        lines = list(self.__head)
+        if self.elided_lines:
+            note = f'[... {self.elided_lines} lines not shown'
+            if self.full_log_filename is not None:
+                note += f', see {self.full_log_filename}'
+            lines.append(note + ' ...]')
+        lines.extend(self.__tail)
+        lines.append(self.__partial_line)
+        return '\n'.join(lines)
+
+    def close(self):
+        """ Write the output kept to file and finish the file with the
+            whole output. It is called once the shape_main application
+            finishes, in the process that runs it.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.file.write(self.getvalue())
+        self.file.flush()
+        if self.__full_log is not None:
+            self.__full_log.close()
+            if not self.elided_lines:
+                os.remove(self.full_log_filename)
+
+    def read_output(self) -> str:
+        """ Return the output written to file by close() and close file. """
+        self.file.seek(0)
+        output = self.file.read()
+        self.file.close()
+        return output
+
+    def get_full_log_filename(self) -> str:
+        """ Return the name of the file with the whole output, or None if
+            there is none (no line was elided).
+        """
+        if self.full_log_filename is not None \
+                and os.path.exists(self.full_log_filename):
+            return self.full_log_filename
+        return None
@@ -0,0 +1,168 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import argparse
+import json
+import signal
+import sys
+import time
+
+from rtps_test_events import OUTPUT_FORMATS, format_event
+
+# Size of the samples when -z 0 is not used (the same as shape_main).
+DEFAULT_SHAPE_SIZE = 20
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Emulator of a shape_main application without DDS. '
+                'It prints the same lines as a shape_main application (topic '
+                'and DataWriter/DataReader creation, matching and samples) '
+                'at a configurable rate, so the harness can be measured '
+                'without a DDS implementation (see benchmark_harness.py). '
+                'The Subscriber prints the samples as if they were received '
+                'from a Publisher that writes them with the same options. '
+                'The options of shape_main that are not listed are ignored.',
+            add_help=True)
+
+        parser.add_argument('-P',
+            action='store_true',
+            help='Publish samples.')
+        parser.add_argument('-S',
+            action='store_true',
+            help='Subscribe samples.')
+        parser.add_argument('-t',
+            default='Square',
+            type=str,
+            metavar='topic_name',
+            help='Topic name. Default: Square.')
+        parser.add_argument('-c',
+            default='BLUE',
+            type=str,
+            metavar='color',
+            help='Color of the samples. Default: BLUE.')
+        parser.add_argument('-z',
+            default=DEFAULT_SHAPE_SIZE,
+            type=int,
+            metavar='size',
+            help='Size of the samples, 0 increases the size for every '
+                f'sample. Default: {DEFAULT_SHAPE_SIZE}.')
+        parser.add_argument('-w',
+            action='store_true',
+            help="Print the Publisher's samples.")
+        parser.add_argument('--write-period',
+            default=33,
+            type=float,
+            metavar='ms',
+            help='Period between samples in ms, 0 prints them as fast as '
+                'possible. Default: 33.')
+        parser.add_argument('--num-iterations',
+            default=0,
+            type=int,
+            metavar='number_of_samples',
+            help='Number of samples, then the application exits. '
+                'Default: 0 (infinite).')
+        parser.add_argument('--output-format',
+            default='text',
+            type=str,
+            choices=OUTPUT_FORMATS,
+            help='Output format: text or one JSON object per event (jsonl). '
+                'Default: text.')
+        return parser
+
+def get_emulated_sample(
+        topic: str,
+        color: str,
+        size: int,
+        number: int) -> dict:
+    """ Return the event of the sample number (from 1) that the emulator
+        prints. The position depends only on number, and the size is number
+        if size is 0.
+    """
+    return {'event': 'sample', 'topic': topic, 'color': color,
+            'x': 5 * number % 240, 'y': 3 * number % 270,
+            'size': size if size != 0 else number}
+
+class Emulator:
+    """
+    Print the events of a shape_main application with the output format
+    (see OUTPUT_FORMATS) until the application is interrupted (SIGINT).
+    """
+    def __init__(self, output_format: str):
+        self.jsonl = output_format == 'jsonl'
+        self.interrupted = False
+        signal.signal(signal.SIGINT, self.__interrupt)
+        # A shape_main application prints each line when it is complete
+        sys.stdout.reconfigure(line_buffering=True)
+
+    def __interrupt(self, signum, frame):
+        self.interrupted = True
+
+    def print_event(self, event: dict):
+        if self.jsonl:
+            print(json.dumps({'event': event['event'],
+                              'time': round(time.monotonic(), 6),
+                              **{key: value for key, value in event.items()
+                                 if key != 'event'}}))
+        else:
+            print(format_event(event))
+
+    def wait(self, end_time: float = None) -> bool:
+        """ Wait until end_time (or forever if it is None). Return False if
+            the application is interrupted before.
+        """
+        while not self.interrupted:
+            remaining = 0.1 if end_time is None \
+                else min(0.1, end_time - time.monotonic())
+            if remaining <= 0:
+                return True
+            time.sleep(remaining)
+        return False
+
+def main():
+    args, _ = Arguments.parser().parse_known_args()
+    if args.P == args.S:
+        print('please specify publish [-P] or subscribe [-S]')
+        sys.exit(1)
+
+    emulator = Emulator(args.output_format)
+    emulator.print_event({'event': 'topic_created', 'topic': args.t})
+    listener = {'topic': args.t, 'type': 'ShapeType', 'current_count': 1,
+                'current_count_change': 1}
+    if args.P:
+        emulator.print_event({'event': 'writer_created', 'topic': args.t,
+                              'color': args.c})
+        emulator.print_event({'event': 'on_publication_matched', **listener})
+    else:
+        emulator.print_event({'event': 'reader_created', 'topic': args.t})
+        emulator.print_event({'event': 'on_subscription_matched', **listener})
+
+    # The samples follow a fixed schedule, so the emulator catches up if
+    # printing them is blocked for a while.
+    print_samples = args.S or args.w
+    period = args.write_period / 1000
+    start_time = time.monotonic()
+    number = 0
+    while not emulator.interrupted:
+        number += 1
+        if print_samples:
+            emulator.print_event(
+                get_emulated_sample(args.t, args.c, args.z, number))
+        if number == args.num_iterations:
+            break
+        if period > 0 and not emulator.wait(start_time + number * period):
+            break
+
+    if not emulator.interrupted and not args.num_iterations:
+        emulator.wait()
+    emulator.print_event({'event': 'done'})
+
+if __name__ == '__main__':
+    main()
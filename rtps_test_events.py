@@ -0,0 +1,310 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import json
+import threading
+import time
+
+import pexpect
+import pexpect.expect
+
+from rtps_test_utilities import log_message
+
+# Output formats of the shape_main applications (--output-format).
+OUTPUT_FORMATS = ['text', 'jsonl']
+
+# Option of the shape_main application that selects the JSONL output format.
+JSONL_OPTION = '--output-format jsonl'
+
+# Line that the shape_main application prints for each event with the text
+# output format. The fields of the event are replaced (see format_event()).
+LISTENER_TEXT = "{event}() topic: '{topic}'  type: '{type}'"
+EVENT_TEXT = {
+    'topic_created': 'Create topic: {topic}',
+    'writer_created': 'Create writer for topic: {topic} color: {color}',
+    'reader_created': 'Create reader for topic: {topic}',
+    'on_inconsistent_topic': LISTENER_TEXT,
+    'on_offered_incompatible_qos':
+        LISTENER_TEXT + ' : {policy_id} ({policy})',
+    'on_requested_incompatible_qos':
+        LISTENER_TEXT + ' : {policy_id} ({policy})',
+    'on_publication_matched': LISTENER_TEXT
+        + ' : matched readers {current_count} (change = {current_count_change})',
+    'on_subscription_matched': LISTENER_TEXT
+        + ' : matched writers {current_count} (change = {current_count_change})',
+    'on_offered_deadline_missed':
+        LISTENER_TEXT + ' : (total = {total_count}, change = {total_count_change})',
+    'on_requested_deadline_missed':
+        LISTENER_TEXT + ' : (total = {total_count}, change = {total_count_change})',
+    'on_liveliness_lost':
+        LISTENER_TEXT + ' : (total = {total_count}, change = {total_count_change})',
+    'on_liveliness_changed':
+        LISTENER_TEXT + ' : (alive = {alive_count}, not_alive = {not_alive_count})',
+    'sample': '{topic:<10} {color:<10} {x:03d} {y:03d} [{size}]',
+    'instance_state': '{topic:<10} {color:<10} {state}',
+    'reading_coherent_sets': 'Reading coherent sets, iteration {iteration}',
+    'reading_ordered_access': 'Reading with ordered access, iteration {iteration}',
+    'coherent_set_started': 'Started Coherent Set',
+    'coherent_set_finished': 'Finished Coherent Set',
+    'log': '{message}',
+    'done': 'Done.',
+    # Lines that are not JSON objects, for example the ones printed by the
+    # DDS implementation
+    'output': '{message}',
+}
+
+def parse_event(line: str) -> dict:
+    """ Return the event of a line printed with the JSONL output format.
+        Lines that are not events are returned as an 'output' event whose
+        message is the line.
+    """
+    try:
+        event = json.loads(line)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict) or 'event' not in event:
+        event = {'event': 'output', 'message': line}
+    return event
+
+def format_event(event: dict) -> str:
+    """ Return the line that the shape_main application prints for the
+        event with the text output format. For example, the event
+        {"event": "sample", "topic": "Square", "color": "BLUE", "x": 191,
+        "y": 152, "size": 30} returns 'Square     BLUE       191 152 [30]'.
+        Unknown events return their JSON object.
+    """
+    try:
+        text = EVENT_TEXT[event['event']].format(**event)
+    except (KeyError, ValueError, IndexError):
+        return json.dumps(event)
+    if event['event'] == 'sample' and 'additional_payload' in event:
+        text += f' {{{event["additional_payload"]}}}'
+    return text
+
+# Whether each shape_main application supports the JSONL output format
+_jsonl_support = {}
+_jsonl_support_lock = threading.Lock()
+
+def supports_jsonl(
+        name_executable: str,
+        working_directory: str = None,
+        verbosity: bool = False) -> bool:
+    """ Return whether the shape_main application supports the JSONL
+        output format, that is, whether its help (-h) shows the option
+        --output-format. The result is saved for the next calls.
+    """
+    with _jsonl_support_lock:
+        if name_executable in _jsonl_support:
+            return _jsonl_support[name_executable]
+        try:
+            output = pexpect.run(f'{name_executable} -h', timeout=10,
+                                 cwd=working_directory, encoding='utf-8')
+        except pexpect.ExceptionPexpect:
+            output = ''
+        supported = '--output-format' in output
+        if not supported:
+            log_message(f'{name_executable} does not support the JSONL output '
+                        'format, using the text output format', verbosity)
+        _jsonl_support[name_executable] = supported
+        return supported
+
+class ShapeMainEvents:
+    """
+    Output of a shape_main application that uses the JSONL output format
+    (--output-format jsonl), read as events.
+
+    The output is parsed one line (event) at a time, so each expect() only
+    searches the events that have not been searched yet, instead of the
+    whole output received since the previous match (as pexpect does). The
+    patterns are searched in the text of each event (see format_event()),
+    so the expect(), before and after of a ShapeMainEvents work the same way
+    as the ones of the pexpect child with the text output format, and the
+    check functions can use both. The event matched is saved in event, so
+    its fields and time are available without searching its text again.
+    """
+    def __init__(self, child: pexpect.spawn):
+        self.child = child
+        self.before = ''
+        self.after = ''
+        self.match = None
+        self.match_index = None
+        # Event of the last match, None if the last expect() did not match
+        # an event (pexpect.TIMEOUT or pexpect.EOF)
+        self.event = None
+        # Output received after the last complete line
+        self.__partial_line = ''
+        # (text, event) of the lines not matched by the previous expect()
+        # and of the lines received since then. The text of the last event
+        # matched remains, as pexpect keeps the output after the match.
+        self.__lines = []
+        # Number of elements of __lines searched by the current expect()
+        self.__searched = 0
+
+    @property
+    def child_fd(self) -> int:
+        return self.child.child_fd
+
+    @property
+    def maxread(self) -> int:
+        return self.child.maxread
+
+    def read_nonblocking(self, size: int = 1, timeout: float = -1) -> str:
+        return self.child.read_nonblocking(size, timeout)
+
+    def feed(self, data: str):
+        """ Add the output of the shape_main application. """
+        lines = (self.__partial_line + data).split('\n')
+        self.__partial_line = lines.pop()
+        for line in lines:
+            event = parse_event(line.rstrip('\r'))
+            self.__lines.append((format_event(event) + '\r\n', event))
+
+    def flush(self):
+        """ Add the last line of the output even if it is not complete. It
+            is called when the output finishes (pexpect.EOF).
+        """
+        if self.__partial_line:
+            self.feed('\n')
+
+    def search(self, searcher: pexpect.expect.searcher_re) -> int:
+        """ Search the patterns in the events not searched yet and return the
+            index of the pattern matched, or None if there is no match.
+        """
+        while self.__searched < len(self.__lines):
+            text, event = self.__lines[self.__searched]
+            self.__searched += 1
+            index = searcher.search(text, len(text))
+            if index >= 0:
+                self.before = ''.join(element[0] for element
+                                      in self.__lines[:self.__searched - 1]) \
+                    + text[:searcher.start]
+                self.after = text[searcher.start:searcher.end]
+                self.match = searcher.match
+                self.match_index = index
+                self.event = event
+                # The output after the match is searched by the next expect()
+                remaining = text[searcher.end:]
+                self.__lines = ([(remaining, event)] if remaining else []) \
+                    + self.__lines[self.__searched:]
+                self.__searched = 0
+                return index
+        return None
+
+    def expecter(self, patterns: list) -> "EventExpecter":
+        """ Return the EventExpecter of the patterns. """
+        return EventExpecter(self, pexpect.expect.searcher_re(
+            self.child.compile_pattern_list(patterns)))
+
+    def restart(self):
+        """ Search again all the lines that have not been matched. It is
+            called when an expect() starts.
+        """
+        self.__searched = 0
+
+    def unmatched(self, result, index: int) -> int:
+        """ Finish an expect() that did not match an event (result is
+            pexpect.TIMEOUT or pexpect.EOF) and return index.
+        """
+        self.before = ''.join(element[0] for element in self.__lines)
+        self.after = result
+        self.match = result
+        self.match_index = index
+        self.event = None
+        return index
+
+    def next_event(self, timeout: float = -1) -> dict:
+        """ Return the next event after the last match, waiting up to timeout
+            seconds, and save it as the last match (event). Return None if
+            no event is received (pexpect.TIMEOUT or pexpect.EOF).
+        """
+        if timeout == -1:
+            timeout = self.child.timeout
+        end_time = None if timeout is None else time.monotonic() + timeout
+        eof = False
+        while True:
+            while self.__lines:
+                text, event = self.__lines.pop(0)
+                if event is self.event:
+                    continue  # rest of the line of the last match
+                self.before = ''
+                self.after = text
+                self.match = None
+                self.match_index = None
+                self.event = event
+                self.__searched = 0
+                return event
+            if eof:
+                return None
+            remaining = None if end_time is None \
+                else max(0, end_time - time.monotonic())
+            try:
+                self.feed(self.read_nonblocking(self.maxread, remaining))
+            except pexpect.TIMEOUT:
+                return None
+            except pexpect.EOF:
+                self.flush()
+                eof = True
+
+    def expect(self, patterns: list, timeout: float = -1) -> int:
+        """ Same as pexpect.spawn.expect(patterns, timeout). """
+        if timeout == -1:
+            timeout = self.child.timeout
+        expecter = self.expecter(patterns)
+        index = expecter.existing_data()
+        if index is not None:
+            return index
+        end_time = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if end_time is None \
+                else max(0, end_time - time.monotonic())
+            try:
+                data = self.read_nonblocking(self.maxread, remaining)
+            except pexpect.TIMEOUT:
+                return expecter.timeout()
+            except pexpect.EOF as e:
+                return expecter.eof(e)
+            index = expecter.new_data(data)
+            if index is not None:
+                return index
+
+class EventExpecter:
+    """
+    Same as pexpect.expect.Expecter, for a ShapeMainEvents (so the
+    expect_async() of the harness can use both).
+    """
+    def __init__(
+            self,
+            events: ShapeMainEvents,
+            searcher: pexpect.expect.searcher_re):
+        self.events = events
+        self.searcher = searcher
+
+    def existing_data(self) -> int:
+        self.events.restart()
+        return self.events.search(self.searcher)
+
+    def new_data(self, data: str) -> int:
+        self.events.feed(data)
+        return self.events.search(self.searcher)
+
+    def timeout(self, err=None) -> int:
+        if self.searcher.timeout_index < 0:
+            raise pexpect.TIMEOUT(str(err) if err is not None
+                                  else 'Timeout exceeded.')
+        return self.events.unmatched(pexpect.TIMEOUT,
+                                     self.searcher.timeout_index)
+
+    def eof(self, err=None) -> int:
+        self.events.flush()
+        index = self.events.search(self.searcher)
+        if index is not None:
+            return index
+        if self.searcher.eof_index < 0:
+            raise pexpect.EOF(str(err) if err is not None
+                              else 'End Of File (EOF).')
+        return self.events.unmatched(pexpect.EOF, self.searcher.eof_index)
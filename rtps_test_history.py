@@ -0,0 +1,77 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import json
+import math
+import os
+import threading
+
+# Maximum number of values saved for each key. Only the most recent values
+# are kept, so the history adapts to new releases of the products.
+MAX_VALUES_PER_KEY = 50
+
+# Minimum number of values needed to calculate a timeout from the history.
+MIN_HISTORY_VALUES = 3
+
+class TimingHistory:
+    """
+    Durations measured in previous runs of the interoperability_report.
+
+    The durations are saved in a JSON file as a dictionary in which each key
+    identifies what was measured (for example 'teardown/<product>') and the
+    value is the list of the most recent durations in seconds.
+    A TimingHistory may be shared by Test Cases running at the same time.
+    """
+    def __init__(self, filename: str = None):
+        self.filename = filename
+        self.__values = {}
+        self.__lock = threading.Lock()
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as file:
+                self.__values = json.load(file)
+
+    def add(self, key: str, value: float):
+        """ Save a new duration for the key. """
+        with self.__lock:
+            values = self.__values.setdefault(key, [])
+            values.append(round(value, 3))
+            del values[:-MAX_VALUES_PER_KEY]
+
+    def get(self, key: str) -> "list[float]":
+        """ Return a copy of the durations saved for the key. """
+        with self.__lock:
+            return list(self.__values.get(key, []))
+
+    def save(self):
+        """ Write the history to its file (if any). """
+        if self.filename is None:
+            return
+        with self.__lock:
+            with open(self.filename, 'w') as file:
+                json.dump(self.__values, file, indent=1, sort_keys=True)
+
+def percentile(values: "list[float]", percent: float) -> float:
+    """ Return the percentile of the values (nearest-rank method). """
+    sorted_values = sorted(values)
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+def adaptive_timeout(
+        values: "list[float]",
+        minimum: float,
+        maximum: float,
+        margin: float) -> float:
+    """
+    Return a timeout calculated from the durations measured in previous
+    runs: twice the 95th percentile of the durations plus a margin, limited
+    to the range [minimum, maximum]. If there are less than
+    MIN_HISTORY_VALUES durations, it returns maximum.
+    """
+    if len(values) < MIN_HISTORY_VALUES:
+        return maximum
+    return min(maximum, max(minimum, 2 * percentile(values, 95) + margin))
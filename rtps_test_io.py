@@ -0,0 +1,187 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import fcntl
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import pexpect
+import pexpect.spawnbase
+from pexpect.utils import poll_ignore_interrupts, split_command_line, which
+
+# I/O backends that connect the harness with the shape_main applications
+# (--io-backend): a pseudo-terminal (pexpect.spawn) or pipes (PipeSpawn).
+IO_BACKENDS = ['pty', 'pipe']
+
+# Size requested for the pipes of the pipe backend (the default size of a
+# pipe in Linux is 64 KiB). If it is not allowed (see
+# /proc/sys/fs/pipe-max-size), the default size is used.
+PIPE_SIZE = 1 << 20
+
+# Maximum number of bytes the pipe backend reads (and decodes) at once.
+PIPE_MAXREAD = 1 << 16
+
+# fcntl.F_SETPIPE_SZ is only available in Linux (Python >= 3.10)
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ',
+                       1031 if sys.platform.startswith('linux') else None)
+
+def set_pipe_size(fd: int, size: int = PIPE_SIZE) -> bool:
+    """ Set the size of the pipe fd. Return False if it is not possible. """
+    if F_SETPIPE_SZ is None:
+        return False
+    try:
+        fcntl.fcntl(fd, F_SETPIPE_SZ, size)
+    except OSError:
+        return False
+    return True
+
+class PipeSpawn(pexpect.spawnbase.SpawnBase):
+    """
+    Same as pexpect.spawnu() (with the methods the harness uses: expect(),
+    read_nonblocking(), sendline(), sendintr(), isalive(), terminate()...),
+    but the standard input and output of the application are pipes instead
+    of a pseudo-terminal.
+
+    The pipes are bigger than the buffer of a pseudo-terminal (see
+    PIPE_SIZE), so the application does not block writing its output while
+    the harness is busy, and the output is read and decoded in bigger chunks
+    (see PIPE_MAXREAD). The standard error goes to the same pipe as the
+    standard output, as it does in the pseudo-terminal. Since the output is
+    not a terminal, the application is run with stdbuf (if it is available)
+    so the C standard library prints each line as soon as it is complete.
+    As with the pseudo-terminal, the application runs in its own session,
+    so other processes can signal its process group (see RemoteProcess).
+    """
+    def __init__(
+            self,
+            command: str,
+            cwd: str = None,
+            timeout: float = 30,
+            maxread: int = PIPE_MAXREAD,
+            logfile=None,
+            encoding: str = 'utf-8'):
+        super().__init__(timeout=timeout, maxread=maxread, logfile=logfile,
+                         encoding=encoding, codec_errors='strict')
+        args = split_command_line(command)
+        # The same error as pexpect.spawn, as stdbuf would only print it
+        if which(args[0]) is None:
+            raise pexpect.ExceptionPexpect(
+                f'The command was not found or was not executable: '
+                f'{args[0]}.')
+        stdbuf = shutil.which('stdbuf')
+        if stdbuf is not None:
+            args = [stdbuf, '-oL', '-eL'] + args
+        try:
+            self.proc = subprocess.Popen(
+                args, cwd=cwd, bufsize=0, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                start_new_session=True)
+        except OSError as e:
+            raise pexpect.ExceptionPexpect(
+                f'The command was not found or was not executable: '
+                f'{args[0]}.') from e
+        self.command = command
+        self.name = f'<pipe {command}>'
+        self.pid = self.proc.pid
+        self.child_fd = self.proc.stdout.fileno()
+        self.stdin_fd = self.proc.stdin.fileno()
+        set_pipe_size(self.child_fd)
+        self.exitstatus = None
+        self.signalstatus = None
+        self.status = None
+        self.closed = False
+
+    def read_nonblocking(self, size: int = 1, timeout: float = -1) -> str:
+        """ Read at most size characters from the application, waiting up
+            to timeout seconds (the same as pexpect.spawn).
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        if not poll_ignore_interrupts([self.child_fd], timeout):
+            raise pexpect.TIMEOUT('Timeout exceeded.')
+        return super().read_nonblocking(size)
+
+    def send(self, s: str) -> int:
+        s = self._coerce_send_string(s)
+        self._log(s, 'send')
+        return os.write(self.stdin_fd, self._encoder.encode(s, final=False))
+
+    def sendline(self, s: str = '') -> int:
+        return self.send(s + '\n')
+
+    def sendintr(self):
+        """ Send SIGINT, as Ctrl+C does in a terminal. """
+        self.kill(signal.SIGINT)
+
+    def sendeof(self):
+        self.proc.stdin.close()
+
+    def kill(self, sig: int):
+        if self.isalive():
+            self.proc.send_signal(sig)
+
+    def isalive(self) -> bool:
+        if self.flag_eof:
+            # The application closed its output, it is exiting
+            try:
+                self.proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        if self.proc.poll() is None:
+            return True
+        self.status = self.proc.returncode
+        if self.status < 0:
+            self.signalstatus = -self.status
+        else:
+            self.exitstatus = self.status
+        return False
+
+    def wait(self) -> int:
+        self.proc.wait()
+        self.isalive()
+        return self.status
+
+    def terminate(self, force: bool = False) -> bool:
+        """ Stop the application with SIGTERM or, if force is True and it
+            does not exit, with SIGKILL. It returns True if the application
+            is stopped (the same as pexpect.spawn).
+        """
+        if not self.isalive():
+            return True
+        self.kill(signal.SIGTERM)
+        time.sleep(0.1)
+        if self.isalive() and force:
+            self.kill(signal.SIGKILL)
+            time.sleep(0.1)
+        return not self.isalive()
+
+    def close(self, force: bool = True):
+        if self.closed:
+            return
+        self.flush()
+        self.terminate(force)
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.closed = True
+
+def spawn(
+        command: str,
+        io_backend: str = 'pty',
+        cwd: str = None,
+        echo: bool = True) -> "pexpect.spawn | PipeSpawn":
+    """ Run the command with the I/O backend (see IO_BACKENDS) and return
+        the object that communicates with it. echo is only used by the
+        'pty' backend: the pipes never echo what is sent.
+    """
+    if io_backend == 'pipe':
+        return PipeSpawn(command, cwd=cwd)
+    return pexpect.spawnu(command, cwd=cwd, echo=echo)
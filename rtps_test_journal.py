@@ -0,0 +1,90 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import json
+import os
+import threading
+
+import junitparser
+
+class Journal:
+    """
+    File where the result of each Test Case is saved as soon as it finishes.
+
+    Each line of the file is a JSON object with the name of the TestSuite
+    ('suite') and the JUnit XML of the TestCase ('case'). If a run is
+    interrupted before the report is written, the journal keeps the results
+    of the Test Cases that finished, so the run can be resumed.
+    A Journal may be shared by Test Cases running at the same time.
+    """
+    def __init__(self, filename: str, keep: bool = False):
+        """ Open the journal. If keep is False, the Test Cases saved by
+            a previous run are removed.
+        """
+        self.filename = filename
+        self.__lock = threading.Lock()
+        self.__file = open(filename, 'a' if keep else 'w')
+
+    def add(self, suite_name: str, test_case: junitparser.TestCase):
+        """ Save the result of a Test Case and flush it to disk. """
+        line = json.dumps({'suite': suite_name,
+                           'case': test_case.tostring().decode()})
+        with self.__lock:
+            self.__file.write(line + '\n')
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+
+    def remove(self):
+        """ Close and delete the journal. It is called once the report
+            has been written.
+        """
+        with self.__lock:
+            self.__file.close()
+            os.remove(self.filename)
+
+def read_journal(filename: str) -> "dict[str, dict[str, junitparser.TestCase]]":
+    """ Return the Test Cases saved in the journal as
+        {suite_name: {test_case_name: TestCase}}. If a Test Case was saved
+        several times, the last one is returned. A line that was not
+        completely written (because the run was interrupted) is ignored.
+    """
+    test_cases = {}
+    if not os.path.exists(filename):
+        return test_cases
+    with open(filename, 'r') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            test_case = junitparser.TestCase.fromstring(entry['case'])
+            test_cases.setdefault(entry['suite'], {})[test_case.name] = test_case
+    return test_cases
+
+def get_completed_test_cases(
+        xml: junitparser.JUnitXml,
+        journal_filename: str) -> "dict[str, dict[str, junitparser.TestCase]]":
+    """ Return the Test Cases that do not need to run again when a run is
+        resumed, as {suite_name: {test_case_name: TestCase}}: the ones in the
+        report and in the journal that passed. The results in the journal are
+        newer than the ones in the report. Skipped Test Cases run again, as
+        the Test Cases they depend on may pass this time.
+    """
+    completed = {}
+    all_test_cases = {}
+    for suite in xml:
+        for test_case in suite:
+            all_test_cases.setdefault(suite.name, {})[test_case.name] = test_case
+    for suite_name, test_cases in read_journal(journal_filename).items():
+        all_test_cases.setdefault(suite_name, {}).update(test_cases)
+
+    for suite_name, test_cases in all_test_cases.items():
+        for name, test_case in test_cases.items():
+            if test_case.is_passed:
+                completed.setdefault(suite_name, {})[name] = test_case
+    return completed
@@ -0,0 +1,170 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import collections
+import multiprocessing
+import queue
+import struct
+import time
+
+# Header of a SampleRing: number of records written and sequence number of
+# the last sample saved (-1 until the Publisher finishes saving samples).
+HEADER = struct.Struct('=qq')
+# Record of a sample: sequence number, x, y, size and time (monotonic clock)
+# the harness read it from the output of the Publisher.
+RECORD = struct.Struct('=qiiid')
+
+class SampleRecord(collections.namedtuple(
+        'SampleRecord', ['sequence', 'x', 'y', 'size', 'timestamp'])):
+    """ Sample saved in a SampleRing. """
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        """ Position and size of the sample ('x y [size]'), the same as
+            Sample.text.
+        """
+        return f'{self.x:03d} {self.y:03d} [{self.size}]'
+
+class SampleRing:
+    """
+    Ring buffer in shared memory with the samples that a Publisher sends,
+    saved as fixed-width records (see RECORD). It has one writer, the
+    process or coroutine that reads the output of the Publisher, and any
+    number of readers (see SampleRingReader), each one with its own cursor,
+    so the same ring is shared by all the Subscribers.
+
+    The ring also has the cursor of the last sample saved, which is set by
+    finish() once the Publisher does not save more samples (see
+    LastSampleSaved).
+
+    The records are written and read with the lock of condition, which is
+    also used to wait for new records: a multiprocessing.Condition if the
+    readers run in other processes, or a threading.Condition otherwise.
+    """
+    def __init__(self, capacity: int, condition=None):
+        self.capacity = capacity
+        self.condition = condition if condition is not None \
+            else multiprocessing.Condition()
+        self.buffer = multiprocessing.RawArray(
+            'B', HEADER.size + capacity * RECORD.size)
+        HEADER.pack_into(self.buffer, 0, 0, -1)
+
+    def __offset(self, sequence: int) -> int:
+        return HEADER.size + (sequence % self.capacity) * RECORD.size
+
+    def get_cursors(self) -> "tuple[int, int]":
+        """ Return the number of records written and the sequence number of
+            the last sample saved (-1 if the Publisher has not finished).
+            It must be called with the lock of condition.
+        """
+        return HEADER.unpack_from(self.buffer, 0)
+
+    def read(self, sequence: int) -> SampleRecord:
+        """ Return the record with the sequence number. It must be called
+            with the lock of condition.
+        """
+        return SampleRecord._make(
+            RECORD.unpack_from(self.buffer, self.__offset(sequence)))
+
+    def put(self, sample: "Sample", timestamp: float = None):
+        """ Save a sample (see Sample) and wake up the readers. """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.condition:
+            written, last = self.get_cursors()
+            RECORD.pack_into(self.buffer, self.__offset(written), written,
+                             sample.x, sample.y, sample.size, timestamp)
+            HEADER.pack_into(self.buffer, 0, written + 1, last)
+            self.condition.notify_all()
+
+    def finish(self):
+        """ Set the last sample saved to the last record written. """
+        with self.condition:
+            written, _ = self.get_cursors()
+            HEADER.pack_into(self.buffer, 0, written, written - 1)
+            self.condition.notify_all()
+
+class SampleRingReader:
+    """
+    Reader of a SampleRing with its own cursor. It has the same interface
+    as a queue.Queue of the texts of the samples (get() and empty()), which
+    is how the check functions read the samples_sent of each Publisher.
+
+    If the writer overwrites records that the reader has not read yet, the
+    reader skips them and continues with the oldest record available.
+    """
+    def __init__(self, ring: SampleRing):
+        self.ring = ring
+        self.cursor = 0
+
+    def get_record(self, block: bool = True, timeout: float = None) -> SampleRecord:
+        """ Return the next record, waiting up to timeout seconds (forever
+            if it is None) if block is True. Raise queue.Empty if there is
+            none.
+        """
+        ring = self.ring
+        with ring.condition:
+            if block and not ring.condition.wait_for(
+                    lambda: ring.get_cursors()[0] > self.cursor, timeout):
+                raise queue.Empty
+            written, _ = ring.get_cursors()
+            if written <= self.cursor:
+                raise queue.Empty
+            self.cursor = max(self.cursor, written - ring.capacity)
+            record = ring.read(self.cursor)
+        self.cursor += 1
+        return record
+
+    def get(self, block: bool = True, timeout: float = None) -> str:
+        """ Same as get_record(), but it returns the text of the sample
+            ('x y [size]').
+        """
+        return self.get_record(block, timeout).text
+
+    def empty(self) -> bool:
+        with self.ring.condition:
+            return self.ring.get_cursors()[0] <= self.cursor
+
+class LastSampleSaved:
+    """
+    Last sample saved in a SampleRing, with the same interface as a
+    queue.Queue where the Publisher puts the text of its last sample once it
+    finishes saving samples (get() and empty()): it returns the sample once.
+    """
+    def __init__(self, ring: SampleRing):
+        self.ring = ring
+        self.returned = False
+
+    def __get_last(self) -> int:
+        with self.ring.condition:
+            return self.ring.get_cursors()[1]
+
+    def get(self, block: bool = True, timeout: float = None) -> str:
+        ring = self.ring
+        with ring.condition:
+            if block and not self.returned and not ring.condition.wait_for(
+                    lambda: ring.get_cursors()[1] >= 0, timeout):
+                raise queue.Empty
+            last = ring.get_cursors()[1]
+            if self.returned or last < 0:
+                raise queue.Empty
+            record = ring.read(last)
+        self.returned = True
+        return record.text
+
+    def empty(self) -> bool:
+        return self.returned or self.__get_last() < 0
+
+def get_ring_readers(rings: "list[SampleRing]") -> "tuple[list, list]":
+    """ Return the samples_sent and last_sample_saved of a Subscriber: a
+        list with a SampleRingReader and a list with a LastSampleSaved for
+        each SampleRing (one for each Publisher).
+    """
+    return [SampleRingReader(element) for element in rings], \
+        [LastSampleSaved(element) for element in rings]
@@ -0,0 +1,270 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import collections
+import queue
+import re
+import time
+
+import pexpect
+
+from rtps_test_events import ShapeMainEvents
+
+# Line that the shape_main applications print for each sample, for example
+# 'Square     BLUE       191 152 [30]', optionally followed by the
+# additional payload size.
+SAMPLE_PATTERN = re.compile(r'(\S+)\s+(\S+)\s+([0-9]+) ([0-9]+) \[([0-9]+)\]')
+
+class Sample(collections.namedtuple('Sample',
+                                    ['topic', 'color', 'x', 'y', 'size'])):
+    """ Sample printed by a shape_main application. """
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        """ Position and size of the sample, the way the check functions
+            compare the samples received with the samples sent. For example,
+            '191 152 [30]'.
+        """
+        return f'{self.x:03d} {self.y:03d} [{self.size}]'
+
+def parse_sample(line: str) -> Sample:
+    """ Return the Sample of a line printed by a shape_main application, or
+        None if the line is not a sample.
+    """
+    match = SAMPLE_PATTERN.search(line)
+    if match is None:
+        return None
+    return Sample(match.group(1), match.group(2), int(match.group(3)),
+                  int(match.group(4)), int(match.group(5)))
+
+def get_sample(output: "pexpect.spawn | ShapeMainEvents") -> Sample:
+    """ Return the Sample of the last match of the output of a shape_main
+        application (a pexpect child or a ShapeMainEvents), or None if it
+        is not a sample. The match is the size ('[30]'), so only the last
+        line of the text before it is parsed.
+    """
+    if isinstance(output, ShapeMainEvents):
+        event = output.event
+        if event is None or event['event'] != 'sample':
+            return None
+        return Sample(event['topic'], event['color'], event['x'], event['y'],
+                      event['size'])
+    if not isinstance(output.after, str):
+        return None  # pexpect.TIMEOUT or pexpect.EOF
+    before = output.before
+    return parse_sample(before[before.rfind('\n') + 1:] + output.after)
+
+class SampleReader:
+    """
+    Iterator over the samples that a Subscriber shape_main application
+    prints. The first sample is the one of the last match of its output
+    (see get_sample()); then the output is read in chunks of up to maxread
+    characters and split in lines, and the samples are parsed with
+    SAMPLE_PATTERN (or taken from the events with the JSONL output format).
+    This way the check functions parse each sample once, instead of calling
+    expect() and searching before + after again for every sample.
+
+    The iteration finishes when no sample is received within timeout
+    seconds, or when the output finishes. The reader consumes the output of
+    the pexpect child (its buffer and the output read after it); the output
+    read and not parsed is kept in unread when the reader is closed, the
+    pexpect child is not modified. It can be used as a context manager:
+
+        with SampleReader(child_sub, timeout) as samples:
+            for sample in samples:
+                ...
+    """
+    def __init__(
+            self,
+            output: "pexpect.spawn | ShapeMainEvents",
+            timeout: float):
+        self.output = output
+        self.timeout = timeout
+        self.__first_sample = get_sample(output)
+        self.__started = False
+        # Lines read and not parsed yet, and output received after the
+        # last complete line
+        self.__lines = collections.deque()
+        self.__partial_line = ''
+        self.__eof = False
+        # Output received by the pexpect child after its last match, it is
+        # split in lines before reading more output
+        self.__buffer = ''
+        if not isinstance(output, ShapeMainEvents):
+            self.__buffer = output.buffer
+            output.buffer = ''
+        # Output read and not parsed, set by close()
+        self.unread = ''
+
+    def __enter__(self) -> "SampleReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self) -> "SampleReader":
+        return self
+
+    def __next__(self) -> Sample:
+        if not self.__started:
+            self.__started = True
+            if self.__first_sample is not None:
+                return self.__first_sample
+        end_time = time.monotonic() + self.timeout
+        if isinstance(self.output, ShapeMainEvents):
+            return self.__next_event(end_time)
+        while True:
+            while self.__lines:
+                sample = parse_sample(self.__lines.popleft())
+                if sample is not None:
+                    return sample
+            if self.__eof or not self.__read(end_time):
+                raise StopIteration
+
+    def __next_event(self, end_time: float) -> Sample:
+        while True:
+            event = self.output.next_event(max(0, end_time - time.monotonic()))
+            if event is None:
+                raise StopIteration
+            if event['event'] == 'sample':
+                return get_sample(self.output)
+
+    def __read(self, end_time: float) -> bool:
+        """ Read the next chunk of output and split it in lines. Return False
+            if no output is received before end_time.
+        """
+        data = self.__buffer
+        if data:
+            self.__buffer = ''
+        else:
+            try:
+                data = self.output.read_nonblocking(
+                    self.output.maxread, max(0, end_time - time.monotonic()))
+            except pexpect.TIMEOUT:
+                return False
+            except pexpect.EOF:
+                self.__eof = True
+                data = '\n'
+        lines = (self.__partial_line + data).split('\n')
+        self.__partial_line = lines.pop()
+        self.__lines.extend(lines)
+        return True
+
+    def close(self):
+        """ Keep the output read and not parsed in unread. """
+        self.unread = ''.join(line + '\n' for line in self.__lines) \
+            + self.__partial_line + self.__buffer
+        self.__lines.clear()
+        self.__partial_line = ''
+        self.__buffer = ''
+
+class SampleAttribution:
+    """
+    Attribution of the samples that a Subscriber receives to the Publishers
+    that sent them. The samples each Publisher saves in its SampleRing (read
+    with samples_sent, and its last sample with last_sample_saved) are
+    indexed by their text (see Sample.text), so finding the Publisher of a
+    sample does not depend on the number of samples sent.
+
+    The Subscriber may print a sample before its Publisher saves it, so
+    attribute() waits for the Publishers to save it, unless a Publisher has
+    already finished (its last sample has been processed, see
+    add_processed()). It blocks on the Condition that the SampleRings of all
+    the Publishers share, which is notified every time any of them saves a
+    sample (see create_sample_rings() in interoperability_report.py).
+    """
+    def __init__(
+            self,
+            samples_sent: "list[SampleRingReader]",
+            last_sample_saved: "list[LastSampleSaved]"):
+        self.samples_sent = samples_sent
+        self.last_sample_saved = last_sample_saved
+        # Texts of the samples sent by each Publisher
+        self.__sent = [set() for _ in samples_sent]
+        self.last_samples = [None] * len(samples_sent)
+        self.processed = set()
+        self.condition = None
+        if samples_sent:
+            self.condition = samples_sent[0].ring.condition
+        if any(element.ring.condition is not self.condition
+               for element in samples_sent + last_sample_saved):
+            raise RuntimeError('The SampleRings of the Publishers must share '
+                               'the same Condition.')
+
+    def update(self):
+        """ Index the samples the Publishers have saved since the last call,
+            without blocking.
+        """
+        for i, element in enumerate(self.samples_sent):
+            try:
+                while True:
+                    self.__sent[i].add(element.get(block=False))
+            except queue.Empty:
+                pass
+        for i, element in enumerate(self.last_sample_saved):
+            try:
+                while True:
+                    self.last_samples[i] = element.get(block=False)
+            except queue.Empty:
+                pass
+
+    def __saved(self) -> bool:
+        """ Return whether any Publisher has saved a sample (or its last
+            sample) that update() has not indexed yet.
+        """
+        return any(not element.empty() for element in self.samples_sent) \
+            or any(not element.empty() for element in self.last_sample_saved)
+
+    def wait(self, timeout: float) -> bool:
+        """ Wait up to timeout seconds until any Publisher saves a sample
+            (or its last sample) that update() has not indexed yet. Return
+            False if none is saved.
+        """
+        if self.condition is None:
+            return False  # There are no Publishers
+        with self.condition:
+            return self.condition.wait_for(self.__saved, max(timeout, 0))
+
+    def find(self, text: str) -> int:
+        """ Return the index of the Publisher that sent the sample text, or
+            None if it is not indexed. If several Publishers sent it, the
+            last one is returned.
+        """
+        for i in range(len(self.__sent) - 1, -1, -1):
+            if text in self.__sent[i]:
+                return i
+        return None
+
+    def add_processed(self, text: str):
+        """ Save the text of a sample that the Subscriber has processed. """
+        self.processed.add(text)
+
+    def publisher_finished(self) -> bool:
+        """ Return whether the last sample of any Publisher has been
+            processed.
+        """
+        return any(element is not None and element in self.processed
+                   for element in self.last_samples)
+
+    def attribute(self, text: str, timeout: float) -> int:
+        """ Return the index of the Publisher that sent the sample text (see
+            find()), waiting up to timeout seconds for the Publishers to save
+            it. Return None if no Publisher has sent it, either because a
+            Publisher has finished (see publisher_finished()) or because
+            timeout expires.
+        """
+        end_time = time.monotonic() + timeout
+        while True:
+            self.update()
+            publisher = self.find(text)
+            if publisher is not None or self.publisher_finished():
+                return publisher
+            if not self.wait(end_time - time.monotonic()):
+                self.update()
+                return self.find(text)
@@ -0,0 +1,107 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import heapq
+import re
+
+import junitparser
+
+# Duration (in seconds) used for all the Test Cases if no previous report
+# contains any duration.
+DEFAULT_DURATION = 1.0
+
+class Durations:
+    """
+    Durations of the Test Cases in previous JUnit reports (the 'time' of
+    each TestCase), used to estimate how long a Test Case will take.
+
+    The durations are identified by the TestSuite name (the
+    publisher/subscriber pair) and the TestCase name. If a Test Case appears
+    several times, the mean is used.
+    """
+    def __init__(self, filenames: "list[str]" = None):
+        self.__durations = {}
+        for filename in filenames or []:
+            xml = junitparser.JUnitXml.fromfile(filename)
+            if isinstance(xml, junitparser.TestSuite):
+                xml = [xml]
+            for suite in xml:
+                for test_case in suite:
+                    self.__durations.setdefault(
+                        (suite.name, test_case.name), []).append(test_case.time)
+
+    def get(self, suite_name: str, test_case_name: str) -> float:
+        """ Return the expected duration of a Test Case for a pair.
+
+            If there is no duration for the pair, it uses the mean duration
+            of the Test Case for the other pairs. If the Test Case never ran,
+            all of them are expected to take the same time: the mean of all
+            the durations (or DEFAULT_DURATION if there are none).
+        """
+        values = self.__durations.get((suite_name, test_case_name))
+        if not values:
+            values = [value
+                      for (suite, name), durations in self.__durations.items()
+                      if name == test_case_name
+                      for value in durations]
+        if not values:
+            values = [value
+                      for durations in self.__durations.values()
+                      for value in durations]
+        if not values:
+            return DEFAULT_DURATION
+        return sum(values) / len(values)
+
+def order_longest_first(
+        units: list,
+        costs: "list[float]",
+        time_out: "list[bool]" = None) -> list:
+    """ Return the units sorted from the highest to the lowest cost. Units
+        with the same cost are sorted by time_out (the units expected to
+        wait for a timeout go first) and then by their original order.
+    """
+    if time_out is None:
+        time_out = [False] * len(units)
+    order = sorted(range(len(units)),
+                   key=lambda i: (-costs[i], not time_out[i], i))
+    return [units[i] for i in order]
+
+def parse_shard(shard: str) -> "tuple[int, int]":
+    """ Return (shard index, number of shards) from a string 'i/N', where
+        the shard index i goes from 1 to N.
+    """
+    match = re.fullmatch(r'([0-9]+)/([0-9]+)', shard)
+    if match is None:
+        raise RuntimeError(f'Invalid shard <{shard}>, the format is i/N.')
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise RuntimeError(f'Invalid shard <{shard}>, it must be '
+            'between 1/N and N/N.')
+    return index, count
+
+def split_in_shards(
+        units: list,
+        costs: "list[float]",
+        num_shards: int) -> "list[list]":
+    """ Split the units in num_shards lists whose total costs are balanced.
+
+        It uses the longest-processing-time-first rule: the units are sorted
+        from the highest to the lowest cost, and each one is added to the
+        shard with the lowest total cost so far. The result only depends on
+        the arguments, so all the shards obtain the same split. The units
+        of each shard keep their original order.
+    """
+    shards = [[] for i in range(num_shards)]
+    # (total cost, shard index) of each shard
+    loads = [(0.0, i) for i in range(num_shards)]
+    order = sorted(range(len(units)), key=lambda i: (-costs[i], i))
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(i)
+        heapq.heappush(loads, (load + costs[i], shard))
+    return [[units[i] for i in sorted(shard)] for shard in shards]
@@ -0,0 +1,191 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+import threading
+import time
+
+import pexpect
+
+from rtps_test_capabilities import ARGUMENT
+from rtps_test_events import JSONL_OPTION, ShapeMainEvents
+from rtps_test_io import spawn
+from rtps_test_utilities import log_message
+
+# Message the shape_main application prints in server mode (--server) after
+# each command, when it is waiting for the next one.
+SERVER_READY = 'Waiting for command'
+
+# Options of the shape_main application that configure the participant.
+# A shape_main application in server mode creates its participant again
+# when any of them changes.
+PARTICIPANT_OPTIONS = ['-d', '--datafrag-size', '--periodic-announcement']
+
+def get_participant_key(parameters: str) -> "tuple[str]":
+    """ Return the participant options (with their arguments) of the
+        shape_main application parameters. For example,
+        '-P -t Square -d 5 -r' returns ('-d 5',).
+    """
+    key = []
+    tokens = ARGUMENT.findall(parameters)
+    for i, token in enumerate(tokens):
+        if token in PARTICIPANT_OPTIONS and i + 1 < len(tokens):
+            key.append(f'{token} {tokens[i + 1]}')
+    return tuple(sorted(key))
+
+class ShapeMainServer:
+    """
+    shape_main application running in server mode (--server): it reads
+    'run <parameters>' commands from its standard input and runs each one
+    until SIGINT (or the number of iterations), keeping its participant
+    between commands. See run() and stop().
+    """
+    def __init__(
+            self,
+            name_executable: str,
+            working_directory: str = None,
+            io_backend: str = 'pty'):
+        self.name_executable = name_executable
+        # The commands are not echoed, so they are not matched as output of
+        # the shape_main application
+        self.child = spawn(f'{name_executable} --server', io_backend,
+                           cwd=working_directory, echo=False)
+        # Participant options of the last command (see get_participant_key())
+        self.participant_key = None
+        # Object that reads the output of the last command: the child or,
+        # with the JSONL output format, a ShapeMainEvents
+        self.output = self.child
+        # Whether the last command has finished
+        self.__finished = False
+
+    def run(self, parameters: str, file, jsonl: bool = False):
+        """ Start running the shape_main application with the parameters.
+            Its output is saved in file, the same way as a shape_main
+            application started for the parameters. If jsonl is True, it
+            uses the JSONL output format and its output is read with a
+            ShapeMainEvents (see output).
+        """
+        self.child.logfile = file
+        self.participant_key = get_participant_key(parameters)
+        self.__finished = False
+        if jsonl:
+            self.child.sendline(f'run {parameters} {JSONL_OPTION}')
+            self.output = ShapeMainEvents(self.child)
+        else:
+            self.child.sendline(f'run {parameters}')
+            self.output = self.child
+
+    def stop(self, deadline: float) -> bool:
+        """ Wait until the shape_main application finishes the command,
+            which is stopped with SIGINT (Ctrl+C) if it has not finished yet.
+            It returns False if the command did not finish before the
+            deadline (time.monotonic()) or the application exited.
+        """
+        if not self.__finished:
+            self.__finished = self.__wait_ready(
+                max(0, deadline - time.monotonic()))
+        self.child.logfile = None
+        return self.__finished
+
+    def interrupt(self):
+        """ Send SIGINT (Ctrl+C) unless the command has already finished. """
+        self.__finished = self.__wait_ready(0)
+        if not self.__finished and self.child.isalive():
+            self.child.sendintr()
+
+    def __wait_ready(self, timeout: float) -> bool:
+        return self.output.expect(
+            [SERVER_READY, pexpect.TIMEOUT, pexpect.EOF], timeout) == 0
+
+    def close(self, timeout: float = 5):
+        """ Exit the shape_main application, it is forcefully terminated
+            if it does not exit within the timeout.
+        """
+        self.child.logfile = None
+        if self.child.isalive():
+            try:
+                self.child.sendline('quit')
+                self.child.expect(pexpect.EOF, timeout=timeout)
+            except (pexpect.TIMEOUT, OSError):
+                self.child.terminate(force=True)
+        self.child.close()
+
+class ServerPool:
+    """
+    shape_main applications running in server mode that are reused by the
+    Test Cases (warm processes), so the participant creation and the
+    discovery of the other participants are not repeated for every Test
+    Case.
+
+    Each server runs one shape_main application of one Test Case at a time.
+    A Test Case takes the idle servers of the shape_main applications it
+    runs (see acquire()), preferring the ones whose participant can be
+    used as it is, and returns them once they are stopped (see stop()).
+    A ServerPool may be shared by Test Cases running at the same time.
+    """
+    def __init__(
+            self,
+            working_directory: str = None,
+            verbosity: bool = False,
+            io_backend: str = 'pty'):
+        self.working_directory = working_directory
+        self.verbosity = verbosity
+        # I/O backend of the servers (see rtps_test_io.IO_BACKENDS)
+        self.io_backend = io_backend
+        self.__idle = []
+        self.__lock = threading.Lock()
+
+    def acquire(self, name_executable: str, parameters: str) -> ShapeMainServer:
+        """ Return an idle server of the shape_main application, or a new one
+            if there is none.
+        """
+        key = get_participant_key(parameters)
+        with self.__lock:
+            candidates = [server for server in self.__idle
+                          if server.name_executable == name_executable]
+            # The servers whose participant does not change go first
+            candidates.sort(key=lambda server: server.participant_key != key)
+            if candidates:
+                self.__idle.remove(candidates[0])
+                log_message(f'Reusing {name_executable} server', self.verbosity)
+                return candidates[0]
+        log_message(f'Starting {name_executable} server', self.verbosity)
+        return ShapeMainServer(name_executable, self.working_directory,
+                               self.io_backend)
+
+    def stop(
+            self,
+            servers: "list[ShapeMainServer]",
+            timeouts: "list[float]") -> "list[tuple]":
+        """ Stop the commands of several servers at the same time (see
+            ShapeMainServer.stop()) and return them to the pool. The servers
+            whose command does not finish within their timeout are closed.
+
+            It returns, for each server, True if its command finished
+            gracefully and the time (in seconds) it took to stop (the same
+            as interoperability_report.stop_processes()).
+        """
+        start_time = time.monotonic()
+        for server in servers:
+            server.interrupt()
+        result = []
+        for server, timeout in zip(servers, timeouts):
+            graceful = server.stop(start_time + timeout)
+            result.append((graceful, time.monotonic() - start_time))
+            if graceful:
+                with self.__lock:
+                    self.__idle.append(server)
+            else:
+                server.close(timeout=0)
+        return result
+
+    def close(self):
+        """ Exit all the shape_main applications of the pool. """
+        with self.__lock:
+            servers, self.__idle = self.__idle, []
+        for server in servers:
+            server.close()
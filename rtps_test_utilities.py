@@ -6,7 +6,9 @@
 # https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
 #
 #################################################################
+import hashlib
 import re
+import shutil
 
 from enum import Enum
 class ReturnCode(Enum):
@@ -53,6 +55,23 @@ def log_message(message, verbosity):
     if verbosity:
         print(message)
 
+def get_file_hash(filename: str) -> str:
+    """ Return the SHA-256 of a file, or None if it cannot be read. """
+    sha256 = hashlib.sha256()
+    try:
+        with open(filename, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                sha256.update(block)
+    except OSError:
+        return None
+    return sha256.hexdigest()
+
+def get_executable_hash(name_executable: str) -> str:
+    """ Return the SHA-256 of the shape_main application, or None if the
+        file cannot be read.
+    """
+    return get_file_hash(shutil.which(name_executable) or name_executable)
+
 def remove_ansi_colors(text):
     ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
     cleaned_str = ansi_escape.sub('', text)
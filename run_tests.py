@@ -0,0 +1,604 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import argparse
+import concurrent.futures
+import junitparser
+import multiprocessing
+import os
+import pathlib
+import platform
+import shutil
+import tempfile
+from datetime import datetime
+
+if __name__ == "__main__" and platform.system() == "Darwin":
+    multiprocessing.set_start_method('fork')
+
+import interoperability_report as ir
+from rtps_test_history import TimingHistory
+from rtps_test_capabilities import Capabilities
+from rtps_test_cache import ResultCache, get_default_cache_directory, \
+    DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_SIZE_MB
+from rtps_test_journal import Journal, get_completed_test_cases
+from rtps_test_scheduling import Durations, order_longest_first, \
+    parse_shard, split_in_shards
+
+# Pattern of the shape_main applications searched in the input directory
+SHAPE_MAIN_PATTERN = '*shape_main_linux'
+
+# Directory where OpenDDS saves the samples with durability TRANSIENT or
+# PERSISTENT. It must be deleted after every publisher/subscriber pair.
+OPENDDS_DURABLE_DATA_DIR = 'OpenDDS-durable-data-dir'
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Run the interoperability_report Test Suite for all '
+                'the combinations of publisher and subscriber shape_main '
+                'applications. If a publisher/subscriber is not provided, all '
+                f'the "{SHAPE_MAIN_PATTERN}" applications in the input '
+                'directory are used as publishers/subscribers. The results '
+                'of all the combinations are saved in a single JUnit report.',
+            add_help=True)
+
+        gen_opts = parser.add_argument_group(title='general options')
+        gen_opts.add_argument('-p', '--publisher',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='publisher_executable_name',
+            help='Publisher shape_main applications. '
+                'Default: all the applications in the input directory.')
+        gen_opts.add_argument('-s', '--subscriber',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='subscriber_executable_name',
+            help='Subscriber shape_main applications. '
+                'Default: all the applications in the input directory.')
+        gen_opts.add_argument('-i', '--input',
+            default='.',
+            required=False,
+            type=str,
+            metavar='input_directory',
+            help='Directory where the publisher/subscriber applications are '
+                'located (only used if -p or -s are not provided). '
+                'Default: current directory.')
+
+        optional = parser.add_argument_group(title='optional parameters')
+        optional.add_argument('-j', '--jobs',
+            default=1,
+            required=False,
+            type=int,
+            metavar='number_of_jobs',
+            help='Number of publisher/subscriber pairs tested at the same '
+                'time. Each Test Case uses its own set of Domain IDs, so '
+                'the pairs do not communicate with each other. '
+                'Default: 1.')
+        optional.add_argument('-t', '--test',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='test_cases',
+            help='Test Cases that the script will run. '
+                'Default: run all Test Cases from the Test Suite.')
+        optional.add_argument('-d', '--disable-test',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='test_cases_disabled',
+            help='Test Cases that the script will skip. '
+                'Default: None')
+        optional.add_argument('--timing-history',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file with the durations measured in previous runs. '
+                'See interoperability_report.py --timing-history. '
+                'Default: None (the history is not used).')
+        optional.add_argument('--capabilities',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JSON file with the options supported by the shape_main '
+                'applications. See interoperability_report.py --capabilities. '
+                'Default: None (the options are not probed).')
+        optional.add_argument('--cache',
+            nargs='?',
+            const=get_default_cache_directory(),
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Use a result cache in the directory (by default, '
+                f'{get_default_cache_directory()}). See '
+                'interoperability_report.py --cache. '
+                'Default: None (all the Test Cases run).')
+        optional.add_argument('--cache-max-age',
+            default=DEFAULT_MAX_AGE_DAYS,
+            required=False,
+            type=float,
+            metavar='days',
+            help='Results older than this number of days are removed from the '
+                f'result cache. Default: {DEFAULT_MAX_AGE_DAYS}.')
+        optional.add_argument('--cache-max-size',
+            default=DEFAULT_MAX_SIZE_MB,
+            required=False,
+            type=float,
+            metavar='megabytes',
+            help='Maximum size of the result cache, the oldest results are '
+                f'removed when it is bigger. Default: {DEFAULT_MAX_SIZE_MB}.')
+        optional.add_argument('--engine',
+            default='multiprocessing',
+            required=False,
+            type=str,
+            choices=['multiprocessing', 'asyncio'],
+            help='How the shape_main applications are driven. See '
+                'interoperability_report.py --engine. With asyncio, all the '
+                'pairs share the same event loop. '
+                'Default: multiprocessing.')
+        optional.add_argument('--warm-processes',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Reuse the shape_main applications (in server mode) in the '
+                'next Test Cases of each pair. See '
+                'interoperability_report.py --warm-processes. '
+                'Default: False.')
+        optional.add_argument('--output-format',
+            default='text',
+            required=False,
+            type=str,
+            choices=ir.OUTPUT_FORMATS,
+            help='Output format of the shape_main applications. See '
+                'interoperability_report.py --output-format. '
+                'Default: text.')
+        optional.add_argument('--io-backend',
+            default='pty',
+            required=False,
+            type=str,
+            choices=ir.IO_BACKENDS,
+            help='How the output of the shape_main applications is read. See '
+                'interoperability_report.py --io-backend. '
+                'Default: pty.')
+        optional.add_argument('--console-lines',
+            default=ir.DEFAULT_CONSOLE_LINES,
+            required=False,
+            type=int,
+            metavar='number_of_lines',
+            help='Number of lines kept at the beginning and at the end of '
+                'the console output of each shape_main application. See '
+                'interoperability_report.py --console-lines. '
+                f'Default: {ir.DEFAULT_CONSOLE_LINES}.')
+        optional.add_argument('--console-log-dir',
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Directory where the whole console output of the '
+                'shape_main applications whose output is elided is saved. '
+                'See interoperability_report.py --console-log-dir. '
+                'Default: not saved.')
+        optional.add_argument('--capture-then-verify',
+            action='store_true',
+            default=False,
+            required=False,
+            help='Check the samples captured from the Subscribers once the '
+                'shape_main applications stop. See '
+                'interoperability_report.py --capture-then-verify. '
+                'Default: disabled.')
+        optional.add_argument('--capture-dir',
+            default=None,
+            required=False,
+            type=str,
+            metavar='directory',
+            help='Directory where the samples captured are saved. See '
+                'interoperability_report.py --capture-dir. '
+                'Default: not saved.')
+        optional.add_argument('--shard',
+            default=None,
+            required=False,
+            type=str,
+            metavar='i/N',
+            help='Split the Test Cases of all the publisher/subscriber pairs '
+                'in N shards and run only the shard i (from 1 to N). See '
+                'interoperability_report.py --shard. '
+                'Default: None (run all the Test Cases).')
+        optional.add_argument('--durations',
+            nargs='+',
+            default=None,
+            required=False,
+            type=str,
+            metavar='filename',
+            help='JUnit reports of previous runs used to balance the shards. '
+                'See interoperability_report.py --durations. '
+                'Default: None.')
+        optional.add_argument('--order',
+            default='duration',
+            required=False,
+            type=str,
+            choices=['duration', 'dictionary'],
+            help='Order in which the pairs and their Test Cases run. '
+                'duration: longest first, according to the reports passed '
+                'with --durations. dictionary: as they are defined. '
+                'Default: duration.')
+        optional.add_argument('--fan-out',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Run the Test Cases that allow it (see \'fan_out\' in '
+                'test_suite.py) once for each publisher application: a single '
+                'publisher runs with the subscribers of all the applications '
+                'at the same time, and each publisher/subscriber pair gets its '
+                'own result. The rest of the Test Cases run for each pair. '
+                'Default: False (all the Test Cases run for each pair).')
+        optional.add_argument('-v','--verbose',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Print debug information to stdout. '
+                'Default: False')
+
+        out_opts = parser.add_argument_group(title='output options')
+        out_opts.add_argument('-o', '--output-name',
+            required=False,
+            metavar='filename',
+            type=str,
+            help='Name of the xml report that will be generated. '
+                'If the file passed already exists, it will add '
+                'the new results to it. In other case it will create '
+                'a new file. '
+                'Default: interoperability_report-date.xml')
+        out_opts.add_argument('--resume',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Run only the Test Cases that are not in the report (and in '
+                'its journal) or that did not pass. See '
+                'interoperability_report.py --resume. '
+                'Default: False (run all the Test Cases).')
+
+        return parser
+
+def find_shape_main_applications(input_directory: str) -> "list[str]":
+    """ Return the shape_main applications found in input_directory and its
+        subdirectories.
+    """
+    return sorted(str(element) for element in
+                  pathlib.Path(input_directory).rglob(SHAPE_MAIN_PATTERN)
+                  if element.is_file())
+
+def get_extra_arguments(name_publisher: str, name_subscriber: str) -> "list[str]":
+    """ Return the interoperability_report arguments that a publisher/subscriber
+        pair needs.
+    """
+    extra_args = []
+    # OpenDDS subscribers need Connext publishers to announce their
+    # participants periodically.
+    if 'opendds' in name_subscriber.lower() \
+            and 'connext_dds' in name_publisher.lower():
+        extra_args += ['--periodic-announcement', '5000']
+    return extra_args
+
+def get_pair_options(
+        name_executable_pub: str,
+        name_executable_sub: str,
+        args: argparse.Namespace) -> dict:
+    """ Return the interoperability_report options used to test a publisher
+        and a subscriber shape_main application.
+    """
+    name_publisher = ir.get_product_name(name_executable_pub)
+    name_subscriber = ir.get_product_name(name_executable_sub)
+
+    pair_args = ['-P', os.path.abspath(name_executable_pub),
+                 '-S', os.path.abspath(name_executable_sub)]
+    if args.verbose:
+        pair_args.append('-v')
+    pair_args += ['--engine', args.engine, '--order', args.order,
+                  '--output-format', args.output_format,
+                  '--io-backend', args.io_backend,
+                  '--console-lines', str(args.console_lines)]
+    if args.console_log_dir is not None:
+        pair_args += ['--console-log-dir', args.console_log_dir]
+    if args.capture_then_verify:
+        pair_args.append('--capture-then-verify')
+    if args.capture_dir is not None:
+        pair_args += ['--capture-dir', args.capture_dir]
+    if args.warm_processes:
+        pair_args.append('--warm-processes')
+    if args.test is not None:
+        pair_args += ['--test'] + args.test
+    if args.disable_test is not None:
+        pair_args += ['--disable-test'] + args.disable_test
+    pair_args += get_extra_arguments(name_publisher, name_subscriber)
+    return ir.get_options(ir.Arguments.parser().parse_args(pair_args))
+
+def run_pair(
+        options: dict,
+        domain_pool: ir.DomainIdPool,
+        result_slots: ir.ResultSlots,
+        asyncio_engine: ir.AsyncioEngine) -> junitparser.TestSuite:
+    """ Run the Test Suite between a publisher and a subscriber shape_main
+        application and return the junitparser TestSuite with the results.
+
+        The shape_main applications run in a temporary directory that is
+        deleted at the end. This removes the files that some products
+        create (such as the OpenDDS-durable-data-dir) and avoids conflicts
+        between pairs running at the same time.
+    """
+    name_publisher = ir.get_product_name(options['publisher'])
+    name_subscriber = ir.get_product_name(options['subscriber'])
+    print(f'Testing Publisher {name_publisher} --- Subscriber {name_subscriber}')
+
+    options['working_directory'] = tempfile.mkdtemp(
+        prefix=f'{name_publisher}-{name_subscriber}-')
+    try:
+        return ir.run_test_suite(options, ir.DEFAULT_TIMEOUT, domain_pool,
+                                 result_slots, asyncio_engine)
+    finally:
+        if os.path.isdir(os.path.join(options['working_directory'],
+                                      OPENDDS_DURABLE_DATA_DIR)):
+            print(f'Deleting {OPENDDS_DURABLE_DATA_DIR}')
+        shutil.rmtree(options['working_directory'], ignore_errors=True)
+
+def run_publisher_fan_out(
+        pair_options: "list[dict]",
+        domain_pool: ir.DomainIdPool,
+        result_slots: ir.ResultSlots,
+        asyncio_engine: ir.AsyncioEngine):
+    """ Run the Test Cases that allow the fan-out mode for the pairs of one
+        publisher application (see ir.run_fan_out_test_case()). Their
+        results are added to the completed Test Cases of each pair, so
+        run_pair() does not run them again.
+
+        The Test Cases run in order. A Test Case whose dependencies (see
+        'depends_on') have not run yet for a pair is left for run_pair().
+    """
+    name_publisher = ir.get_product_name(pair_options[0]['publisher'])
+    print(f'Testing Publisher {name_publisher} --- all Subscribers (fan-out)')
+
+    # Test Cases to run for each pair, in order
+    pair_test_cases = [
+        {ir.get_test_case_name(element[0], element[1]): element
+         for element in ir.get_test_cases_to_run(options)}
+        for options in pair_options]
+    test_cases = {}
+    for element in pair_test_cases:
+        test_cases.update(element)
+
+    # The temporary directory is deleted at the end, also if the pool of
+    # servers cannot be created or a Test Case fails
+    working_directory = tempfile.mkdtemp(prefix=f'{name_publisher}-fan-out-')
+    server_pool = None
+    try:
+        if pair_options[0]['warm_processes']:
+            server_pool = ir.ServerPool(working_directory,
+                                        pair_options[0]['verbosity'],
+                                        pair_options[0]['io_backend'])
+        for name, element in test_cases.items():
+            if not ir.is_fan_out_test_case(element[2]):
+                continue
+            fan_out_options = []
+            for options, names_to_run in zip(pair_options, pair_test_cases):
+                completed = options['completed_test_cases']
+                if name not in names_to_run or name in completed:
+                    continue
+                dependencies = [
+                    ir.get_test_case_name(element[0], dependency)
+                    for dependency in element[2].get('depends_on', [])
+                    if ir.get_test_case_name(element[0], dependency)
+                        in names_to_run]
+                if any(dependency not in completed
+                       for dependency in dependencies):
+                    continue
+                failed = [dependency for dependency in dependencies
+                          if not completed[dependency].is_passed]
+                if failed:
+                    completed[name] = ir.skip_test_case(
+                        options, element[0], element[1], failed)
+                else:
+                    fan_out_options.append(options)
+            if not fan_out_options:
+                continue
+            cases = ir.run_fan_out_test_case(
+                fan_out_options, ir.DEFAULT_TIMEOUT, *element,
+                working_directory=working_directory,
+                domain_pool=domain_pool,
+                result_slots=result_slots,
+                asyncio_engine=asyncio_engine,
+                server_pool=server_pool)
+            for options, case in zip(fan_out_options, cases):
+                options['completed_test_cases'][name] = case
+    finally:
+        if server_pool is not None:
+            server_pool.close()
+        shutil.rmtree(working_directory, ignore_errors=True)
+
+def get_pair_duration(options: dict) -> float:
+    """ Return the expected duration of the Test Cases of a pair, according
+        to options['durations'].
+    """
+    suite_name = ir.get_suite_name(options)
+    return sum(options['durations'].get(
+                   suite_name, ir.get_test_case_name(element[0], element[1]))
+               for element in ir.get_test_cases_to_run(options))
+
+def select_shard(
+        pair_options: "list[dict]",
+        shard: "tuple[int, int]",
+        durations: Durations) -> "list[dict]":
+    """ Split the (publisher/subscriber pair, Test Case) units of all the
+        pairs in shards with balanced expected durations, and return the
+        options of the pairs that have Test Cases in the shard
+        (shard index, number of shards). The options of each pair are set to
+        run only the Test Cases of the shard.
+    """
+    units = []
+    costs = []
+    for i, options in enumerate(pair_options):
+        suite_name = ir.get_suite_name(options)
+        for element in ir.get_test_cases_to_run(options):
+            name = ir.get_test_case_name(element[0], element[1])
+            units.append((i, name))
+            costs.append(durations.get(suite_name, name))
+
+    selected_units = split_in_shards(units, costs, shard[1])[shard[0] - 1]
+    for i, options in enumerate(pair_options):
+        options['shard_test_cases'] = {
+            name for pair, name in selected_units if pair == i}
+    return [options for options in pair_options
+            if options['shard_test_cases']]
+
+def main():
+    parser = Arguments.parser()
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        raise RuntimeError('The number of jobs must be greater than 0.')
+    if args.resume and args.output_name is None:
+        raise RuntimeError('The option --resume needs --output-name.')
+
+    publishers = args.publisher
+    if publishers is None:
+        print(f'Searching for publisher applications in directory: {args.input}')
+        publishers = find_shape_main_applications(args.input)
+    subscribers = args.subscriber
+    if subscribers is None:
+        print(f'Searching for subscriber applications in directory: {args.input}')
+        subscribers = find_shape_main_applications(args.input)
+
+    if not publishers or not subscribers:
+        parser.print_usage()
+        raise RuntimeError('Unable to find publisher or subscriber applications.')
+
+    if args.output_name is None:
+        date_time = datetime.now().strftime('%Y%m%d-%H_%M_%S')
+        filename_report = f'interoperability_report-{date_time}.xml'
+    else:
+        filename_report = args.output_name
+    if os.path.exists(filename_report):
+        xml = junitparser.JUnitXml.fromfile(filename_report)
+    else:
+        xml = junitparser.JUnitXml()
+
+    pair_options = [
+        get_pair_options(publisher, subscriber, args)
+        for publisher in publishers
+        for subscriber in subscribers]
+
+    # All the pairs share the same pool of Domain IDs, so Test Cases running
+    # at the same time never use the same Domain ID. They also share the
+    # result slots, which are created once for the whole run.
+    test_cases = ir.get_test_cases_to_run(pair_options[0])
+    domain_pool = ir.DomainIdPool(
+        block_size=ir.get_domain_block_size(test_cases),
+        num_blocks=args.jobs)
+    # In fan-out mode, a publisher runs with the subscribers of all the
+    # applications
+    result_slots = ir.ResultSlots(
+        group_size=max(ir.get_result_group_size(test_cases),
+                       1 + len(subscribers) if args.fan_out else 0),
+        num_groups=args.jobs)
+
+    durations = Durations(args.durations)
+    for options in pair_options:
+        options['durations'] = durations
+    if args.shard is not None:
+        pair_options = select_shard(pair_options, parse_shard(args.shard),
+                                    durations)
+
+    # All the pairs share the same timing history
+    timing_history = TimingHistory(args.timing_history) \
+        if args.timing_history is not None else None
+    for options in pair_options:
+        options['timing_history'] = timing_history
+
+    # All the pairs share the same capabilities, so each shape_main
+    # application is probed once
+    capabilities = Capabilities(args.capabilities) \
+        if args.capabilities is not None else None
+    for options in pair_options:
+        options['capabilities'] = capabilities
+
+    # All the pairs share the same result cache. When only one product has
+    # a new build, only the pairs in which it is used run again.
+    if args.cache is not None:
+        result_cache = ResultCache(args.cache)
+        result_cache.evict(args.cache_max_age, args.cache_max_size)
+        for options in pair_options:
+            options['result_cache'] = result_cache
+
+    # All the pairs save their results in the same journal
+    journal_filename = f'{filename_report}.journal'
+    if args.resume:
+        completed_test_cases = get_completed_test_cases(xml, journal_filename)
+        for options in pair_options:
+            options['completed_test_cases'] = completed_test_cases.get(
+                ir.get_suite_name(options), {})
+    journal = Journal(journal_filename, keep=args.resume)
+    for options in pair_options:
+        options['journal'] = journal
+
+    asyncio_engine = ir.AsyncioEngine() if args.engine == 'asyncio' else None
+
+    if args.fan_out:
+        publisher_pairs = {}
+        for options in pair_options:
+            publisher_pairs.setdefault(options['publisher'], []).append(options)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [
+                executor.submit(run_publisher_fan_out, element, domain_pool,
+                                result_slots, asyncio_engine)
+                for element in publisher_pairs.values()]
+        for future in futures:
+            future.result()
+
+    # Start with the pairs that take longer, so the last pairs running at the
+    # same time finish at about the same time.
+    pairs_to_run = list(range(len(pair_options)))
+    if args.order == 'duration':
+        pairs_to_run = order_longest_first(
+            pairs_to_run,
+            [get_pair_duration(options) for options in pair_options])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            i: executor.submit(run_pair, pair_options[i], domain_pool,
+                               result_slots, asyncio_engine)
+            for i in pairs_to_run}
+
+    if asyncio_engine is not None:
+        asyncio_engine.close()
+
+    # Add the results in the same order as the pairs were defined
+    for i in range(len(pair_options)):
+        suite = futures[i].result()
+        if args.resume:
+            # The new TestSuite contains the Test Cases of the previous one
+            ir.remove_test_suites(xml, suite.name)
+        xml.add_testsuite(suite)
+
+    xml.write(filename_report)
+    journal.remove()
+
+    if timing_history is not None:
+        timing_history.save()
+    if capabilities is not None:
+        capabilities.save()
+
+if __name__ == '__main__':
+    main()
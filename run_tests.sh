@@ -5,6 +5,7 @@ input="."
 publisher=""
 subscriber=""
 output=""
+jobs=""
 
 # Function to display usage information
 usage() {
@@ -14,12 +15,13 @@ usage() {
     echo "subscriber is not provided, this script will find and use all "
     echo "'*_shape_main_linux' applications in the input directory as publisher and"
     echo "subscribers."
-    echo "Usage: $0 [-p publisher] [-s subscriber] [-o output] [-i input] [-h]"
+    echo "Usage: $0 [-p publisher] [-s subscriber] [-o output] [-i input] [-j jobs] [-h]"
     echo "Options:"
     echo "  -p, --publisher   Specify the publisher application"
     echo "  -s, --subscriber  Specify the subscriber application"
     echo "  -o, --output      Specify the output XML file"
     echo "  -i, --input       Specify the directory where publisher/subscriber applications are located (only if -p and -s are not provided)"
+    echo "  -j, --jobs        Specify the number of publisher/subscriber pairs tested at the same time"
     echo "  -h, --help        Print this help message"
     echo "Examples:"
     echo "Run Connext as publisher and all executables under './executables' as subscribers"
@@ -46,6 +48,10 @@ while [[ $# -gt 0 ]]; do
             input="$2"
             shift 2
             ;;
+        -j|--jobs)
+            jobs="$2"
+            shift 2
+            ;;
         -h|--help)
             usage
             ;;
@@ -56,42 +62,21 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
-# If publisher is not provided, find publisher applications
-if [[ -z $publisher ]]; then
-    echo "Searching for publisher applications in directory: $input"
-    publisher=$(find "$input" -type f -name '*shape_main_linux')
+# Run the application logic. run_tests.py finds the applications in the input
+# directory if the publisher or the subscriber are not provided, runs all the
+# publisher/subscriber pairs and saves the results in a single report.
+args=(-i "$input")
+if [[ -n $publisher ]]; then
+    args+=(-p "$publisher")
 fi
-
-# If subscriber is not provided, find subscriber applications
-if [[ -z $subscriber ]]; then
-    echo "Searching for subscriber applications in directory: $input"
-    subscriber=$(find "$input" -type f -name '*shape_main_linux')
+if [[ -n $subscriber ]]; then
+    args+=(-s "$subscriber")
 fi
-
-# Check if required options are provided
-if [[ -z $publisher || -z $subscriber ]]; then
-    echo "Error: Unable to find publisher or subscriber applications."
-    usage
+if [[ -n $output ]]; then
+    args+=(-o "$output")
+fi
+if [[ -n $jobs ]]; then
+    args+=(-j "$jobs")
 fi
 
-# Run the application logic
-for i in $publisher; do
-    for j in $subscriber; do
-        publisher_name=$(basename "$i" _shape_main_linux)
-        subscriber_name=$(basename "$j" _shape_main_linux)
-        echo "Testing Publisher $publisher_name --- Subscriber $subscriber_name"
-        extra_args=""
-        if [[ "${subscriber_name,,}" == *opendds* && "${publisher_name,,}" == *connext_dds* ]]; then
-            extra_args="--periodic-announcement 5000"
-        fi;
-        if [[ -n $output ]]; then
-            python3 ./interoperability_report.py -P "$i" -S "$j" -o "$output" $extra_args
-        else
-            python3 ./interoperability_report.py -P "$i" -S "$j" $extra_args
-        fi
-        if [ -d "./OpenDDS-durable-data-dir" ]; then
-            echo Deleting OpenDDS-durable-data-dir;
-            rm -rf ./OpenDDS-durable-data-dir;
-        fi;
-    done
-done
+python3 ./run_tests.py "${args[@]}"
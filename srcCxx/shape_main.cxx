@@ -15,6 +15,7 @@
 #include <signal.h>
 #include <string.h>
 #include <stdarg.h>
+#include <errno.h>
 #include <iostream>
 #include <getopt.h>
 #include <sys/types.h>
@@ -108,6 +109,12 @@ enum Verbosity
     DEBUG=2,
 };
 
+enum OutputFormat
+{
+    TEXT_OUTPUT_FORMAT,
+    JSONL_OUTPUT_FORMAT,
+};
+
 class QosUtils {
 public:
     static std::string to_string(ReliabilityQosPolicyKind reliability_value)
@@ -162,6 +169,16 @@ public:
         return "Error stringifying verbosity.";
     }
 
+    static std::string to_string(OutputFormat output_format_value)
+    {
+        if (output_format_value == TEXT_OUTPUT_FORMAT){
+            return "TEXT";
+        } else if (output_format_value == JSONL_OUTPUT_FORMAT){
+            return "JSONL";
+        }
+        return "Error stringifying output format.";
+    }
+
     static std::string to_string(OwnershipQosPolicyKind ownership_kind_value)
     {
         if (ownership_kind_value == SHARED_OWNERSHIP_QOS){
@@ -195,11 +212,73 @@ public:
     }
 };
 
+/*************************************************************/
+/* Event printed with the JSONL output format (--output-format jsonl):
+ * a JSON object in a single line with the name of the event, the time
+ * it happened (seconds of the monotonic clock) and the fields added. */
+class JsonEvent {
+public:
+    JsonEvent(const char *name)
+    {
+        struct timespec now;
+        char time_string[32];
+        clock_gettime(CLOCK_MONOTONIC, &now);
+        snprintf(time_string, sizeof(time_string), "%ld.%06ld",
+                (long) now.tv_sec, (long) now.tv_nsec / 1000);
+        text_ = "{\"event\": " + quote(name) + ", \"time\": " + time_string;
+    }
+
+    JsonEvent &add(const char *key, const std::string &value)
+    {
+        text_ += ", " + quote(key) + ": " + quote(value);
+        return *this;
+    }
+
+    JsonEvent &add(const char *key, const char *value)
+    {
+        return add(key, std::string(value != NULL ? value : ""));
+    }
+
+    JsonEvent &add(const char *key, long long value)
+    {
+        text_ += ", " + quote(key) + ": " + std::to_string(value);
+        return *this;
+    }
+
+    void print()
+    {
+        printf("%s}\n", text_.c_str());
+    }
+
+private:
+    static std::string quote(const std::string &value)
+    {
+        std::string result = "\"";
+        for (size_t i = 0; i < value.size(); ++i) {
+            unsigned char c = value[i];
+            if (c == '"' || c == '\\') {
+                result += '\\';
+                result += c;
+            } else if (c < 0x20) {
+                char escaped[8];
+                snprintf(escaped, sizeof(escaped), "\\u%04x", c);
+                result += escaped;
+            } else {
+                result += c;
+            }
+        }
+        return result + "\"";
+    }
+
+    std::string text_;
+};
+
 class Logger{
 public:
     Logger(enum Verbosity v)
     {
         verbosity_ = v;
+        output_format_ = TEXT_OUTPUT_FORMAT;
     }
 
     void verbosity(enum Verbosity v)
@@ -212,19 +291,103 @@ public:
         return verbosity_;
     }
 
+    void output_format(enum OutputFormat f)
+    {
+        output_format_ = f;
+    }
+
+    enum OutputFormat output_format()
+    {
+        return output_format_;
+    }
+
+    bool jsonl()
+    {
+        return output_format_ == JSONL_OUTPUT_FORMAT;
+    }
+
     void log_message(std::string message, enum Verbosity level_verbosity)
     {
         if (level_verbosity <= verbosity_) {
-            std::cout << message << std::endl;
+            if (jsonl()) {
+                JsonEvent("log")
+                        .add("level", level_verbosity == ERROR ? "error" : "debug")
+                        .add("message", message)
+                        .print();
+                fflush(stdout);
+            } else {
+                std::cout << message << std::endl;
+            }
         }
     }
 
 private:
     enum Verbosity verbosity_;
+    enum OutputFormat output_format_;
 };
 
 /*************************************************************/
 Logger logger(ERROR);
+/*************************************************************/
+/* Print a sample written or read. The last byte of the additional
+ * payload is printed if additional_payload is not negative */
+void print_sample(
+        const char *topic_name,
+        const char *color,
+        int x,
+        int y,
+        int shapesize,
+        int additional_payload)
+{
+    if (logger.jsonl()) {
+        JsonEvent event("sample");
+        event.add("topic", topic_name)
+                .add("color", color)
+                .add("x", x)
+                .add("y", y)
+                .add("size", shapesize);
+        if (additional_payload >= 0) {
+            event.add("additional_payload", additional_payload);
+        }
+        event.print();
+        return;
+    }
+    printf("%-10s %-10s %03d %03d [%d]", topic_name, color, x, y, shapesize);
+    if (additional_payload >= 0) {
+        printf(" {%u}", (unsigned int) additional_payload);
+    }
+    printf("\n");
+}
+
+/*************************************************************/
+/* Print the state of an instance that is not alive */
+void print_instance_state(
+        const char *topic_name,
+        const char *color,
+        const char *state)
+{
+    if (logger.jsonl()) {
+        JsonEvent("instance_state")
+                .add("topic", topic_name)
+                .add("color", color)
+                .add("state", state)
+                .print();
+    } else {
+        printf("%-10s %-10s %s\n", topic_name, color, state);
+    }
+}
+
+/*************************************************************/
+/* Print an event without fields, or its text with the text output format */
+void print_event(const char *name, const char *text)
+{
+    if (logger.jsonl()) {
+        JsonEvent(name).print();
+    } else {
+        printf("%s\n", text);
+    }
+}
+
 /*************************************************************/
 class ShapeOptions {
 public:
@@ -427,6 +590,30 @@ public:
         printf("                         shapesize. This will make that shapesize is in the\n");
         printf("                         range [1,N]. This only applies if shapesize is\n");
         printf("                         increased (-z 0)\n");
+        printf("   --output-format [text|jsonl] : output format. jsonl prints one JSON\n");
+        printf("                                  object per line and event, with its name\n");
+        printf("                                  ('event'), the monotonic time in seconds\n");
+        printf("                                  ('time') and its fields. Default: text\n");
+        printf("   --server : run in server mode, the rest of the options are read as\n");
+        printf("              commands from the standard input, one command per line:\n");
+        printf("                - run <options>: create the entities with the options\n");
+        printf("                  above and run them until Ctrl+C (or the number of\n");
+        printf("                  iterations). Then the entities are deleted, and the\n");
+        printf("                  participant is kept for the next command (unless\n");
+        printf("                  the next command changes -d, --datafrag-size or\n");
+        printf("                  --periodic-announcement)\n");
+        printf("                - quit: exit the application\n");
+        printf("              It must be the only command line parameter\n");
+    }
+
+    //-------------------------------------------------------------
+    // Whether the participant created with these options can be used with
+    // the other options
+    bool same_participant(ShapeOptions *other)
+    {
+        return domain_id == other->domain_id
+                && datafrag_size == other->datafrag_size
+                && periodic_announcement_period_us == other->periodic_announcement_period_us;
     }
 
     //-------------------------------------------------------------
@@ -534,6 +721,7 @@ public:
             {"datafrag-size", required_argument, NULL, 'Z'},
             {"cft", required_argument, NULL, 'F'},
             {"size-modulo", required_argument, NULL, 'Q'},
+            {"output-format", required_argument, NULL, 'J'},
             {NULL, 0, NULL, 0 }
         };
 
@@ -951,6 +1139,18 @@ public:
                 }
                 break;
             }
+            case 'J':
+                if (strcmp(optarg, "text") == 0) {
+                    logger.output_format(TEXT_OUTPUT_FORMAT);
+                } else if (strcmp(optarg, "jsonl") == 0) {
+                    logger.output_format(JSONL_OUTPUT_FORMAT);
+                } else {
+                    logger.log_message("unrecognized value for output-format "
+                                + std::string(optarg),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                }
+                break;
             case '?':
                 parse_ok = false;
                 break;
@@ -966,6 +1166,7 @@ public:
             std::string app_kind = publish ? "publisher" : "subscriber";
             logger.log_message("Shape Options: "
                     "\n    Verbosity = " + QosUtils::to_string(logger.verbosity()) +
+                    "\n    Output Format = " + QosUtils::to_string(logger.output_format()) +
                     "\n    This application is a " + app_kind +
                     "\n    DomainId = " + std::to_string(domain_id) +
                     "\n    ReliabilityKind = " + QosUtils::to_string(reliability_kind) +
@@ -1019,7 +1220,11 @@ public:
     void on_inconsistent_topic         (Topic *topic,  const InconsistentTopicStatus &) {
         const char *topic_name = topic->get_name() NAME_ACCESSOR;
         const char *type_name  = topic->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s'\n", __FUNCTION__, topic_name, type_name);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name).print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s'\n", __FUNCTION__, topic_name, type_name);
+        }
     }
 
     void on_offered_incompatible_qos(DataWriter *dw,  const OfferedIncompatibleQosStatus & status) {
@@ -1028,34 +1233,62 @@ public:
         const char *type_name   = topic->get_type_name() NAME_ACCESSOR;
         const char *policy_name = NULL;
         policy_name = get_qos_policy_name(status.last_policy_id);
-        printf("%s() topic: '%s'  type: '%s' : %d (%s)\n", __FUNCTION__,
-                topic_name, type_name,
-                status.last_policy_id,
-                policy_name );
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("policy_id", status.last_policy_id)
+                    .add("policy", policy_name)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : %d (%s)\n", __FUNCTION__,
+                    topic_name, type_name,
+                    status.last_policy_id,
+                    policy_name );
+        }
     }
 
     void on_publication_matched (DataWriter *dw, const PublicationMatchedStatus & status) {
         Topic      *topic      = dw->get_topic( );
         const char *topic_name = topic->get_name() NAME_ACCESSOR;
         const char *type_name  = topic->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : matched readers %d (change = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.current_count, status.current_count_change);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("current_count", status.current_count)
+                    .add("current_count_change", status.current_count_change)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : matched readers %d (change = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.current_count, status.current_count_change);
+        }
     }
 
     void on_offered_deadline_missed (DataWriter *dw, const OfferedDeadlineMissedStatus & status) {
         Topic      *topic      = dw->get_topic( );
         const char *topic_name = topic->get_name() NAME_ACCESSOR;
         const char *type_name  = topic->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.total_count, status.total_count_change);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("total_count", status.total_count)
+                    .add("total_count_change", status.total_count_change)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.total_count, status.total_count_change);
+        }
     }
 
     void on_liveliness_lost (DataWriter *dw, const LivelinessLostStatus & status) {
         Topic      *topic      = dw->get_topic( );
         const char *topic_name = topic->get_name() NAME_ACCESSOR;
         const char *type_name  = topic->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.total_count, status.total_count_change);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("total_count", status.total_count)
+                    .add("total_count_change", status.total_count_change)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.total_count, status.total_count_change);
+        }
     }
 
     void on_requested_incompatible_qos (DataReader *dr, const RequestedIncompatibleQosStatus & status) {
@@ -1064,39 +1297,76 @@ public:
         const char       *type_name  = td->get_type_name() NAME_ACCESSOR;
         const char *policy_name = NULL;
         policy_name = get_qos_policy_name(status.last_policy_id);
-        printf("%s() topic: '%s'  type: '%s' : %d (%s)\n", __FUNCTION__,
-                topic_name, type_name, status.last_policy_id,
-                policy_name);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("policy_id", status.last_policy_id)
+                    .add("policy", policy_name)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : %d (%s)\n", __FUNCTION__,
+                    topic_name, type_name, status.last_policy_id,
+                    policy_name);
+        }
     }
 
     void on_subscription_matched (DataReader *dr, const SubscriptionMatchedStatus & status) {
         TopicDescription *td         = GET_TOPIC_DESCRIPTION(dr);
         const char       *topic_name = td->get_name() NAME_ACCESSOR;
         const char       *type_name  = td->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : matched writers %d (change = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.current_count, status.current_count_change);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("current_count", status.current_count)
+                    .add("current_count_change", status.current_count_change)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : matched writers %d (change = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.current_count, status.current_count_change);
+        }
     }
 
     void on_requested_deadline_missed (DataReader *dr, const RequestedDeadlineMissedStatus & status) {
         TopicDescription *td         = GET_TOPIC_DESCRIPTION(dr);
         const char       *topic_name = td->get_name() NAME_ACCESSOR;
         const char       *type_name  = td->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.total_count, status.total_count_change);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("total_count", status.total_count)
+                    .add("total_count_change", status.total_count_change)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : (total = %d, change = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.total_count, status.total_count_change);
+        }
     }
 
     void on_liveliness_changed (DataReader *dr, const LivelinessChangedStatus & status) {
         TopicDescription *td         = GET_TOPIC_DESCRIPTION(dr);
         const char       *topic_name = td->get_name() NAME_ACCESSOR;
         const char       *type_name  = td->get_type_name() NAME_ACCESSOR;
-        printf("%s() topic: '%s'  type: '%s' : (alive = %d, not_alive = %d)\n", __FUNCTION__,
-                topic_name, type_name, status.alive_count, status.not_alive_count);
+        if (logger.jsonl()) {
+            listener_event(__FUNCTION__, topic_name, type_name)
+                    .add("alive_count", status.alive_count)
+                    .add("not_alive_count", status.not_alive_count)
+                    .print();
+        } else {
+            printf("%s() topic: '%s'  type: '%s' : (alive = %d, not_alive = %d)\n", __FUNCTION__,
+                    topic_name, type_name, status.alive_count, status.not_alive_count);
+        }
     }
 
   void on_sample_rejected (DataReader *, const SampleRejectedStatus &) {}
   void on_data_available (DataReader *) {}
   void on_sample_lost (DataReader *, const SampleLostStatus &) {}
   void on_data_on_readers (Subscriber *) {}
+
+private:
+    // Event printed by the callbacks with the JSONL output format
+    static JsonEvent listener_event(const char *name, const char *topic_name, const char *type_name)
+    {
+        JsonEvent event(name);
+        event.add("topic", topic_name).add("type", type_name);
+        return event;
+    }
 };
 
 
@@ -1140,71 +1410,78 @@ public:
     //-------------------------------------------------------------
     ~ShapeApplication()
     {
-        if (dp)  dp->delete_contained_entities( );
-        if (dpf) dpf->delete_participant( dp );
+        delete_participant();
+    }
+
+    //-------------------------------------------------------------
+    bool initialize(ShapeOptions *options)
+    {
+        return create_participant(options) && create_entities(options);
+    }
+
+    //-------------------------------------------------------------
+    // Delete the topics, publisher/subscriber, DataWriters and DataReaders
+    // created by create_entities(). The participant is kept, so new
+    // entities can be created without repeating the discovery.
+    void delete_entities()
+    {
+        if (dp) dp->delete_contained_entities( );
+        pub = NULL;
+        sub = NULL;
 
         free(topics);
         free(drs);
         free(dws);
+        topics = NULL;
+        drs = NULL;
+        dws = NULL;
 
         STRING_FREE(color);
+        color = NULL;
     }
 
     //-------------------------------------------------------------
-    bool initialize(ShapeOptions *options)
+    void delete_participant()
     {
-        // Initialize entities array
-        topics = (Topic**) malloc(sizeof(Topic*) * options->num_topics);
-        if (topics == NULL) {
-            logger.log_message("Error allocating memory for topics", Verbosity::ERROR);
-            return false;
-        }
-        for (unsigned int i = 0; i < options->num_topics; ++i) {
-            topics[i] = NULL;
-        }
-
-        if (options->publish) {
-            dws = (ShapeTypeDataWriter**) malloc(sizeof(ShapeTypeDataWriter*) * options->num_topics);
-            if (dws == NULL) {
-                logger.log_message("Error allocating memory for DataWriters", Verbosity::ERROR);
-                return false;
-            }
-            for (unsigned int i = 0; i < options->num_topics; ++i) {
-                dws[i] = NULL;
-            }
-        } else {
-            drs = (ShapeTypeDataReader**) malloc(sizeof(ShapeTypeDataReader*) * options->num_topics);
-            if (drs == NULL) {
-                logger.log_message("Error allocating memory for DataReaders", Verbosity::ERROR);
-                return false;
-            }
-            for (unsigned int i = 0; i < options->num_topics; ++i) {
-                drs[i] = NULL;
-            }
-        }
+        delete_entities();
+        if (dpf && dp) dpf->delete_participant( dp );
+        dp = NULL;
+    }
 
+    //-------------------------------------------------------------
+    bool has_participant()
+    {
+        return dp != NULL;
+    }
 
+    //-------------------------------------------------------------
+    bool create_participant(ShapeOptions *options)
+    {
 #ifndef OBTAIN_DOMAIN_PARTICIPANT_FACTORY
 #define OBTAIN_DOMAIN_PARTICIPANT_FACTORY DomainParticipantFactory::get_instance()
 #endif
-        logger.log_message("Running initialize() function", Verbosity::DEBUG);
+        logger.log_message("Running create_participant() function", Verbosity::DEBUG);
 
-        DomainParticipantFactory *dpf = OBTAIN_DOMAIN_PARTICIPANT_FACTORY;
+        // The participant factory is configured only once, even if the
+        // participant is created again (see run_server())
         if (dpf == NULL) {
-            logger.log_message("failed to create participant factory (missing license?).", Verbosity::ERROR);
-            return false;
-        }
-        logger.log_message("Participant Factory created", Verbosity::DEBUG);
+            dpf = OBTAIN_DOMAIN_PARTICIPANT_FACTORY;
+            if (dpf == NULL) {
+                logger.log_message("failed to create participant factory (missing license?).", Verbosity::ERROR);
+                return false;
+            }
+            logger.log_message("Participant Factory created", Verbosity::DEBUG);
 #ifdef CONFIGURE_PARTICIPANT_FACTORY
-        CONFIGURE_PARTICIPANT_FACTORY
+            CONFIGURE_PARTICIPANT_FACTORY
 #endif
 
 #ifdef RTI_CONNEXT_MICRO
-        if (!config_micro()) {
-            logger.log_message("Error configuring Connext Micro", Verbosity::ERROR);
-            return false;
-        }
+            if (!config_micro()) {
+                logger.log_message("Error configuring Connext Micro", Verbosity::ERROR);
+                return false;
+            }
 #endif
+        }
 
         DDS::DomainParticipantQos dp_qos;
         dpf->get_default_participant_qos(dp_qos);
@@ -1249,13 +1526,55 @@ public:
 #endif
         REGISTER_TYPE(dp, "ShapeType");
 
+        return true;
+    }
+
+    //-------------------------------------------------------------
+    bool create_entities(ShapeOptions *options)
+    {
+        logger.log_message("Running create_entities() function", Verbosity::DEBUG);
+
+        // Initialize entities array
+        topics = (Topic**) malloc(sizeof(Topic*) * options->num_topics);
+        if (topics == NULL) {
+            logger.log_message("Error allocating memory for topics", Verbosity::ERROR);
+            return false;
+        }
+        for (unsigned int i = 0; i < options->num_topics; ++i) {
+            topics[i] = NULL;
+        }
+
+        if (options->publish) {
+            dws = (ShapeTypeDataWriter**) malloc(sizeof(ShapeTypeDataWriter*) * options->num_topics);
+            if (dws == NULL) {
+                logger.log_message("Error allocating memory for DataWriters", Verbosity::ERROR);
+                return false;
+            }
+            for (unsigned int i = 0; i < options->num_topics; ++i) {
+                dws[i] = NULL;
+            }
+        } else {
+            drs = (ShapeTypeDataReader**) malloc(sizeof(ShapeTypeDataReader*) * options->num_topics);
+            if (drs == NULL) {
+                logger.log_message("Error allocating memory for DataReaders", Verbosity::ERROR);
+                return false;
+            }
+            for (unsigned int i = 0; i < options->num_topics; ++i) {
+                drs[i] = NULL;
+            }
+        }
+
         // Create different topics (depending on the number of entities)
         // being the first topic name the provide one, and the rest appending
         // a number after, for example: Square, Square1, Square2...
         for (unsigned int i = 0; i < options->num_topics; ++i) {
             std::string topic_name;
             topic_name = std::string(options->topic_name) + (i > 0 ? std::to_string(i) : "");
-            printf("Create topic: %s\n", topic_name.c_str());
+            if (logger.jsonl()) {
+                JsonEvent("topic_created").add("topic", topic_name).print();
+            } else {
+                printf("Create topic: %s\n", topic_name.c_str());
+            }
             topics[i] = dp->create_topic( topic_name.c_str(), "ShapeType", TOPIC_QOS_DEFAULT, NULL, LISTENER_STATUS_MASK_NONE);
             if (topics[i] == NULL) {
                 logger.log_message("failed to create topic <" + topic_name + ">", Verbosity::ERROR);
@@ -1485,7 +1804,14 @@ public:
         // Create different DataWriters (depending on the number of entities)
         // The DWs are attached to the same array index of the topics.
         for (unsigned int i = 0; i < options->num_topics; ++i) {
-            printf("Create writer for topic: %s color: %s\n", topics[i]->get_name() NAME_ACCESSOR, options->color );
+            if (logger.jsonl()) {
+                JsonEvent("writer_created")
+                        .add("topic", topics[i]->get_name() NAME_ACCESSOR)
+                        .add("color", options->color)
+                        .print();
+            } else {
+                printf("Create writer for topic: %s color: %s\n", topics[i]->get_name() NAME_ACCESSOR, options->color );
+            }
             dws[i] = dynamic_cast<ShapeTypeDataWriter *>(pub->create_datawriter( topics[i], dw_qos, NULL, LISTENER_STATUS_MASK_NONE));
             if (dws[i] == NULL) {
                 logger.log_message("failed to create datawriter[" + std::to_string(i) + "] topic: " + topics[i]->get_name(), Verbosity::ERROR);
@@ -1739,7 +2065,11 @@ public:
                     return false;
                 }
 
-                printf("Create reader for topic: %s\n", cft->get_name() NAME_ACCESSOR);
+                if (logger.jsonl()) {
+                    JsonEvent("reader_created").add("topic", cft->get_name() NAME_ACCESSOR).print();
+                } else {
+                    printf("Create reader for topic: %s\n", cft->get_name() NAME_ACCESSOR);
+                }
                 drs[i] = dynamic_cast<ShapeTypeDataReader *>(sub->create_datareader(cft, dr_qos, NULL, LISTENER_STATUS_MASK_NONE));
                 if (drs[i] == NULL) {
                     logger.log_message("failed to create datareader[" + std::to_string(i) + "] topic: " + topics[i]->get_name(), Verbosity::ERROR);
@@ -1752,7 +2082,11 @@ public:
             // Create different DataReaders (depending on the number of entities)
             // The DRs are attached to the same array index of the topics.
             for (unsigned int i = 0; i < options->num_topics; ++i) {
-                printf("Create reader for topic: %s\n", topics[i]->get_name() NAME_ACCESSOR);
+                if (logger.jsonl()) {
+                    JsonEvent("reader_created").add("topic", topics[i]->get_name() NAME_ACCESSOR).print();
+                } else {
+                    printf("Create reader for topic: %s\n", topics[i]->get_name() NAME_ACCESSOR);
+                }
                 drs[i] = dynamic_cast<ShapeTypeDataReader *>(sub->create_datareader(topics[i], dr_qos, NULL, LISTENER_STATUS_MASK_NONE));
                 if (drs[i] == NULL) {
                     logger.log_message("failed to create datareader[" + std::to_string(i) + "] topic: " + topics[i]->get_name(), Verbosity::ERROR);
@@ -1833,10 +2167,18 @@ public:
 
 #if   defined(RTI_CONNEXT_DDS) || defined(TWINOAKS_COREDX) || defined(INTERCOM_DDS)
             if (options->coherent_set_enabled) {
-                printf("Reading coherent sets, iteration %d\n",n);
+                if (logger.jsonl()) {
+                    JsonEvent("reading_coherent_sets").add("iteration", n).print();
+                } else {
+                    printf("Reading coherent sets, iteration %d\n",n);
+                }
             }
             if (options->ordered_access_enabled) {
-                printf("Reading with ordered access, iteration %d\n",n);
+                if (logger.jsonl()) {
+                    JsonEvent("reading_ordered_access").add("iteration", n).print();
+                } else {
+                    printf("Reading with ordered access, iteration %d\n",n);
+                }
             }
             if (options->coherent_set_enabled || options->ordered_access_enabled) {
                 sub->begin_access();
@@ -1911,23 +2253,24 @@ public:
                             SampleInfo         *sample_info = &sample_infos[n_sample];
 #endif
                             if (sample_info->valid_data)  {
-                                printf("%-10s %-10s %03d %03d [%d]", drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                        sample->color FIELD_ACCESSOR STRING_IN,
-                                        sample->x FIELD_ACCESSOR,
-                                        sample->y FIELD_ACCESSOR,
-                                        sample->shapesize FIELD_ACCESSOR );
+                                int additional_payload = -1;
 #if   defined(OPENDDS)
                                 if (sample->additional_payload_size.length() > 0) {
                                     int additional_payload_index = sample->additional_payload_size.length() - 1;
-                                    printf(" {%u}", sample->additional_payload_size[additional_payload_index] FIELD_ACCESSOR);
+                                    additional_payload = sample->additional_payload_size[additional_payload_index] FIELD_ACCESSOR;
                                 }
 #else
                                 if (DDS_UInt8Seq_get_length(&sample->additional_payload_size FIELD_ACCESSOR) > 0) {
                                     int additional_payload_index = DDS_UInt8Seq_get_length(&sample->additional_payload_size FIELD_ACCESSOR) - 1;
-                                    printf(" {%u}", sample->additional_payload_size FIELD_ACCESSOR [additional_payload_index]);
+                                    additional_payload = sample->additional_payload_size FIELD_ACCESSOR [additional_payload_index];
                                 }
 #endif
-                                printf("\n");
+                                print_sample(drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
+                                        sample->color FIELD_ACCESSOR STRING_IN,
+                                        sample->x FIELD_ACCESSOR,
+                                        sample->y FIELD_ACCESSOR,
+                                        sample->shapesize FIELD_ACCESSOR,
+                                        additional_payload);
 #if defined(EPROSIMA_FAST_DDS)
                                 instance_handle_color[sample_info->instance_handle] = sample->color FIELD_ACCESSOR STRING_IN;
 #elif defined(RTI_CONNEXT_MICRO)
@@ -1948,13 +2291,13 @@ public:
                                 drs[i]->get_key_value(shape_key, sample_info->instance_handle);
 #endif
                                 if (sample_info->instance_state == NOT_ALIVE_NO_WRITERS_INSTANCE_STATE) {
-                                    printf("%-10s %-10s NOT_ALIVE_NO_WRITERS_INSTANCE_STATE\n",
-                                            drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                            shape_key.color FIELD_ACCESSOR STRING_IN);
+                                    print_instance_state(drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
+                                            shape_key.color FIELD_ACCESSOR STRING_IN,
+                                            "NOT_ALIVE_NO_WRITERS_INSTANCE_STATE");
                                 } else if (sample_info->instance_state == NOT_ALIVE_DISPOSED_INSTANCE_STATE) {
-                                    printf("%-10s %-10s NOT_ALIVE_DISPOSED_INSTANCE_STATE\n",
-                                            drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                            shape_key.color FIELD_ACCESSOR STRING_IN);
+                                    print_instance_state(drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
+                                            shape_key.color FIELD_ACCESSOR STRING_IN,
+                                            "NOT_ALIVE_DISPOSED_INSTANCE_STATE");
                                 }
                             }
                         }
@@ -2062,7 +2405,7 @@ public:
             if (options->coherent_set_enabled || options->ordered_access_enabled) {
                 // n also represents the number of samples written per publisher per instance
                 if (options->coherent_set_sample_count != 0 && n % options->coherent_set_sample_count == 0) {
-                    printf("Started Coherent Set\n");
+                    print_event("coherent_set_started", "Started Coherent Set");
                     pub->begin_coherent_changes();
                 }
             }
@@ -2083,16 +2426,17 @@ public:
 #endif
 
                     if (options->print_writer_samples) {
-                        printf("%-10s %-10s %03d %03d [%d]", dws[i]->get_topic()->get_name() NAME_ACCESSOR,
-                                                shape.color FIELD_ACCESSOR STRING_IN,
-                                                shape.x FIELD_ACCESSOR,
-                                                shape.y FIELD_ACCESSOR,
-                                                shape.shapesize FIELD_ACCESSOR);
+                        int additional_payload = -1;
                         if (options->additional_payload_size > 0) {
                             int additional_payload_index = options->additional_payload_size - 1;
-                            printf(" {%u}", shape.additional_payload_size FIELD_ACCESSOR [additional_payload_index]);
+                            additional_payload = shape.additional_payload_size FIELD_ACCESSOR [additional_payload_index];
                         }
-                        printf("\n");
+                        print_sample(dws[i]->get_topic()->get_name() NAME_ACCESSOR,
+                                shape.color FIELD_ACCESSOR STRING_IN,
+                                shape.x FIELD_ACCESSOR,
+                                shape.y FIELD_ACCESSOR,
+                                shape.shapesize FIELD_ACCESSOR,
+                                additional_payload);
                     }
                 }
             }
@@ -2102,7 +2446,7 @@ public:
                 // n also represents the number of samples written per publisher per instance
                 if (options->coherent_set_sample_count != 0
                         && n % options->coherent_set_sample_count == options->coherent_set_sample_count - 1) {
-                    printf("Finished Coherent Set\n");
+                    print_event("coherent_set_finished", "Finished Coherent Set");
                     pub->end_coherent_changes();
                 }
             }
@@ -2165,11 +2509,201 @@ public:
     }
 };
 
+/*************************************************************/
+/* Message printed in server mode when the application is waiting for
+ * the next command */
+#define SERVER_READY_MESSAGE "Waiting for command"
+
+/*************************************************************/
+/* Read a line from the standard input (without the end of line).
+ * Returns false at the end of the input. */
+bool
+read_command(std::string &line)
+{
+    char buffer[1024];
+    line.clear();
+    while (true) {
+        if (fgets(buffer, sizeof(buffer), stdin) == NULL) {
+            if (ferror(stdin) && errno == EINTR) {
+                // Interrupted by SIGINT while waiting for the command
+                clearerr(stdin);
+                continue;
+            }
+            return !line.empty();
+        }
+        line += buffer;
+        if (!line.empty() && line[line.size() - 1] == '\n') {
+            line.erase(line.size() - 1);
+            if (!line.empty() && line[line.size() - 1] == '\r') {
+                line.erase(line.size() - 1);
+            }
+            return true;
+        }
+    }
+}
+
+/*************************************************************/
+/* Split a command in arguments, the same way a shell does with the
+ * command line: arguments are separated by spaces, unless they are
+ * quoted (single or double quotes) or escaped with '\'. */
+std::vector<std::string>
+split_command(const std::string &command)
+{
+    std::vector<std::string> arguments;
+    std::string argument;
+    bool in_argument = false;
+    char quote = '\0';
+    for (size_t i = 0; i < command.size(); ++i) {
+        char c = command[i];
+        if (quote != '\0') {
+            if (c == quote) {
+                quote = '\0';
+            } else if (c == '\\' && quote == '"' && i + 1 < command.size()) {
+                argument += command[++i];
+            } else {
+                argument += c;
+            }
+        } else if (c == '"' || c == '\'') {
+            quote = c;
+            in_argument = true;
+        } else if (c == '\\' && i + 1 < command.size()) {
+            argument += command[++i];
+            in_argument = true;
+        } else if (isspace((unsigned char) c)) {
+            if (in_argument) {
+                arguments.push_back(argument);
+                argument.clear();
+                in_argument = false;
+            }
+        } else {
+            argument += c;
+            in_argument = true;
+        }
+    }
+    if (in_argument) {
+        arguments.push_back(argument);
+    }
+    return arguments;
+}
+
+/*************************************************************/
+/* Parse the options of a 'run' command, as if they were passed in
+ * the command line */
+bool
+parse_command_options(
+        ShapeOptions &options,
+        const char *prog,
+        std::vector<std::string> &arguments)
+{
+    std::vector<char *> argv;
+    argv.push_back(const_cast<char *>(prog));
+    // The first argument is the command
+    for (size_t i = 1; i < arguments.size(); ++i) {
+        argv.push_back(&arguments[i][0]);
+    }
+    argv.push_back(NULL);
+
+    // getopt() keeps its state between calls, it must start again
+#if defined(__APPLE__) || defined(__FreeBSD__) || defined(__NetBSD__) || defined(__OpenBSD__)
+    optreset = 1;
+    optind = 1;
+#else
+    optind = 0;
+#endif
+    return options.parse((int) argv.size() - 1, &argv[0]);
+}
+
+/*************************************************************/
+/* Server mode (--server): run the commands read from the standard input
+ * (see ShapeOptions::print_usage()). The participant is only created
+ * again when a command needs a different one, so the participant creation
+ * and the discovery of the other participants are not repeated for every
+ * command. Returns the exit code of the application. */
+int
+run_server(const char *prog)
+{
+    ShapeApplication shapeApp;
+    // Options used to create the current participant
+    ShapeOptions *participant_options = NULL;
+    std::string command;
+
+    while (read_command(command)) {
+        std::vector<std::string> arguments = split_command(command);
+        if (arguments.empty()) {
+            continue;
+        }
+        if (arguments[0] == "quit") {
+            break;
+        }
+        if (arguments[0] != "run") {
+            logger.log_message("unknown command " + arguments[0], Verbosity::ERROR);
+            printf("%s\n", SERVER_READY_MESSAGE);
+            fflush(stdout);
+            continue;
+        }
+
+        // A SIGINT received before this command must not stop it
+        all_done = 0;
+        // Each command selects its output format
+        logger.output_format(TEXT_OUTPUT_FORMAT);
+
+        ShapeOptions *options = new ShapeOptions();
+        logger.log_message("Parsing command parameters...", Verbosity::DEBUG);
+        if (!parse_command_options(*options, prog, arguments)) {
+            delete options;
+            printf("%s\n", SERVER_READY_MESSAGE);
+            fflush(stdout);
+            continue;
+        }
+
+        if (participant_options != NULL
+                && !participant_options->same_participant(options)) {
+            logger.log_message("Deleting participant...", Verbosity::DEBUG);
+            shapeApp.delete_participant();
+        }
+        if (!shapeApp.has_participant()) {
+            delete participant_options;
+            participant_options = NULL;
+            logger.log_message("Creating participant...", Verbosity::DEBUG);
+            if (shapeApp.create_participant(options)) {
+                participant_options = options;
+            }
+        }
+
+        if (participant_options != NULL) {
+            logger.log_message("Creating entities...", Verbosity::DEBUG);
+            if (shapeApp.create_entities(options)) {
+                logger.log_message("Running ShapeApp...", Verbosity::DEBUG);
+                shapeApp.run(options);
+            }
+            shapeApp.delete_entities();
+            print_event("done", "Done.");
+        }
+        if (participant_options != options) {
+            delete options;
+        }
+        printf("%s\n", SERVER_READY_MESSAGE);
+        fflush(stdout);
+    }
+
+    shapeApp.delete_participant();
+    delete participant_options;
+    return 0;
+}
+
 /*************************************************************/
 int main( int argc, char * argv[] )
 {
     install_sig_handlers();
 
+    /* Print each line as soon as it is complete, also when the output
+     * is a pipe instead of a terminal */
+    setvbuf(stdout, NULL, _IOLBF, BUFSIZ);
+
+    if (argc == 2 && strcmp(argv[1], "--server") == 0) {
+        return run_server(argv[0]);
+    }
+
     ShapeOptions options;
     logger.log_message("Parsing command line parameters...", Verbosity::DEBUG);
     bool parseResult = options.parse(argc, argv);
@@ -2186,7 +2720,7 @@ int main( int argc, char * argv[] )
         return ERROR_RUNNING;
     }
 
-    printf("Done.\n");
+    print_event("done", "Done.");
 
     return 0;
 }
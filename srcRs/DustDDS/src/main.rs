@@ -235,6 +235,13 @@ struct Options {
     /// This only applies if shapesize is increased (-z 0)
     #[clap(short = 'Q', long = "size-modulo")]
     size_modulo: Option<i32>,
+
+    /// run in server mode: the rest of the options are read as commands from the standard input, one command per
+    /// line. "run <options>" creates the entities with the options and runs them until Ctrl+C (or the number of
+    /// iterations), then deletes them. The participant is kept for the next command, unless it changes -d.
+    /// "quit" exits the application
+    #[clap(long = "server", default_value_t = false)]
+    server: bool,
 }
 
 impl Options {
@@ -551,7 +558,7 @@ fn init_publisher(
 fn run_publisher(
     data_writer: &DataWriter<ShapeType>,
     options: Options,
-    all_done: Receiver<()>,
+    all_done: &Receiver<()>,
 ) -> Result<(), RunningError> {
     let mut random_gen = thread_rng();
 
@@ -676,7 +683,7 @@ fn init_subscriber(
 fn run_subscriber(
     data_reader: &DataReader<ShapeType>,
     options: Options,
-    all_done: Receiver<()>,
+    all_done: &Receiver<()>,
 ) -> Result<(), RunningError> {
     while all_done.try_recv().is_err() {
         let mut previous_handle = None;
@@ -728,7 +735,7 @@ fn run_subscriber(
     Ok(())
 }
 
-fn initialize(options: &Options) -> Result<DomainParticipant, InitializeError> {
+fn create_participant(options: &Options) -> Result<DomainParticipant, InitializeError> {
     let participant_factory = DomainParticipantFactory::get_instance();
     let participant = participant_factory.create_participant(
         options.domain_id,
@@ -746,6 +753,10 @@ fn initialize(options: &Options) -> Result<DomainParticipant, InitializeError> {
             StatusKind::LivelinessChanged,
         ],
     )?;
+    Ok(participant)
+}
+
+fn create_topic(participant: &DomainParticipant, options: &Options) -> Result<(), InitializeError> {
     println!("Create topic: {}", options.topic_name);
     let _topic = participant.create_topic::<ShapeType>(
         &options.topic_name,
@@ -754,7 +765,12 @@ fn initialize(options: &Options) -> Result<DomainParticipant, InitializeError> {
         NO_LISTENER,
         NO_STATUS,
     )?;
+    Ok(())
+}
 
+fn initialize(options: &Options) -> Result<DomainParticipant, InitializeError> {
+    let participant = create_participant(options)?;
+    create_topic(&participant, options)?;
     Ok(participant)
 }
 
@@ -816,6 +832,134 @@ impl From<RunningError> for Return {
     }
 }
 
+fn run_entities(
+    participant: &DomainParticipant,
+    options: &Options,
+    all_done: &Receiver<()>,
+) -> Result<(), Return> {
+    if options.publish {
+        let data_writer = init_publisher(participant, options.clone())?;
+        run_publisher(&data_writer, options.clone(), all_done)?;
+    } else {
+        let data_reader = init_subscriber(participant, options.clone())?;
+        run_subscriber(&data_reader, options.clone(), all_done)?;
+    }
+    Ok(())
+}
+
+/// Message printed in server mode when the application is waiting for the next command
+const SERVER_READY_MESSAGE: &str = "Waiting for command";
+
+/// Split a command in arguments, the same way a shell does with the command line: arguments are separated by
+/// spaces, unless they are quoted (single or double quotes) or escaped with '\'.
+fn split_command(command: &str) -> Vec<String> {
+    let mut arguments = Vec::new();
+    let mut argument = String::new();
+    let mut in_argument = false;
+    let mut quote = None;
+    let mut chars = command.chars();
+    while let Some(c) = chars.next() {
+        match quote {
+            Some(q) if c == q => quote = None,
+            Some('"') if c == '\\' => argument.extend(chars.next()),
+            Some(_) => argument.push(c),
+            None if c == '"' || c == '\'' => {
+                quote = Some(c);
+                in_argument = true;
+            }
+            None if c == '\\' => {
+                argument.extend(chars.next());
+                in_argument = true;
+            }
+            None if c.is_whitespace() => {
+                if in_argument {
+                    arguments.push(std::mem::take(&mut argument));
+                    in_argument = false;
+                }
+            }
+            None => {
+                argument.push(c);
+                in_argument = true;
+            }
+        }
+    }
+    if in_argument {
+        arguments.push(argument);
+    }
+    arguments
+}
+
+/// Run a "run <options>" command of the server mode (see Options::server). The participant is created again if the
+/// options need a different one.
+fn run_command(
+    participant: &mut Option<(DomainParticipant, i32)>,
+    arguments: &[String],
+    all_done: &Receiver<()>,
+) -> Result<(), Return> {
+    let options = Options::try_parse_from(
+        std::iter::once("shape_main".to_string()).chain(arguments.iter().cloned()),
+    )
+    .map_err(|e| ParsingError(e.to_string()))?;
+    options.validate()?;
+
+    if let Some((current, domain_id)) = participant.take() {
+        if domain_id == options.domain_id {
+            *participant = Some((current, domain_id));
+        } else {
+            DomainParticipantFactory::get_instance()
+                .delete_participant(&current)
+                .map_err(InitializeError::from)?;
+        }
+    }
+    if participant.is_none() {
+        *participant = Some((create_participant(&options)?, options.domain_id));
+    }
+
+    let (current, _) = participant.as_ref().expect("participant created");
+    let result = create_topic(current, &options)
+        .map_err(Return::from)
+        .and_then(|_| run_entities(current, &options, all_done));
+    current
+        .delete_contained_entities()
+        .expect("Entites beeing deleted");
+    result
+}
+
+/// Run the commands read from the standard input (see Options::server). The participant is only created again when
+/// a command needs a different one, so the participant creation and the discovery of the other participants are not
+/// repeated for every command.
+fn run_server(all_done: &Receiver<()>) -> Result<(), Return> {
+    let mut participant = None;
+    for line in std::io::stdin().lines() {
+        let Ok(line) = line else { break };
+        let arguments = split_command(&line);
+        match arguments.first().map(String::as_str) {
+            None => continue,
+            Some("quit") => break,
+            Some("run") => {
+                // A Ctrl+C received before this command must not stop it
+                while all_done.try_recv().is_ok() {}
+                match run_command(&mut participant, &arguments[1..], all_done) {
+                    Ok(()) => println!("Done."),
+                    Err(e) => println!("Error: {:?}", e),
+                }
+            }
+            Some(command) => println!("unknown command {command}"),
+        }
+        println!("{SERVER_READY_MESSAGE}");
+        std::io::stdout().flush().expect("flush stdout succeeds");
+    }
+    if let Some((current, _)) = participant {
+        current
+            .delete_contained_entities()
+            .expect("Entites beeing deleted");
+        DomainParticipantFactory::get_instance()
+            .delete_participant(&current)
+            .ok();
+    }
+    Ok(())
+}
+
 fn main() -> Result<(), Return> {
     let (tx, rx) = std::sync::mpsc::channel();
 
@@ -823,18 +967,54 @@ fn main() -> Result<(), Return> {
         .expect("Error setting Ctrl-C handler");
 
     let options = Options::parse();
+    if options.server {
+        return run_server(&rx);
+    }
     options.validate()?;
     let participant = initialize(&options)?;
-    if options.publish {
-        let data_writer = init_publisher(&participant, options.clone())?;
-        run_publisher(&data_writer, options.clone(), rx)?;
-    } else {
-        let data_reader = init_subscriber(&participant, options.clone())?;
-        run_subscriber(&data_reader, options.clone(), rx)?;
-    }
+    run_entities(&participant, &options, &rx)?;
     participant
         .delete_contained_entities()
         .expect("Entites beeing deleted");
     println!("Done.");
     Ok(())
 }
+
+#[cfg(test)]
+mod tests {
+    use super::split_command;
+
+    #[test]
+    fn split_command_separates_arguments_by_spaces() {
+        assert_eq!(
+            split_command("  run -P  -t Square\t-r "),
+            ["run", "-P", "-t", "Square", "-r"]
+        );
+        assert!(split_command("   ").is_empty());
+    }
+
+    #[test]
+    fn split_command_keeps_quoted_arguments() {
+        assert_eq!(
+            split_command(r#"run -t "Square 1" -p 'a b' -c"BLUE""#),
+            ["run", "-t", "Square 1", "-p", "a b", "-cBLUE"]
+        );
+        // Empty quoted arguments are kept
+        assert_eq!(split_command(r#"run -p "" ''"#), ["run", "-p", "", ""]);
+        // Each quote only ends with the same quote
+        assert_eq!(
+            split_command(r#"run "it's" 'say "hi"'"#),
+            ["run", "it's", r#"say "hi""#]
+        );
+    }
+
+    #[test]
+    fn split_command_escapes() {
+        assert_eq!(
+            split_command(r#"run a\ b "c\"d" 'e\f'"#),
+            ["run", "a b", "c\"d", "e\\f"]
+        );
+        // An unterminated quote ends at the end of the command
+        assert_eq!(split_command(r#"run "a b"#), ["run", "a b"]);
+    }
+}
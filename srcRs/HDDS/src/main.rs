@@ -87,6 +87,13 @@ impl MatchNotifier {
         }
     }
 
+    /// Forget the local endpoints, once they are deleted (see run_server())
+    fn clear(&self) {
+        self.writer_endpoints.lock().unwrap().clear();
+        self.reader_endpoints.lock().unwrap().clear();
+        self.incompatible_topics.lock().unwrap().clear();
+    }
+
     fn mark_incompatible(&self, topic: &str) {
         self.incompatible_topics
             .lock()
@@ -1032,6 +1039,15 @@ impl ShapeOptions {
         println!("   --datafrag-size <bytes> : set the data fragment size");
         println!("   --cft <expression> : ContentFilteredTopic filter expression");
         println!("   --size-modulo <int> : modulo operation applied to shapesize");
+        println!("   --server : run in server mode, the rest of the options are read as");
+        println!("              commands from the standard input, one command per line:");
+        println!("                - run <options>: create the entities with the options");
+        println!("                  above and run them until Ctrl+C (or the number of");
+        println!("                  iterations). Then the entities are deleted, and the");
+        println!("                  participant is kept for the next command (unless");
+        println!("                  the next command changes -d)");
+        println!("                - quit: exit the application");
+        println!("              It must be the only command line parameter");
     }
 
     fn parse(args: &[String]) -> Option<Self> {
@@ -1857,6 +1873,138 @@ fn run_subscriber(
     Ok(())
 }
 
+// ---------------------------------------------------------------------------
+// Participant
+// ---------------------------------------------------------------------------
+fn create_participant(
+    options: &ShapeOptions,
+) -> Result<(Arc<Participant>, Arc<MatchNotifier>), Box<dyn std::error::Error>> {
+    let participant = Participant::builder("hdds_shape_main")
+        .domain_id(options.domain_id)
+        .with_transport(TransportMode::UdpMulticast)
+        .build()
+        .map_err(|e| format!("failed to create participant: {:?}", e))?;
+
+    // Wire up MatchNotifier for on_publication_matched / on_subscription_matched
+    let notifier = {
+        let guid_bytes = participant.guid().as_bytes();
+        let mut prefix = [0u8; 12];
+        prefix.copy_from_slice(&guid_bytes[..12]);
+        let fsm = participant.discovery();
+        Arc::new(MatchNotifier::new(prefix, fsm.clone()))
+    };
+
+    if let Some(fsm) = participant.discovery() {
+        fsm.register_listener(notifier.clone());
+    }
+
+    Ok((participant, notifier))
+}
+
+// ---------------------------------------------------------------------------
+// Server mode (--server)
+//
+// The commands are read from stdin, one per line (see print_usage()). The
+// participant is only created again when a command uses another domain, so
+// the participant creation and the discovery of the other participants are
+// not repeated for every command. The writers and readers are deleted when
+// run_publisher()/run_subscriber() return.
+// ---------------------------------------------------------------------------
+/// Printed when the application is waiting for the next command
+const SERVER_READY_MESSAGE: &str = "Waiting for command";
+
+/// Split a command in arguments, the same way a shell does with the command
+/// line: arguments are separated by spaces, unless they are quoted (single or
+/// double quotes) or escaped with '\'.
+fn split_command(command: &str) -> Vec<String> {
+    let mut arguments = Vec::new();
+    let mut argument = String::new();
+    let mut in_argument = false;
+    let mut quote = None;
+    let mut chars = command.chars();
+    while let Some(c) = chars.next() {
+        match quote {
+            Some(q) if c == q => quote = None,
+            Some('"') if c == '\\' => argument.extend(chars.next()),
+            Some(_) => argument.push(c),
+            None if c == '"' || c == '\'' => {
+                quote = Some(c);
+                in_argument = true;
+            }
+            None if c == '\\' => {
+                argument.extend(chars.next());
+                in_argument = true;
+            }
+            None if c.is_whitespace() => {
+                if in_argument {
+                    arguments.push(std::mem::take(&mut argument));
+                    in_argument = false;
+                }
+            }
+            None => {
+                argument.push(c);
+                in_argument = true;
+            }
+        }
+    }
+    if in_argument {
+        arguments.push(argument);
+    }
+    arguments
+}
+
+fn run_server(prog: &str) {
+    use std::io::{BufRead, Write};
+
+    let mut participant: Option<(Arc<Participant>, Arc<MatchNotifier>, u32)> = None;
+    for line in std::io::stdin().lock().lines() {
+        let Ok(line) = line else { break };
+        let mut arguments = split_command(&line);
+        match arguments.first().map(String::as_str) {
+            None => continue,
+            Some("quit") => break,
+            Some("run") => {
+                // A SIGINT received before this command must not stop it
+                ALL_DONE.store(false, Ordering::SeqCst);
+                arguments[0] = prog.to_string();
+                match ShapeOptions::parse(&arguments) {
+                    None => ShapeOptions::print_usage(prog),
+                    Some(options) => {
+                        if let Some((_, _, domain_id)) = participant {
+                            if domain_id != options.domain_id {
+                                participant = None;
+                            }
+                        }
+                        if participant.is_none() {
+                            match create_participant(&options) {
+                                Ok((p, notifier)) => {
+                                    participant = Some((p, notifier, options.domain_id))
+                                }
+                                Err(e) => eprintln!("{}", e),
+                            }
+                        }
+                        if let Some((ref p, ref notifier, _)) = participant {
+                            let result = if options.publish {
+                                run_publisher(p, &options, notifier)
+                            } else {
+                                run_subscriber(p, &options, notifier)
+                            };
+                            notifier.clear();
+                            match result {
+                                Ok(()) => println!("Done."),
+                                Err(e) => eprintln!("Error: {:?}", e),
+                            }
+                        }
+                    }
+                }
+            }
+            Some(command) => eprintln!("unknown command {}", command),
+        }
+        println!("{}", SERVER_READY_MESSAGE);
+        std::io::stdout().flush().ok();
+    }
+}
+
 // ---------------------------------------------------------------------------
 // main
 // ---------------------------------------------------------------------------
@@ -1866,6 +2014,10 @@ fn main() {
     rng_seed_once();
 
     let args: Vec<String> = std::env::args().collect();
+    if args.len() == 2 && args[1] == "--server" {
+        run_server(&args[0]);
+        return;
+    }
     let options = match ShapeOptions::parse(&args) {
         Some(opts) => opts,
         None => {
@@ -1874,31 +2026,14 @@ fn main() {
         }
     };
 
-    let participant = match Participant::builder("hdds_shape_main")
-        .domain_id(options.domain_id)
-        .with_transport(TransportMode::UdpMulticast)
-        .build()
-    {
+    let (participant, notifier) = match create_participant(&options) {
         Ok(p) => p,
         Err(e) => {
-            eprintln!("failed to create participant: {:?}", e);
+            eprintln!("{}", e);
             std::process::exit(2);
         }
     };
 
-    // Wire up MatchNotifier for on_publication_matched / on_subscription_matched
-    let notifier = {
-        let guid_bytes = participant.guid().as_bytes();
-        let mut prefix = [0u8; 12];
-        prefix.copy_from_slice(&guid_bytes[..12]);
-        let fsm = participant.discovery();
-        Arc::new(MatchNotifier::new(prefix, fsm.clone()))
-    };
-
-    if let Some(fsm) = participant.discovery() {
-        fsm.register_listener(notifier.clone());
-    }
-
     let result = if options.publish {
         run_publisher(&participant, &options, &notifier)
     } else {
@@ -1912,3 +2047,42 @@ fn main() {
 
     println!("Done.");
 }
+
+#[cfg(test)]
+mod tests {
+    use super::split_command;
+
+    #[test]
+    fn split_command_separates_arguments_by_spaces() {
+        assert_eq!(
+            split_command("  run -P  -t Square\t-r "),
+            ["run", "-P", "-t", "Square", "-r"]
+        );
+        assert!(split_command("   ").is_empty());
+    }
+
+    #[test]
+    fn split_command_keeps_quoted_arguments() {
+        assert_eq!(
+            split_command(r#"run -t "Square 1" -p 'a b' -c"BLUE""#),
+            ["run", "-t", "Square 1", "-p", "a b", "-cBLUE"]
+        );
+        // Empty quoted arguments are kept
+        assert_eq!(split_command(r#"run -p "" ''"#), ["run", "-p", "", ""]);
+        // Each quote only ends with the same quote
+        assert_eq!(
+            split_command(r#"run "it's" 'say "hi"'"#),
+            ["run", "it's", r#"say "hi""#]
+        );
+    }
+
+    #[test]
+    fn split_command_escapes() {
+        assert_eq!(
+            split_command(r#"run a\ b "c\"d" 'e\f'"#),
+            ["run", "a b", "c\"d", "e\\f"]
+        );
+        // An unterminated quote ends at the end of the command
+        assert_eq!(split_command(r#"run "a b"#), ["run", "a b"]);
+    }
+}
@@ -18,6 +18,9 @@ import test_suite_functions as tsf
 #           'apps' : [parameter_list],
 #           'expected_codes' : [expected_return_code_list],
 #           'check_function' : checking_function,
+#           'startup_delay' : seconds,
+#           'depends_on' : [test_case_name_list],
+#           'fan_out' : True,
 #           'title' : 'This is the title of the test',
 #           'description' : 'This is a long description of the test'
 #       },
@@ -32,7 +35,34 @@ import test_suite_functions as tsf
 #         the samples from the publishers. By default, it just checks that
 #         the data is received. In case that it has a different behavior, that
 #         function must be implemented in the test_suite file and the test case
-#         should reference it in this parameter.
+#         should reference it in this parameter. It may also be built from
+#         the conditions of rtps_test_checks.py with check_samples(), for
+#         example tsf.check_samples('check_size_0', tsf.SizesWithin(1, 20),
+#         tsf.SizeStrictlyIncreasing()).
+#       * startup_delay [OPTIONAL]: time (in seconds) waited after starting a
+#         publisher and before starting a subscriber application. By default,
+#         each application is started as soon as the previous one has created
+#         its DataWriter or DataReader. This is needed by tests that require a
+#         gap between the creation of the entities (e.g. durability tests).
+#       * depends_on [OPTIONAL]: names of the Test Cases (from the same
+#         dictionary) that must pass before running this one. If any of them
+#         does not pass, this Test Case is not run and it is reported as
+#         skipped. Dependencies on Test Cases that are not run (for example,
+#         because of --test or --disable-test) are ignored. Only declare real
+#         preconditions: the Test Cases that need data to flow depend on
+#         Test_Domain_0, while the Test Cases that expect no communication
+#         (incompatible QoS, no match) and the Domain tests do not, so they
+#         run even if Test_Domain_0 fails and do not wait for it.
+#       * fan_out [OPTIONAL]: True if the Test Case may run in fan-out mode
+#         (see run_tests.py --fan-out): a single Publisher runs with the
+#         Subscribers of several products at the same time, and each
+#         publisher/subscriber pair gets its own result. The Publisher
+#         ReturnCode is shared by all the pairs, so this is only valid for
+#         Test Cases with one Publisher and one Subscriber in which the
+#         Publisher ReturnCode cannot depend on the Subscribers: the
+#         Publisher is expected to return ReturnCode.OK (not, for example,
+#         INCOMPATIBLE_QOS) and it does not wait for acknowledgments (-w),
+#         because a slow Subscriber would throttle it.
 #       * title: human-readable short description of the test
 #       * description: description of the test behavior and parameters
 #
@@ -79,6 +109,7 @@ rtps_test_suite_1 = {
     'Test_DataRepresentation_0' : {
         'apps' : ['-P -t Square -x 1', '-S -t Square -x 1'],
         'expected_codes' : [ ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Default communication using XCDR1',
         'description' : 'This test covers the interoperability scenario with XCDR1:\n\n'
                         ' * Configures the publisher / subscriber with DATA_REPRESENTATION XCDR version 1\n'
@@ -113,6 +144,7 @@ rtps_test_suite_1 = {
     'Test_DataRepresentation_3' : {
         'apps' : ['-P -t Square -x 2', '-S -t Square -x 2 -b'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Default communication using XCDR2',
         'description' : 'This test covers the interoperability scenario with XCDR2:\n\n'
                         ' * Configures publisher / subscriber with DATA_REPRESENTATION XCDR version 2\n'
@@ -125,6 +157,8 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -b -z 0', '-S -t Square -b'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
         'check_function' : tsf.test_reliability_order,
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between BEST_EFFORT publisher and subscriber',
         'description' : 'Verifies a best effort publisher communicates with a best effort subscriber with no out-of-order '
                             'or duplicate samples\n\n'
@@ -152,6 +186,8 @@ rtps_test_suite_1 = {
     'Test_Reliability_2' : {
         'apps' : ['-P -t Square -r', '-S -t Square -b'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between RELIABLE publisher and BEST_EFFORT subscriber',
         'description' : 'Verifies a reliable publisher communicates with a best effort subscriber\n\n'
                         ' * Configures the publisher with a RELIABLE reliability\n'
@@ -164,6 +200,8 @@ rtps_test_suite_1 = {
     'Test_Reliability_3' : {
         'apps' : ['-P -t Square -r', '-S -t Square -r'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication using reliability RELIABLE',
         'description' : 'Verifies a reliable publisher communicates with a reliable subscriber\n\n'
                         ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
@@ -176,6 +214,7 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -r -k 0 -w', '-S -t Square -r -k 0'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
         'check_function' : tsf.test_reliability_no_losses,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Behavior of RELIABLE reliability',
         'description' : 'Verifies a RELIABLE publisher communicates with a RELIABLE subscriber and samples are received '
                             'in order without any losses or duplicates\n\n'
@@ -191,6 +230,7 @@ rtps_test_suite_1 = {
     'Test_Ownership_0' : {
         'apps' : ['-P -t Square -s -1', '-S -t Square -s -1'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between SHARED OWNERSHIP publisher and subscriber',
         'description' : 'Verifies a shared ownership publisher communicates with a shared '
                             'ownership subscriber\n\n'
@@ -241,6 +281,7 @@ rtps_test_suite_1 = {
             ReturnCode.OK,
             ReturnCode.RECEIVING_FROM_ONE],
         'check_function' : tsf.test_ownership_receivers,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Behavior of EXCLUSIVE OWNERSHIP QoS with publishers of the same instance',
         'description' : 'Verifies an exclusive ownership subscriber receives samples only from '
                             'the highest ownership strength publisher of the same instance\n\n'
@@ -274,6 +315,7 @@ rtps_test_suite_1 = {
             ReturnCode.OK,
             ReturnCode.RECEIVING_FROM_BOTH],
         'check_function' : tsf.test_ownership_receivers,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Behavior of EXCLUSIVE OWNERSHIP QoS with publishers with different instances',
         'description' : 'Verifies an exclusive ownership subscriber receives samples from different '
                             'publishers that publish different instances (ShapeType with different color)\n\n'
@@ -303,6 +345,7 @@ rtps_test_suite_1 = {
             ReturnCode.OK,
             ReturnCode.RECEIVING_FROM_BOTH],
         'check_function' : tsf.test_ownership_receivers,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Behavior of SHARED OWNERSHIP QoS with publishers with the same instance',
         'description' : 'Verifies a shared ownership subscriber receives samples from all '
                             'shared ownership publishers of the different instances\n\n'
@@ -332,6 +375,7 @@ rtps_test_suite_1 = {
             ReturnCode.OK,
             ReturnCode.RECEIVING_FROM_BOTH],
         'check_function' : tsf.test_ownership_receivers,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Behavior of SHARED OWNERSHIP QoS with different instances',
         'description' : 'Verifies a shared ownership subscriber receives samples from all '
                             'shared ownership publishers of different instances\n\n'
@@ -353,6 +397,7 @@ rtps_test_suite_1 = {
     'Test_Deadline_0' : {
         'apps' : ['-P -t Square -f 3000', '-S -t Square -f 5000'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication with publisher deadline smaller than subscriber deadline',
         'description' : 'Verifies there is communication between a publisher with a deadline smaller than the subscriber\n\n'
                         ' * Configures the publisher with DEADLINE of 3 seconds\n'
@@ -364,6 +409,7 @@ rtps_test_suite_1 = {
     'Test_Deadline_1' : {
         'apps' : ['-P -t Square -f 5000', '-S -t Square -f 5000'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication with the same publisher and subscriber deadlines',
         'description' : 'Verifies there is communication between a publisher with the same deadline as the subscriber\n\n'
                         ' * Configures the publisher with DEADLINE of 5 seconds\n'
@@ -405,6 +451,7 @@ rtps_test_suite_1 = {
     'Test_Topic_0' : {
         'apps' : ['-P -t Circle', '-S -t Circle'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication using the same topic: Circle',
         'description' : 'Verifies communication between a publisher and a subscriber using a specific topic ("Circle")\n\n'
                         ' * Configures the publisher and subscriber to use the topic name "Circle"\n'
@@ -428,6 +475,7 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -r -k 0 -c BLUE', '-P -t Square -r -k 0 -c RED', '-S -t Square -r -k 0 --cft "color = \'RED\'"'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK, ReturnCode.RECEIVING_FROM_ONE],
         'check_function' : tsf.test_color_receivers,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Use of Content filter to avoid receiving undesired data (key)',
         'description' : 'Verifies a subscription using a ContentFilteredTopic does not receive data that does not '
                         'pass the filter. The filter is applied to the key "color"\n\n'
@@ -448,6 +496,7 @@ rtps_test_suite_1 = {
         'apps': ['-P -t Square -r -k 0 -z 0 --size-modulo 50', '-S -t Square -r -k 0 --cft "shapesize <= 20"'],
         'expected_codes': [ReturnCode.OK, ReturnCode.OK],
         'check_function': tsf.test_size_less_than_20,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Use of Content filter to avoid receiving undesired data (non-key)',
         'description': 'Verifies a subscription using a ContentFilteredTopic does not receive data that does not '
                        'pass the filter. The filter is applied to the non-key member "shapesize".\n\n'
@@ -463,6 +512,7 @@ rtps_test_suite_1 = {
     'Test_Partition_0' : {
         'apps' : ['-P -t Square -p "p1"', '-S -t Square -p "p1"'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between publisher and subscriber using the same partition',
         'description' : 'Verifies communication between a publisher and a subscriber using the same partition\n\n'
                         ' * Configures the publisher and subscriber to use the PARTITION "p1"\n'
@@ -485,6 +535,7 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -p "p1" -c BLUE', '-P -t Square -p "x1" -c RED', '-S -t Square -p "p*"'],
         'check_function' : tsf.test_color_receivers,
         'expected_codes' : [ReturnCode.OK, ReturnCode.READER_NOT_MATCHED, ReturnCode.RECEIVING_FROM_ONE],
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Usage of a partition expression to receive data only from the corresponding publishers',
         'description' : 'Verifies a subscription using a partition expression only receives data from the corresponding '
                             'publishers\n\n'
@@ -501,6 +552,8 @@ rtps_test_suite_1 = {
     'Test_Durability_0' : {
         'apps' : ['-P -t Square -D v', '-S -t Square -D v'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between VOLATILE publisher and VOLATILE subscriber',
         'description' : 'Verifies a volatile publisher communicates with a volatile subscriber\n\n'
                         ' * Configures the publisher with a VOLATILE durability\n'
@@ -548,6 +601,8 @@ rtps_test_suite_1 = {
     'Test_Durability_4' : {
         'apps' : ['-P -t Square -D l', '-S -t Square -D v'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between TRANSIENT_LOCAL publisher and VOLATILE subscriber',
         'description' : 'Verifies a transient local publisher communicates with a volatile subscriber\n\n'
                         ' * Configures the publisher with a TRANSIENT_LOCAL durability\n'
@@ -559,6 +614,8 @@ rtps_test_suite_1 = {
     'Test_Durability_5' : {
         'apps' : ['-P -t Square -D l', '-S -t Square -D l'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between TRANSIENT_LOCAL publisher and TRANSIENT_LOCAL subscriber',
         'description' : 'Verifies a transient local publisher communicates with a transient local subscriber\n\n'
                         ' * Configures the publisher with a TRANSIENT_LOCAL durability\n'
@@ -594,6 +651,8 @@ rtps_test_suite_1 = {
     'Test_Durability_8' : {
         'apps' : ['-P -t Square -D t', '-S -t Square -D v'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between TRANSIENT publisher and VOLATILE subscriber',
         'description' : 'Verifies a transient publisher communicates with a volatile subscriber\n\n'
                         ' * Configures the publisher with a TRANSIENT durability\n'
@@ -605,6 +664,8 @@ rtps_test_suite_1 = {
     'Test_Durability_9' : {
         'apps' : ['-P -t Square -D t', '-S -t Square -D l'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between TRANSIENT publisher and TRANSIENT_LOCAL subscriber',
         'description' : 'Verifies a transient publisher communicates with a transient local subscriber\n\n'
                         ' * Configures the publisher with a TRANSIENT durability\n'
@@ -616,6 +677,8 @@ rtps_test_suite_1 = {
     'Test_Durability_10' : {
         'apps' : ['-P -t Square -D t', '-S -t Square -D t'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between TRANSIENT publisher and TRANSIENT subscriber',
         'description' : 'Verifies a transient publisher communicates with a transient subscriber\n\n'
                         ' * Configures the publisher with a TRANSIENT durability\n'
@@ -639,6 +702,8 @@ rtps_test_suite_1 = {
     'Test_Durability_12' : {
         'apps' : ['-P -t Square -D p', '-S -t Square -D v'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between PERSISTENT publisher and VOLATILE subscriber',
         'description' : 'Verifies a persistent publisher communicates with a volatile subscriber\n\n'
                         ' * Configures the publisher with a PERSISTENT durability\n'
@@ -650,6 +715,8 @@ rtps_test_suite_1 = {
     'Test_Durability_13' : {
         'apps' : ['-P -t Square -D p', '-S -t Square -D l'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between PERSISTENT publisher and TRANSIENT_LOCAL subscriber',
         'description' : 'Verifies a persistent publisher communicates with a transient local subscriber\n\n'
                         ' * Configures the publisher with a PERSISTENT durability\n'
@@ -661,6 +728,8 @@ rtps_test_suite_1 = {
     'Test_Durability_14' : {
         'apps' : ['-P -t Square -D p', '-S -t Square -D t'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between PERSISTENT publisher and TRANSIENT subscriber',
         'description' : 'Verifies a persistent publisher communicates with a transient subscriber\n\n'
                         ' * Configures the publisher with a PERSISTENT durability\n'
@@ -672,6 +741,8 @@ rtps_test_suite_1 = {
     'Test_Durability_15' : {
         'apps' : ['-P -t Square -D p', '-S -t Square -D p'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'fan_out' : True,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Communication between PERSISTENT publisher and PERSISTENT subscriber',
         'description' : 'Verifies a persistent publisher communicates with a persistent subscriber\n\n'
                         ' * Configures the publisher with a PERSISTENT durability\n'
@@ -689,6 +760,8 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -z 0 -r -k 0 -D v -w', '-S -t Square -r -k 0 -D v'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
         'check_function' : tsf.test_durability_volatile,
+        'startup_delay' : 1,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Test the behavior of the VOLATILE durability',
         'description' : 'Verifies a volatile publisher and subscriber communicates and work as expected\n\n'
                         ' * Configures the publisher / subscriber with a VOLATILE durability\n'
@@ -707,6 +780,8 @@ rtps_test_suite_1 = {
         'apps' : ['-P -t Square -z 0 -r -k 0 -D l -w', '-S -t Square -r -k 0 -D l'],
         'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
         'check_function' : tsf.test_durability_transient_local,
+        'startup_delay' : 1,
+        'depends_on' : ['Test_Domain_0'],
         'title' : 'Test the behavior of the TRANSIENT_LOCAL durability',
         'description' : 'Verifies a transient local publisher and subscriber communicates and work as expected\n\n'
                         ' * Configures the publisher / subscriber with a TRANSIENT_LOCAL durability\n'
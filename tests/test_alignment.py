@@ -0,0 +1,104 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import junitparser
+from lxml import etree
+
+import interoperability_report as ir
+from rtps_test_alignment import RELIABILITY_METRICS, SequenceAlignment
+from rtps_test_utilities import ReturnCode
+
+def align(sent: "list[str]", received: "list[str]") -> SequenceAlignment:
+    alignment = SequenceAlignment()
+    for text in sent:
+        alignment.add_sent(text)
+    for text in received:
+        alignment.align(text)
+    return alignment
+
+def test_complete_stream():
+    alignment = align(['a', 'b', 'c', 'd'], ['b', 'c', 'd'])
+    # The samples sent before the first one received are not lost
+    assert alignment.is_complete()
+    assert alignment.is_exhausted()
+    assert alignment.get_metrics() == {
+        **dict.fromkeys(RELIABILITY_METRICS, 0), 'samples_received': 3}
+
+def test_lost_samples():
+    alignment = align(list('abcdefg'), list('abefg'))
+    assert not alignment.is_complete()
+    assert alignment.get_lost() == 2
+    assert alignment.get_longest_gap() == 2
+
+def test_duplicated_and_not_sent_samples():
+    alignment = align(['a', 'b'], ['a', 'a', 'x', 'b'])
+    metrics = alignment.get_metrics()
+    assert metrics['samples_duplicated'] == 1
+    assert metrics['samples_not_sent'] == 1
+    assert metrics['samples_lost'] == 0
+    assert not alignment.is_complete()
+
+def test_reordered_samples():
+    alignment = align(list('abcdef'), list('adbcef'))
+    metrics = alignment.get_metrics()
+    assert metrics['samples_reordered'] == 2
+    assert metrics['max_reorder_distance'] == 2
+    assert metrics['samples_lost'] == 0
+    assert metrics['longest_gap'] == 0
+
+def test_repeated_texts():
+    # The same text sent twice is aligned with the first one not received
+    alignment = align(['a', 'b', 'a'], ['a', 'b', 'a'])
+    assert alignment.aligned == {0, 1, 2}
+    assert alignment.is_complete()
+
+def test_pending_and_exhausted():
+    alignment = SequenceAlignment()
+    assert alignment.is_exhausted()
+    alignment.add_sent('a')
+    alignment.add_sent('b')
+    assert alignment.is_pending('a')
+    assert not alignment.is_pending('c')
+    alignment.align('b')
+    # The samples sent before the first one received are not pending
+    assert not alignment.is_pending('a')
+    assert alignment.is_exhausted()
+    alignment.add_sent('c')
+    assert not alignment.is_exhausted()
+
+def test_metric_properties_round_trip(tmp_path):
+    parameters = ['-P -t Square', '-S -t Square']
+    results = {
+        'return_codes': [ReturnCode.OK, ReturnCode.DATA_NOT_CORRECT],
+        'teardown_result': [(True, 0.1), (True, 0.2)],
+        'output': ['publisher output', 'subscriber output'],
+        'metrics': [{}, {'samples_lost': 2, 'longest_gap': 1}],
+    }
+    test_case = junitparser.TestCase('suite_Test_A')
+    ir.set_test_result(test_case, parameters,
+                       [ReturnCode.OK, ReturnCode.OK], results, False)
+    suite = junitparser.TestSuite('a---b')
+    suite.add_testcase(test_case)
+    xml = junitparser.JUnitXml()
+    xml.add_testsuite(suite)
+    filename = str(tmp_path / 'report.xml')
+    xml.write(filename)
+
+    # Both the failure and the properties are written
+    element = etree.parse(filename).find('.//testcase')
+    assert [child.tag for child in element] == ['failure', 'properties']
+    properties = {child.get('name'): child.get('value')
+                  for child in element.find('properties')}
+    assert properties == {'Subscriber_1_samples_lost': '2',
+                          'Subscriber_1_longest_gap': '1'}
+
+    # The result is read back
+    test_case = next(iter(next(iter(junitparser.JUnitXml.fromfile(filename)))))
+    assert not test_case.is_passed
+    assert isinstance(test_case.result[0], junitparser.Failure)
@@ -0,0 +1,96 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+import time
+import junitparser
+
+import interoperability_report as ir
+import test_suite_functions as tsf
+from rtps_test_cache import ResultCache, is_cacheable
+from rtps_test_utilities import ReturnCode
+
+PARAMETERS = ['-P -t Square', '-S -t Square']
+EXPECTED_CODES = [ReturnCode.OK, ReturnCode.OK]
+
+def create_file(filename, content: str) -> str:
+    with open(str(filename), 'w') as file:
+        file.write(content)
+    return str(filename)
+
+def get_key(cache: ResultCache, publisher: str, subscriber: str,
+            parameters: "list[str]" = PARAMETERS) -> str:
+    return cache.get_key(publisher, subscriber, parameters, EXPECTED_CODES,
+                         tsf.test_reliability_order, 0)
+
+def test_is_cacheable():
+    assert is_cacheable(junitparser.TestCase('Test_A'))
+    failed = junitparser.TestCase('Test_A')
+    failed.result = [junitparser.Failure('DATA_NOT_RECEIVED')]
+    assert not is_cacheable(failed)
+    unsupported = junitparser.TestCase('Test_A')
+    unsupported.result = [junitparser.Failure('UNSUPPORTED_FEATURE')]
+    assert is_cacheable(unsupported)
+
+def test_key_depends_on_the_content(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    a = create_file(tmp_path / 'a_shape_main', 'a')
+    b = create_file(tmp_path / 'b_shape_main', 'b')
+    copy_of_a = create_file(tmp_path / 'copy_shape_main', 'a')
+    key = get_key(cache, a, b)
+    assert key is not None
+    # The key does not depend on the name or the whitespace
+    assert get_key(cache, copy_of_a, b) == key
+    assert get_key(cache, a, b, ['-P  -t Square', '-S -t  Square']) == key
+    assert get_key(cache, b, a) != key
+    assert get_key(cache, a, b, ['-P -t Square -r', '-S -t Square']) != key
+    assert get_key(cache, str(tmp_path / 'missing_shape_main'), b) is None
+
+def test_rebuilt_application_is_hashed_again(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    a = create_file(tmp_path / 'a_shape_main', 'a')
+    key = get_key(cache, a, a)
+    create_file(a, 'new build')
+    # Another modification time, even if the size is the same
+    os.utime(a, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert get_key(cache, a, a) != key
+
+def test_add_and_get(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert cache.get('key') == (None, None)
+    cache.add('key', junitparser.TestCase('Test_A'))
+    test_case, saved_time = cache.get('key')
+    assert test_case.name == 'Test_A'
+    assert abs(saved_time - time.time()) < 60
+    # No temporary files are left
+    assert os.listdir(cache.directory) == ['key.xml']
+
+def test_evict(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    for key in ['old', 'older', 'new']:
+        cache.add(key, junitparser.TestCase('Test_A'))
+    day = 24 * 3600
+    now = time.time()
+    os.utime(os.path.join(cache.directory, 'older.xml'),
+             (now - 10 * day, now - 10 * day))
+    os.utime(os.path.join(cache.directory, 'old.xml'), (now - 1, now - 1))
+    cache.evict(max_age_days=7, max_size_mb=100)
+    assert sorted(os.listdir(cache.directory)) == ['new.xml', 'old.xml']
+    # The oldest results are removed until the cache is small enough
+    size = os.path.getsize(os.path.join(cache.directory, 'new.xml'))
+    cache.evict(max_age_days=7, max_size_mb=size / (1024 * 1024))
+    assert os.listdir(cache.directory) == ['new.xml']
+
+def test_cache_is_opt_in():
+    arguments = ['-P', 'a_shape_main', '-S', 'b_shape_main']
+    parser = ir.Arguments.parser()
+    assert parser.parse_args(arguments).cache is None
+    assert parser.parse_args(arguments + ['--cache']).cache is not None
+    assert parser.parse_args(arguments + ['--cache', 'directory']).cache \
+        == 'directory'
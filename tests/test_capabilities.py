@@ -0,0 +1,85 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+import stat
+
+from rtps_test_capabilities import Capabilities, get_probed_options, \
+    get_role, probe_option
+
+# shape_main application that does not support the option -D t, and does
+# not create its DataWriter with -x 2 (the result is not known). Each run
+# is logged in 'probes.log'.
+SHAPE_MAIN = '''#!/bin/sh
+echo "$@" >> probes.log
+case "$*" in
+    *"-D t"*) echo "DURABILITY TRANSIENT not supported"; exit 1;;
+    *"-x 2"*) exit 1;;
+esac
+echo "Create writer for topic: CapabilityProbe"
+exec sleep 30
+'''
+
+def create_shape_main(directory) -> str:
+    filename = os.path.join(str(directory), 'probe_shape_main')
+    with open(filename, 'w') as file:
+        file.write(SHAPE_MAIN)
+    os.chmod(filename, os.stat(filename).st_mode | stat.S_IXUSR)
+    return filename
+
+def get_probes(directory) -> "list[str]":
+    with open(os.path.join(str(directory), 'probes.log')) as file:
+        return file.read().splitlines()
+
+def test_get_role():
+    assert get_role('-P -t Square') == '-P'
+    assert get_role('-S -t Square -P') == '-P'
+    assert get_role('-S -t Square') == '-S'
+
+def test_get_probed_options():
+    assert get_probed_options('-P -t Square -r -D t -d 1') == ['-r', '-D t']
+    assert get_probed_options('-S -t Square --cft "x <= 100" -b') == \
+        ['--cft "x <= 100"', '-b']
+
+def test_probe_option(tmp_path):
+    shape_main = create_shape_main(tmp_path)
+    assert probe_option(shape_main, '-P', '-r', 10, str(tmp_path)) is True
+    assert probe_option(shape_main, '-P', '-D t', 10, str(tmp_path)) is False
+    assert probe_option(shape_main, '-P', '-x 2', 10, str(tmp_path)) is None
+
+def test_capabilities_are_probed_once(tmp_path):
+    shape_main = create_shape_main(tmp_path)
+    filename = str(tmp_path / 'capabilities.json')
+    capabilities = Capabilities(filename)
+    for _ in range(2):
+        assert capabilities.get_unsupported_options(
+            shape_main, '-P -t Square -r -D t -x 2', 10, str(tmp_path)) \
+            == ['-D t']
+    assert len(get_probes(tmp_path)) == 3
+    capabilities.save()
+
+    # The known results are saved, the unknown ones are probed again
+    capabilities = Capabilities(filename)
+    assert capabilities.is_supported(shape_main, '-P', '-D t', 10,
+                                     str(tmp_path)) is False
+    assert capabilities.is_supported(shape_main, '-P', '-x 2', 10,
+                                     str(tmp_path)) is None
+    assert len(get_probes(tmp_path)) == 4
+
+def test_capabilities_of_a_new_build(tmp_path):
+    shape_main = create_shape_main(tmp_path)
+    filename = str(tmp_path / 'capabilities.json')
+    capabilities = Capabilities(filename)
+    capabilities.is_supported(shape_main, '-P', '-r', 10, str(tmp_path))
+    capabilities.save()
+    with open(shape_main, 'a') as file:
+        file.write('# New build\n')
+    Capabilities(filename).is_supported(shape_main, '-P', '-r', 10,
+                                        str(tmp_path))
+    assert len(get_probes(tmp_path)) == 2
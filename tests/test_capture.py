@@ -0,0 +1,98 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import tempfile
+import threading
+import pexpect
+
+import test_suite_functions as tsf
+from rtps_test_capture import SampleCapture, SubscriberCapture, can_capture, \
+    capture_ring, read_captures, save_captures, verify_capture
+from rtps_test_ring import SampleRing
+from rtps_test_samples import Sample
+from rtps_test_utilities import ReturnCode
+
+def create_capture() -> SampleCapture:
+    capture = SampleCapture()
+    capture.append(1, 2, 30, 'BLUE', 1.0)
+    capture.append(3, 4, 30, 'RED', 2.0)
+    capture.append(5, 6, 30, 'BLUE', 3.0)
+    return capture
+
+def test_capture_columns():
+    capture = create_capture()
+    assert len(capture) == 3
+    assert capture.colors == ['BLUE', 'RED']
+    assert list(capture.color) == [0, 1, 0]
+    assert capture.get_texts() == ['001 002 [30]', '003 004 [30]',
+                                   '005 006 [30]']
+    assert list(capture.get_samples())[1] == Sample('', 'RED', 3, 4, 30)
+
+def test_capture_write_and_read():
+    capture = create_capture()
+    capture.last = 2
+    with tempfile.TemporaryFile(mode='w+b') as file:
+        capture.write(file)
+        SampleCapture().write(file)
+        file.seek(0)
+        first = SampleCapture.read(file)
+        second = SampleCapture.read(file)
+        assert SampleCapture.read(file) is None
+    assert first.get_texts() == capture.get_texts()
+    assert first.colors == capture.colors
+    assert list(first.color) == list(capture.color)
+    assert list(first.timestamp) == list(capture.timestamp)
+    assert first.last == 2
+    assert len(second) == 0
+
+def test_capture_ring():
+    ring = SampleRing(2, threading.Condition())
+    for i in range(3):
+        ring.put(Sample('Square', 'BLUE', i, i, 30), timestamp=i)
+    capture = capture_ring(ring)
+    # The samples overwritten are not captured
+    assert capture.get_texts() == ['001 001 [30]', '002 002 [30]']
+    assert capture.last is None
+    ring.finish()
+    assert capture_ring(ring).last == 1
+
+def test_save_and_read_captures(tmp_path):
+    filename = str(tmp_path / 'Test_A.capture')
+    save_captures(filename, 'suite_Test_A', ['Publisher_1', 'Subscriber_1'],
+                  ['-P -t Square', '-S -t Square'], [create_capture(), None])
+    header, captures = read_captures(filename)
+    assert header['test_case'] == 'suite_Test_A'
+    assert header['entities'] == ['Publisher_1', 'Subscriber_1']
+    assert captures[0].get_texts() == create_capture().get_texts()
+    assert captures[1] is None
+
+def test_subscriber_capture(tmp_path):
+    filename = tmp_path / 'subscriber.txt'
+    filename.write_text(''.join(f'Square     BLUE       {i:03d} {i:03d} [{i}]\n'
+                                for i in range(1, 6)))
+    child = pexpect.spawnu('cat', [str(filename)])
+    child.expect(r'\[[0-9]+\]')
+    subscriber_capture = SubscriberCapture(
+        tempfile.TemporaryFile(mode='w+b'), max_samples=4)
+    assert subscriber_capture.check_function(child, [], [], 1) == \
+        ReturnCode.OK
+    child.close(force=True)
+    capture = subscriber_capture.read_capture()
+    assert list(capture.size) == [1, 2, 3, 4]
+
+def test_verify_capture():
+    check_function = tsf.test_reliability_order
+    assert can_capture(check_function)
+    capture = create_capture()
+    assert verify_capture(check_function, capture, []) == \
+        ReturnCode.DATA_NOT_CORRECT
+    increasing = SampleCapture()
+    for i in range(1, 4):
+        increasing.append(i, i, i, 'BLUE', i)
+    assert verify_capture(check_function, increasing, []) == ReturnCode.OK
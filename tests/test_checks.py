@@ -0,0 +1,204 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import copy
+import threading
+
+import pexpect
+import pytest
+
+from rtps_test_checks import SOURCE_PUBLISHER, AlignsWithPublisherStream, \
+    AllColorsEqual, MatchesPublisherStream, ReceivesFromBothAfterSwitch, \
+    ReceivesSamples, SizeStrictlyIncreasing, SizesWithin, check_samples, \
+    get_metric_names, run_checks, verify_checks
+from rtps_test_capture import SampleCapture
+from rtps_test_ring import SampleRing, get_ring_readers
+from rtps_test_samples import Sample
+from rtps_test_utilities import ReturnCode
+import test_suite_functions as tsf
+
+def create_samples(values: "list[int]", size: int = 30,
+                   color: str = 'BLUE') -> "list[tuple]":
+    """ Return the samples (x, y, size, color) with x and y in values. """
+    return [(value, value, size, color) for value in values]
+
+# (checks, samples sent by each Publisher, samples received, verdict)
+SCENARIOS = [
+    ([SizesWithin(1, 20), ReceivesSamples(3)],
+     [], create_samples([1, 2, 3], size=5), ReturnCode.OK),
+    ([SizesWithin(1, 20)],
+     [], create_samples([1], size=5) + create_samples([2], size=30),
+     ReturnCode.DATA_NOT_CORRECT),
+    ([ReceivesSamples(5)],
+     [], create_samples([1, 2, 3]), ReturnCode.DATA_NOT_RECEIVED),
+    ([SizeStrictlyIncreasing()],
+     [], [(1, 1, 1, 'BLUE'), (2, 2, 2, 'BLUE'), (3, 3, 2, 'BLUE')],
+     ReturnCode.DATA_NOT_CORRECT),
+    ([AllColorsEqual()],
+     [], create_samples([1, 2]), ReturnCode.RECEIVING_FROM_ONE),
+    ([AllColorsEqual()],
+     [], create_samples([1]) + create_samples([2], color='RED'),
+     ReturnCode.RECEIVING_FROM_BOTH),
+    ([MatchesPublisherStream()],
+     [create_samples(range(1, 6))], create_samples([2, 3, 4, 5]),
+     ReturnCode.OK),
+    ([MatchesPublisherStream()],
+     [create_samples(range(1, 6))], create_samples([2, 4, 5]),
+     ReturnCode.DATA_NOT_CORRECT),
+    ([ReceivesFromBothAfterSwitch()],
+     [], [(1, 1, 10, 'BLUE'), (2, 2, 20, 'BLUE'), (3, 3, 10, 'BLUE')],
+     ReturnCode.RECEIVING_FROM_BOTH),
+    ([ReceivesFromBothAfterSwitch()],
+     [], [(1, 1, 10, 'BLUE'), (2, 2, 20, 'BLUE'), (3, 3, 20, 'BLUE')],
+     ReturnCode.RECEIVING_FROM_ONE),
+    ([ReceivesFromBothAfterSwitch(SOURCE_PUBLISHER)],
+     [create_samples([1, 3, 5]), create_samples([2, 4, 6])],
+     create_samples([1, 2, 3, 4]), ReturnCode.RECEIVING_FROM_BOTH),
+]
+
+def spawn_subscriber(tmp_path, samples: "list[tuple]") -> pexpect.spawn:
+    """ Return a child that prints the samples the way a Subscriber
+        shape_main application does, after matching its first sample.
+    """
+    filename = tmp_path / 'subscriber.txt'
+    filename.write_text(''.join(
+        f'Square     {color:10s} {x:03d} {y:03d} [{size}]\n'
+        for x, y, size, color in samples))
+    child = pexpect.spawnu('cat', [str(filename)])
+    if samples:
+        child.expect(r'\[[0-9]+\]')
+    return child
+
+def get_publisher_readers(
+        publishers: "list[list[tuple]]") -> "tuple[list, list]":
+    """ Return samples_sent and last_sample_saved with the samples each
+        Publisher sent, once all of them have been saved.
+    """
+    condition = threading.Condition()
+    rings = []
+    for samples in publishers:
+        rings.append(SampleRing(len(samples), condition))
+        for x, y, size, color in samples:
+            rings[-1].put(Sample('Square', color, x, y, size))
+        rings[-1].finish()
+    return get_ring_readers(rings)
+
+def run_scenario(tmp_path, checks, publishers, received,
+                 metrics: dict = None) -> ReturnCode:
+    child = spawn_subscriber(tmp_path, received)
+    samples_sent, last_sample_saved = get_publisher_readers(publishers)
+    try:
+        # The checks are started by run_checks(), as in check_samples()
+        return run_checks(child, samples_sent, last_sample_saved, 1,
+                          copy.deepcopy(checks), metrics=metrics)
+    finally:
+        child.close(force=True)
+
+@pytest.mark.parametrize('checks, publishers, received, verdict', SCENARIOS)
+def test_run_checks(tmp_path, checks, publishers, received, verdict):
+    assert run_scenario(tmp_path, checks, publishers, received) == verdict
+
+def test_run_checks_stops_at_max_samples(tmp_path):
+    child = spawn_subscriber(tmp_path, create_samples(range(1, 11)))
+    try:
+        # ReceivesSamples(5) is OK after 5 samples, but 3 are read
+        assert run_checks(child, [], [], 1, [ReceivesSamples(5)],
+                          max_samples=3) == ReturnCode.DATA_NOT_RECEIVED
+    finally:
+        child.close(force=True)
+
+def test_aligns_with_publisher_stream_metrics(tmp_path):
+    metrics = {}
+    assert run_scenario(
+        tmp_path, [AlignsWithPublisherStream()],
+        [create_samples(range(1, 9))], create_samples([1, 2, 4, 3, 5, 7, 8]),
+        metrics) == ReturnCode.DATA_NOT_CORRECT
+    assert metrics['samples_received'] == 7
+    assert metrics['samples_reordered'] == 1
+    assert metrics['max_reorder_distance'] == 1
+    assert metrics['samples_lost'] == 1
+    assert metrics['longest_gap'] == 1
+
+def test_check_samples(tmp_path):
+    check_function = check_samples('check_sizes', SizesWithin(1, 20),
+                                   ReceivesSamples(3), max_samples=3,
+                                   doc='Checks the sizes.')
+    assert check_function.__name__ == 'check_sizes'
+    assert check_function.__doc__ == 'Checks the sizes.'
+    # It belongs to the module that builds it
+    assert check_function.__module__ == __name__
+    assert tsf.test_reliability_order.__module__ == 'test_suite_functions'
+    assert get_metric_names(check_function) == []
+    assert get_metric_names(tsf.test_reliability_no_losses) == \
+        AlignsWithPublisherStream.METRICS
+    child = spawn_subscriber(tmp_path, create_samples([1, 2, 3], size=5))
+    try:
+        assert check_function(child, [], [], 1) == ReturnCode.OK
+    finally:
+        child.close(force=True)
+
+@pytest.mark.parametrize('samples, verdict', [
+    (250, ReturnCode.DATA_NOT_RECEIVED), (251, ReturnCode.OK)])
+def test_size_less_than_20_needs_more_than_250_samples(tmp_path, samples,
+                                                       verdict):
+    child = spawn_subscriber(tmp_path,
+                             create_samples(range(1, samples + 1), size=5))
+    try:
+        assert tsf.test_size_less_than_20(child, [], [], 1) == verdict
+    finally:
+        child.close(force=True)
+
+def test_size_less_than_20_checks():
+    # The same conditions are verified offline
+    checks = tsf.test_size_less_than_20.checks
+    assert [check.count for check in checks
+            if isinstance(check, ReceivesSamples)] == [251]
+    assert tsf.test_size_less_than_20.max_samples == 251
+
+def create_capture(samples: "list[tuple]", last: bool = False) -> SampleCapture:
+    capture = SampleCapture()
+    for timestamp, (x, y, size, color) in enumerate(samples):
+        capture.append(x, y, size, color, timestamp)
+    if last:
+        capture.last = len(samples) - 1
+    return capture
+
+@pytest.mark.parametrize('checks, publishers, received, verdict', SCENARIOS)
+def test_verify_checks(tmp_path, checks, publishers, received, verdict):
+    # The offline verdict is the same as the verdict of run_checks()
+    assert verify_checks(
+        copy.deepcopy(checks), create_capture(received),
+        [create_capture(element, last=True) for element in publishers]) \
+        == verdict
+
+def test_verify_checks_first_failure(tmp_path):
+    # The verdict is the one of the first sample that fails, or the one of
+    # the first check if several checks fail on the same sample, the same
+    # as run_checks()
+    for received, verdict in [
+            ([(1, 1, 30, 'BLUE'), (2, 2, 5, 'RED')],
+             ReturnCode.DATA_NOT_CORRECT),
+            ([(1, 1, 5, 'BLUE'), (2, 2, 30, 'RED')],
+             ReturnCode.RECEIVING_FROM_BOTH)]:
+        checks = [AllColorsEqual(), SizesWithin(1, 20)]
+        assert run_scenario(tmp_path, checks, [], received) == verdict
+        assert verify_checks(checks, create_capture(received), []) == verdict
+
+def test_verify_checks_metrics(tmp_path):
+    publishers = [create_samples(range(1, 9))]
+    received = create_samples([1, 2, 4, 3, 5, 7, 8])
+    run_metrics = {}
+    run_scenario(tmp_path, [AlignsWithPublisherStream()], publishers,
+                 received, run_metrics)
+    verify_metrics = {}
+    assert verify_checks(
+        [AlignsWithPublisherStream()], create_capture(received),
+        [create_capture(publishers[0], last=True)], verify_metrics) \
+        == ReturnCode.DATA_NOT_CORRECT
+    assert verify_metrics == run_metrics
@@ -0,0 +1,72 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import gzip
+import io
+import os
+
+from rtps_test_console import ConsoleCapture
+
+def test_write_partial_lines():
+    capture = ConsoleCapture(io.StringIO(), 2)
+    for data in ['line ', '1\nline 2', '\n', 'line 3\nline', ' 4']:
+        capture.write(data)
+    assert capture.elided_lines == 0
+    assert capture.getvalue() == 'line 1\nline 2\nline 3\nline 4'
+
+def test_getvalue_with_elided_lines():
+    capture = ConsoleCapture(io.StringIO(), 2)
+    capture.write(''.join(f'line {i}\n' for i in range(1, 11)))
+    # The first and the last two lines are kept
+    assert capture.elided_lines == 6
+    assert capture.getvalue() == \
+        'line 1\nline 2\n[... 6 lines not shown ...]\nline 9\nline 10\n'
+
+def test_all_the_lines_are_kept_with_max_lines_0():
+    capture = ConsoleCapture(io.StringIO(), 0)
+    output = ''.join(f'line {i}\n' for i in range(1, 1001))
+    capture.write(output)
+    assert capture.elided_lines == 0
+    assert capture.getvalue() == output
+
+def test_close_writes_the_output_kept(tmp_path):
+    capture = ConsoleCapture(open(tmp_path / 'output.txt', 'w+t'), 1)
+    capture.write('line 1\nline 2\nline 3\nline 4')
+    capture.close()
+    capture.close()  # closing again does nothing
+    assert capture.read_output() == \
+        'line 1\n[... 1 lines not shown ...]\nline 3\nline 4'
+
+def test_full_log_with_elided_lines(tmp_path):
+    full_log_filename = str(tmp_path / 'Test_A_Publisher_1.log.gz')
+    capture = ConsoleCapture(io.StringIO(), 1, full_log_filename)
+    output = 'line 1\nline 2\nline 3\nline 4\n'
+    capture.write(output)
+    assert f'see {full_log_filename}' in capture.getvalue()
+    capture.close()
+    assert capture.get_full_log_filename() == full_log_filename
+    with gzip.open(full_log_filename, 'rt', encoding='utf-8') as file:
+        assert file.read() == output
+
+def test_full_log_is_deleted_if_no_line_is_elided(tmp_path):
+    full_log_filename = str(tmp_path / 'Test_A_Publisher_1.log.gz')
+    capture = ConsoleCapture(io.StringIO(), 10, full_log_filename)
+    capture.write('line 1\nline 2\n')
+    assert os.path.exists(full_log_filename)
+    capture.close()
+    assert not os.path.exists(full_log_filename)
+    assert capture.get_full_log_filename() is None
+
+def test_full_log_of_a_previous_run_is_deleted(tmp_path):
+    full_log_filename = tmp_path / 'Test_A_Publisher_1.log.gz'
+    full_log_filename.write_bytes(b'previous run')
+    capture = ConsoleCapture(io.StringIO(), 10, str(full_log_filename))
+    assert not full_log_filename.exists()
+    capture.close()
+    assert capture.get_full_log_filename() is None
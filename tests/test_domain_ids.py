@@ -0,0 +1,47 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import interoperability_report as ir
+
+def test_get_domain_ids():
+    assert ir.get_domain_ids(['-P -t Square', '-S -t Square -d 1',
+                              '-P -d 12 -t Square']) == [0, 1, 12]
+
+def test_get_domain_block_size():
+    test_cases = [
+        ('suite', 'Test_A', {'apps': ['-P -t Square', '-S -t Square']}),
+        ('suite', 'Test_B', {'apps': ['-P -d 1', '-S -d 0']}),
+    ]
+    assert ir.get_domain_block_size(test_cases) == 2
+    assert ir.get_domain_block_size([]) == 1
+
+def test_rewrite_domain_ids_keeps_offsets():
+    parameters = ['-P -t Square -d 1 -r', '-S -t Square']
+    assert ir.rewrite_domain_ids(parameters, 10) == \
+        ['-P -t Square -d 11 -r', '-S -t Square -d 10']
+    # Other options that contain a 'd' are not modified
+    assert ir.rewrite_domain_ids(['-P -D v -d 0'], 4) == ['-P -D v -d 4']
+
+def test_domain_id_pool_blocks_are_disjoint():
+    pool = ir.DomainIdPool(block_size=3, num_blocks=4)
+    blocks = [pool.acquire() for _ in range(4)]
+    assert sorted(blocks) == [0, 3, 6, 9]
+    pool.release(blocks[1])
+    assert pool.acquire() == blocks[1]
+
+def test_domain_id_pool_is_limited_by_max_domain_id():
+    block_size = 100
+    pool = ir.DomainIdPool(block_size=block_size, num_blocks=10)
+    blocks = []
+    for _ in range((ir.MAX_DOMAIN_ID + 1) // block_size):
+        blocks.append(pool.acquire())
+    assert all(element + block_size - 1 <= ir.MAX_DOMAIN_ID
+               for element in blocks)
+    # There are no more blocks until one is released
+    assert pool._DomainIdPool__free_blocks.empty()
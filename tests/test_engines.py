@@ -0,0 +1,229 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+import sys
+
+import pytest
+
+import interoperability_report as ir
+from rtps_test_utilities import ReturnCode, basic_check
+import test_suite_functions as tsf
+
+EMULATOR = f'{sys.executable} ' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'rtps_test_emulator.py')
+
+# Publisher that creates its DataWriter and matches, but ignores SIGINT, so
+# it is forcefully terminated.
+IGNORES_SIGINT = '''#!/bin/sh
+trap "" INT
+echo "Create topic: Square"
+echo "Create writer for topic: Square color: BLUE"
+echo "on_publication_matched() topic: 'Square'  type: 'ShapeType'"
+while true; do sleep 0.1; done
+'''
+
+# Application that prints 'Create topic:' and, after the number of seconds
+# of its first argument, creates its DataWriter or DataReader. It appends
+# the time it starts and the time it is ready to the file of its second
+# argument.
+DELAYED_READY = f'''#!{sys.executable}
+import signal
+import sys
+import time
+
+role = 'Publisher' if '-P' in sys.argv else 'Subscriber'
+
+def log_event(event: str):
+    with open(sys.argv[2], 'a') as file:
+        file.write(f'{{role}} {{event}} {{time.monotonic()}}\\n')
+
+signal.signal(signal.SIGINT, lambda signum, frame: sys.exit(0))
+log_event('start')
+print('Create topic: Square', flush=True)
+time.sleep(float(sys.argv[1]))
+log_event('ready')
+if role == 'Publisher':
+    print('Create writer for topic: Square color: BLUE')
+    print("on_publication_matched() topic: 'Square'  type: 'ShapeType'")
+else:
+    print('Create reader for topic: Square')
+    print('Square     BLUE       001 001 [20]')
+sys.stdout.flush()
+while True:
+    time.sleep(0.1)
+'''
+
+@pytest.fixture(scope='module')
+def asyncio_engine():
+    engine = ir.AsyncioEngine()
+    yield engine
+    engine.close()
+
+def run_engines(
+        asyncio_engine: ir.AsyncioEngine,
+        parameters: "list[str]",
+        name_executables: "list[str]" = None,
+        check_function: "function" = basic_check,
+        timeout: float = 2,
+        io_backend: str = 'pty',
+        stage_timeouts: "dict[str, float]" = None,
+        before_run: "function" = None) -> "list[dict]":
+    """ Run the shape_main applications (by default, the emulator) with the
+        multiprocessing engine and with the asyncio engine, and return the
+        results of both (see run_shape_main_applications()). The
+        ReturnCodes must be the same. By default, all the stages use
+        timeout. before_run is called before running each engine.
+    """
+    if name_executables is None:
+        name_executables = [EMULATOR] * len(parameters)
+    if stage_timeouts is None:
+        stage_timeouts = ir.get_stage_timeouts(None, None, None, None,
+                                               parameters, timeout)
+    results = []
+    for engine in [None, asyncio_engine]:
+        if before_run is not None:
+            before_run()
+        results.append(ir.run_shape_main_applications(
+            name_executables, parameters, False, timeout, check_function,
+            None, None, None, stage_timeouts, asyncio_engine=engine,
+            io_backend=io_backend))
+    assert results[0]['return_codes'] == results[1]['return_codes']
+    return results
+
+@pytest.mark.parametrize('io_backend', ['pty', 'pipe'])
+def test_engines_pass(asyncio_engine, io_backend):
+    for result in run_engines(
+            asyncio_engine,
+            ['-P -t Square -w -z 0 --write-period 1',
+             '-S -t Square -z 0 --write-period 1'],
+            check_function=tsf.test_reliability_order,
+            io_backend=io_backend):
+        assert result['return_codes'] == [ReturnCode.OK, ReturnCode.OK]
+        assert [graceful for graceful, _ in result['teardown_result']] == \
+            [True, True]
+        assert 'Create writer for topic: Square' in result['output'][0]
+
+def test_engines_eof_before_the_topic(asyncio_engine):
+    # The emulator exits at once with -P and -S
+    for result in run_engines(asyncio_engine,
+                              ['-P -S -t Square', '-S -t Square']):
+        assert result['return_codes'] == \
+            [ReturnCode.TOPIC_NOT_CREATED, ReturnCode.OK]
+
+def test_engines_eof_while_sending_samples(asyncio_engine):
+    # The applications exit after 3 samples: the Publisher keeps the
+    # samples it sent and the check function stops at the end of the
+    # Subscriber output
+    for result in run_engines(
+            asyncio_engine,
+            ['-P -t Square -w -z 0 --write-period 0 --num-iterations 3',
+             '-S -t Square -z 0 --write-period 0 --num-iterations 3'],
+            check_function=tsf.test_reliability_order):
+        assert result['return_codes'] == [ReturnCode.OK, ReturnCode.OK]
+        assert result['output'][0].count('Square     BLUE') == 3
+
+def test_engines_timeout(asyncio_engine):
+    # The application does not print anything
+    for result in run_engines(asyncio_engine, ['-P -t Square', '-S -t Square'],
+                              name_executables=['sh -c "sleep 30" --',
+                                                EMULATOR],
+                              timeout=0.5):
+        assert result['return_codes'] == \
+            [ReturnCode.TOPIC_NOT_CREATED, ReturnCode.OK]
+        assert result['stage_durations'][0] == {}
+
+def test_engines_timeout_while_sending_samples(asyncio_engine):
+    # The Publisher prints the first sample at once, then one every 5 s
+    for result in run_engines(asyncio_engine,
+                              ['-P -t Square -w --write-period 5000',
+                               '-S -t Square --write-period 5000'],
+                              timeout=0.5):
+        assert result['return_codes'] == \
+            [ReturnCode.DATA_NOT_SENT, ReturnCode.OK]
+        assert 'pub_data' in result['stage_durations'][0]
+
+def test_engines_teardown(asyncio_engine, tmp_path, monkeypatch):
+    ignores_sigint = tmp_path / 'ignores_sigint_shape_main_linux'
+    ignores_sigint.write_text(IGNORES_SIGINT)
+    os.chmod(ignores_sigint, 0o755)
+    monkeypatch.setattr(ir, 'MAX_TEARDOWN_TIMEOUT', 1)
+    for result in run_engines(asyncio_engine, ['-P -t Square', '-S -t Square'],
+                              name_executables=[str(ignores_sigint),
+                                                EMULATOR]):
+        assert result['return_codes'] == [ReturnCode.OK, ReturnCode.OK]
+        # The Publisher is killed once its teardown timeout expires
+        graceful, stop_time = result['teardown_result'][0]
+        assert not graceful
+        assert 1 <= stop_time < 10
+        assert result['teardown_result'][1][0]
+
+def run_delayed_ready(
+        asyncio_engine: ir.AsyncioEngine,
+        tmp_path,
+        delay: float,
+        timeout: float,
+        stage_timeout: float) -> "list[list[tuple]]":
+    """ Run a Publisher that is ready after delay seconds and a Subscriber
+        (DELAYED_READY) with both engines. Return, for each engine, the
+        events the applications logged: (entity, event, time).
+    """
+    name_executable = tmp_path / 'delayed_shape_main_linux'
+    name_executable.write_text(DELAYED_READY)
+    os.chmod(name_executable, 0o755)
+    log = tmp_path / 'events.log'
+    events = []
+
+    def save_events():
+        if log.exists():
+            events.append(read_events(log))
+            log.unlink()
+
+    results = run_engines(
+        asyncio_engine, ['-P -t Square', '-S -t Square'],
+        name_executables=[f'{name_executable} {delay} {log}',
+                          f'{name_executable} 0 {log}'],
+        timeout=timeout,
+        stage_timeouts={stage: stage_timeout for stage in
+                        ir.PUBLISHER_STAGES + ir.SUBSCRIBER_STAGES},
+        before_run=save_events)
+    save_events()
+    for result in results:
+        assert result['return_codes'] == [ReturnCode.OK, ReturnCode.OK]
+    return events
+
+def read_events(log) -> "list[tuple]":
+    events = []
+    for line in log.read_text().splitlines():
+        entity, event, timestamp = line.split()
+        events.append((entity, event, float(timestamp)))
+    return events
+
+def test_next_entity_starts_when_the_previous_one_is_ready(
+        asyncio_engine, tmp_path):
+    for events in run_delayed_ready(asyncio_engine, tmp_path, delay=0.5,
+                                    timeout=5, stage_timeout=5):
+        # The Subscriber starts once the Publisher has printed
+        # 'Create writer for topic'
+        assert [event[:2] for event in events] == [
+            ('Publisher', 'start'), ('Publisher', 'ready'),
+            ('Subscriber', 'start'), ('Subscriber', 'ready')]
+        assert events[1][2] - events[0][2] >= 0.5
+
+def test_next_entity_starts_if_the_previous_one_is_not_ready(
+        asyncio_engine, tmp_path):
+    # The Publisher takes longer than two timeouts to create its DataWriter
+    # (its stage timeouts are longer), so the Subscriber does not wait for it
+    for events in run_delayed_ready(asyncio_engine, tmp_path, delay=3,
+                                    timeout=0.5, stage_timeout=10):
+        assert [event[:2] for event in events] == [
+            ('Publisher', 'start'), ('Subscriber', 'start'),
+            ('Subscriber', 'ready'), ('Publisher', 'ready')]
+        assert 1 <= events[1][2] - events[0][2] < 3
@@ -0,0 +1,120 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import json
+import re
+
+import pexpect.expect
+
+from rtps_test_events import EVENT_TEXT, ShapeMainEvents, format_event, \
+    parse_event
+
+LISTENER = '"topic": "Square", "type": "ShapeType"'
+LISTENER_TEXT = "topic: 'Square'  type: 'ShapeType'"
+
+# (line printed with the JSONL output format, line printed with the text
+# output format) of each event
+EVENTS = [
+    ('{"event": "topic_created", "time": 1.5, "topic": "Square"}',
+     'Create topic: Square'),
+    ('{"event": "writer_created", "time": 1.5, "topic": "Square", '
+        '"color": "BLUE"}',
+     'Create writer for topic: Square color: BLUE'),
+    ('{"event": "reader_created", "time": 1.5, "topic": "Square"}',
+     'Create reader for topic: Square'),
+    ('{"event": "on_inconsistent_topic", "time": 1.5, ' + LISTENER + '}',
+     f'on_inconsistent_topic() {LISTENER_TEXT}'),
+    ('{"event": "on_offered_incompatible_qos", "time": 1.5, ' + LISTENER
+        + ', "policy_id": 11, "policy": "RELIABILITY"}',
+     f'on_offered_incompatible_qos() {LISTENER_TEXT} : 11 (RELIABILITY)'),
+    ('{"event": "on_requested_incompatible_qos", "time": 1.5, ' + LISTENER
+        + ', "policy_id": 2, "policy": "DURABILITY"}',
+     f'on_requested_incompatible_qos() {LISTENER_TEXT} : 2 (DURABILITY)'),
+    ('{"event": "on_publication_matched", "time": 1.5, ' + LISTENER
+        + ', "current_count": 1, "current_count_change": 1}',
+     f'on_publication_matched() {LISTENER_TEXT} : matched readers 1 '
+        '(change = 1)'),
+    ('{"event": "on_subscription_matched", "time": 1.5, ' + LISTENER
+        + ', "current_count": 0, "current_count_change": -1}',
+     f'on_subscription_matched() {LISTENER_TEXT} : matched writers 0 '
+        '(change = -1)'),
+    ('{"event": "on_offered_deadline_missed", "time": 1.5, ' + LISTENER
+        + ', "total_count": 3, "total_count_change": 1}',
+     f'on_offered_deadline_missed() {LISTENER_TEXT} : (total = 3, change = 1)'),
+    ('{"event": "on_requested_deadline_missed", "time": 1.5, ' + LISTENER
+        + ', "total_count": 3, "total_count_change": 1}',
+     f'on_requested_deadline_missed() {LISTENER_TEXT} : '
+        '(total = 3, change = 1)'),
+    ('{"event": "on_liveliness_lost", "time": 1.5, ' + LISTENER
+        + ', "total_count": 1, "total_count_change": 1}',
+     f'on_liveliness_lost() {LISTENER_TEXT} : (total = 1, change = 1)'),
+    ('{"event": "on_liveliness_changed", "time": 1.5, ' + LISTENER
+        + ', "alive_count": 0, "not_alive_count": 1}',
+     f'on_liveliness_changed() {LISTENER_TEXT} : (alive = 0, not_alive = 1)'),
+    ('{"event": "sample", "time": 1.5, "topic": "Square", "color": "BLUE", '
+        '"x": 91, "y": 152, "size": 30}',
+     'Square     BLUE       091 152 [30]'),
+    ('{"event": "instance_state", "time": 1.5, "topic": "Square", '
+        '"color": "RED", "state": "NOT_ALIVE_DISPOSED_INSTANCE_STATE"}',
+     'Square     RED        NOT_ALIVE_DISPOSED_INSTANCE_STATE'),
+    ('{"event": "reading_coherent_sets", "time": 1.5, "iteration": 4}',
+     'Reading coherent sets, iteration 4'),
+    ('{"event": "reading_ordered_access", "time": 1.5, "iteration": 4}',
+     'Reading with ordered access, iteration 4'),
+    ('{"event": "coherent_set_started", "time": 1.5}',
+     'Started Coherent Set'),
+    ('{"event": "coherent_set_finished", "time": 1.5}',
+     'Finished Coherent Set'),
+    ('{"event": "log", "time": 1.5, "message": "Waiting for command"}',
+     'Waiting for command'),
+    ('{"event": "done", "time": 1.5}',
+     'Done.'),
+    ('Error: DDS implementation message',
+     'Error: DDS implementation message'),
+]
+
+def test_format_event_reproduces_the_text_output():
+    for line, text in EVENTS:
+        assert format_event(parse_event(line)) == text
+    # All the events are tested
+    assert {parse_event(line)['event'] for line, _ in EVENTS} == \
+        set(EVENT_TEXT)
+
+def test_format_event_of_samples_with_additional_payload():
+    event = parse_event(
+        '{"event": "sample", "time": 1.5, "topic": "Square", '
+        '"color": "BLUE", "x": 5, "y": 10, "size": 30, '
+        '"additional_payload": 255}')
+    assert format_event(event) == 'Square     BLUE       005 010 [30] {255}'
+
+def test_parse_event_of_lines_that_are_not_events():
+    for line in ['not JSON', '', '{"event"', '[1, 2]', '"text"',
+                 '{"message": "no event"}']:
+        event = parse_event(line)
+        assert event == {'event': 'output', 'message': line}
+        assert format_event(event) == line
+
+def test_format_event_of_unknown_events():
+    event = {'event': 'unknown', 'time': 1.5}
+    assert format_event(event) == json.dumps(event)
+    # Known event without all its fields
+    event = {'event': 'topic_created', 'time': 1.5}
+    assert format_event(event) == json.dumps(event)
+
+def test_shape_main_events_search_lines_split_in_chunks():
+    events = ShapeMainEvents(None)
+    searcher = pexpect.expect.searcher_re([re.compile('Create topic:')])
+    line = '{"event": "topic_created", "time": 1.5, "topic": "Square"}\n'
+    events.feed('not an event\n' + line[:10])
+    assert events.search(searcher) is None
+    events.feed(line[10:])
+    assert events.search(searcher) == 0
+    assert events.before == 'not an event\r\n'
+    assert events.after == 'Create topic:'
+    assert events.event['topic'] == 'Square'
@@ -0,0 +1,99 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import pytest
+
+import interoperability_report as ir
+from rtps_test_utilities import ReturnCode
+import test_suite
+
+FAN_OUT_TEST_CASE = {
+    'apps' : ['-P -t Square -r', '-S -t Square -r'],
+    'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+    'fan_out' : True,
+}
+
+def get_pair_options(publisher: str, subscriber: str) -> dict:
+    return ir.get_options(ir.Arguments.parser().parse_args(
+        ['-P', publisher, '-S', subscriber]))
+
+def test_is_fan_out_test_case():
+    assert ir.is_fan_out_test_case(FAN_OUT_TEST_CASE)
+    # Not marked with 'fan_out'
+    assert not ir.is_fan_out_test_case(
+        {**FAN_OUT_TEST_CASE, 'fan_out': False})
+    assert not ir.is_fan_out_test_case(
+        {key: value for key, value in FAN_OUT_TEST_CASE.items()
+         if key != 'fan_out'})
+    # More than one Publisher or Subscriber
+    assert not ir.is_fan_out_test_case({
+        **FAN_OUT_TEST_CASE,
+        'apps': FAN_OUT_TEST_CASE['apps'] + ['-S -t Square -r'],
+        'expected_codes': [ReturnCode.OK] * 3})
+    # The Subscriber runs first
+    assert not ir.is_fan_out_test_case({
+        **FAN_OUT_TEST_CASE,
+        'apps': list(reversed(FAN_OUT_TEST_CASE['apps']))})
+    # The Publisher ReturnCode depends on the Subscribers
+    assert not ir.is_fan_out_test_case({
+        **FAN_OUT_TEST_CASE,
+        'expected_codes': [ReturnCode.INCOMPATIBLE_QOS,
+                           ReturnCode.INCOMPATIBLE_QOS]})
+    assert not ir.is_fan_out_test_case({
+        **FAN_OUT_TEST_CASE,
+        'apps': ['-P -t Square -r -w', '-S -t Square -r']})
+
+def test_real_test_suite_fan_out():
+    # All the Test Cases marked with 'fan_out' can run in fan-out mode
+    for name, parameters in test_suite.rtps_test_suite_1.items():
+        if parameters.get('fan_out', False):
+            assert ir.is_fan_out_test_case(parameters), name
+
+def test_run_fan_out_test_case(monkeypatch):
+    pair_options = [get_pair_options('dir/a_shape_main', f'dir/{name}_shape_main')
+                    for name in ['b', 'c', 'd']]
+    calls = []
+
+    def run_shape_main_applications(name_executables, parameters, **kwargs):
+        calls.append((name_executables, parameters))
+        # The Subscriber of the second pair does not receive data
+        return_codes = [ReturnCode.OK, ReturnCode.OK,
+                        ReturnCode.DATA_NOT_RECEIVED, ReturnCode.OK]
+        return {
+            'return_codes': return_codes,
+            'teardown_result': [(True, 0.1)] * len(parameters),
+            'stage_durations': [{}] * len(parameters),
+            'output': [''] * len(parameters),
+            'captures': [None] * len(parameters),
+        }
+    monkeypatch.setattr(ir, 'run_shape_main_applications',
+                        run_shape_main_applications)
+
+    cases = ir.run_fan_out_test_case(
+        pair_options, ir.DEFAULT_TIMEOUT, 'example_suite', 'Test_A',
+        FAN_OUT_TEST_CASE)
+
+    # A single Publisher runs with the Subscribers of all the pairs
+    assert len(calls) == 1
+    name_executables, parameters = calls[0]
+    assert name_executables == [pair_options[0]['publisher']] + \
+        [options['subscriber'] for options in pair_options]
+    assert ir.get_entity_types(parameters) == \
+        ['Publisher_1', 'Subscriber_1', 'Subscriber_2', 'Subscriber_3']
+    # Each pair gets its own result, with the ReturnCode of its Subscriber
+    assert len(cases) == 3
+    assert all(case.name == 'example_suite_Test_A' for case in cases)
+    assert [case.is_passed for case in cases] == [True, False, True]
+
+def test_run_fan_out_test_case_rejects_other_test_cases():
+    with pytest.raises(RuntimeError):
+        ir.run_fan_out_test_case(
+            [get_pair_options('a_shape_main', 'b_shape_main')],
+            ir.DEFAULT_TIMEOUT, 'example_suite', 'Test_A',
+            {**FAN_OUT_TEST_CASE, 'fan_out': False})
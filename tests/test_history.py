@@ -0,0 +1,97 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import interoperability_report as ir
+import rtps_test_history
+from rtps_test_history import TimingHistory, adaptive_timeout, percentile
+
+PUBLISHER = 'dir/connext_dds-7.3.0_shape_main_linux'
+SUBSCRIBER = 'dir/opendds-3.28_shape_main_linux'
+
+def test_timing_history_keeps_the_latest_values(tmp_path):
+    filename = str(tmp_path / 'history.json')
+    history = TimingHistory(filename)
+    for i in range(rtps_test_history.MAX_VALUES_PER_KEY + 5):
+        history.add('key', i + 0.12345)
+    values = history.get('key')
+    assert len(values) == rtps_test_history.MAX_VALUES_PER_KEY
+    assert values[0] == 5.123
+    assert history.get('other') == []
+    history.save()
+    assert TimingHistory(filename).get('key') == values
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 100) == 5
+    assert percentile([7], 95) == 7
+
+def test_adaptive_timeout_clamping():
+    # Not enough history
+    assert adaptive_timeout([1, 1], minimum=3, maximum=15, margin=2) == 15
+    # 2 * 1 + 2 is less than the minimum
+    assert adaptive_timeout([0.5, 1, 1], minimum=5, maximum=15, margin=2) == 5
+    assert adaptive_timeout([2, 3, 4], minimum=3, maximum=15, margin=2) == 10
+    # 2 * 10 + 2 is more than the maximum
+    assert adaptive_timeout([1, 2, 10], minimum=3, maximum=15, margin=2) == 15
+
+def test_get_write_period():
+    assert ir.get_write_period(['-P -t Square', '-S -t Square']) is None
+    assert ir.get_write_period(['-P -t Square --write-period 3000 -w',
+                                '-P -t Square --write-period 100',
+                                '-S -t Square']) == 3000
+
+def test_get_stage_timeouts_without_history():
+    stage_timeouts = ir.get_stage_timeouts(
+        None, PUBLISHER, SUBSCRIBER, 'Test_A', ['-P', '-S'], 15)
+    assert stage_timeouts == {
+        stage: 15 for stage in ir.PUBLISHER_STAGES + ir.SUBSCRIBER_STAGES}
+
+def test_get_stage_timeouts_per_test_case():
+    history = TimingHistory()
+    fast = ['-P -t Square', '-S -t Square']
+    slow = ['-P -t Square --write-period 3000', '-S -t Square']
+    for parameters, test_case_name, duration in [
+            (fast, 'Test_Fast', 0.1), (slow, 'Test_Slow', 3)]:
+        keys = ir.get_stage_history_keys(PUBLISHER, SUBSCRIBER,
+                                         test_case_name, parameters)
+        for _ in range(rtps_test_history.MIN_HISTORY_VALUES):
+            for key in keys:
+                history.add(f'{key}/sub_data', duration)
+
+    def get_timeout(test_case_name, parameters):
+        return ir.get_stage_timeouts(history, PUBLISHER, SUBSCRIBER,
+                                     test_case_name, parameters, 15)['sub_data']
+
+    # The fast Test Case does not set the timeout of the slow one
+    assert get_timeout('Test_Fast', fast) == ir.MIN_STAGE_TIMEOUT
+    assert get_timeout('Test_Slow', slow) == 2 * 3 + ir.STAGE_TIMEOUT_MARGIN
+    # Test Cases without enough history of their own (for example, because
+    # the stage never succeeds) use the Test Cases with the same write period
+    assert get_timeout('Test_Negative', fast) == ir.MIN_STAGE_TIMEOUT
+    assert get_timeout('Test_Negative', ['-P --write-period 3000', '-S']) == \
+        2 * 3 + ir.STAGE_TIMEOUT_MARGIN
+    assert get_timeout('Test_Negative', ['-P --write-period 500', '-S']) == 15
+    # The stages without history use the maximum timeout
+    assert ir.get_stage_timeouts(history, PUBLISHER, SUBSCRIBER, 'Test_Fast',
+                                 fast, 15)['pub_matched'] == 15
+
+def test_get_teardown_timeout():
+    assert ir.get_teardown_timeout(None, PUBLISHER) == ir.MAX_TEARDOWN_TIMEOUT
+    history = TimingHistory()
+    key = f'teardown/{ir.get_product_name(PUBLISHER)}'
+    for _ in range(rtps_test_history.MIN_HISTORY_VALUES):
+        history.add(key, ir.FORCED_TEARDOWN)
+    # The product never exits after SIGINT
+    assert ir.get_teardown_timeout(history, PUBLISHER) == ir.MIN_TEARDOWN_TIMEOUT
+    for _ in range(rtps_test_history.MIN_HISTORY_VALUES):
+        history.add(key, 4)
+    assert ir.get_teardown_timeout(history, PUBLISHER) == 4 * 2 + 1
@@ -0,0 +1,125 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import fcntl
+import os
+import shutil
+import signal
+import sys
+
+import pexpect
+import pytest
+
+import rtps_test_io
+from rtps_test_io import PipeSpawn, set_pipe_size, spawn
+
+EMULATOR = f'{sys.executable} ' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'rtps_test_emulator.py')
+
+# fcntl.F_GETPIPE_SZ is only available in Linux (Python >= 3.10)
+F_GETPIPE_SZ = getattr(fcntl, 'F_GETPIPE_SZ', 1032)
+
+def test_sendintr_sends_sigint():
+    child = spawn(f'{EMULATOR} -P -w --write-period 10', 'pipe')
+    try:
+        assert isinstance(child, PipeSpawn)
+        child.expect(r'Square     BLUE       005 003 \[20\]', timeout=10)
+        child.sendintr()
+        # The emulator handles SIGINT as a shape_main application does
+        child.expect('Done.', timeout=10)
+        child.expect(pexpect.EOF, timeout=10)
+        assert child.wait() == 0
+        assert child.signalstatus is None
+    finally:
+        child.close()
+
+def test_eof():
+    child = spawn(f'{EMULATOR} -P -w --write-period 0 --num-iterations 3',
+                  'pipe')
+    child.expect(pexpect.EOF, timeout=10)
+    assert child.before.splitlines()[-4:] == [
+        'Square     BLUE       005 003 [20]',
+        'Square     BLUE       010 006 [20]',
+        'Square     BLUE       015 009 [20]',
+        'Done.']
+    with pytest.raises(pexpect.EOF):
+        child.read_nonblocking(1, timeout=1)
+    assert not child.isalive()
+    assert child.exitstatus == 0
+    child.close()
+
+def test_terminate():
+    child = spawn(f'{sys.executable} -c "import signal, time; '
+                  'signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+                  'print(1, flush=True); time.sleep(30)"', 'pipe')
+    child.expect('1', timeout=10)
+    # The application ignores SIGTERM
+    assert not child.terminate()
+    assert child.terminate(force=True)
+    assert child.signalstatus == signal.SIGKILL
+    child.close()
+
+def test_command_not_found():
+    with pytest.raises(pexpect.ExceptionPexpect):
+        spawn('./not_a_shape_main_application', 'pipe')
+
+@pytest.mark.skipif(shutil.which('stdbuf') is None,
+                    reason='stdbuf is not available')
+def test_output_is_line_buffered_with_stdbuf():
+    child = PipeSpawn(f'{EMULATOR} -P')
+    try:
+        assert child.proc.args[:3] == [shutil.which('stdbuf'), '-oL', '-eL']
+        assert child.proc.args[3:] == EMULATOR.split() + ['-P']
+        child.expect('Create writer for topic: Square', timeout=10)
+    finally:
+        child.close()
+
+def test_command_runs_without_stdbuf(monkeypatch):
+    monkeypatch.setattr(rtps_test_io.shutil, 'which', lambda name: None)
+    child = PipeSpawn(f'{EMULATOR} -P')
+    try:
+        assert child.proc.args == EMULATOR.split() + ['-P']
+        child.expect('Create writer for topic: Square', timeout=10)
+    finally:
+        child.close()
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'),
+                    reason='the size of a pipe can only be set in Linux')
+def test_set_pipe_size():
+    read_fd, write_fd = os.pipe()
+    try:
+        assert set_pipe_size(read_fd, 1 << 17)
+        assert fcntl.fcntl(read_fd, F_GETPIPE_SZ) == 1 << 17
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+def test_set_pipe_size_fallback(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    try:
+        # The size is not allowed (see /proc/sys/fs/pipe-max-size)
+        def fcntl_error(fd, command, argument):
+            raise OSError('Operation not permitted')
+        monkeypatch.setattr(rtps_test_io.fcntl, 'fcntl', fcntl_error)
+        assert not set_pipe_size(read_fd)
+        # Platforms other than Linux
+        monkeypatch.setattr(rtps_test_io, 'F_SETPIPE_SZ', None)
+        assert not set_pipe_size(read_fd)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+def test_pipe_spawn_without_pipe_size(monkeypatch):
+    monkeypatch.setattr(rtps_test_io, 'F_SETPIPE_SZ', None)
+    child = spawn(f'{EMULATOR} -P -w --write-period 0 --num-iterations 2',
+                  'pipe')
+    child.expect(pexpect.EOF, timeout=10)
+    assert 'Square     BLUE       010 006 [20]' in child.before
+    child.close()
@@ -0,0 +1,75 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+import junitparser
+
+from rtps_test_journal import Journal, read_journal, get_completed_test_cases
+
+def create_test_case(name: str, result: list = None) -> junitparser.TestCase:
+    test_case = junitparser.TestCase(name)
+    if result is not None:
+        test_case.result = result
+    return test_case
+
+def test_journal_round_trip(tmp_path):
+    filename = str(tmp_path / 'report.xml.journal')
+    journal = Journal(filename)
+    journal.add('suite', create_test_case('Test_A'))
+    journal.add('suite', create_test_case('Test_B',
+                                          [junitparser.Failure('failed')]))
+    journal.add('suite', create_test_case('Test_B'))
+    test_cases = read_journal(filename)
+    assert sorted(test_cases['suite']) == ['Test_A', 'Test_B']
+    # The last result of a Test Case is the one returned
+    assert test_cases['suite']['Test_B'].is_passed
+    journal.remove()
+    assert not os.path.exists(filename)
+
+def test_journal_ignores_incomplete_lines(tmp_path):
+    filename = str(tmp_path / 'report.xml.journal')
+    journal = Journal(filename)
+    journal.add('suite', create_test_case('Test_A'))
+    with open(filename, 'a') as file:
+        file.write('{"suite": "suite", "case": "<testcase')
+    assert list(read_journal(filename)['suite']) == ['Test_A']
+
+def test_journal_keep(tmp_path):
+    filename = str(tmp_path / 'report.xml.journal')
+    Journal(filename).add('suite', create_test_case('Test_A'))
+    Journal(filename, keep=True).add('suite', create_test_case('Test_B'))
+    assert sorted(read_journal(filename)['suite']) == ['Test_A', 'Test_B']
+    Journal(filename)
+    assert read_journal(filename) == {}
+
+def test_read_journal_that_does_not_exist(tmp_path):
+    assert read_journal(str(tmp_path / 'missing.journal')) == {}
+
+def test_get_completed_test_cases(tmp_path):
+    xml = junitparser.JUnitXml()
+    suite = junitparser.TestSuite('suite')
+    suite.add_testcase(create_test_case('Test_Passed'))
+    suite.add_testcase(create_test_case('Test_Failed',
+                                        [junitparser.Failure('failed')]))
+    suite.add_testcase(create_test_case('Test_Skipped',
+                                        [junitparser.Skipped('skipped')]))
+    suite.add_testcase(create_test_case('Test_Fixed',
+                                        [junitparser.Failure('failed')]))
+    xml.add_testsuite(suite)
+    filename = str(tmp_path / 'report.xml.journal')
+    journal = Journal(filename)
+    # The journal is newer than the report
+    journal.add('suite', create_test_case('Test_Fixed'))
+    journal.add('suite', create_test_case('Test_New'))
+    journal.add('other', create_test_case('Test_Other'))
+
+    completed = get_completed_test_cases(xml, filename)
+    assert sorted(completed['suite']) == \
+        ['Test_Fixed', 'Test_New', 'Test_Passed']
+    assert list(completed['other']) == ['Test_Other']
@@ -0,0 +1,102 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import multiprocessing
+import time
+
+import pexpect
+
+import interoperability_report as ir
+
+def spawn(command: str) -> pexpect.spawn:
+    return pexpect.spawn('/bin/sh', ['-c', command])
+
+def test_wait_any_process_exit_returns_when_one_exits():
+    short = spawn('sleep 0.2')
+    long = spawn('sleep 30')
+    try:
+        start = time.monotonic()
+        exited = ir.wait_any_process_exit([long, short], timeout=10)
+        assert exited == [short]
+        assert time.monotonic() - start < 5
+    finally:
+        long.terminate(force=True)
+
+def test_wait_any_process_exit_timeout():
+    child = spawn('sleep 30')
+    try:
+        start = time.monotonic()
+        assert ir.wait_any_process_exit([child], timeout=0.3) == []
+        assert time.monotonic() - start >= 0.3
+    finally:
+        child.terminate(force=True)
+
+def test_wait_any_process_exit_already_exited():
+    child = spawn('true')
+    child.expect(pexpect.EOF)
+    child.wait()
+    assert ir.wait_any_process_exit([child], timeout=10) == [child]
+
+def test_wait_any_process_exit_reads_output():
+    # The child cannot finish if nobody reads its output
+    child = spawn('yes | head -c 1000000; exit 0')
+    assert ir.wait_any_process_exit([child], timeout=10) == [child]
+
+def test_stop_processes():
+    graceful = spawn('sleep 30')
+    ignores_sigint = spawn('trap "" INT; while true; do sleep 0.1; done')
+    time.sleep(0.2)  # Let the shell install the trap
+    result = ir.stop_processes([graceful, ignores_sigint], [10, 0.5])
+    assert result[0][0] is True
+    assert result[0][1] < 5
+    assert result[1][0] is False
+    assert result[1][1] >= 0.5
+    assert not graceful.isalive()
+    assert not ignores_sigint.isalive()
+
+def run_entity(command: str, child_pids, index: int, finished):
+    """ Spawn command and read its output until it exits, like the
+        processes of the entities in run_test().
+    """
+    child = spawn(command)
+    child_pids[index] = child.pid
+    finished.set()
+    child.expect(pexpect.EOF, timeout=None)
+    child.wait()
+
+def test_stop_processes_of_other_processes():
+    # The applications take 1 s to exit after SIGINT, except the last one,
+    # which does not exit
+    commands = ['trap "sleep 1; exit 0" INT; while true; do sleep 0.1; done'] * 3 \
+        + ['trap "" INT; while true; do sleep 0.1; done']
+    child_pids = multiprocessing.Array('i', len(commands))
+    finished = [multiprocessing.Event() for _ in commands]
+    processes = [multiprocessing.Process(target=run_entity,
+                                         args=(element, child_pids, i,
+                                               finished[i]))
+                 for i, element in enumerate(commands)]
+    for element in processes:
+        element.start()
+    for element in finished:
+        assert element.wait(10)
+    time.sleep(0.2)  # Let the shells install the traps
+
+    start = time.monotonic()
+    result = ir.stop_processes(
+        [ir.RemoteProcess(element) for element in child_pids],
+        [10, 10, 10, 1.5])
+    # All the applications are stopped at the same time
+    assert time.monotonic() - start < 2.5
+    assert [element[0] for element in result] == [True, True, True, False]
+    assert all(0.9 <= element[1] < 2 for element in result[:3])
+    for element in processes:
+        element.join(10)
+        assert element.exitcode == 0
+    assert not any(ir.RemoteProcess(element).isalive()
+                   for element in child_pids)
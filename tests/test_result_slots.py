@@ -0,0 +1,97 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import multiprocessing
+
+import junitparser
+import pytest
+
+import interoperability_report as ir
+from rtps_test_utilities import ReturnCode
+
+def save_results(group: ir.ResultGroup, index: int):
+    group.return_codes[index] = ReturnCode.DATA_NOT_RECEIVED
+    group.teardown_result[index] = (False, 1.5)
+    group.stage_timestamps[(index, 'start')] = 10.0
+    group.child_pids[index] = 1234
+    group.metrics[(index, 'samples_lost')] = 3
+
+def test_results_are_shared_with_the_processes():
+    slots = ir.ResultSlots(group_size=2)
+    group = slots.acquire(2)
+    process = multiprocessing.Process(target=save_results, args=(group, 1))
+    process.start()
+    process.join()
+    assert group.return_codes[0] is None
+    assert group.return_codes[1] == ReturnCode.DATA_NOT_RECEIVED
+    assert group.teardown_result[0] == (True, 0.0)
+    assert group.teardown_result[1] == (False, 1.5)
+    assert group.stage_timestamps[(1, 'start')] == 10.0
+    assert group.child_pids[0] == 0
+    assert group.child_pids[1] == 1234
+    assert group.metrics.get_metrics(0) == {}
+    assert group.metrics.get_metrics(1) == {'samples_lost': 3}
+
+def test_acquired_groups_are_cleared():
+    slots = ir.ResultSlots(group_size=2)
+    group = slots.acquire(2)
+    save_results(group, 0)
+    slots.release(group)
+    group = slots.acquire(1)
+    assert len(group.return_codes) == 1
+    assert group.return_codes[0] is None
+    assert group.teardown_result[0] == (True, 0.0)
+    assert group.stage_timestamps[(0, 'start')] is None
+    assert group.child_pids[0] == 0
+    assert group.metrics.get_metrics(0) == {}
+    with pytest.raises(IndexError):
+        group.return_codes[1]
+
+def test_groups_do_not_overlap():
+    slots = ir.ResultSlots(group_size=2, num_groups=2)
+    first = slots.acquire(2)
+    second = slots.acquire(2)
+    assert first.base != second.base
+    first.return_codes[1] = ReturnCode.OK
+    assert second.return_codes[0] is None
+    assert second.return_codes[1] is None
+
+def test_acquire_more_than_group_size():
+    slots = ir.ResultSlots(group_size=2)
+    with pytest.raises(RuntimeError):
+        slots.acquire(3)
+
+def test_get_stage_durations():
+    slots = ir.ResultSlots(group_size=1)
+    group = slots.acquire(1)
+    stages = ir.PUBLISHER_STAGES
+    group.stage_timestamps[(0, 'start')] = 1.0
+    group.stage_timestamps[(0, stages[0])] = 1.5
+    assert group.stage_timestamps.get_durations(0, stages) == \
+        {stages[0]: 0.5}
+
+def test_group_is_released_if_running_fails(monkeypatch, tmp_path):
+    def fail(**kwargs):
+        raise RuntimeError('cannot run the shape_main applications')
+    monkeypatch.setattr(ir.multiprocessing, 'Process', fail)
+    slots = ir.ResultSlots(group_size=2)
+    with pytest.raises(RuntimeError):
+        ir.run_test(
+            name_executable_pub='shape_main',
+            name_executable_sub='shape_main',
+            test_case=junitparser.TestCase('Test_A'),
+            parameters=['-P -t Square', '-S -t Square'],
+            expected_codes=[ReturnCode.OK, ReturnCode.OK],
+            verbosity=False,
+            timeout=1,
+            check_function=ir.basic_check,
+            working_directory=str(tmp_path),
+            result_slots=slots)
+    # The only group is free again
+    assert slots._ResultSlots__free_groups.qsize() == 1
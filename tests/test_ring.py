@@ -0,0 +1,93 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import multiprocessing
+import queue
+import threading
+import pytest
+
+from rtps_test_ring import SampleRing, SampleRingReader, LastSampleSaved, \
+    get_ring_readers
+from rtps_test_samples import Sample
+
+def create_sample(i: int) -> Sample:
+    return Sample('Square', 'BLUE', i, i, 30)
+
+def create_ring(capacity: int) -> SampleRing:
+    return SampleRing(capacity, threading.Condition())
+
+def test_readers_have_their_own_cursor():
+    ring = create_ring(4)
+    first, second = SampleRingReader(ring), SampleRingReader(ring)
+    assert first.empty()
+    ring.put(create_sample(1))
+    ring.put(create_sample(2))
+    assert first.get() == '001 001 [30]'
+    assert second.get() == '001 001 [30]'
+    assert first.get() == '002 002 [30]'
+    assert first.empty()
+    assert not second.empty()
+    with pytest.raises(queue.Empty):
+        first.get(block=False)
+    with pytest.raises(queue.Empty):
+        first.get(timeout=0.1)
+
+def test_overwritten_records_are_skipped():
+    ring = create_ring(4)
+    reader = SampleRingReader(ring)
+    for i in range(10):
+        ring.put(create_sample(i))
+    records = [reader.get_record(block=False) for _ in range(4)]
+    # The reader continues with the oldest record available
+    assert [record.sequence for record in records] == [6, 7, 8, 9]
+    assert [record.x for record in records] == [6, 7, 8, 9]
+    assert reader.empty()
+
+def test_last_sample_saved():
+    ring = create_ring(4)
+    last_sample_saved = LastSampleSaved(ring)
+    assert last_sample_saved.empty()
+    with pytest.raises(queue.Empty):
+        last_sample_saved.get(timeout=0.1)
+    for i in range(6):
+        ring.put(create_sample(i))
+    ring.finish()
+    assert not last_sample_saved.empty()
+    assert last_sample_saved.get() == '005 005 [30]'
+    # It is returned once
+    assert last_sample_saved.empty()
+    with pytest.raises(queue.Empty):
+        last_sample_saved.get()
+
+def test_readers_wait_for_new_records():
+    ring = create_ring(4)
+    samples_sent, last_sample_saved = get_ring_readers([ring])
+    timer = threading.Timer(0.1, ring.put, [create_sample(7)])
+    timer.start()
+    assert samples_sent[0].get(timeout=10) == '007 007 [30]'
+    timer.join()
+    timer = threading.Timer(0.1, ring.finish)
+    timer.start()
+    assert last_sample_saved[0].get(timeout=10) == '007 007 [30]'
+    timer.join()
+
+def put_samples(ring: SampleRing, count: int):
+    for i in range(count):
+        ring.put(create_sample(i))
+    ring.finish()
+
+def test_ring_is_shared_with_other_processes():
+    ring = SampleRing(16)
+    reader = SampleRingReader(ring)
+    process = multiprocessing.Process(target=put_samples, args=(ring, 3))
+    process.start()
+    texts = [reader.get(timeout=10) for _ in range(3)]
+    process.join()
+    assert texts == ['000 000 [30]', '001 001 [30]', '002 002 [30]']
+    assert LastSampleSaved(ring).get(timeout=10) == '002 002 [30]'
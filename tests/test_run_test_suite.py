@@ -0,0 +1,122 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import junitparser
+import pytest
+
+import interoperability_report as ir
+import test_suite
+
+TEST_SUITE = '''
+from rtps_test_utilities import ReturnCode
+
+example_suite = {
+    'Test_A' : {
+        'apps' : ['-P -t Square', '-S -t Square'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+    },
+    'Test_B' : {
+        'apps' : ['-P -t Square', '-S -t Square'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_A'],
+    },
+    'Test_C' : {
+        'apps' : ['-P -t Square', '-S -t Square'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'depends_on' : ['Test_B'],
+    },
+    'Test_D' : {
+        'apps' : ['-P -t Square -r', '-S -t Square -b'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+    },
+}
+'''
+
+@pytest.fixture
+def run_suite(tmp_path, monkeypatch):
+    """ Return a function that runs the example Test Suite with the
+        arguments of interoperability_report.py and returns the names of the
+        Test Cases run and the TestSuite. The Test Cases in 'failing' fail,
+        the rest pass.
+    """
+    (tmp_path / 'example_test_suite.py').write_text(TEST_SUITE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def run(arguments: "list[str]" = [], failing: "list[str]" = [],
+            completed: "list[str]" = []):
+        options = ir.get_options(ir.Arguments.parser().parse_args(
+            ['-P', 'a_shape_main', '-S', 'b_shape_main',
+             '-s', 'example_test_suite'] + arguments))
+        options['completed_test_cases'] = {
+            name: junitparser.TestCase(name) for name in completed}
+        run_names = []
+
+        def run_test_case(options, timeout, test_suite_name, test_case_name,
+                          test_case_parameters, **kwargs):
+            case = junitparser.TestCase(
+                ir.get_test_case_name(test_suite_name, test_case_name))
+            if test_case_name in failing:
+                case.result = [junitparser.Failure('failed')]
+            run_names.append(test_case_name)
+            return case
+        monkeypatch.setattr(ir, 'run_test_case', run_test_case)
+        suite = ir.run_test_suite(options, ir.DEFAULT_TIMEOUT)
+        return run_names, suite
+    return run
+
+def test_resume_does_not_run_completed_test_cases(run_suite):
+    run_names, suite = run_suite(
+        ['--order', 'dictionary'],
+        completed=['example_suite_Test_A', 'example_suite_Test_C'])
+    assert run_names == ['Test_B', 'Test_D']
+    # The report contains all the Test Cases, in the Test Suite order
+    assert [case.name for case in suite] == \
+        [f'example_suite_Test_{name}' for name in 'ABCD']
+
+def test_dependencies_that_fail_skip_the_test_cases(run_suite):
+    run_names, suite = run_suite(['--order', 'dictionary'],
+                                 failing=['Test_A'])
+    assert run_names == ['Test_A', 'Test_D']
+    cases = {case.name: case for case in suite}
+    # Test_C is skipped because Test_B did not pass (it was skipped)
+    for name in ['Test_B', 'Test_C']:
+        result = cases[f'example_suite_{name}'].result
+        assert len(result) == 1
+        assert isinstance(result[0], junitparser.Skipped)
+    assert 'Test_B' in cases['example_suite_Test_C'].result[0].message
+
+def test_dependencies_run_first(run_suite):
+    # With --jobs, a Test Case waits for its dependencies to finish
+    run_names, _ = run_suite(['--order', 'dictionary', '--jobs', '4'])
+    assert run_names.index('Test_A') < run_names.index('Test_B') \
+        < run_names.index('Test_C')
+
+def test_dependencies_not_run_are_ignored(run_suite):
+    run_names, _ = run_suite(['-t', 'Test_B', 'Test_C'], failing=['Test_A'])
+    assert sorted(run_names) == ['Test_B', 'Test_C']
+
+def test_dependencies_must_be_in_the_test_suite(tmp_path, monkeypatch):
+    (tmp_path / 'wrong_test_suite.py').write_text(
+        TEST_SUITE.replace("['Test_A']", "['Test_Missing']"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    options = ir.get_options(ir.Arguments.parser().parse_args(
+        ['-P', 'a_shape_main', '-S', 'b_shape_main',
+         '-s', 'wrong_test_suite']))
+    with pytest.raises(RuntimeError):
+        ir.get_test_cases_to_run(options)
+
+def test_real_test_suite_dependencies():
+    for name, parameters in test_suite.rtps_test_suite_1.items():
+        for dependency in parameters.get('depends_on', []):
+            assert dependency in test_suite.rtps_test_suite_1
+        # The Test Cases that expect incompatible QoS and the Domain tests
+        # do not depend on Test_Domain_0
+        if name.startswith('Test_Domain_') \
+                or ir.ReturnCode.INCOMPATIBLE_QOS in parameters['expected_codes']:
+            assert 'depends_on' not in parameters, name
@@ -0,0 +1,162 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+
+import junitparser
+import pytest
+
+import interoperability_report as ir
+import run_tests
+from rtps_test_scheduling import Durations
+
+def get_pair_options(publisher: str, subscriber: str, *arguments: str) -> dict:
+    args = run_tests.Arguments.parser().parse_args(
+        ['-p', publisher, '-s', subscriber] + list(arguments))
+    return run_tests.get_pair_options(publisher, subscriber, args)
+
+def test_get_extra_arguments_periodic_announcement():
+    # Only the OpenDDS subscribers need the Connext publishers to announce
+    # their participants periodically
+    assert run_tests.get_extra_arguments(
+        'connext_dds-7.3.0', 'opendds-3.28') == \
+        ['--periodic-announcement', '5000']
+    assert run_tests.get_extra_arguments(
+        'Connext_DDS-7.3.0', 'OpenDDS-3.28') == \
+        ['--periodic-announcement', '5000']
+    assert run_tests.get_extra_arguments('opendds-3.28', 'connext_dds-7.3.0') == []
+    assert run_tests.get_extra_arguments('opendds-3.28', 'opendds-3.28') == []
+    assert run_tests.get_extra_arguments('fastdds-2.14', 'opendds-3.28') == []
+
+def test_get_pair_options():
+    options = get_pair_options(
+        'dir/connext_dds-7.3.0_shape_main_linux',
+        'dir/opendds-3.28_shape_main_linux', '-t', 'Test_A', '-v')
+    assert options['publisher'] == \
+        os.path.abspath('dir/connext_dds-7.3.0_shape_main_linux')
+    assert options['subscriber'] == \
+        os.path.abspath('dir/opendds-3.28_shape_main_linux')
+    assert options['test_cases'] == ['Test_A']
+    assert options['verbosity']
+    assert options['periodic_announcement_ms'] == 5000
+
+    options = get_pair_options('dir/opendds-3.28_shape_main_linux',
+                               'dir/connext_dds-7.3.0_shape_main_linux')
+    assert options['periodic_announcement_ms'] == 0
+
+def test_find_shape_main_applications(tmp_path):
+    for name in ['b/opendds_shape_main_linux', 'a_shape_main_linux',
+                 'a_shape_main_linux.txt']:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+    (tmp_path / 'c_shape_main_linux').mkdir()
+    assert run_tests.find_shape_main_applications(str(tmp_path)) == [
+        str(tmp_path / 'a_shape_main_linux'),
+        str(tmp_path / 'b/opendds_shape_main_linux')]
+
+def test_select_shard_of_several_pairs():
+    pair_options = [get_pair_options('a_shape_main', 'b_shape_main',
+                                     '-t', 'Test_Domain_0', 'Test_Domain_1'),
+                    get_pair_options('a_shape_main', 'c_shape_main',
+                                     '-t', 'Test_Domain_0')]
+    selected = []
+    for index in range(1, 4):
+        for options in pair_options:
+            options['shard_test_cases'] = None
+        selected.append([
+            (ir.get_suite_name(options), name)
+            for options in run_tests.select_shard(pair_options, (index, 3),
+                                                  Durations())
+            for name in sorted(options['shard_test_cases'])])
+    # Each (pair, Test Case) unit runs in one shard only
+    assert [len(shard) for shard in selected] == [1, 1, 1]
+    assert len({unit for shard in selected for unit in shard}) == 3
+
+def test_select_shard_uses_the_durations(tmp_path):
+    pair_options = [get_pair_options('a_shape_main', 'b_shape_main',
+                                     '-t', 'Test_Domain_0', 'Test_Domain_1'),
+                    get_pair_options('a_shape_main', 'c_shape_main',
+                                     '-t', 'Test_Domain_0', 'Test_Domain_1')]
+    long_test_case = ir.get_test_case_name('rtps_test_suite_1', 'Test_Domain_0')
+    # Report in which the first Test Case of the first pair takes much
+    # longer than the rest
+    xml = junitparser.JUnitXml()
+    for i, options in enumerate(pair_options):
+        suite = junitparser.TestSuite(ir.get_suite_name(options))
+        for name in ['Test_Domain_0', 'Test_Domain_1']:
+            test_case = junitparser.TestCase(
+                ir.get_test_case_name('rtps_test_suite_1', name))
+            test_case.time = 100.0 if test_case.name == long_test_case \
+                and i == 0 else 1.0
+            suite.add_testcase(test_case)
+        xml.add_testsuite(suite)
+    xml.write(str(tmp_path / 'report.xml'))
+    durations = Durations([str(tmp_path / 'report.xml')])
+
+    # The long Test Case runs alone in its shard
+    selected = run_tests.select_shard(pair_options, (1, 2), durations)
+    assert selected == [pair_options[0]]
+    assert pair_options[0]['shard_test_cases'] == {long_test_case}
+    for options in pair_options:
+        options['shard_test_cases'] = None
+    selected = run_tests.select_shard(pair_options, (2, 2), durations)
+    assert [len(options['shard_test_cases']) for options in selected] == [1, 2]
+
+def test_run_publisher_fan_out(monkeypatch):
+    pair_options = [get_pair_options(
+        'a_shape_main', f'{name}_shape_main', '-t', 'Test_Domain_0',
+        'Test_Reliability_0', 'Test_Reliability_1') for name in ['b', 'c']]
+    domain_0 = ir.get_test_case_name('rtps_test_suite_1', 'Test_Domain_0')
+    reliability_0 = ir.get_test_case_name('rtps_test_suite_1',
+                                          'Test_Reliability_0')
+    # Test_Reliability_0 depends on Test_Domain_0, which only passed in
+    # the first pair
+    failed = junitparser.TestCase(domain_0)
+    failed.result = [junitparser.Failure('failed')]
+    pair_options[0]['completed_test_cases'] = {
+        domain_0: junitparser.TestCase(domain_0)}
+    pair_options[1]['completed_test_cases'] = {domain_0: failed}
+    calls = []
+
+    def run_fan_out_test_case(pair_options, timeout, test_suite_name,
+                              test_case_name, test_case_parameters,
+                              working_directory, **kwargs):
+        assert os.path.isdir(working_directory)
+        calls.append((test_case_name, len(pair_options), working_directory))
+        return [junitparser.TestCase(
+                    ir.get_test_case_name(test_suite_name, test_case_name))
+                for _ in pair_options]
+    monkeypatch.setattr(ir, 'run_fan_out_test_case', run_fan_out_test_case)
+
+    run_tests.run_publisher_fan_out(pair_options, None, None, None)
+    # Only the Test Cases that allow the fan-out mode run, for the pairs
+    # whose dependencies passed
+    assert [call[:2] for call in calls] == [('Test_Reliability_0', 1)]
+    assert reliability_0 in pair_options[0]['completed_test_cases']
+    assert pair_options[1]['completed_test_cases'][reliability_0].is_skipped
+    for options in pair_options:
+        assert len(options['completed_test_cases']) == 2
+    # The working directory is deleted at the end
+    assert not os.path.exists(calls[0][2])
+
+def test_run_publisher_fan_out_deletes_the_directory(monkeypatch):
+    options = get_pair_options('a_shape_main', 'b_shape_main',
+                               '-t', 'Test_Reliability_0')
+    working_directories = []
+
+    def run_fan_out_test_case(*args, working_directory, **kwargs):
+        working_directories.append(working_directory)
+        raise RuntimeError('error')
+    monkeypatch.setattr(ir, 'run_fan_out_test_case', run_fan_out_test_case)
+
+    with pytest.raises(RuntimeError):
+        run_tests.run_publisher_fan_out([options], None, None, None)
+    assert len(working_directories) == 1
+    assert not os.path.exists(working_directories[0])
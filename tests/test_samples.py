@@ -0,0 +1,168 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import itertools
+import threading
+import time
+
+import pexpect
+import pytest
+
+from rtps_test_ring import SampleRing, get_ring_readers
+from rtps_test_samples import Sample, SampleAttribution, SampleReader, \
+    parse_sample
+
+class FakeChild:
+    """ Output of a shape_main application, as read from a pexpect child:
+        the last match (before and after), the output received after it
+        (buffer) and the chunks returned by read_nonblocking(). When there
+        are no more chunks, it raises pexpect.EOF or pexpect.TIMEOUT.
+    """
+    maxread = 2000
+
+    def __init__(self, chunks: "list[str]", before: str = '', after=None,
+                 buffer: str = '', eof: bool = True):
+        self.chunks = list(chunks)
+        self.before = before
+        self.after = after
+        self.buffer = buffer
+        self.eof = eof
+
+    def read_nonblocking(self, size: int, timeout: float) -> str:
+        if self.chunks:
+            return self.chunks.pop(0)
+        raise pexpect.EOF('EOF') if self.eof else pexpect.TIMEOUT('TIMEOUT')
+
+def create_rings(samples: "list[list[int]]") -> "list[SampleRing]":
+    """ Return a SampleRing for each Publisher with the samples (x and y)
+        in samples, sharing the same Condition.
+    """
+    condition = threading.Condition()
+    rings = []
+    for element in samples:
+        rings.append(SampleRing(16, condition))
+        for value in element:
+            rings[-1].put(create_sample(value))
+    return rings
+
+def create_sample(value: int) -> Sample:
+    return Sample('Square', 'BLUE', value, value, 30)
+
+def read_samples(child: FakeChild) -> "list[Sample]":
+    with SampleReader(child, 1) as samples:
+        return list(samples)
+
+def test_parse_sample():
+    sample = parse_sample('Square     BLUE       191 52 [30]')
+    assert sample == Sample('Square', 'BLUE', 191, 52, 30)
+    assert sample.text == '191 052 [30]'
+    assert parse_sample('Create writer for topic: Square') is None
+
+def test_samples_split_in_chunks():
+    child = FakeChild(['Square     BLUE       001 0',
+                       '02 [30]\r\nSquare     BL',
+                       'UE       003 004 [31]\r', '\n'])
+    assert read_samples(child) == [Sample('Square', 'BLUE', 1, 2, 30),
+                                   Sample('Square', 'BLUE', 3, 4, 31)]
+
+def test_first_sample_is_the_last_match():
+    child = FakeChild(
+        ['Square     BLUE       005 006 [32]\r\n'],
+        before='Create reader for topic: Square\r\nSquare     BLUE       001 002 ',
+        after='[30]',
+        buffer='\r\nSquare     BLUE       003 004 [31]\r\n')
+    assert [sample.size for sample in read_samples(child)] == [30, 31, 32]
+    # The output received after the match is consumed
+    assert child.buffer == ''
+
+def test_partial_line_at_the_end_of_the_output():
+    child = FakeChild(['Square     BLUE       001 002 [30]\r\n',
+                       'Square     BLUE       003 004 [31]'])
+    assert [sample.size for sample in read_samples(child)] == [30, 31]
+
+def test_lines_that_are_not_samples_or_have_payload():
+    child = FakeChild([
+        "on_subscription_matched() topic: 'Square'  type: 'ShapeType'\r\n"
+        'Square     BLUE       001 002 [30] {255}\r\n'
+        'Error: DDS implementation message\r\n'
+        'Square     RED        003 004 [31]\r\n'])
+    assert read_samples(child) == [Sample('Square', 'BLUE', 1, 2, 30),
+                                   Sample('Square', 'RED', 3, 4, 31)]
+
+def test_timeout_keeps_the_output_not_parsed():
+    child = FakeChild(['Square     BLUE       001 002 [30]\r\nSquare     BL'],
+                      eof=False)
+    reader = SampleReader(child, 0.1)
+    with reader as samples:
+        assert [sample.size for sample in samples] == [30]
+    assert reader.unread == 'Square     BL'
+    assert child.buffer == ''
+
+def test_close_keeps_the_lines_not_parsed():
+    child = FakeChild(['Square     BLUE       001 002 [30]\r\n'
+                       'Square     BLUE       003 004 [31]\r\n'
+                       'Square     BLUE       005'])
+    reader = SampleReader(child, 1)
+    with reader as samples:
+        assert [sample.size for sample in itertools.islice(samples, 1)] == [30]
+    assert reader.unread == 'Square     BLUE       003 004 [31]\r\n' \
+        'Square     BLUE       005'
+
+def test_attribute():
+    attribution = SampleAttribution(*get_ring_readers(
+        create_rings([[1, 2], [2, 3]])))
+    assert attribution.attribute('001 001 [30]', 1) == 0
+    assert attribution.attribute('003 003 [30]', 1) == 1
+    # A sample sent by both Publishers is attributed to the last one
+    assert attribution.attribute('002 002 [30]', 1) == 1
+
+def test_attribute_waits_for_the_publishers():
+    rings = create_rings([[], []])
+    attribution = SampleAttribution(*get_ring_readers(rings))
+    timer = threading.Timer(0.2, rings[1].put, [create_sample(4)])
+    timer.start()
+    start = time.monotonic()
+    assert attribution.attribute('004 004 [30]', 10) == 1
+    # It wakes up as soon as the sample is saved
+    assert time.monotonic() - start < 5
+    timer.join()
+
+def test_attribute_waits_for_the_last_sample():
+    rings = create_rings([[1], [2]])
+    attribution = SampleAttribution(*get_ring_readers(rings))
+    assert attribution.attribute('001 001 [30]', 1) == 0
+    attribution.add_processed('001 001 [30]')
+    # The sample is not waited for once the Publisher 1 finishes
+    timer = threading.Timer(0.2, rings[0].finish)
+    timer.start()
+    start = time.monotonic()
+    assert attribution.attribute('005 005 [30]', 10) is None
+    assert time.monotonic() - start < 5
+    timer.join()
+
+def test_attribute_timeout():
+    attribution = SampleAttribution(*get_ring_readers(create_rings([[1]])))
+    start = time.monotonic()
+    assert attribution.attribute('005 005 [30]', 0.2) is None
+    assert time.monotonic() - start >= 0.2
+
+def test_attribute_after_a_publisher_finished():
+    rings = create_rings([[1], []])
+    rings[0].finish()
+    attribution = SampleAttribution(*get_ring_readers(rings))
+    attribution.add_processed('001 001 [30]')
+    # The sample is not waited for, as the Publisher 1 has finished
+    start = time.monotonic()
+    assert attribution.attribute('005 005 [30]', 10) is None
+    assert time.monotonic() - start < 5
+
+def test_attribution_needs_a_shared_condition():
+    rings = [SampleRing(16, threading.Condition()) for _ in range(2)]
+    with pytest.raises(RuntimeError):
+        SampleAttribution(*get_ring_readers(rings))
@@ -0,0 +1,105 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import junitparser
+import pytest
+
+import interoperability_report as ir
+from rtps_test_scheduling import DEFAULT_DURATION, Durations, \
+    order_longest_first, parse_shard, split_in_shards
+
+def get_options(arguments: "list[str]", subscriber: str = 'b') -> dict:
+    return ir.get_options(ir.Arguments.parser().parse_args(
+        ['-P', 'a_shape_main', '-S', f'{subscriber}_shape_main'] + arguments))
+
+def write_report(filename: str, durations: "dict[str, dict[str, float]]"):
+    """ Write a JUnit report with the durations as
+        {suite_name: {test_case_name: time}}.
+    """
+    xml = junitparser.JUnitXml()
+    for suite_name, test_cases in durations.items():
+        suite = junitparser.TestSuite(suite_name)
+        for name, time in test_cases.items():
+            test_case = junitparser.TestCase(name)
+            test_case.time = time
+            suite.add_testcase(test_case)
+        xml.add_testsuite(suite)
+    xml.write(filename)
+
+def test_parse_shard():
+    assert parse_shard('1/4') == (1, 4)
+    assert parse_shard('4/4') == (4, 4)
+    for shard in ['0/4', '5/4', '1/0', '1', 'a/b', '-1/4']:
+        with pytest.raises(RuntimeError):
+            parse_shard(shard)
+
+def test_split_in_shards():
+    units = ['a', 'b', 'c', 'd', 'e']
+    costs = [1.0, 5.0, 2.0, 4.0, 3.0]
+    shards = split_in_shards(units, costs, 2)
+    # Every unit is in one shard, in its original order
+    assert sorted(unit for shard in shards for unit in shard) == units
+    for shard in shards:
+        assert shard == sorted(shard)
+    # Longest processing time first: b(5), d(4), e(3), c(2), a(1)
+    assert shards == [['a', 'b', 'c'], ['d', 'e']]
+    # More shards than units
+    assert split_in_shards(['a'], [1.0], 3) == [['a'], [], []]
+
+def test_durations(tmp_path):
+    filename = str(tmp_path / 'report.xml')
+    write_report(filename, {
+        'a---a': {'Test_A': 2.0, 'Test_B': 4.0},
+        'a---b': {'Test_A': 6.0},
+    })
+    durations = Durations([filename])
+    assert durations.get('a---a', 'Test_A') == 2.0
+    # Mean of the Test Case for the other pairs
+    assert durations.get('b---b', 'Test_A') == 4.0
+    # Mean of all the Test Cases
+    assert durations.get('a---b', 'Test_C') == 4.0
+    assert Durations().get('a---a', 'Test_A') == DEFAULT_DURATION
+
+def test_shards_cover_the_test_suite():
+    options = get_options([])
+    names = {ir.get_test_case_name(element[0], element[1])
+             for element in ir.get_test_cases_to_run(options)}
+    shards = []
+    for index in range(1, 4):
+        options = get_options(['--shard', f'{index}/3'])
+        shards.append(ir.get_shard_test_cases(options))
+    assert set.union(*shards) == names
+    assert sum(len(shard) for shard in shards) == len(names)
+    # The shards have about the same number of Test Cases of the same
+    # duration
+    assert max(len(shard) for shard in shards) \
+        - min(len(shard) for shard in shards) <= 1
+
+def test_order_longest_first():
+    units = ['a', 'b', 'c', 'd']
+    assert order_longest_first(units, [1.0, 3.0, 1.0, 2.0]) == \
+        ['b', 'd', 'a', 'c']
+    # With the same cost, the units expected to time out go first
+    assert order_longest_first(units, [1.0, 1.0, 1.0, 1.0],
+                               [False, False, True, False]) == \
+        ['c', 'a', 'b', 'd']
+
+def test_order_test_cases_by_duration(tmp_path):
+    filename = str(tmp_path / 'report.xml')
+    write_report(filename, {
+        'a---b': {'rtps_test_suite_1_Test_Domain_0': 1.0,
+                  'rtps_test_suite_1_Test_Domain_1': 8.0,
+                  'rtps_test_suite_1_Test_Domain_2': 3.0},
+    })
+    options = get_options(['-t', 'Test_Domain_0', 'Test_Domain_1',
+                           'Test_Domain_2', '--durations', filename])
+    test_cases = ir.order_test_cases(options,
+                                     ir.get_test_cases_to_run(options))
+    assert [element[1] for element in test_cases] == \
+        ['Test_Domain_1', 'Test_Domain_2', 'Test_Domain_0']
@@ -0,0 +1,150 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+import os
+import sys
+import time
+
+import pytest
+
+from rtps_test_server import ServerPool, ShapeMainServer, get_participant_key
+
+# shape_main application in server mode: each 'run' command prints the
+# creation of its entity and runs until SIGINT, then it prints the ready
+# message. With --ignore-sigint, the command never finishes.
+FAKE_SERVER = '''
+import signal
+import sys
+import time
+
+interrupted = False
+ignore_sigint = False
+
+def interrupt(signum, frame):
+    global interrupted
+    interrupted = not ignore_sigint
+
+signal.signal(signal.SIGINT, interrupt)
+for line in sys.stdin:
+    arguments = line.split()
+    if arguments[:1] == ['quit']:
+        break
+    if arguments[:1] != ['run']:
+        continue
+    interrupted = False
+    ignore_sigint = '--ignore-sigint' in arguments
+    print('Create writer for topic: Square color: BLUE', flush=True)
+    while not interrupted:
+        time.sleep(0.05)
+    print('Done.')
+    print('Waiting for command', flush=True)
+'''
+
+@pytest.fixture
+def fake_server(tmp_path) -> str:
+    """ Return the name of a fake shape_main application (FAKE_SERVER). """
+    name_executable = tmp_path / 'fake_shape_main_linux'
+    name_executable.write_text(f'#!{sys.executable}\n{FAKE_SERVER}')
+    os.chmod(name_executable, 0o755)
+    return str(name_executable)
+
+def run(server: ShapeMainServer, parameters: str):
+    server.run(parameters, None)
+    server.output.expect('Create writer', timeout=10)
+
+def test_get_participant_key():
+    assert get_participant_key('-P -t Square -d 5 -r') == ('-d 5',)
+    assert get_participant_key('-S -t Square') == ()
+    # The options are sorted, so their order does not change the key
+    assert get_participant_key('-d 1 -P --periodic-announcement 5000') == \
+        get_participant_key('--periodic-announcement 5000 -P -d 1') == \
+        ('--periodic-announcement 5000', '-d 1')
+    assert get_participant_key('-P -t "Square 1" --datafrag-size 512') == \
+        ('--datafrag-size 512',)
+    # An option without its argument is ignored
+    assert get_participant_key('-P -t Square -d') == ()
+
+def test_server_runs_several_commands(fake_server):
+    server = ShapeMainServer(fake_server)
+    try:
+        for parameters in ['-P -t Square -d 1', '-P -t Circle -d 2']:
+            run(server, parameters)
+            assert server.participant_key == get_participant_key(parameters)
+            server.interrupt()
+            assert server.stop(time.monotonic() + 10)
+        assert server.child.isalive()
+    finally:
+        server.close()
+    # It exits with the quit command
+    assert server.child.exitstatus == 0
+
+def test_acquire_prefers_the_same_participant(fake_server):
+    pool = ServerPool()
+    try:
+        servers = [pool.acquire(fake_server, '-P -t Square -d 1'),
+                   pool.acquire(fake_server, '-S -t Square -d 2')]
+        assert servers[0] is not servers[1]
+        run(servers[0], '-P -t Square -d 1')
+        run(servers[1], '-S -t Square -d 2')
+        assert [graceful for graceful, _ in pool.stop(servers, [10, 10])] == \
+            [True, True]
+
+        # The server whose participant uses the Domain ID 2 is reused,
+        # even if it ran another entity
+        assert pool.acquire(fake_server, '-P -t Circle -d 2') is servers[1]
+        # Without a matching participant, any idle server is reused
+        assert pool.acquire(fake_server, '-P -t Circle -d 3') is servers[0]
+        # The servers are not shared, so a new one is started
+        new_server = pool.acquire(fake_server, '-P -t Circle -d 1')
+        assert new_server not in servers
+        new_server.close()
+    finally:
+        for server in servers:
+            server.close()
+        pool.close()
+
+def test_acquire_does_not_reuse_other_executables(fake_server, tmp_path):
+    other_server = str(tmp_path / 'other_shape_main_linux')
+    os.symlink(fake_server, other_server)
+    pool = ServerPool()
+    server = pool.acquire(fake_server, '-P -t Square')
+    try:
+        run(server, '-P -t Square')
+        pool.stop([server], [10])
+        other = pool.acquire(other_server, '-P -t Square')
+        assert other is not server
+        assert other.name_executable == other_server
+        other.close()
+    finally:
+        pool.close()
+    assert not server.child.isalive()
+
+def test_stop_closes_the_servers_that_do_not_stop(fake_server):
+    pool = ServerPool()
+    servers = [pool.acquire(fake_server, '-P -t Square'),
+               pool.acquire(fake_server, '-S -t Square')]
+    try:
+        run(servers[0], '-P -t Square')
+        run(servers[1], '-S -t Square --ignore-sigint')
+        result = pool.stop(servers, [10, 0.5])
+        assert result[0][0] is True
+        assert result[1][0] is False
+        assert result[1][1] >= 0.5
+        # The server that did not stop is closed and not returned to the
+        # pool
+        assert not servers[1].child.isalive()
+        assert servers[0].child.isalive()
+        assert pool.acquire(fake_server, '-S -t Square') is servers[0]
+        new_server = pool.acquire(fake_server, '-S -t Square')
+        assert new_server is not servers[1]
+        new_server.close()
+    finally:
+        for server in servers:
+            server.close()
+        pool.close()